@@ -1,12 +1,19 @@
 """Admin API routes."""
+import json
 import logging
+from datetime import datetime
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
+from ...core.exceptions import ValidationError
+from ...core.pagination import page_response, parse_page_args
 from ...core.security import admin_required, login_required
 from ...db.session import get_db
 from ...schemas.auth import UserRead
 from ...schemas.user import UserCreateAdmin, UserListPaginated, UserListResponse, UserUpdateAdmin
+from ...services.ai_service import AIService
+from ...services.ai_usage_service import AIUsageService
+from ...services.roster_import import RosterImportService
 from ...services.user_service import UserService
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/api/v1/admin")
@@ -16,25 +23,40 @@ logger = logging.getLogger(__name__)
 @admin_bp.route("/users", methods=["GET"])
 @admin_required
 def list_users():
-    """Get list of users with optional filtering."""
+    """Get list of users with optional filtering.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset pagination:
+    the response carries ``next_cursor`` and a briefly cached ``total``
+    (``with_total=false`` skips counting). ``skip``/``limit`` keep working as before.
+    """
     # GET requests use query parameters
     role = request.args.get("role") or None
     search = request.args.get("search") or None
-    try:
-        skip = int(request.args.get("skip", 0))
-        limit = int(request.args.get("limit", 100))
-    except (ValueError, TypeError):
-        skip = 0
-        limit = 100
 
     db = get_db()
     service = UserService(db)
     try:
+        if "cursor" in request.args:
+            cursor, limit = parse_page_args(request.args)
+            with_total = request.args.get("with_total", "true").lower() != "false"
+            page = service.get_users_page(role=role, search=search, limit=limit, cursor=cursor, with_total=with_total)
+            return jsonify(
+                page_response(page, limit, lambda user: UserListResponse.model_validate(user).model_dump())
+            )
+
+        try:
+            skip = int(request.args.get("skip", 0))
+            limit = int(request.args.get("limit", 100))
+        except (ValueError, TypeError):
+            skip = 0
+            limit = 100
         users, total = service.get_users(role=role, search=search, skip=skip, limit=limit)
         items = [UserListResponse.model_validate(user).model_dump() for user in users]
         return jsonify(
             UserListPaginated(items=items, total=total, skip=skip, limit=limit).model_dump()
         )
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
     except Exception as e:
         logger.error(f"Error listing users: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -69,7 +91,6 @@ def create_user():
             class_name=payload.class_name,
             notes=payload.notes,
         )
-        db.commit()
         logger.info(f"User created by admin: {user.id} ({user.role})")
         return jsonify(UserRead.model_validate(user).model_dump()), 201
     except ValueError as e:
@@ -81,6 +102,48 @@ def create_user():
         return jsonify({"detail": str(e)}), 500
 
 
+@admin_bp.route("/users/import", methods=["POST"])
+@admin_required
+def import_users():
+    """Bulk-import a roster from an uploaded CSV or XLSX file (multipart field ``file``).
+
+    Form fields: ``default_password`` (used for rows without a password column/value),
+    ``dry_run=true`` to validate only. Progress and the final per-row error report are
+    streamed as server-sent events.
+    """
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"detail": "file is required"}), 400
+    default_password = request.form.get("default_password") or None
+    dry_run = (request.form.get("dry_run") or "").lower() in ("1", "true", "yes")
+
+    try:
+        rows = RosterImportService.parse(upload.filename, upload.stream)
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error parsing roster: {e}", exc_info=True)
+        return jsonify({"detail": f"Unable to read roster: {e}"}), 400
+
+    db = get_db()
+
+    def generate():
+        try:
+            for event in RosterImportService.run(db, rows, default_password=default_password, dry_run=dry_run):
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            logger.info(f"Roster imported by admin: {len(rows)} rows (dry_run={dry_run})")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error importing roster: {e}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @admin_bp.route("/users/<int:user_id>", methods=["GET"])
 @admin_required
 def get_user(user_id: int):
@@ -128,7 +191,6 @@ def update_user(user_id: int):
             class_name=payload.class_name,
             notes=payload.notes,
         )
-        db.commit()
         logger.info(f"User updated by admin: {user_id}")
         return jsonify(UserRead.model_validate(user).model_dump())
     except ValueError as e:
@@ -148,7 +210,6 @@ def delete_user(user_id: int):
     service = UserService(db)
     try:
         service.delete_user(user_id)
-        db.commit()
         logger.info(f"User deleted by admin: {user_id}")
         return jsonify({"detail": "User deleted successfully"}), 200
     except ValueError as e:
@@ -159,3 +220,64 @@ def delete_user(user_id: int):
         logger.error(f"Error deleting user: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
 
+
+
+@admin_bp.route("/ai-usage", methods=["GET"])
+@admin_required
+def get_ai_usage():
+    """AI token usage report per user, read from the daily/monthly rollups.
+
+    Query params: period=day|month (default day), key=YYYY-MM-DD|YYYY-MM (default current), user_id.
+    """
+    period = request.args.get("period", "day")
+    if period not in ("day", "month"):
+        return jsonify({"detail": "period must be 'day' or 'month'"}), 400
+    key = request.args.get("key") or datetime.utcnow().strftime("%Y-%m-%d" if period == "day" else "%Y-%m")
+    try:
+        user_id = int(request.args["user_id"]) if request.args.get("user_id") else None
+    except (ValueError, TypeError):
+        return jsonify({"detail": "user_id must be an integer"}), 400
+
+    db = get_db()
+    try:
+        items = AIUsageService.get_report(db, period, key, user_id=user_id)
+        return jsonify({
+            "period": period,
+            "key": key,
+            "total_tokens": sum(item["total_tokens"] for item in items),
+            "items": items,
+        })
+    except Exception as e:
+        logger.error(f"Error getting AI usage report: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
+@admin_bp.route("/ai-logs", methods=["GET"])
+@admin_required
+def list_ai_logs():
+    """AI interaction logs, newest first, with keyset pagination.
+
+    Query params: action, limit, cursor (``next_cursor`` from the previous page).
+    """
+    db = get_db()
+    try:
+        cursor, limit = parse_page_args(request.args)
+        page = AIService.get_logs_page(db, action=request.args.get("action") or None, limit=limit, cursor=cursor)
+        return jsonify(
+            page_response(
+                page,
+                limit,
+                lambda log: {
+                    "id": log.id,
+                    "action": log.action,
+                    "input_data": log.input_data,
+                    "output_data": log.output_data,
+                    "created_at": log.created_at.isoformat(),
+                },
+            )
+        )
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error listing AI logs: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
@@ -3,21 +3,116 @@ AI助理API
 """
 import logging
 import json
+import mimetypes
 import os
-from pathlib import Path
-from flask import Blueprint, jsonify, request, Response, stream_with_context, send_from_directory
+from functools import wraps
+from flask import Blueprint, jsonify, make_response, redirect, request, Response, send_file, stream_with_context, send_from_directory
 
+from ...core.config import get_settings
 from ...core.security import login_required
 from flask import g
 from ...db.session import get_db
 from ...services.ai_service import AIService
+from ...services.ai_usage_service import AIUsageService
+from ...services.chapter_service import ChapterService
+from ...services import generated_file_service
+from ...services.data_generator import SchemaError, normalize_schema, preview_text, write_dataset
+from ...services.level_service import LevelService
 
 ai_assistant_bp = Blueprint("ai_assistant", __name__, url_prefix="/api/v1/ai-assistant")
 logger = logging.getLogger(__name__)
 
 
+def ai_quota_required(f):
+    """在调用大模型前校验当前用户的 token 配额
+
+    达到硬配额时直接返回 429；达到软配额时照常处理，并在响应头 ``X-AI-Quota-Warning`` 中给出提示。
+    需放在 ``login_required`` 之后。
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        status = AIUsageService.check_quota(get_db(), g.current_user)
+        if status.exceeded:
+            return jsonify({"detail": status.message, "quota": status.as_dict()}), 429
+        response = make_response(f(*args, **kwargs))
+        if status.warnings:
+            response.headers["X-AI-Quota-Warning"] = ",".join(status.warnings)
+        return response
+    return decorated_function
+
+
+def _commit_stream_writes(db) -> None:
+    """流式接口的生成线程在 after_request（commit_db）之后才结束：由线程自己提交 AI 用量与日志"""
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to commit AI usage of a streamed response: {e}")
+
+
+def _parse_data_schema_options(data: dict) -> tuple[dict, str | None]:
+    """解析 schema 模式的 rows / seed 参数，返回 (options, error)"""
+    settings = get_settings()
+    try:
+        rows = int(data.get("rows") or settings.data_file_default_rows)
+        seed = int(data["seed"]) if data.get("seed") is not None else int.from_bytes(os.urandom(4), "big")
+    except (TypeError, ValueError):
+        return {}, "rows 和 seed 必须是整数"
+    if not 1 <= rows <= settings.data_file_max_rows:
+        return {}, f"rows 必须在 1 到 {settings.data_file_max_rows} 之间"
+    return {"rows": rows, "seed": seed}, None
+
+
+def _stored_file_info(stored: "generated_file_service.StoredFile", base_url: str = "") -> dict:
+    """生成文件的返回信息：url 指向内容哈希文件名（可永久缓存），alias_url 始终指向最新版本"""
+    return {
+        "filename": stored.alias,
+        "stored_name": stored.name,
+        "size": stored.size,
+        "url": f"{base_url}{generated_file_service.URL_PREFIX}{stored.name}",
+        "alias_url": f"{base_url}{generated_file_service.URL_PREFIX}{stored.alias}",
+    }
+
+
+def _with_base_url(info: dict, base_url: str) -> dict:
+    return {
+        **info,
+        "url": base_url + info["url"],
+        "alias_url": base_url + info["alias_url"],
+    }
+
+
+def _write_schema_data_file(
+    schema: dict,
+    task_name: str,
+    file_format: str,
+    rows: int,
+    seed: int,
+    progress_callback=None,
+) -> dict:
+    """按 schema 在本地生成数据并写入 backend/data/generated，返回文件信息与预览"""
+    normalized = normalize_schema(schema)
+    tmp_path = generated_file_service.new_temp_path()
+    try:
+        preview = write_dataset(normalized, tmp_path, file_format, rows, seed, progress_callback=progress_callback)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    stored = generated_file_service.store_path(tmp_path, generated_file_service.safe_alias(task_name, file_format))
+    return {
+        **_stored_file_info(stored),
+        "file_format": file_format,
+        "schema": schema,
+        "rows": rows,
+        "seed": seed,
+        "preview": preview,
+        "content": preview_text(preview, normalized, file_format),
+    }
+
+
 @ai_assistant_bp.route("/generate-mindmap", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_mindmap():
     """AI生成思维导图（支持教学大纲解析和流式输出）"""
     if not request.is_json:
@@ -45,7 +140,7 @@ def generate_mindmap():
             return jsonify({"detail": "篇章名称或教学大纲不能为空"}), 400
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         # 如果启用流式输出且提供了教学大纲
         if stream and syllabus:
@@ -78,6 +173,7 @@ def generate_mindmap():
                             result_container['error'] = str(e)
                             logger.error(f"Error in AI generation: {e}", exc_info=True)
                         finally:
+                            _commit_stream_writes(db)
                             result_container['finished'] = True
                             content_queue.put(('done', None))
                     
@@ -141,6 +237,7 @@ def generate_mindmap():
 
 @ai_assistant_bp.route("/generate-task", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_task():
     """AI生成关卡任务"""
     if not request.is_json:
@@ -156,7 +253,7 @@ def generate_task():
             return jsonify({"detail": "只有教师和管理员可以使用AI助理"}), 403
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         level_name = data.get("level_name", "")
         level_description = data.get("level_description")
@@ -177,6 +274,7 @@ def generate_task():
 
 @ai_assistant_bp.route("/generate-cards", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_cards():
     """AI生成知识/技能卡片"""
     if not request.is_json:
@@ -192,7 +290,7 @@ def generate_cards():
             return jsonify({"detail": "只有教师和管理员可以使用AI助理"}), 403
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         task_name = data.get("task_name", "")
         task_description = data.get("task_description")
@@ -213,6 +311,7 @@ def generate_cards():
 
 @ai_assistant_bp.route("/generate-phases", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_phases():
     """AI生成环节步骤"""
     if not request.is_json:
@@ -228,7 +327,7 @@ def generate_phases():
             return jsonify({"detail": "只有教师和管理员可以使用AI助理"}), 403
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         task_name = data.get("task_name", "")
         task_description = data.get("task_description")
@@ -249,6 +348,7 @@ def generate_phases():
 
 @ai_assistant_bp.route("/generate-questions", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_questions():
     """AI生成闯关考题"""
     if not request.is_json:
@@ -264,7 +364,7 @@ def generate_questions():
             return jsonify({"detail": "只有教师和管理员可以使用AI助理"}), 403
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         level_name = data.get("level_name", "")
         knowledge_points = data.get("knowledge_points", [])
@@ -286,6 +386,7 @@ def generate_questions():
 
 @ai_assistant_bp.route("/generate-teaching-guide", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_teaching_guide():
     """AI生成实验指导书（Markdown格式）"""
     if not request.is_json:
@@ -312,7 +413,7 @@ def generate_teaching_guide():
             return jsonify({"detail": "任务名称和任务要求不能为空"}), 400
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         content = ai_service.generate_teaching_guide(
             task_name=task_name,
@@ -334,6 +435,7 @@ def generate_teaching_guide():
 
 @ai_assistant_bp.route("/generate-teaching-guide-stream", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_teaching_guide_stream():
     """AI生成实验指导书（Markdown格式，SSE 流式输出日志与最终结果）"""
     if not request.is_json:
@@ -360,7 +462,7 @@ def generate_teaching_guide_stream():
             return jsonify({"detail": "任务名称和任务要求不能为空"}), 400
 
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
 
         def generate():
             try:
@@ -393,6 +495,7 @@ def generate_teaching_guide_stream():
                         result_container["error"] = str(e)
                         logger.error(f"Error in generate_teaching_guide_stream: {e}", exc_info=True)
                     finally:
+                        _commit_stream_writes(db)
                         result_container["finished"] = True
                         content_queue.put(("done", None))
 
@@ -439,6 +542,7 @@ def generate_teaching_guide_stream():
 
 @ai_assistant_bp.route("/generate-teaching-requirements", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_teaching_requirements():
     """AI 生成实验指导书中的「任务要求」段落（Markdown 文本）"""
     if not request.is_json:
@@ -462,7 +566,7 @@ def generate_teaching_requirements():
             return jsonify({"detail": "任务名称不能为空"}), 400
 
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
 
         requirements = ai_service.generate_teaching_requirements(
             task_name=task_name,
@@ -481,6 +585,7 @@ def generate_teaching_requirements():
 
 @ai_assistant_bp.route("/generate-teaching-requirements-stream", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_teaching_requirements_stream():
     """AI 流式生成「任务要求」段落（Markdown 文本），并通过 SSE 输出进度日志"""
     if not request.is_json:
@@ -504,7 +609,7 @@ def generate_teaching_requirements_stream():
             return jsonify({"detail": "任务名称不能为空"}), 400
 
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
 
         def generate():
             try:
@@ -536,6 +641,7 @@ def generate_teaching_requirements_stream():
                             exc_info=True,
                         )
                     finally:
+                        _commit_stream_writes(db)
                         result_container["finished"] = True
                         content_queue.put(("done", None))
 
@@ -582,6 +688,7 @@ def generate_teaching_requirements_stream():
 
 @ai_assistant_bp.route("/generate-data-file", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_data_file():
     """根据教案中的数据要求生成示例数据文件内容（csv/json/txt）"""
     if not request.is_json:
@@ -600,17 +707,35 @@ def generate_data_file():
         task_name = (data.get("task_name") or "").strip()
         data_requirements = (data.get("data_requirements") or "").strip()
         file_format = (data.get("file_format") or "csv").strip().lower() or "csv"
+        # content：由大模型直接输出整份数据；schema：大模型只输出列定义，数据行在本地生成
+        mode = (data.get("mode") or "content").strip().lower()
+        schema = data.get("schema") if mode == "schema" else None
 
         if not task_name:
             return jsonify({"detail": "任务名称不能为空"}), 400
-        if not data_requirements:
+        if not data_requirements and not schema:
             return jsonify({"detail": "数据要求不能为空"}), 400
 
         if file_format not in ["csv", "json", "txt"]:
             file_format = "csv"
 
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
+
+        if mode == "schema":
+            options, error = _parse_data_schema_options(data)
+            if error:
+                return jsonify({"detail": error}), 400
+            # 请求中带上之前返回的 schema 与 seed 可以不经大模型直接复现或扩充数据
+            if not schema:
+                schema = ai_service.generate_data_schema(task_name=task_name, data_requirements=data_requirements)
+            if not schema:
+                return jsonify({"detail": "生成数据结构失败，请稍后重试"}), 500
+            try:
+                result = _write_schema_data_file(schema, task_name, file_format, **options)
+            except SchemaError as e:
+                return jsonify({"detail": f"数据结构不合法：{e}", "schema": schema}), 400
+            return jsonify(_with_base_url(result, request.host_url.rstrip("/"))), 200
 
         content = ai_service.generate_data_file(
             task_name=task_name,
@@ -621,29 +746,15 @@ def generate_data_file():
         if not content:
             return jsonify({"detail": "生成数据文件失败，请稍后重试"}), 500
 
-        # 简单生成一个推荐的文件名
-        safe_task_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in task_name)[:50] or "data"
-        ext = "csv" if file_format == "csv" else "json" if file_format == "json" else "txt"
-        filename = f"{safe_task_name}_sample.{ext}"
-
-        # 将文件写入 backend/data/generated 目录下
-        project_root = Path(__file__).resolve().parents[3]
-        data_dir = project_root / "data" / "generated"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        file_path = data_dir / filename
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
-
-        # 构造可在 Markdown 中引用的 URL
-        base_url = request.host_url.rstrip("/")
-        file_url = f"{base_url}/api/v1/ai-assistant/data-files/{filename}"
+        # 按内容哈希保存到 backend/data/generated，并更新「任务名_sample.<ext>」别名
+        stored = generated_file_service.store_text(content, generated_file_service.safe_alias(task_name, file_format))
+        info = _with_base_url(_stored_file_info(stored), request.host_url.rstrip("/"))
 
         return jsonify(
             {
-                "filename": filename,
+                **info,
                 "content": content,
                 "file_format": file_format,
-                "url": file_url,
             }
         ), 200
     except Exception as e:
@@ -653,6 +764,7 @@ def generate_data_file():
 
 @ai_assistant_bp.route("/generate-data-file-stream", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_data_file_stream():
     """根据教案中的数据要求生成示例数据文件内容（csv/json/txt），并通过 SSE 输出流式日志"""
     if not request.is_json:
@@ -670,16 +782,24 @@ def generate_data_file_stream():
         task_name = (data.get("task_name") or "").strip()
         data_requirements = (data.get("data_requirements") or "").strip()
         file_format = (data.get("file_format") or "csv").strip().lower() or "csv"
+        mode = (data.get("mode") or "content").strip().lower()
+        schema = data.get("schema") if mode == "schema" else None
 
         if not task_name:
             return jsonify({"detail": "任务名称不能为空"}), 400
-        if not data_requirements:
+        if not data_requirements and not schema:
             return jsonify({"detail": "数据要求不能为空"}), 400
         if file_format not in ["csv", "json", "txt"]:
             file_format = "csv"
+        schema_options = {}
+        if mode == "schema":
+            schema_options, error = _parse_data_schema_options(data)
+            if error:
+                return jsonify({"detail": error}), 400
 
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
+        base_url = request.host_url.rstrip("/")
 
         def generate():
             try:
@@ -695,8 +815,31 @@ def generate_data_file_stream():
                 def stream_callback(chunk: str):
                     content_queue.put(('content', chunk))
 
+                def progress_callback(written: int, total: int):
+                    content_queue.put(('progress', {'written': written, 'total': total}))
+
+                def run_schema_mode():
+                    # 大模型只生成列定义（流式输出），随后在本线程内本地生成数据行
+                    data_schema = schema or ai_service.generate_data_schema(
+                        task_name=task_name,
+                        data_requirements=data_requirements,
+                        stream_callback=stream_callback,
+                    )
+                    if not data_schema:
+                        return None
+                    try:
+                        return _write_schema_data_file(
+                            data_schema, task_name, file_format,
+                            progress_callback=progress_callback, **schema_options,
+                        )
+                    except SchemaError as e:
+                        raise ValueError(f"数据结构不合法：{e}") from e
+
                 def run_ai():
                     try:
+                        if mode == "schema":
+                            result_container['result'] = run_schema_mode()
+                            return
                         result = ai_service.generate_data_file_stream(
                             task_name=task_name,
                             data_requirements=data_requirements,
@@ -708,6 +851,7 @@ def generate_data_file_stream():
                         result_container['error'] = str(e)
                         logger.error(f"Error in generate_data_file_stream: {e}", exc_info=True)
                     finally:
+                        _commit_stream_writes(db)
                         result_container['finished'] = True
                         content_queue.put(('done', None))
 
@@ -719,6 +863,8 @@ def generate_data_file_stream():
                         item_type, content = content_queue.get(timeout=1)
                         if item_type == 'content' and content:
                             yield f"data: {json.dumps({'type': 'content', 'content': content})}\n\n"
+                        elif item_type == 'progress':
+                            yield f"data: {json.dumps({'type': 'progress', **content})}\n\n"
                         elif item_type == 'done':
                             break
                     except queue.Empty:
@@ -730,6 +876,9 @@ def generate_data_file_stream():
 
                 if result_container['error']:
                     yield f"data: {json.dumps({'type': 'error', 'message': result_container['error']})}\n\n"
+                elif mode == "schema" and result_container['result']:
+                    result = _with_base_url(result_container['result'], base_url)
+                    yield f"data: {json.dumps({'type': 'result', **result}, ensure_ascii=False)}\n\n"
                 elif result_container['result']:
                     content = result_container['result']
                     if not content:
@@ -737,21 +886,12 @@ def generate_data_file_stream():
                         return
 
                     # 写入文件并返回 URL（与非流式接口保持一致）
-                    project_root = Path(__file__).resolve().parents[3]
-                    data_dir = project_root / "data" / "generated"
-                    data_dir.mkdir(parents=True, exist_ok=True)
-
-                    safe_task_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in task_name)[:50] or "data"
-                    ext = "csv" if file_format == "csv" else "json" if file_format == "json" else "txt"
-                    filename = f"{safe_task_name}_sample.{ext}"
-                    file_path = data_dir / filename
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(content)
+                    stored = generated_file_service.store_text(
+                        content, generated_file_service.safe_alias(task_name, file_format)
+                    )
+                    info = _with_base_url(_stored_file_info(stored), base_url)
 
-                    base_url = request.host_url.rstrip("/")
-                    file_url = f"{base_url}/api/v1/ai-assistant/data-files/{filename}"
-
-                    yield f"data: {json.dumps({'type': 'result', 'filename': filename, 'file_format': file_format, 'url': file_url})}\n\n"
+                    yield f"data: {json.dumps({'type': 'result', 'file_format': file_format, **info})}\n\n"
                 else:
                     yield f"data: {json.dumps({'type': 'error', 'message': '生成数据文件失败，请稍后重试'})}\n\n"
             except Exception as e:
@@ -772,16 +912,64 @@ def generate_data_file_stream():
         return jsonify({"detail": str(e)}), 500
 
 
+@ai_assistant_bp.route("/usage", methods=["GET"])
+@login_required
+def get_my_usage():
+    """当前用户当天/当月的 AI token 用量与配额"""
+    status = AIUsageService.check_quota(get_db(), g.current_user)
+    if g.current_user.role == "admin":
+        # 管理员不受配额限制，但仍返回实际用量
+        totals = AIUsageService.get_user_totals(get_db(), g.current_user.id)
+        status.daily_tokens, status.monthly_tokens = totals["day"], totals["month"]
+    return jsonify(status.as_dict()), 200
+
+
 @ai_assistant_bp.route("/data-files/<path:filename>", methods=["GET"])
 def get_data_file(filename: str):
     """提供生成的数据文件下载/访问接口，支持在 Markdown 中通过 URL 访问
 
     说明：该链接需要能被浏览器/Markdown 直接打开，因此这里不做登录校验。
     若后续需要权限控制，可改为短期签名 URL 或带 token 的一次性链接。
+
+    - 哈希文件名：内容不可变，返回强 ETag 与一年的 immutable 缓存，支持 Range 与预压缩 gzip；
+    - 友好文件名（别名）：302 跳转到当前指向的哈希文件名，跳转本身不缓存；
+    - 旧版按任务名直接保存的文件：按原方式返回。
     """
     safe_name = os.path.basename(filename)
-    project_root = Path(__file__).resolve().parents[3]
-    data_dir = project_root / "data" / "generated"
+    data_dir = generated_file_service.GENERATED_DIR
+
+    if generated_file_service.is_hashed_name(safe_name):
+        file_path = data_dir / safe_name
+        if not file_path.exists():
+            return jsonify({"detail": "文件不存在"}), 404
+        digest = safe_name.split(".", 1)[0]
+        gz_path = file_path.with_name(safe_name + ".gz")
+        # Range 请求按原始字节偏移，因此只在整文件请求时返回 gzip 版本
+        use_gzip = (
+            "gzip" in request.headers.get("Accept-Encoding", "")
+            and not request.headers.get("Range")
+            and gz_path.exists()
+        )
+        mimetype = mimetypes.guess_type(safe_name)[0] or "application/octet-stream"
+        response = send_file(
+            gz_path if use_gzip else file_path,
+            mimetype=mimetype,
+            download_name=safe_name,
+            conditional=True,
+            etag=f"{digest}-gz" if use_gzip else digest,
+        )
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    target = generated_file_service.resolve_alias(safe_name)
+    if target:
+        response = redirect(f"{generated_file_service.URL_PREFIX}{target}", code=302)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
     if not (data_dir / safe_name).exists():
         return jsonify({"detail": "文件不存在"}), 404
 
@@ -789,6 +977,7 @@ def get_data_file(filename: str):
 
 @ai_assistant_bp.route("/generate-syllabus", methods=["POST"])
 @login_required
+@ai_quota_required
 def generate_syllabus():
     """AI生成教学大纲（流式输出，返回Markdown格式）"""
     if not request.is_json:
@@ -812,7 +1001,7 @@ def generate_syllabus():
             return jsonify({"detail": "课程名称和课程要求不能为空"}), 400
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         # 如果启用流式输出
         if stream:
@@ -843,6 +1032,7 @@ def generate_syllabus():
                             result_container['error'] = str(e)
                             logger.error(f"Error in AI generation: {e}", exc_info=True)
                         finally:
+                            _commit_stream_writes(db)
                             result_container['finished'] = True
                             content_queue.put(('done', None))
                     
@@ -902,6 +1092,7 @@ def generate_syllabus():
 
 @ai_assistant_bp.route("/learning-help", methods=["POST"])
 @login_required
+@ai_quota_required
 def learning_help():
     """AI学习助手（学生端）"""
     if not request.is_json:
@@ -914,15 +1105,33 @@ def learning_help():
     try:
         current_user = g.current_user
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         
         question = data.get("question", "")
         context = data.get("context")
+        level_id = data.get("level_id")
         
         if not question:
             return jsonify({"detail": "问题不能为空"}), 400
         
-        result = ai_service.learning_help(question, context)
+        if level_id is not None:
+            try:
+                level_id = int(level_id)
+            except (TypeError, ValueError):
+                return jsonify({"detail": "level_id 必须为整数"}), 400
+            level = LevelService.get_level(db, level_id)
+            if not level:
+                return jsonify({"detail": "关卡不存在"}), 404
+            # 学生只能基于已发布的关卡提问；教师只能引用自己篇章下的关卡
+            if current_user.role == "student":
+                if not level.is_published:
+                    return jsonify({"detail": "无权访问此关卡"}), 403
+            elif current_user.role != "admin":
+                chapter = ChapterService.get_chapter(db, level.chapter_id)
+                if not chapter or chapter.teacher_id != current_user.id:
+                    return jsonify({"detail": "无权访问此关卡"}), 403
+        
+        result = ai_service.learning_help(question, context, level_id=level_id)
         
         if result:
             return jsonify({"answer": result}), 200
@@ -935,6 +1144,7 @@ def learning_help():
 
 @ai_assistant_bp.route("/teaching-guide-to-course-json", methods=["POST"])
 @login_required
+@ai_quota_required
 def teaching_guide_to_course_json():
     """将Markdown教案转换为固定结构的课程JSON（courseData）"""
     if not request.is_json:
@@ -954,7 +1164,7 @@ def teaching_guide_to_course_json():
             return jsonify({"detail": "markdown 内容不能为空"}), 400
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         result = ai_service.teaching_guide_to_course_json(markdown)
         
         if not result:
@@ -972,6 +1182,7 @@ def teaching_guide_to_course_json():
 
 @ai_assistant_bp.route("/teaching-guide-to-course-json-stream", methods=["POST"])
 @login_required
+@ai_quota_required
 def teaching_guide_to_course_json_stream():
     """将Markdown教案转换为课程JSON（courseData），并通过SSE流式返回中间日志与最终结果"""
     if not request.is_json:
@@ -991,7 +1202,7 @@ def teaching_guide_to_course_json_stream():
             return jsonify({"detail": "markdown 内容不能为空"}), 400
         
         db = get_db()
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
 
         def generate():
             try:
@@ -1018,6 +1229,7 @@ def teaching_guide_to_course_json_stream():
                         result_container["error"] = str(e)
                         logger.error(f"Error in teaching_guide_to_course_json_stream: {e}", exc_info=True)
                     finally:
+                        _commit_stream_writes(db)
                         result_container["finished"] = True
                         content_queue.put(("done", None))
 
@@ -1,13 +1,14 @@
 import logging
-from datetime import timedelta
 
 from flask import Blueprint, jsonify, request
 from pydantic import ValidationError
 
 from ...core.config import get_settings
-from ...core.security import create_access_token, login_required
+from ...core.hash_executor import HashingBusyError
+from ...core.security import login_required
 from ...db.session import get_db
-from ...schemas.auth import TeacherCreate, Token, UserCreate, UserLogin, UserRead
+from ...models.user import User
+from ...schemas.auth import RefreshRequest, TeacherCreate, Token, UserCreate, UserLogin, UserRead
 from ...services.auth import AuthService
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/v1/auth")
@@ -44,7 +45,6 @@ def register_user():
     service = AuthService(db)
     try:
         user = service.register_user(payload)
-        db.commit()
         logger.info(f"User registered successfully: {user.id}")
         return jsonify(UserRead.model_validate(user).model_dump()), 201
     except Exception as e:
@@ -76,24 +76,80 @@ def login():
     service = AuthService(db)
     try:
         user = service.authenticate(payload.identifier, payload.password)
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-        token = create_access_token(subject=str(user.id), expires_delta=access_token_expires)
+        tokens = service.issue_tokens(user)
         # Return token with user role information
-        response_data = Token(access_token=token).model_dump()
+        response_data = Token(**tokens).model_dump()
         response_data["user"] = UserRead.model_validate(user).model_dump()
         return jsonify(response_data)
+    except HashingBusyError as e:
+        logger.warning("Login rejected: password hash executor is saturated")
+        response = jsonify({"detail": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         status_code = getattr(e, "status_code", 401)
         error_msg = getattr(e, "message", str(e))
         return jsonify({"detail": error_msg}), status_code
 
 
+@auth_bp.route("/refresh", methods=["POST"])
+def refresh_token():
+    """Exchange a refresh token for a new access/refresh token pair (rotation)."""
+    data = request.get_json(silent=True) or {}
+    try:
+        payload = RefreshRequest(**data)
+    except ValidationError as e:
+        return jsonify({"detail": e.errors()}), 400
+
+    db = get_db()
+    service = AuthService(db)
+    try:
+        user, tokens = service.refresh(payload.refresh_token)
+        response_data = Token(**tokens).model_dump()
+        response_data["user"] = UserRead.model_validate(user).model_dump()
+        return jsonify(response_data)
+    except Exception as e:
+        db.rollback()
+        status_code = getattr(e, "status_code", 401)
+        error_msg = getattr(e, "message", str(e))
+        return jsonify({"detail": error_msg}), status_code
+
+
+@auth_bp.route("/logout", methods=["POST"])
+@login_required
+def logout():
+    """Log out the current session; its access and refresh tokens stop working at once."""
+    from flask import g
+    db = get_db()
+    family_id = g.token_payload.get("fam")
+    if family_id:
+        AuthService(db).revoke_session(family_id)
+    else:
+        # Token issued before sessions existed: the only way to revoke it is per user
+        AuthService(db).revoke_all_sessions(db.get(User, g.current_user.id))
+    return "", 204
+
+
+@auth_bp.route("/logout-all", methods=["POST"])
+@login_required
+def logout_all():
+    """Log out every session of the current user."""
+    from flask import g
+    db = get_db()
+    AuthService(db).revoke_all_sessions(db.get(User, g.current_user.id))
+    return "", 204
+
+
 @auth_bp.route("/me", methods=["GET"])
 @login_required
 def read_current_user():
     """Get current user information."""
     from flask import g
-    return jsonify(UserRead.model_validate(g.current_user).model_dump())
+    # g.current_user only carries id/role/is_active; load the full row for the profile
+    user = get_db().get(User, g.current_user.id)
+    if user is None:
+        return jsonify({"detail": "Could not validate credentials"}), 401
+    return jsonify(UserRead.model_validate(user).model_dump())
 
 
 @auth_bp.route("/admin/create-teacher", methods=["POST"])
@@ -124,7 +180,6 @@ def create_teacher():
     service = AuthService(db)
     try:
         teacher = service.create_teacher(payload)
-        db.commit()
         logger.info(f"Teacher created successfully: {teacher.id}")
         return jsonify(UserRead.model_validate(teacher).model_dump()), 201
     except Exception as e:
@@ -61,7 +61,6 @@ def create_chapter():
             description=payload.description,
             teacher_id=current_user.id
         )
-        db.commit()
         logger.info(f"Chapter created: {chapter.id} by user {current_user.id}")
         return jsonify(ChapterRead.model_validate(chapter).model_dump()), 201
     except ValidationError as e:
@@ -127,7 +126,6 @@ def update_chapter(chapter_id: int):
             name=payload.name,
             description=payload.description
         )
-        db.commit()
         logger.info(f"Chapter updated: {chapter_id} by user {current_user.id}")
         return jsonify(ChapterRead.model_validate(chapter).model_dump()), 200
     except NotFoundError as e:
@@ -156,7 +154,6 @@ def delete_chapter(chapter_id: int):
             return jsonify({"detail": "无权删除此篇章"}), 403
         
         ChapterService.delete_chapter(db, chapter_id)
-        db.commit()
         logger.info(f"Chapter deleted: {chapter_id} by user {current_user.id}")
         return jsonify({"detail": "篇章删除成功"}), 200
     except NotFoundError as e:
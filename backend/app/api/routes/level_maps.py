@@ -2,12 +2,14 @@
 地图管理API
 """
 import logging
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, make_response, request
 
-from ...core.exceptions import NotFoundError
+from ...core.conditional import is_not_modified, make_etag, not_modified, required_version, with_validators
+from ...core.exceptions import NotFoundError, PreconditionRequiredError, VersionConflictError
 from ...core.security import login_required
 from flask import g
 from ...db.session import get_db
+from sqlalchemy.exc import IntegrityError
 from ...schemas.level_map import LevelMapRead, LevelMapUpdate
 from ...services.level_map_service import LevelMapService
 from ...services.chapter_service import ChapterService
@@ -19,7 +21,12 @@ logger = logging.getLogger(__name__)
 @level_maps_bp.route("/<int:chapter_id>/map", methods=["GET"])
 @login_required
 def get_map(chapter_id: int):
-    """获取地图配置"""
+    """
+    获取地图配置
+
+    ETag 为地图版本号（"map-<版本>"，地图尚不存在时为 0），Last-Modified 为 updated_at；
+    If-None-Match / If-Modified-Since 命中时直接返回 304，不读取配置 JSON。
+    """
     try:
         current_user = g.current_user
         db = get_db()
@@ -32,16 +39,23 @@ def get_map(chapter_id: int):
         if current_user.role != "admin" and chapter.teacher_id != current_user.id:
             return jsonify({"detail": "无权访问此篇章"}), 403
         
-        level_map = LevelMapService.get_map_by_chapter(db, chapter_id)
+        level_map = LevelMapService.get_map_by_chapter(db, chapter_id, with_config=False)
+        etag = make_etag("map", level_map.version if level_map else 0)
+        last_modified = level_map.updated_at if level_map else None
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
         if not level_map:
             # 如果地图不存在，返回空配置
-            return jsonify({
+            data = {
                 "id": None,
                 "chapter_id": chapter_id,
-                "map_config_json": None
-            }), 200
-        
-        return jsonify(LevelMapRead.model_validate(level_map).model_dump()), 200
+                "map_config_json": None,
+                "version": 0
+            }
+        else:
+            data = LevelMapRead.model_validate(level_map).model_dump()
+        return with_validators(make_response(jsonify(data), 200), etag, last_modified)
     except Exception as e:
         logger.error(f"Error getting map: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -50,7 +64,12 @@ def get_map(chapter_id: int):
 @level_maps_bp.route("/<int:chapter_id>/map", methods=["PUT"])
 @login_required
 def update_map(chapter_id: int):
-    """更新地图配置（思维导图数据，包含关卡节点创建/更新）"""
+    """
+    更新地图配置（思维导图数据，包含关卡节点创建/更新）
+
+    需提供读取时的版本号（地图尚不存在时为 0）：请求体中的 version 或 If-Match: "map-<版本>"；
+    地图已被修改时返回 409（附 current_version），未提供时返回 428。
+    """
     if not request.is_json:
         return jsonify({"detail": "Content-Type must be application/json"}), 400
     
@@ -58,6 +77,14 @@ def update_map(chapter_id: int):
     if not data:
         return jsonify({"detail": "Request body is required"}), 400
     
+    body_version = data.get("version")
+    if body_version is not None and (not isinstance(body_version, int) or isinstance(body_version, bool)):
+        return jsonify({"detail": "version 必须是整数"}), 400
+    try:
+        expected_version = required_version(request.if_match, "map", body_version)
+    except PreconditionRequiredError as e:
+        return jsonify({"detail": e.message}), e.code
+    
     try:
         current_user = g.current_user
         db = get_db()
@@ -79,11 +106,17 @@ def update_map(chapter_id: int):
         level_map = LevelMapService.create_or_update_map(
             db=db,
             chapter_id=chapter_id,
-            map_config_json=map_config_json
+            map_config_json=map_config_json,
+            expected_version=expected_version
         )
-        db.commit()
         logger.info(f"Map updated for chapter {chapter_id} by user {current_user.id}")
         return jsonify(LevelMapRead.model_validate(level_map).model_dump()), 200
+    except VersionConflictError as e:
+        return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
+    except IntegrityError:
+        # 另一个请求同时创建了该篇章的地图
+        db.rollback()
+        return jsonify({"detail": "地图已被修改，请刷新后重试"}), 409
     except Exception as e:
         logger.error(f"Error updating map: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -2,29 +2,71 @@
 关卡管理API
 """
 import logging
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, make_response, request
 
-from ...core.exceptions import NotFoundError, ValidationError
+from ...core.authorization import get_resolver
+from ...core.conditional import is_not_modified, make_etag, not_modified, required_version, with_validators
+from ...core.exceptions import NotFoundError, PreconditionRequiredError, ValidationError, VersionConflictError
+from ...core.json_patch import JsonPatchError
+from ...core.pagination import page_response, parse_page_args, wants_page
 from ...core.security import login_required
 from flask import g
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...schemas.level import LevelCreate, LevelUpdate, LevelRead, CourseDataUpdate, CourseDataResponse
+from ...schemas.level import (
+    LEVEL_CONTENT_FIELDS,
+    CourseDataResponse,
+    CourseDataPatch,
+    CourseDataUpdate,
+    CourseDataVersionRead,
+    LevelCreate,
+    LevelRead,
+    LevelSummary,
+    LevelUpdate,
+)
+from ...services.course_data_version_service import EMPTY_COURSE_DATA, CourseDataVersionService
 from ...services.level_service import LevelService
 from ...services.chapter_service import ChapterService
 from ...services.treasure_chest_service import TreasureChestService
 from ...services.ai_service import AIService
+from ...services.guide_retriever import guide_retriever
 from ...schemas.treasure_chest import TreasureChestCreate, TreasureChestUpdate, TreasureChestRead
 import json
 from datetime import datetime
 
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
 levels_bp = Blueprint("levels", __name__, url_prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
 
+def _parse_content_fields(args) -> tuple:
+    """解析 ?fields=teaching_guide_md,course_data_json：列表中需要附带返回的大字段"""
+    raw = args.get("fields", "")
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in LEVEL_CONTENT_FIELDS]
+    if unknown:
+        raise ValidationError(f"fields 仅支持: {', '.join(LEVEL_CONTENT_FIELDS)}")
+    return fields
+
+
+def _level_summary_dict(level, content_fields: tuple = ()) -> dict:
+    data = LevelSummary.model_validate(level).model_dump()
+    for field in content_fields:
+        data[field] = getattr(level, field)
+    return data
+
+
 @levels_bp.route("/chapters/<int:chapter_id>/levels", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_levels(chapter_id: int):
-    """获取篇章下的关卡列表"""
+    """
+    获取篇章下的关卡列表
+
+    默认返回不含教案与课程数据的精简信息；需要时用 ?fields=teaching_guide_md,course_data_json 显式请求。
+    """
     try:
         current_user = g.current_user
         db = get_db()
@@ -37,8 +79,16 @@ def get_levels(chapter_id: int):
         if current_user.role != "admin" and chapter.teacher_id != current_user.id:
             return jsonify({"detail": "无权访问此篇章"}), 403
         
-        levels = LevelService.get_levels_by_chapter(db, chapter_id)
-        return jsonify([LevelRead.model_validate(level).model_dump() for level in levels]), 200
+        content_fields = _parse_content_fields(request.args)
+        if wants_page(request.args):
+            cursor, limit = parse_page_args(request.args)
+            page = LevelService.get_levels_page(db, chapter_id, limit, cursor, content_fields=content_fields)
+            return jsonify(page_response(page, limit, lambda level: _level_summary_dict(level, content_fields))), 200
+
+        levels = LevelService.get_levels_by_chapter(db, chapter_id, content_fields=content_fields)
+        return jsonify([_level_summary_dict(level, content_fields) for level in levels]), 200
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
     except Exception as e:
         logger.error(f"Error getting levels: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -84,7 +134,6 @@ def create_level(chapter_id: int):
             order=payload.order,
             allow_skip=payload.allow_skip,
         )
-        db.commit()
         logger.info(f"Level created: {level.id} in chapter {chapter_id} by user {current_user.id}")
         return jsonify(LevelRead.model_validate(level).model_dump()), 201
     except ValidationError as e:
@@ -95,32 +144,174 @@ def create_level(chapter_id: int):
 
 
 @levels_bp.route("/levels/<int:level_id>", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_level(level_id: int):
-    """获取关卡详情"""
+    """
+    获取关卡详情
+
+    ETag 为关卡版本号加课程数据版本号（"level-<版本>.<课程数据版本>"），Last-Modified 为 updated_at；
+    If-None-Match / If-Modified-Since 命中时直接返回 304，不加载教案与课程数据。
+    """
     try:
-        current_user = g.current_user
         db = get_db()
         
-        level = LevelService.get_level(db, level_id)
-        if not level:
-            return jsonify({"detail": "关卡不存在"}), 404
+        node, err = get_resolver(db).check(g.current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
         
-        # 检查篇章权限
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权访问此关卡"}), 403
+        level = node.entity
+        etag = make_etag("level", level.version, level.course_data_version)
+        if is_not_modified(request, etag, level.updated_at):
+            return not_modified(etag, level.updated_at)
         
-        return jsonify(LevelRead.model_validate(level).model_dump()), 200
+        level = LevelService.load_content(db, level)
+        response = make_response(jsonify(LevelRead.model_validate(level).model_dump()), 200)
+        return with_validators(response, etag, level.updated_at)
     except Exception as e:
         logger.error(f"Error getting level: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
 
 
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _level_tree_dict(level) -> dict:
+    """关卡树序列化（不含教案与课程数据大字段）"""
+    return {
+        "id": level.id,
+        "chapter_id": level.chapter_id,
+        "name": level.name,
+        "description": level.description,
+        "order": level.order,
+        "allow_skip": level.allow_skip,
+        "version": level.version,
+        "is_visible": level.is_visible,
+        "is_published": level.is_published,
+        "published_at": _isoformat(level.published_at),
+        "updated_at": _isoformat(level.updated_at),
+        "tasks": [
+            {
+                "id": t.id,
+                "name": t.name,
+                "description": t.description,
+                "objective": t.objective,
+                "updated_at": _isoformat(t.updated_at),
+                "phases": [
+                    {
+                        "id": p.id,
+                        "phase_name": p.phase_name,
+                        "order": p.order,
+                        "is_required": p.is_required,
+                        "steps": [
+                            {
+                                "id": s.id,
+                                "step_name": s.step_name,
+                                "content": s.content,
+                                "requirements": s.requirements,
+                                "submission_type": s.submission_type,
+                                "validation_rules": s.validation_rules,
+                                "order": s.order,
+                            }
+                            for s in p.steps
+                        ],
+                    }
+                    for p in t.phases
+                ],
+                "knowledge_cards": [
+                    {
+                        "id": c.id,
+                        "title": c.title,
+                        "content": c.content,
+                        "knowledge_point": c.knowledge_point,
+                        "order": c.order,
+                    }
+                    for c in t.knowledge_cards
+                ],
+                "skill_cards": [
+                    {
+                        "id": c.id,
+                        "title": c.title,
+                        "content": c.content,
+                        "skill_name": c.skill_name,
+                        "order": c.order,
+                    }
+                    for c in t.skill_cards
+                ],
+                "questions": [{"question_id": r.question_id, "order": r.order} for r in t.question_rels],
+            }
+            for t in level.tasks
+        ],
+        "questions": [
+            {
+                "id": q.id,
+                "question_type": q.question_type,
+                "title": q.title,
+                "content": q.content,
+                "options": q.options,
+                "correct_answer": q.correct_answer,
+                "answer_analysis": q.answer_analysis,
+                "difficulty": q.difficulty,
+                "score": q.score,
+                "knowledge_point": q.knowledge_point,
+                "tags": q.tags,
+                "version": q.version,
+            }
+            for q in level.questions
+        ],
+        "treasure_chests": [TreasureChestRead.model_validate(c).model_dump(mode="json") for c in level.treasure_chests],
+    }
+
+
+@levels_bp.route("/levels/<int:level_id>/tree", methods=["GET"])
+@query_budget(12)
+@login_required
+def get_level_tree(level_id: int):
+    """
+    获取关卡完整树（任务/环节/步骤/卡片/题目/宝箱），供关卡编辑器一次性加载
+
+    ETag 由各层 max(updated_at) 与行数计算，If-None-Match 命中时直接返回 304，不加载树。
+    """
+    try:
+        current_user = g.current_user
+        db = get_db()
+
+        _, err = get_resolver(db).check(current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        version = LevelService.get_level_tree_version(db, level_id)
+        if version is None:
+            return jsonify({"detail": "关卡不存在"}), 404
+        etag = f"tree-{version}"
+
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+        else:
+            level = LevelService.get_level_tree(db, level_id)
+            response = make_response(jsonify(_level_tree_dict(level)), 200)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+    except Exception as e:
+        logger.error(f"Error getting level tree: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
 @levels_bp.route("/levels/<int:level_id>", methods=["PUT"])
 @login_required
 def update_level(level_id: int):
-    """更新关卡基本信息"""
+    """
+    更新关卡基本信息
+
+    需提供读取时的版本号：请求体中的 version 或 If-Match: "level-<版本>"；
+    关卡已被修改时返回 409（附 current_version），未提供时返回 428。
+    修改课程数据时还需提供读取时的课程数据版本：请求体中的 course_data_base_version
+    或 If-Match: "level-<版本>.<课程数据版本>"，规则同上。
+    """
     if not request.is_json:
         return jsonify({"detail": "Content-Type must be application/json"}), 400
     
@@ -133,11 +324,21 @@ def update_level(level_id: int):
     except Exception as e:
         return jsonify({"detail": f"Invalid request data: {str(e)}"}), 400
     
+    try:
+        expected_version = required_version(request.if_match, "level", payload.version)
+        course_data_base_version = None
+        if payload.course_data_json is not None:
+            course_data_base_version = required_version(
+                request.if_match, "level", payload.course_data_base_version, revision=True
+            )
+    except PreconditionRequiredError as e:
+        return jsonify({"detail": e.message}), e.code
+    
     try:
         current_user = g.current_user
         db = get_db()
         
-        level = LevelService.get_level(db, level_id)
+        level = LevelService.get_level(db, level_id, with_content=True)
         if not level:
             return jsonify({"detail": "关卡不存在"}), 404
         
@@ -156,10 +357,14 @@ def update_level(level_id: int):
             teaching_guide_md=payload.teaching_guide_md,
             allow_skip=payload.allow_skip,
             course_data_json=payload.course_data_json,
+            user_id=current_user.id,
+            expected_version=expected_version,
+            course_data_base_version=course_data_base_version,
         )
-        db.commit()
         logger.info(f"Level updated: {level_id} by user {current_user.id}")
         return jsonify(LevelRead.model_validate(level).model_dump()), 200
+    except VersionConflictError as e:
+        return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
     except NotFoundError as e:
         return jsonify({"detail": e.message}), e.code
     except ValidationError as e:
@@ -187,7 +392,6 @@ def delete_level(level_id: int):
             return jsonify({"detail": "无权删除此关卡"}), 403
         
         LevelService.delete_level(db, level_id)
-        db.commit()
         logger.info(f"Level deleted: {level_id} by user {current_user.id}")
         return jsonify({"detail": "关卡删除成功"}), 200
     except NotFoundError as e:
@@ -238,7 +442,6 @@ def create_treasure_chest(level_id: int):
             position_y=payload.position_y,
             reward_config=payload.reward_config
         )
-        db.commit()
         logger.info(f"Treasure chest created: {chest.id} in level {level_id} by user {current_user.id}")
         return jsonify(TreasureChestRead.model_validate(chest).model_dump()), 201
     except ValidationError as e:
@@ -248,46 +451,62 @@ def create_treasure_chest(level_id: int):
         return jsonify({"detail": str(e)}), 500
 
 
+def _course_data_response(course_data: dict, version: int, status: int = 200, last_modified=None):
+    """课程数据响应；ETag 携带版本号，客户端在 PUT/PATCH 时通过 If-Match 回传，GET 时通过 If-None-Match 回传"""
+    response = make_response(jsonify(course_data), status)
+    return with_validators(response, make_etag("course-data", version), last_modified)
+
+
 @levels_bp.route("/levels/<int:level_id>/course-data", methods=["GET"])
 @login_required
 def get_course_data(level_id: int):
-    """获取关卡的课程数据（JSON）"""
+    """
+    获取关卡的课程数据（JSON）
+
+    课程数据只经由版本服务写入，版本号不变内容就不变：If-None-Match 与 "course-data-<版本>" 匹配
+    （或 If-Modified-Since 不早于 updated_at）时直接返回 304，不加载、不解析课程数据。
+    尚无课程数据但有教案时需要从教案生成，不返回 304。
+    """
     try:
         current_user = g.current_user
         db = get_db()
         
-        level = LevelService.get_level(db, level_id)
-        if not level:
-            return jsonify({"detail": "关卡不存在"}), 404
+        node, err = get_resolver(db).check(current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
         
-        # 检查篇章权限
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权访问此关卡"}), 403
+        level = node.entity
+        etag = make_etag("course-data", level.course_data_version)
+        stored = level.course_data_hash is not None or level.teaching_guide_hash is None
+        if stored and is_not_modified(request, etag, level.updated_at):
+            return not_modified(etag, level.updated_at)
         
+        level = LevelService.load_content(db, level, ("course_data_json",))
         # 如果有保存的JSON，返回JSON；否则从MD生成
         if level.course_data_json:
             try:
                 course_data = json.loads(level.course_data_json)
-                return jsonify(course_data), 200
+                return _course_data_response(course_data, level.course_data_version, last_modified=level.updated_at)
             except json.JSONDecodeError:
                 logger.warning(f"Invalid JSON in course_data_json for level {level_id}")
                 # 如果JSON无效，继续尝试从MD生成
         
         # 如果没有JSON，尝试从MD生成
         if level.teaching_guide_md:
-            ai_service = AIService(db)
+            ai_service = AIService(db, user_id=g.current_user.id)
             course_data = ai_service.teaching_guide_to_course_json(level.teaching_guide_md)
             if course_data:
-                # 保存生成的JSON
-                level.course_data_json = json.dumps(course_data, ensure_ascii=False)
+                # 保存生成的JSON（作为一个新版本）
+                CourseDataVersionService.record(db, level, course_data, current_user.id, source="ai")
                 level.last_md_sync = datetime.utcnow()
                 level.edit_mode = 'md'
                 db.commit()
-                return jsonify(course_data), 200
+                guide_retriever.index_level(level.id, level.teaching_guide_md, level.course_data_json)
+                return _course_data_response(course_data, level.course_data_version, last_modified=level.updated_at)
         
         # 都没有，返回空结构
-        return jsonify({"steps": [], "meta": {}}), 200
+        return _course_data_response(EMPTY_COURSE_DATA, level.course_data_version, last_modified=level.updated_at)
     except Exception as e:
         logger.error(f"Error getting course data: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -296,7 +515,12 @@ def get_course_data(level_id: int):
 @levels_bp.route("/levels/<int:level_id>/course-data", methods=["PUT"])
 @login_required
 def update_course_data(level_id: int):
-    """更新关卡的课程数据（JSON）"""
+    """
+    整体更新关卡的课程数据（JSON）
+
+    需提供修改基于的版本：If-Match: "course-data-<版本>" 或请求体中的 base_version；
+    不是当前版本时返回 409（附 current_version），未提供时返回 428。
+    """
     if not request.is_json:
         return jsonify({"detail": "Content-Type must be application/json"}), 400
     
@@ -309,11 +533,16 @@ def update_course_data(level_id: int):
     except Exception as e:
         return jsonify({"detail": f"Invalid request data: {str(e)}"}), 400
     
+    try:
+        base_version = required_version(request.if_match, "course-data", payload.base_version)
+    except PreconditionRequiredError as e:
+        return jsonify({"detail": e.message}), e.code
+    
     try:
         current_user = g.current_user
         db = get_db()
         
-        level = LevelService.get_level(db, level_id)
+        level = LevelService.get_level(db, level_id, with_content=True)
         if not level:
             return jsonify({"detail": "关卡不存在"}), 404
         
@@ -326,19 +555,203 @@ def update_course_data(level_id: int):
         if not isinstance(payload.course_data, dict):
             return jsonify({"detail": "course_data must be a JSON object"}), 400
         
-        # 保存JSON数据
-        level.course_data_json = json.dumps(payload.course_data, ensure_ascii=False)
-        level.last_json_edit = datetime.utcnow()
-        level.edit_mode = 'json'
-        
-        db.commit()
+        # 保存JSON数据（基于当前版本且内容有变化时追加一个版本）
+        try:
+            CourseDataVersionService.check_base_version(level, base_version)
+            CourseDataVersionService.record(db, level, payload.course_data, current_user.id)
+            level.last_json_edit = datetime.utcnow()
+            level.edit_mode = 'json'
+            db.commit()
+        except VersionConflictError as e:
+            return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
+        except (IntegrityError, StaleDataError):
+            # 另一个请求同时基于同一版本保存
+            db.rollback()
+            return jsonify({"detail": "课程数据已被修改，请刷新后重试"}), 409
+        guide_retriever.index_level(level.id, level.teaching_guide_md, level.course_data_json)
         logger.info(f"Course data updated for level {level_id} by user {current_user.id}")
-        return jsonify({"detail": "保存成功", "course_data": payload.course_data}), 200
+        return _course_data_response({
+            "detail": "保存成功",
+            "course_data": payload.course_data,
+            "version": level.course_data_version,
+        }, level.course_data_version)
     except Exception as e:
         logger.error(f"Error updating course data: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
 
 
+@levels_bp.route("/levels/<int:level_id>/course-data", methods=["PATCH"])
+@login_required
+def patch_course_data(level_id: int):
+    """
+    以 JSON Patch（RFC 6902）增量保存课程数据，供可视化编辑器自动保存
+
+    请求体为操作数组（Content-Type: application/json-patch+json，基础版本放在
+    If-Match: "course-data-<版本>"），或 {"base_version": <版本>, "patch": [...]}。
+    补丁在服务端应用到当前文档上；基础版本不是当前版本时返回 409，未提供基础版本时返回 428。
+    """
+    if not request.is_json:
+        return jsonify({"detail": "Content-Type must be application/json-patch+json"}), 400
+
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {"patch": data}
+    try:
+        payload = CourseDataPatch(**(data or {}))
+    except Exception as e:
+        return jsonify({"detail": f"Invalid request data: {str(e)}"}), 400
+
+    try:
+        base_version = required_version(request.if_match, "course-data", payload.base_version)
+    except PreconditionRequiredError as e:
+        return jsonify({"detail": e.message}), e.code
+
+    try:
+        current_user = g.current_user
+        db = get_db()
+
+        level = LevelService.get_level(db, level_id, with_content=True)
+        if not level:
+            return jsonify({"detail": "关卡不存在"}), 404
+
+        # 检查篇章权限
+        chapter = ChapterService.get_chapter(db, level.chapter_id)
+        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
+            return jsonify({"detail": "无权修改此关卡"}), 403
+
+        try:
+            entry = CourseDataVersionService.patch(db, level, payload.patch, base_version, current_user.id)
+            if entry is not None:
+                level.last_json_edit = datetime.utcnow()
+                level.edit_mode = 'json'
+                db.commit()
+        except VersionConflictError as e:
+            return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
+        except JsonPatchError as e:
+            return jsonify({"detail": f"补丁无法应用: {e}"}), 422
+        except (IntegrityError, StaleDataError):
+            # 另一个请求同时基于同一版本保存（版本号唯一约束或关卡行版本冲突）
+            db.rollback()
+            return jsonify({"detail": "课程数据已被修改，请刷新后重试"}), 409
+        if entry is not None:
+            guide_retriever.index_level(level.id, level.teaching_guide_md, level.course_data_json)
+        return _course_data_response({"detail": "保存成功", "version": level.course_data_version}, level.course_data_version)
+    except Exception as e:
+        logger.error(f"Error patching course data: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
+def _version_dict(entry) -> dict:
+    return CourseDataVersionRead.model_validate(entry).model_dump()
+
+
+@levels_bp.route("/levels/<int:level_id>/course-data/versions", methods=["GET"])
+@query_budget(3)
+@login_required
+def get_course_data_versions(level_id: int):
+    """获取课程数据的版本列表（按版本号倒序，不含内容）"""
+    try:
+        db = get_db()
+        _, err = get_resolver(db).check(g.current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        if wants_page(request.args):
+            cursor, limit = parse_page_args(request.args)
+            page = CourseDataVersionService.get_versions_page(db, level_id, limit, cursor)
+            return jsonify(page_response(page, limit, _version_dict)), 200
+        return jsonify([_version_dict(entry) for entry in CourseDataVersionService.get_versions(db, level_id)]), 200
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error listing course data versions: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
+@levels_bp.route("/levels/<int:level_id>/course-data/versions/<int:version>", methods=["GET"])
+@query_budget(3)
+@login_required
+def get_course_data_version(level_id: int, version: int):
+    """获取指定版本的课程数据（由最近的快照加补丁重建）"""
+    try:
+        db = get_db()
+        _, err = get_resolver(db).check(g.current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        course_data = CourseDataVersionService.get_version_data(db, level_id, version)
+        return jsonify({"version": version, "course_data": course_data}), 200
+    except (NotFoundError, ValidationError) as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error getting course data version: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
+@levels_bp.route("/levels/<int:level_id>/course-data/diff", methods=["GET"])
+@query_budget(4)
+@login_required
+def diff_course_data_versions(level_id: int):
+    """比较两个版本：?from=<版本>&to=<版本>（to 缺省为当前版本），返回把 from 变为 to 的 JSON Patch"""
+    try:
+        db = get_db()
+        node, err = get_resolver(db).check(g.current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        try:
+            from_version = int(request.args["from"])
+            to_version = int(request.args.get("to", node.entity.course_data_version))
+        except (KeyError, ValueError):
+            return jsonify({"detail": "from 与 to 必须是版本号"}), 400
+        patch = CourseDataVersionService.diff(db, level_id, from_version, to_version)
+        return jsonify({"from": from_version, "to": to_version, "patch": patch}), 200
+    except (NotFoundError, ValidationError) as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error diffing course data versions: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
+@levels_bp.route("/levels/<int:level_id>/course-data/versions/<int:version>/restore", methods=["POST"])
+@login_required
+def restore_course_data_version(level_id: int, version: int):
+    """把课程数据恢复到指定版本（追加为新版本，历史不被改写）"""
+    try:
+        current_user = g.current_user
+        db = get_db()
+        node, err = get_resolver(db).check(current_user, "level", level_id, forbidden="无权修改此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        level = node.entity
+        try:
+            CourseDataVersionService.restore(db, level, version, current_user.id)
+            level.last_json_edit = datetime.utcnow()
+            level.edit_mode = 'json'
+            db.commit()
+        except (IntegrityError, StaleDataError):
+            # 另一个请求同时保存了课程数据
+            db.rollback()
+            return jsonify({"detail": "课程数据已被修改，请刷新后重试"}), 409
+        guide_retriever.index_level(level.id, level.teaching_guide_md, level.course_data_json)
+        logger.info(f"Course data of level {level_id} restored to version {version} by user {current_user.id}")
+        return jsonify({
+            "detail": "已恢复",
+            "course_data": json.loads(level.course_data_json),
+            "version": level.course_data_version,
+        }), 200
+    except (NotFoundError, ValidationError) as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error restoring course data version: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
 @levels_bp.route("/levels/<int:level_id>/sync-md", methods=["POST"])
 @login_required
 def sync_to_md(level_id: int):
@@ -347,7 +760,7 @@ def sync_to_md(level_id: int):
         current_user = g.current_user
         db = get_db()
         
-        level = LevelService.get_level(db, level_id)
+        level = LevelService.get_level(db, level_id, with_content=True)
         if not level:
             return jsonify({"detail": "关卡不存在"}), 404
         
@@ -360,7 +773,7 @@ def sync_to_md(level_id: int):
             return jsonify({"detail": "没有可同步的JSON数据"}), 400
         
         # 调用AI将JSON转回MD（需要实现这个方法）
-        ai_service = AIService(db)
+        ai_service = AIService(db, user_id=g.current_user.id)
         try:
             course_data = json.loads(level.course_data_json)
             # 注意：这个方法需要在AIService中实现
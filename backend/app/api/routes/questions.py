@@ -4,31 +4,51 @@
 import logging
 
 from flask import Blueprint, jsonify, request, g
+from pydantic import ValidationError as PydanticValidationError
 
-from ...core.exceptions import ValidationError, NotFoundError
+from ...core.authorization import get_resolver
+from ...core.conditional import required_version
+from ...core.exceptions import ValidationError, NotFoundError, PreconditionRequiredError, VersionConflictError
+from ...core.pagination import page_response, parse_page_args, wants_page
 from ...core.security import login_required
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...services.level_service import LevelService
-from ...services.chapter_service import ChapterService
+from ...schemas.task_bulk import QuestionsReplace
 from ...services.question_service import QuestionService
 
 questions_bp = Blueprint("questions", __name__, url_prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
 
-def _check_level_permission(db, current_user, level_id: int):
-    level = LevelService.get_level(db, level_id)
-    if not level:
-        return None, ("关卡不存在", 404)
+def _question_dict(q) -> dict:
+    return {
+        "id": q.id,
+        "level_id": q.level_id,
+        "question_type": q.question_type,
+        "title": q.title,
+        "content": q.content,
+        "options": q.options,
+        "correct_answer": q.correct_answer,
+        "answer_analysis": q.answer_analysis,
+        "difficulty": q.difficulty,
+        "score": q.score,
+        "knowledge_point": q.knowledge_point,
+        "tags": q.tags,
+        "version": q.version,
+        "created_at": q.created_at.isoformat(),
+        "updated_at": q.updated_at.isoformat(),
+    }
 
-    chapter = ChapterService.get_chapter(db, level.chapter_id)
-    if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-        return None, ("无权操作此关卡", 403)
 
-    return level, None
+def _check_level_permission(db, current_user, level_id: int):
+    node, err = get_resolver(db).check(current_user, "level", level_id)
+    if err:
+        return None, err
+    return node.entity, None
 
 
 @questions_bp.route("/levels/<int:level_id>/questions", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_questions(level_id: int):
     """获取关卡题目列表（用于关卡编辑页面）"""
@@ -41,27 +61,18 @@ def get_questions(level_id: int):
             msg, code = err
             return jsonify({"detail": msg}), code
 
+        resolver = get_resolver(db)
+        if wants_page(request.args):
+            cursor, limit = parse_page_args(request.args)
+            page = QuestionService.get_questions_page(db, level_id, limit, cursor)
+            resolver.preload("question", page.items, resolver.resolve("level", level_id))
+            return jsonify(page_response(page, limit, _question_dict)), 200
+
         questions = QuestionService.get_questions_by_level(db, level_id)
-        data = [
-            {
-                "id": q.id,
-                "level_id": q.level_id,
-                "question_type": q.question_type,
-                "title": q.title,
-                "content": q.content,
-                "options": q.options,
-                "correct_answer": q.correct_answer,
-                "answer_analysis": q.answer_analysis,
-                "difficulty": q.difficulty,
-                "score": q.score,
-                "knowledge_point": q.knowledge_point,
-                "tags": q.tags,
-                "created_at": q.created_at.isoformat(),
-                "updated_at": q.updated_at.isoformat(),
-            }
-            for q in questions
-        ]
-        return jsonify(data), 200
+        resolver.preload("question", questions, resolver.resolve("level", level_id))
+        return jsonify([_question_dict(q) for q in questions]), 200
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
     except Exception as e:
         logger.error(f"Error getting questions: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -118,6 +129,7 @@ def create_question(level_id: int):
                     "score": question.score,
                     "knowledge_point": question.knowledge_point,
                     "tags": question.tags,
+                    "version": question.version,
                     "created_at": question.created_at.isoformat(),
                     "updated_at": question.updated_at.isoformat(),
                 }
@@ -131,6 +143,43 @@ def create_question(level_id: int):
         return jsonify({"detail": str(e)}), 500
 
 
+@questions_bp.route("/tasks/<int:task_id>/questions", methods=["PUT"])
+@query_budget(12)
+@login_required
+def replace_task_questions(task_id: int):
+    """批量保存任务的全部题目（题目写入任务所属关卡的题库，顺序即任务内顺序；已有题目需带 version）"""
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {"questions": data}
+    if not data:
+        return jsonify({"detail": "Request body is required"}), 400
+
+    try:
+        payload = QuestionsReplace(**data)
+    except PydanticValidationError as e:
+        return jsonify({"detail": e.errors(include_url=False, include_context=False)}), 400
+
+    try:
+        current_user = g.current_user
+        db = get_db()
+
+        node, err = get_resolver(db).check(current_user, "task", task_id)
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        questions = QuestionService.replace_task_questions(db, task_id, node.entity.level_id, payload.questions)
+        logger.info(f"Questions replaced for task {task_id} by user {current_user.id}: {len(questions)} questions")
+        return jsonify([_question_dict(q) for q in questions]), 200
+    except VersionConflictError as e:
+        return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
+    except (ValidationError, PreconditionRequiredError) as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error replacing task questions: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
 @questions_bp.route("/questions/<int:question_id>", methods=["GET"])
 @login_required
 def get_question(question_id: int):
@@ -139,14 +188,11 @@ def get_question(question_id: int):
         current_user = g.current_user
         db = get_db()
 
-        question = QuestionService.get_question(db, question_id)
-        if not question:
-            return jsonify({"detail": "题目不存在"}), 404
-
-        level, err = _check_level_permission(db, current_user, question.level_id)
+        node, err = get_resolver(db).check(current_user, "question", question_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
+        question = node.entity
 
         return (
             jsonify(
@@ -163,6 +209,7 @@ def get_question(question_id: int):
                     "score": question.score,
                     "knowledge_point": question.knowledge_point,
                     "tags": question.tags,
+                    "version": question.version,
                     "created_at": question.created_at.isoformat(),
                     "updated_at": question.updated_at.isoformat(),
                 }
@@ -177,7 +224,7 @@ def get_question(question_id: int):
 @questions_bp.route("/questions/<int:question_id>", methods=["PUT"])
 @login_required
 def update_question(question_id: int):
-    """更新题目"""
+    """更新题目（需提供读取时的版本号：请求体中的 version 或 If-Match: "question-<版本>"）"""
     if not request.is_json:
         return jsonify({"detail": "Content-Type must be application/json"}), 400
 
@@ -185,15 +232,19 @@ def update_question(question_id: int):
     if not data:
         return jsonify({"detail": "Request body is required"}), 400
 
+    body_version = data.get("version")
+    if body_version is not None and (not isinstance(body_version, int) or isinstance(body_version, bool)):
+        return jsonify({"detail": "version 必须是整数"}), 400
+    try:
+        expected_version = required_version(request.if_match, "question", body_version)
+    except PreconditionRequiredError as e:
+        return jsonify({"detail": e.message}), e.code
+
     try:
         current_user = g.current_user
         db = get_db()
 
-        question = QuestionService.get_question(db, question_id)
-        if not question:
-            return jsonify({"detail": "题目不存在"}), 404
-
-        level, err = _check_level_permission(db, current_user, question.level_id)
+        _, err = get_resolver(db).check(current_user, "question", question_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
@@ -201,6 +252,7 @@ def update_question(question_id: int):
         question = QuestionService.update_question(
             db=db,
             question_id=question_id,
+            expected_version=expected_version,
             question_type=data.get("question_type"),
             title=data.get("title"),
             content=data.get("content"),
@@ -227,12 +279,15 @@ def update_question(question_id: int):
                     "score": question.score,
                     "knowledge_point": question.knowledge_point,
                     "tags": question.tags,
+                    "version": question.version,
                     "created_at": question.created_at.isoformat(),
                     "updated_at": question.updated_at.isoformat(),
                 }
             ),
             200,
         )
+    except VersionConflictError as e:
+        return jsonify({"detail": e.message, "current_version": e.current_version}), e.code
     except NotFoundError as e:
         return jsonify({"detail": e.message}), e.code
     except ValidationError as e:
@@ -250,11 +305,7 @@ def delete_question(question_id: int):
         current_user = g.current_user
         db = get_db()
 
-        question = QuestionService.get_question(db, question_id)
-        if not question:
-            return jsonify({"detail": "题目不存在"}), 404
-
-        level, err = _check_level_permission(db, current_user, question.level_id)
+        _, err = get_resolver(db).check(current_user, "question", question_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
@@ -5,12 +5,11 @@ import logging
 
 from flask import Blueprint, jsonify, request, g
 
+from ...core.authorization import get_resolver
 from ...core.exceptions import ValidationError, NotFoundError
 from ...core.security import login_required
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...services.level_service import LevelService
-from ...services.chapter_service import ChapterService
-from ...services.task_service import TaskService
 from ...models.task_phase_question_rel import TaskPhaseQuestionRel
 
 task_phase_question_rel_bp = Blueprint("task_phase_question_rel", __name__, url_prefix="/api/v1")
@@ -18,19 +17,14 @@ logger = logging.getLogger(__name__)
 
 
 def _check_task_permission(db, current_user, task_id: int):
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        return None, ("任务不存在", 404)
-
-    level = LevelService.get_level(db, task.level_id)
-    chapter = ChapterService.get_chapter(db, level.chapter_id)
-    if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-        return None, ("无权操作此任务", 403)
-
-    return task, None
+    node, err = get_resolver(db).check(current_user, "task", task_id)
+    if err:
+        return None, err
+    return node.entity, None
 
 
 @task_phase_question_rel_bp.route("/tasks/<int:task_id>/phase-question-relation", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_phase_question_relation(task_id: int):
     """获取任务下的环节-考题关联配置"""
@@ -100,7 +94,6 @@ def set_phase_question_relation(task_id: int):
         else:
             rel.relation_config = relation_config
 
-        db.commit()
         return jsonify({"detail": "关联关系已保存"}), 200
     except ValidationError as e:
         return jsonify({"detail": e.message}), e.code
@@ -4,13 +4,14 @@
 import logging
 
 from flask import Blueprint, jsonify, request, g
+from pydantic import ValidationError as PydanticValidationError
 
+from ...core.authorization import get_resolver
 from ...core.exceptions import ValidationError, NotFoundError
 from ...core.security import login_required
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...services.level_service import LevelService
-from ...services.chapter_service import ChapterService
-from ...services.task_service import TaskService
+from ...schemas.task_bulk import PhasesReplace
 from ...services.task_phase_service import TaskPhaseService
 
 task_phases_bp = Blueprint("task_phases", __name__, url_prefix="/api/v1")
@@ -19,19 +20,14 @@ logger = logging.getLogger(__name__)
 
 def _check_task_permission(db, current_user, task_id: int):
     """内部工具：检查当前用户对任务的权限"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        return None, ("任务不存在", 404)
-
-    level = LevelService.get_level(db, task.level_id)
-    chapter = ChapterService.get_chapter(db, level.chapter_id)
-    if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-        return None, ("无权操作此任务", 403)
-
-    return task, None
+    node, err = get_resolver(db).check(current_user, "task", task_id)
+    if err:
+        return None, err
+    return node.entity, None
 
 
 @task_phases_bp.route("/tasks/<int:task_id>/phases", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_phases(task_id: int):
     """获取任务下的环节列表"""
@@ -45,6 +41,8 @@ def get_phases(task_id: int):
             return jsonify({"detail": msg}), code
 
         phases = TaskPhaseService.get_phases_by_task(db, task_id)
+        resolver = get_resolver(db)
+        resolver.preload("phase", phases, resolver.resolve("task", task_id))
         data = [
             {
                 "id": p.id,
@@ -111,6 +109,69 @@ def create_phase(task_id: int):
         return jsonify({"detail": str(e)}), 500
 
 
+def _step_dict(s) -> dict:
+    return {
+        "id": s.id,
+        "phase_id": s.phase_id,
+        "step_name": s.step_name,
+        "content": s.content,
+        "requirements": s.requirements,
+        "submission_type": s.submission_type,
+        "validation_rules": s.validation_rules,
+        "order": s.order,
+        "created_at": s.created_at.isoformat(),
+        "updated_at": s.updated_at.isoformat(),
+    }
+
+
+@task_phases_bp.route("/tasks/<int:task_id>/phases", methods=["PUT"])
+@query_budget(14)
+@login_required
+def replace_phases(task_id: int):
+    """批量保存任务的全部环节与步骤（新建、更新、删除在一个事务内完成）"""
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {"phases": data}
+    if not data:
+        return jsonify({"detail": "Request body is required"}), 400
+
+    try:
+        payload = PhasesReplace(**data)
+    except PydanticValidationError as e:
+        return jsonify({"detail": e.errors(include_url=False, include_context=False)}), 400
+
+    try:
+        current_user = g.current_user
+        db = get_db()
+
+        task, err = _check_task_permission(db, current_user, task_id)
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+
+        phases = TaskPhaseService.replace_phases(db, task_id, payload.phases)
+        logger.info(f"Phases replaced for task {task_id} by user {current_user.id}: {len(phases)} phases")
+        data = [
+            {
+                "id": p.id,
+                "task_id": p.task_id,
+                "phase_name": p.phase_name,
+                "order": p.order,
+                "is_required": p.is_required,
+                "created_at": p.created_at.isoformat(),
+                "updated_at": p.updated_at.isoformat(),
+                "steps": [_step_dict(s) for s in p.steps],
+            }
+            for p in phases
+        ]
+        return jsonify(data), 200
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
+    except Exception as e:
+        logger.error(f"Error replacing phases: {e}", exc_info=True)
+        return jsonify({"detail": str(e)}), 500
+
+
 @task_phases_bp.route("/tasks/<int:task_id>/phases/<int:phase_id>", methods=["PUT"])
 @login_required
 def update_phase(task_id: int, phase_id: int):
@@ -5,13 +5,11 @@ import logging
 
 from flask import Blueprint, jsonify, request, g
 
+from ...core.authorization import get_resolver
 from ...core.exceptions import ValidationError, NotFoundError
 from ...core.security import login_required
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...services.level_service import LevelService
-from ...services.chapter_service import ChapterService
-from ...services.task_service import TaskService
-from ...services.task_phase_service import TaskPhaseService
 from ...services.task_step_service import TaskStepService
 
 task_steps_bp = Blueprint("task_steps", __name__, url_prefix="/api/v1")
@@ -20,23 +18,11 @@ logger = logging.getLogger(__name__)
 
 def _check_phase_permission(db, current_user, task_id: int, phase_id: int):
     """内部工具：检查当前用户对某个环节的权限"""
-    task = TaskService.get_task(db, task_id)
-    if not task:
-        return None, None, ("任务不存在", 404)
-
-    level = LevelService.get_level(db, task.level_id)
-    chapter = ChapterService.get_chapter(db, level.chapter_id)
-    if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-        return None, None, ("无权操作此任务", 403)
-
-    phase = TaskPhaseService.get_phase(db, phase_id)
-    if not phase or phase.task_id != task.id:
-        return None, None, ("任务环节不存在", 404)
-
-    return task, phase, None
+    return get_resolver(db).check(current_user, "phase", phase_id, task=task_id)
 
 
 @task_steps_bp.route("/tasks/<int:task_id>/phases/<int:phase_id>/steps", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_steps(task_id: int, phase_id: int):
     """获取某环节下的步骤列表"""
@@ -44,12 +30,13 @@ def get_steps(task_id: int, phase_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task, phase, err = _check_phase_permission(db, current_user, task_id, phase_id)
+        phase_node, err = _check_phase_permission(db, current_user, task_id, phase_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
 
         steps = TaskStepService.get_steps_by_phase(db, phase_id)
+        get_resolver(db).preload("step", steps, phase_node)
         data = [
             {
                 "id": s.id,
@@ -86,7 +73,7 @@ def create_step(task_id: int, phase_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task, phase, err = _check_phase_permission(db, current_user, task_id, phase_id)
+        _, err = _check_phase_permission(db, current_user, task_id, phase_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
@@ -140,15 +127,11 @@ def update_step(task_id: int, phase_id: int, step_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task, phase, err = _check_phase_permission(db, current_user, task_id, phase_id)
+        _, err = get_resolver(db).check(current_user, "step", step_id, task=task_id, phase=phase_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
 
-        step = TaskStepService.get_step(db, step_id)
-        if not step or step.phase_id != phase.id:
-            return jsonify({"detail": "步骤不存在"}), 404
-
         step = TaskStepService.update_step(
             db=db,
             step_id=step_id,
@@ -193,15 +176,11 @@ def delete_step(task_id: int, phase_id: int, step_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task, phase, err = _check_phase_permission(db, current_user, task_id, phase_id)
+        _, err = get_resolver(db).check(current_user, "step", step_id, task=task_id, phase=phase_id)
         if err:
             msg, code = err
             return jsonify({"detail": msg}), code
 
-        step = TaskStepService.get_step(db, step_id)
-        if not step or step.phase_id != phase.id:
-            return jsonify({"detail": "步骤不存在"}), 404
-
         TaskStepService.delete_step(db, step_id)
         return jsonify({"detail": "步骤删除成功"}), 200
     except NotFoundError as e:
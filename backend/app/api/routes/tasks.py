@@ -5,18 +5,32 @@ import logging
 
 from flask import Blueprint, jsonify, request, g
 
+from ...core.authorization import get_resolver
 from ...core.exceptions import ValidationError, NotFoundError
+from ...core.pagination import page_response, parse_page_args, wants_page
 from ...core.security import login_required
+from ...db.query_stats import query_budget
 from ...db.session import get_db
-from ...services.level_service import LevelService
-from ...services.chapter_service import ChapterService
 from ...services.task_service import TaskService
 
 tasks_bp = Blueprint("tasks", __name__, url_prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
 
+def _task_dict(t) -> dict:
+    return {
+        "id": t.id,
+        "level_id": t.level_id,
+        "name": t.name,
+        "description": t.description,
+        "objective": t.objective,
+        "created_at": t.created_at.isoformat(),
+        "updated_at": t.updated_at.isoformat(),
+    }
+
+
 @tasks_bp.route("/levels/<int:level_id>/tasks", methods=["GET"])
+@query_budget(3)
 @login_required
 def get_tasks(level_id: int):
     """获取关卡下的任务列表"""
@@ -24,28 +38,22 @@ def get_tasks(level_id: int):
         current_user = g.current_user
         db = get_db()
 
-        level = LevelService.get_level(db, level_id)
-        if not level:
-            return jsonify({"detail": "关卡不存在"}), 404
+        level_node, err = get_resolver(db).check(current_user, "level", level_id, forbidden="无权访问此关卡")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
 
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权访问此关卡"}), 403
+        if wants_page(request.args):
+            cursor, limit = parse_page_args(request.args)
+            page = TaskService.get_tasks_page(db, level_id, limit, cursor)
+            get_resolver(db).preload("task", page.items, level_node)
+            return jsonify(page_response(page, limit, _task_dict)), 200
 
         tasks = TaskService.get_tasks_by_level(db, level_id)
-        data = [
-            {
-                "id": t.id,
-                "level_id": t.level_id,
-                "name": t.name,
-                "description": t.description,
-                "objective": t.objective,
-                "created_at": t.created_at.isoformat(),
-                "updated_at": t.updated_at.isoformat(),
-            }
-            for t in tasks
-        ]
-        return jsonify(data), 200
+        get_resolver(db).preload("task", tasks, level_node)
+        return jsonify([_task_dict(t) for t in tasks]), 200
+    except ValidationError as e:
+        return jsonify({"detail": e.message}), e.code
     except Exception as e:
         logger.error(f"Error getting tasks: {e}", exc_info=True)
         return jsonify({"detail": str(e)}), 500
@@ -66,13 +74,10 @@ def create_task(level_id: int):
         current_user = g.current_user
         db = get_db()
 
-        level = LevelService.get_level(db, level_id)
-        if not level:
-            return jsonify({"detail": "关卡不存在"}), 404
-
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权操作此关卡"}), 403
+        _, err = get_resolver(db).check(current_user, "level", level_id)
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
 
         task = TaskService.create_task(
             db=db,
@@ -103,6 +108,7 @@ def create_task(level_id: int):
 
 
 @tasks_bp.route("/tasks/<int:task_id>", methods=["GET"])
+@query_budget(2)
 @login_required
 def get_task(task_id: int):
     """获取任务详情"""
@@ -110,14 +116,11 @@ def get_task(task_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task = TaskService.get_task(db, task_id)
-        if not task:
-            return jsonify({"detail": "任务不存在"}), 404
-
-        level = LevelService.get_level(db, task.level_id)
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权访问此任务"}), 403
+        task_node, err = get_resolver(db).check(current_user, "task", task_id, forbidden="无权访问此任务")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
+        task = task_node.entity
 
         return (
             jsonify(
@@ -153,14 +156,10 @@ def update_task(task_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task = TaskService.get_task(db, task_id)
-        if not task:
-            return jsonify({"detail": "任务不存在"}), 404
-
-        level = LevelService.get_level(db, task.level_id)
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权修改此任务"}), 403
+        _, err = get_resolver(db).check(current_user, "task", task_id, forbidden="无权修改此任务")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
 
         task = TaskService.update_task(
             db=db,
@@ -200,14 +199,10 @@ def delete_task(task_id: int):
         current_user = g.current_user
         db = get_db()
 
-        task = TaskService.get_task(db, task_id)
-        if not task:
-            return jsonify({"detail": "任务不存在"}), 404
-
-        level = LevelService.get_level(db, task.level_id)
-        chapter = ChapterService.get_chapter(db, level.chapter_id)
-        if current_user.role != "admin" and chapter.teacher_id != current_user.id:
-            return jsonify({"detail": "无权删除此任务"}), 403
+        _, err = get_resolver(db).check(current_user, "task", task_id, forbidden="无权删除此任务")
+        if err:
+            msg, code = err
+            return jsonify({"detail": msg}), code
 
         TaskService.delete_task(db, task_id)
         return jsonify({"detail": "任务删除成功"}), 200
@@ -7,6 +7,8 @@ from typing import Any, Callable, Dict, List, Optional
 import httpx
 from openai import OpenAI
 
+from .token_utils import estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 def _extract_content_from_choices(choice: Dict[str, Any]) -> str:
@@ -50,6 +52,31 @@ def _handle_stream_http_error(e: httpx.HTTPStatusError, api_name: str = "API") -
     logger.error(f"{api_name} stream request failed: {e.response.text}")
     return e
 
+# Markdown 转课程 JSON 时提供给模型的结构示例
+COURSE_JSON_EXAMPLE = {
+    "meta": {
+        "title": "课程标题",
+        "preparations": ["预备知识1"],
+        "goals": [{"title": "知识目标", "items": ["目标1"]}]
+    },
+    "steps": [
+        {
+            "id": "step-1",
+            "title": "步骤标题",
+            "canvasConfig": { "width": 1200, "height": 800, "backgroundColor": "#ffffff" },
+            "components": [
+                {
+                    "id": "comp-1-1",
+                    "type": "text",
+                    "config": { "content": "<h1>内容</h1>" },
+                    "position": { "x": 100, "y": 50 },
+                    "size": { "width": 1000, "height": 100 }
+                }
+            ]
+        }
+    ]
+}
+
 class AIClient:
     """AI 客户端，封装大模型 API 调用"""
 
@@ -65,11 +92,34 @@ class AIClient:
         self.temperature = 0.5
         self.max_tokens = 8000
         self.timeout = 180
+        # 每次调用的 token 用量，由 AIService 在写日志时取走并记入用量账本
+        self.usage_events: List[Dict[str, Any]] = []
 
     def _load_config(self) -> dict:
         """加载配置（存根）"""
         return {}
 
+    def _record_usage(self, messages: list, completion: str, usage: Any = None) -> None:
+        """记录一次调用的 token 用量；服务端未返回 usage 时按字符数估算"""
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            self.usage_events.append({
+                "prompt_tokens": usage.prompt_tokens or 0,
+                "completion_tokens": usage.completion_tokens or 0,
+                "estimated": False,
+            })
+            return
+        prompt_text = "".join(str(m.get("content", "")) for m in messages)
+        self.usage_events.append({
+            "prompt_tokens": estimate_tokens(prompt_text),
+            "completion_tokens": estimate_tokens(completion or ""),
+            "estimated": True,
+        })
+
+    def pop_usage_events(self) -> List[Dict[str, Any]]:
+        """取走并清空已记录的用量"""
+        events, self.usage_events = self.usage_events, []
+        return events
+
     def _call_api(self, messages: list, **kwargs) -> Optional[str]:
         """通用 API 调用"""
         try:
@@ -80,7 +130,9 @@ class AIClient:
                 max_tokens=kwargs.get("max_tokens", self.max_tokens),
                 **{k: v for k, v in kwargs.items() if k not in ["model", "temperature", "max_tokens"]}
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            self._record_usage(messages, content, getattr(response, "usage", None))
+            return content
         except Exception as e:
             logger.error(f"API call failed: {e}")
             return None
@@ -94,15 +146,21 @@ class AIClient:
                 temperature=kwargs.get("temperature", self.temperature),
                 max_tokens=kwargs.get("max_tokens", self.max_tokens),
                 stream=True,
-                **{k: v for k, v in kwargs.items() if k not in ["model", "temperature", "max_tokens", "stream"]}
+                stream_options={"include_usage": True},
+                **{k: v for k, v in kwargs.items() if k not in ["model", "temperature", "max_tokens", "stream", "stream_options"]}
             )
             full_content = ""
+            usage = None
             for chunk in response:
+                # include_usage 时最后一个 chunk 的 choices 为空，只携带 usage
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
                 if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     full_content += content
                     if callback:
                         callback(content)
+            self._record_usage(messages, full_content, usage)
             return full_content
         except Exception as e:
             logger.error(f"Stream API call failed: {e}")
@@ -195,40 +253,18 @@ class AIClient:
         return self._cleanup_json_response(raw_response)
 
     def _build_teaching_guide_to_course_json_prompt(self, markdown: str) -> str:
-        """构建 Markdown 转 JSON 的 Prompt"""
-        example_json = {
-            "meta": {
-                "title": "课程标题",
-                "preparations": ["预备知识1"],
-                "goals": [{"title": "知识目标", "items": ["目标1"]}]
-            },
-            "steps": [
-                {
-                    "id": "step-1",
-                    "title": "步骤标题",
-                    "canvasConfig": { "width": 1200, "height": 800, "backgroundColor": "#ffffff" },
-                    "components": [
-                        {
-                            "id": "comp-1-1",
-                            "type": "text",
-                            "config": { "content": "<h1>内容</h1>" },
-                            "position": { "x": 100, "y": 50 },
-                            "size": { "width": 1000, "height": 100 }
-                        }
-                    ]
-                }
-            ]
-        }
+        """构建 Markdown 转 JSON 的 Prompt（示例结构使用紧凑 JSON，每个分块都会重复发送）"""
         return f"""
 请将以下 Markdown 实验指导书转换为可视化幻灯片编辑器的 JSON 数据。
 严格遵守以下 JSON 结构示例：
-{json.dumps(example_json, indent=2, ensure_ascii=False)}
+{json.dumps(COURSE_JSON_EXAMPLE, separators=(",", ":"), ensure_ascii=False)}
 
 要求：
 1. 拆分步骤：每个 ## 标题为一个 step。
 2. 组件化：文本转 type:"text" (HTML格式), 代码转 type:"code", 题目转 type:"quiz"。
 3. 自动布局：为每个组件分配 position(x,y) 和 size(width,height)。
-4. 只输出 JSON，不要解释。
+4. 图片地址形如 media://N 时原样保留在 <img src> 中，不要改写。
+5. 只输出 JSON，不要解释。
 
 待转换内容：
 {markdown}
@@ -312,6 +348,32 @@ class AIClient:
         ]
         return self._call_api_stream(messages, callback=stream_callback)
 
+    def generate_data_schema(self, task_name: str, data_requirements: str, stream_callback=None) -> Optional[Dict[str, Any]]:
+        """生成示例数据的列定义（schema），由本地生成器按 schema 批量生成数据行"""
+        system_prompt = (
+            "你是一个数据建模专家。根据任务和数据要求，只输出一个 JSON 对象描述数据表的列，不要输出任何数据行。\n"
+            '格式：{"columns":[{"name":"列名","type":"类型",...}]}\n'
+            "可用类型及参数：\n"
+            "- sequence：start, step, prefix, width（编号类，如 E0001）\n"
+            "- int / float：min, max, distribution(uniform|normal), mean, std, decimals(float)\n"
+            "- choice：values(取值列表), weights(可选，与 values 等长)\n"
+            "- date / datetime：start, end（YYYY-MM-DD）, format（strftime 格式）\n"
+            "- bool：p(为真的概率), true_label, false_label\n"
+            "- name（中文姓名）, phone（手机号）, email\n"
+            "- text：values(候选文本列表)\n"
+            "所有列都可设置 null_rate（0~1，缺失值比例，用于数据清洗练习）。\n"
+            "取值范围、分布与取值列表要贴合业务场景，只返回 JSON。"
+        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"任务：{task_name}\n数据要求：{data_requirements}"},
+        ]
+        if stream_callback:
+            raw_response = self._call_api_stream(messages, callback=stream_callback, temperature=0.2)
+        else:
+            raw_response = self._call_api(messages, temperature=0.2)
+        return self._cleanup_json_response(raw_response)
+
     # 存根方法
     def generate_teaching_guide(self, **kwargs): return self.generate_teaching_guide_stream(**kwargs)
     def generate_teaching_requirements(self, **kwargs): return self.generate_teaching_requirements_stream(**kwargs)
@@ -321,4 +383,12 @@ class AIClient:
     def generate_questions(self, name, kp, sp): return self._cleanup_json_response(self._call_api([{"role":"user","content":f"生成题目JSON: {name}"}]))
     def generate_data_file(self, **kwargs): return self.generate_data_file_stream(**kwargs)
     def learning_help(self, q, c): return self._call_api([{"role":"user","content":f"问题: {q}\n背景: {c}"}])
+
+    def learning_help_with_passages(self, question: str, passages: str) -> Optional[str]:
+        """基于检索到的教案片段回答学生问题"""
+        messages = [
+            {"role": "system", "content": "你是一位耐心的课程助教。请优先依据提供的教案参考资料回答学生的问题，资料未覆盖时再结合通用知识简要说明。"},
+            {"role": "user", "content": f"参考资料：\n{passages}\n\n学生问题：{question}"}
+        ]
+        return self._call_api(messages)
     def teaching_guide_to_course_json(self, md): return self.teaching_guide_to_course_json_stream(md)
@@ -0,0 +1,154 @@
+"""
+层级资源授权
+
+篇章 → 关卡 → 任务 → 环节 → 步骤（以及挂在关卡下的题目）构成一棵归属树，编辑类接口的权限
+都取决于根部篇章的 teacher_id。:class:`AuthorizationResolver` 用一条 JOIN 查询同时取出目标实体
+和它所有祖先的 id 以及篇章的 teacher_id，结果按 (kind, id) 缓存在本次请求内；列出子节点时可用
+:meth:`AuthorizationResolver.preload` 直接由父节点推出子节点的归属，后续检查不再访问数据库。
+
+管理员可以操作任何节点；其他用户只能操作自己篇章下的节点。
+"""
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from flask import g, has_app_context
+from sqlalchemy.orm import Session
+
+from ..models import Chapter, Level, Question, Task, TaskPhase, TaskStep
+
+# kind -> (模型, 父节点 kind, 指向父节点的外键列)
+_HIERARCHY = {
+    "chapter": (Chapter, None, None),
+    "level": (Level, "chapter", Level.chapter_id),
+    "task": (Task, "level", Task.level_id),
+    "phase": (TaskPhase, "task", TaskPhase.task_id),
+    "step": (TaskStep, "phase", TaskStep.phase_id),
+    "question": (Question, "level", Question.level_id),
+}
+
+NOT_FOUND_MESSAGES = {
+    "chapter": "篇章不存在",
+    "level": "关卡不存在",
+    "task": "任务不存在",
+    "phase": "任务环节不存在",
+    "step": "步骤不存在",
+    "question": "题目不存在",
+}
+
+FORBIDDEN_MESSAGES = {
+    "chapter": "无权操作此篇章",
+    "level": "无权操作此关卡",
+    "task": "无权操作此任务",
+    "phase": "无权操作此任务",
+    "step": "无权操作此任务",
+    "question": "无权操作此关卡",
+}
+
+
+@dataclass(frozen=True)
+class OwnershipNode:
+    """某个实体及其祖先链"""
+    kind: str
+    entity: Any
+    teacher_id: int
+    ancestors: dict  # kind -> id，包含自身
+
+    def ancestor_id(self, kind: str) -> Optional[int]:
+        return self.ancestors.get(kind)
+
+
+def _ancestor_chain(kind: str) -> list[str]:
+    chain = []
+    parent = _HIERARCHY[kind][1]
+    while parent is not None:
+        chain.append(parent)
+        parent = _HIERARCHY[parent][1]
+    return chain
+
+
+class AuthorizationResolver:
+    """按请求缓存的归属解析器"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._nodes: dict[tuple[str, int], Optional[OwnershipNode]] = {}
+
+    def resolve(self, kind: str, entity_id: int) -> Optional[OwnershipNode]:
+        """一条查询取出实体与祖先链；实体不存在（或祖先缺失）时返回 None"""
+        key = (kind, entity_id)
+        if key in self._nodes:
+            return self._nodes[key]
+
+        model = _HIERARCHY[kind][0]
+        chain = _ancestor_chain(kind)
+        columns = [model]
+        query_joins = []
+        child_kind = kind
+        for parent_kind in chain:
+            parent_model = _HIERARCHY[parent_kind][0]
+            query_joins.append((parent_model, parent_model.id == _HIERARCHY[child_kind][2]))
+            child_kind = parent_kind
+        if chain:
+            columns += [_HIERARCHY[parent_kind][0].id for parent_kind in chain]
+            columns.append(Chapter.teacher_id)
+
+        query = self.db.query(*columns)
+        for parent_model, onclause in query_joins:
+            query = query.join(parent_model, onclause)
+        row = query.filter(model.id == entity_id).first()
+
+        if row is None:
+            node = None
+        elif not chain:
+            node = OwnershipNode(kind, row, row.teacher_id, {kind: row.id})
+        else:
+            entity, *ids, teacher_id = row
+            ancestors = dict(zip(chain, ids))
+            ancestors[kind] = entity.id
+            node = OwnershipNode(kind, entity, teacher_id, ancestors)
+        self._nodes[key] = node
+        return node
+
+    def preload(self, kind: str, entities: Iterable[Any], parent: OwnershipNode) -> None:
+        """列出子节点后调用：由父节点的祖先链推出子节点的归属并放入缓存"""
+        for entity in entities:
+            ancestors = dict(parent.ancestors)
+            ancestors[kind] = entity.id
+            self._nodes[(kind, entity.id)] = OwnershipNode(kind, entity, parent.teacher_id, ancestors)
+
+    @staticmethod
+    def can_edit(user, node: OwnershipNode) -> bool:
+        return user.role == "admin" or node.teacher_id == user.id
+
+    def check(
+        self,
+        user,
+        kind: str,
+        entity_id: int,
+        forbidden: Optional[str] = None,
+        not_found: Optional[str] = None,
+        **expected_ancestors: int,
+    ):
+        """
+        检查 user 能否操作某个节点，返回 (node, None) 或 (None, (message, status_code))
+
+        expected_ancestors 用于校验 URL 中的父级 id，例如 ``check(user, "phase", phase_id, task=task_id)``；
+        不匹配时按节点不存在处理。
+        """
+        node = self.resolve(kind, entity_id)
+        if node is None or any(node.ancestor_id(k) != v for k, v in expected_ancestors.items()):
+            return None, (not_found or NOT_FOUND_MESSAGES[kind], 404)
+        if not self.can_edit(user, node):
+            return None, (forbidden or FORBIDDEN_MESSAGES[kind], 403)
+        return node, None
+
+
+def get_resolver(db: Session) -> AuthorizationResolver:
+    """返回当前请求（同一个 db 会话）共用的解析器"""
+    if not has_app_context():
+        return AuthorizationResolver(db)
+    resolver = g.get("authorization_resolver")
+    if resolver is None or resolver.db is not db:
+        resolver = AuthorizationResolver(db)
+        g.authorization_resolver = resolver
+    return resolver
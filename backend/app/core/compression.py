@@ -0,0 +1,50 @@
+"""
+内容块压缩
+
+zstd 压缩与解压都明显快于 zlib，但依赖可选包 ``zstandard``；未安装时使用标准库 zlib。
+每个内容块记录自己的编码（``zstd`` / ``zlib`` / ``raw``），读取时按记录的编码解压，
+因此切换配置或增删依赖都不影响已存储的数据。
+"""
+import zlib
+from typing import Optional
+
+from .config import get_settings
+
+try:
+    import zstandard  # 可选依赖
+except ImportError:  # pragma: no cover - 取决于部署环境
+    zstandard = None
+
+
+def _codec() -> str:
+    configured = get_settings().content_blob_codec
+    if configured == "zstd" or (configured == "auto" and zstandard is not None):
+        if zstandard is None:
+            raise RuntimeError("content_blob_codec=zstd requires the zstandard package")
+        return "zstd"
+    return "zlib"
+
+
+def compress(data: bytes, codec: Optional[str] = None) -> tuple[str, bytes]:
+    """压缩并返回 (编码, 字节)；压缩后反而更大时原样存储（编码为 raw）"""
+    codec = codec or _codec()
+    level = get_settings().content_blob_compression_level
+    if codec == "zstd":
+        packed = zstandard.ZstdCompressor(level=level).compress(data)
+    else:
+        packed = zlib.compress(data, level)
+    if len(packed) >= len(data):
+        return "raw", data
+    return codec, packed
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return data
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd content requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown content codec: {codec}")
@@ -0,0 +1,66 @@
+"""
+条件请求（ETag / If-Match / If-None-Match）
+
+可编辑资源的 ETag 形如 ``"<前缀>-<版本号>"``（如 ``"map-3"``、``"course-data-12"``），响应内容还包含
+其他独立计数的数据时附加 ``.<修订号>``（如关卡详情含课程数据：``"level-3.12"``）：
+
+- 写请求通过 If-Match 原样回传，或在请求体中提供版本号字段；两者都没有时返回 428。同时修改附加数据的
+  写请求（如通过关卡接口保存课程数据）还要核对修订号部分；
+- 读请求带 If-None-Match（或 If-Modified-Since）且资源未变化时返回 304。版本号随行一起读出，
+  判断时不需要加载、序列化大字段。
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import make_response
+
+from .exceptions import PreconditionRequiredError
+
+
+def make_etag(prefix: str, version: int, revision: Optional[int] = None) -> str:
+    return f"{prefix}-{version}" if revision is None else f"{prefix}-{version}.{revision}"
+
+
+def if_match_version(if_match, prefix: str, revision: bool = False) -> Optional[int]:
+    """从 If-Match 中取出指定前缀的版本号（revision=True 时取修订号）；没有时返回 None"""
+    for etag in if_match:
+        if not etag.startswith(f"{prefix}-"):
+            continue
+        version, _, etag_revision = etag[len(prefix) + 1:].partition(".")
+        version = etag_revision if revision else version
+        if version.isdigit():
+            return int(version)
+    return None
+
+
+def required_version(if_match, prefix: str, body_version: Optional[int] = None, revision: bool = False) -> int:
+    """条件写入的基础版本：请求体中的版本号优先，其次 If-Match；都没有时抛出 PreconditionRequiredError"""
+    if body_version is not None:
+        return body_version
+    version = if_match_version(if_match, prefix, revision)
+    if version is None:
+        raise PreconditionRequiredError()
+    return version
+
+
+def is_not_modified(request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match 优先；没有时用 If-Modified-Since 与 last_modified（UTC，按秒比较）判断"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag: str, last_modified: Optional[datetime] = None):
+    """设置 ETag / Last-Modified；no-cache 让浏览器每次带上验证器重新确认"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None):
+    """304 响应（无响应体）"""
+    return with_validators(make_response("", 304), etag, last_modified)
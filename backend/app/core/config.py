@@ -13,10 +13,100 @@ DEFAULT_DB_PATH = DATA_DIR / "app.db"
 class Settings(BaseSettings):
     project_name: str = "过关斩将教学平台 API"
     secret_key: str = "change_me"
-    access_token_expire_minutes: int = 60 * 24
+    # 访问令牌短期有效，过期后用刷新令牌换取新令牌（刷新令牌每次使用后轮换）
+    access_token_expire_minutes: int = 15
+    refresh_token_expire_days: int = 14
     algorithm: str = "HS256"
     database_url: str = f"sqlite:///{DEFAULT_DB_PATH.as_posix()}"
 
+    # Argon2 参数（修改后旧哈希会在用户下次登录时自动按新参数重新计算）
+    # 默认值参考 OWASP 建议：19 MiB 内存、2 次迭代、1 路并行
+    argon2_time_cost: int = 2
+    argon2_memory_cost_kib: int = 19456
+    argon2_parallelism: int = 1
+
+    # 登录密码校验线程池：并发数（0 表示 CPU 核数）、最大排队数、最长等待秒数（超出返回 503）
+    password_hash_workers: int = 0
+    password_hash_max_pending: int = 256
+    password_hash_wait_seconds: float = 10.0
+
+    # SQL 统计：同一语句在一个请求内重复多少次记为疑似 N+1；测试环境开启查询预算断言
+    query_n_plus_one_threshold: int = 5
+    enforce_query_budget: bool = False
+
+    # 列表分页：单页最大条数；总数缓存秒数（0 表示每次都精确计数）
+    pagination_max_limit: int = 200
+    pagination_count_cache_seconds: int = 30
+
+    # 已认证用户缓存：local（进程内）/ redis（多进程共享，需配置 redis_url）/ off；
+    # TTL 即角色、启用状态变更在其他进程中生效的最长延迟
+    user_cache_backend: str = "local"
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_entries: int = 10_000
+    redis_url: str = ""
+
+    # 令牌吊销集合：Bloom 过滤器预期容量与误判率；从数据库增量同步的间隔秒数；
+    # 全量重新读取的间隔秒数（已有记录被延长有效期时靠全量同步传播到其他进程）
+    revocation_bloom_capacity: int = 100_000
+    revocation_bloom_error_rate: float = 0.001
+    revocation_sync_seconds: float = 5.0
+    revocation_full_sync_seconds: float = 60.0
+
+    # 批量保存环节/步骤/题目时单次最多条目数
+    bulk_save_max_items: int = 500
+
+    # 教案/课程数据内容块压缩：auto（安装了 zstandard 用 zstd，否则 zlib）/ zstd / zlib；
+    # 已存储的内容块记录各自的编码，切换后旧数据仍可读取
+    content_blob_codec: str = "auto"
+    content_blob_compression_level: int = 6
+
+    # 课程数据版本历史：每隔多少个版本保存一次完整快照（其余版本只保存 JSON Patch），
+    # 也即重建任意版本最多需要重放的补丁数
+    course_data_snapshot_interval: int = 20
+
+    # 名册导入：单次最大行数、每块插入行数、哈希进程数（0 表示 CPU 核数）
+    roster_import_max_rows: int = 10_000
+    roster_import_chunk_size: int = 500
+    roster_import_hash_workers: int = 0
+
+    # 只读副本（逗号分隔的数据库 URL，为空时所有请求走主库）与健康检查间隔
+    database_replica_urls: str = ""
+    database_replica_health_interval_seconds: float = 30.0
+    # 客户端提交写入后的这段时间内，其读请求也走主库（应大于副本的复制延迟）
+    database_replica_sticky_seconds: float = 5.0
+
+    # SQLite 连接调优（sqlite_tuned=False 时回退到默认配置）
+    sqlite_tuned: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_pool_size: int = 10
+    sqlite_max_overflow: int = 20
+    # 外键约束：服务层删除关卡、任务等时没有级联删除子记录，开启前需先补齐级联
+    sqlite_foreign_keys: bool = False
+
+    # AI 学习助手检索增强：每次提问最多引用的教案段落数与 token 预算
+    learning_help_top_k: int = 4
+    learning_help_context_tokens: int = 1200
+
+    # AI token 配额（按用户统计，0 表示不限制；管理员不受限制）
+    # 软配额只提示，硬配额在生成开始前拒绝请求
+    ai_daily_soft_quota_tokens: int = 200_000
+    ai_daily_hard_quota_tokens: int = 500_000
+    ai_monthly_soft_quota_tokens: int = 3_000_000
+    ai_monthly_hard_quota_tokens: int = 6_000_000
+
+    # 本地合成数据生成（schema 模式）的行数
+    data_file_default_rows: int = 1000
+    data_file_max_rows: int = 200_000
+
+    # 生成数据文件：超过该大小时保存预压缩的 gzip 版本；后台清理间隔与保留期（间隔为 0 时不清理）
+    generated_file_gzip_min_bytes: int = 1024
+    generated_file_gc_interval_seconds: int = 3600
+    generated_file_gc_grace_seconds: int = 24 * 3600
+
     model_config = {
         "env_file": ROOT_DIR / ".env",
         "env_file_encoding": "utf-8",
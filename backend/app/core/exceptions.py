@@ -40,3 +40,16 @@ class ConflictError(BaseAppException):
     def __init__(self, message: str = "资源冲突"):
         super().__init__(message, code=409)
 
+
+
+class VersionConflictError(ConflictError):
+    """版本冲突异常（乐观锁：提交的版本号不是当前版本）"""
+    def __init__(self, message: str = "数据已被修改，请刷新后重试", current_version=None):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+class PreconditionRequiredError(BaseAppException):
+    """缺少前置条件异常（条件写入未提供版本号）"""
+    def __init__(self, message: str = "缺少版本号：请通过 If-Match 或请求体中的 version 提供"):
+        super().__init__(message, code=428)
@@ -0,0 +1,83 @@
+"""
+有界的密码哈希执行器
+
+Argon2 校验是刻意设计的 CPU 密集操作。上课开始时几百个学生同时登录，如果每个请求线程都直接做校验，
+所有 CPU 都会被登录占满，其他接口一起变慢。这里把校验放到固定大小的线程池中执行（argon2-cffi 在计算时
+释放 GIL，线程可以真正并行），并限制排队数量：
+
+- 同时最多 ``password_hash_workers`` 个校验在运行（默认等于 CPU 核数），其余请求的线程让出 CPU；
+- 排队超过 ``password_hash_max_pending`` 或等待超过 ``password_hash_wait_seconds`` 时抛出
+  :class:`HashingBusyError`，登录接口返回 503 + Retry-After，由客户端稍后重试，而不是让队列无限增长。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Optional, TypeVar
+
+from .config import get_settings
+
+T = TypeVar("T")
+
+
+class HashingBusyError(Exception):
+    """哈希执行器已满载"""
+    def __init__(self, retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__("Too many concurrent logins, please retry shortly")
+
+
+class BoundedHashExecutor:
+    def __init__(self, max_workers: int, max_pending: int, wait_seconds: float):
+        self.max_workers = max_workers
+        self.wait_seconds = wait_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        # 运行中 + 排队中的任务总数上限
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """在线程池中执行 fn 并等待结果；满载或等待超时时抛出 HashingBusyError"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError(retry_after=self._retry_after())
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.wait_seconds)
+        except FutureTimeoutError:
+            # 任务仍会在后台完成并释放名额，这里只是不再等待
+            future.cancel()
+            raise HashingBusyError(retry_after=self._retry_after())
+
+    def _retry_after(self) -> int:
+        # 粗略估计：队列里每 max_workers 个任务约需一个等待周期
+        return max(1, int(self._pending / max(self.max_workers, 1) * 0.1) + 1)
+
+
+_executor: Optional[BoundedHashExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> BoundedHashExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            settings = get_settings()
+            _executor = BoundedHashExecutor(
+                max_workers=settings.password_hash_workers or os.cpu_count() or 1,
+                max_pending=settings.password_hash_max_pending,
+                wait_seconds=settings.password_hash_wait_seconds,
+            )
+        return _executor
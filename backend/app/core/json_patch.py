@@ -0,0 +1,182 @@
+"""
+JSON Patch（RFC 6902）与 JSON Pointer（RFC 6901）
+
+- :func:`make_patch` 生成把 ``old`` 变为 ``new`` 的补丁：对象按键递归比较，数组先去掉相同的前缀与后缀，
+  再逐项比较并对多出的元素生成 add/remove，因此补丁大小与改动量成正比，而不是与文档大小成正比；
+- :func:`apply_patch` 依次执行 add/remove/replace/move/copy/test，返回新文档，不修改入参。
+"""
+import copy
+from typing import Any, List
+
+
+class JsonPatchError(ValueError):
+    """补丁格式错误、路径不存在或 test 操作不通过"""
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _join(path: str, token) -> str:
+    return f"{path}/{_escape(str(token))}"
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [_unescape(token) for token in pointer[1:].split("/")]
+
+
+def json_equal(a: Any, b: Any) -> bool:
+    """按 JSON 语义比较：类型也必须相同（Python 的 == 认为 1、True、1.0 相等，序列化后却不同）"""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(json_equal(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(json_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _diff(old: Any, new: Any, path: str, ops: list) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _join(path, key)})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _join(path, key), "value": copy.deepcopy(value)})
+            elif not json_equal(old[key], value):
+                _diff(old[key], value, _join(path, key), ops)
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        prefix = 0
+        limit = min(len(old), len(new))
+        while prefix < limit and json_equal(old[prefix], new[prefix]):
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and json_equal(old[-1 - suffix], new[-1 - suffix]):
+            suffix += 1
+        old_middle = old[prefix:len(old) - suffix]
+        new_middle = new[prefix:len(new) - suffix]
+        common = min(len(old_middle), len(new_middle))
+        for offset in range(common):
+            if not json_equal(old_middle[offset], new_middle[offset]):
+                _diff(old_middle[offset], new_middle[offset], _join(path, prefix + offset), ops)
+        # 多出的旧元素在同一下标处依次删除；多出的新元素依次插入
+        for _ in range(len(old_middle) - common):
+            ops.append({"op": "remove", "path": _join(path, prefix + common)})
+        for offset in range(common, len(new_middle)):
+            ops.append({"op": "add", "path": _join(path, prefix + offset), "value": copy.deepcopy(new_middle[offset])})
+        return
+    if not json_equal(old, new):
+        ops.append({"op": "replace", "path": path, "value": copy.deepcopy(new)})
+
+
+def make_patch(old: Any, new: Any) -> list:
+    """生成把 old 变为 new 的 JSON Patch 操作列表（相同则为空列表）"""
+    ops: list = []
+    _diff(old, new, "", ops)
+    return ops
+
+
+def _list_index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise JsonPatchError(f"Path not found: {token!r}")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_list_index(doc, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Cannot traverse into a scalar at {token!r}")
+    return doc
+
+
+def resolve_pointer(doc: Any, pointer: str) -> Any:
+    return _resolve(doc, parse_pointer(pointer))
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to a scalar at {token!r}")
+    return doc
+
+
+def _remove(doc: Any, tokens: List[str]) -> tuple[Any, Any]:
+    """删除并返回 (新文档, 被删除的值)"""
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent = _resolve(doc, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"Path not found: {token!r}")
+        return doc, parent.pop(token)
+    if isinstance(parent, list):
+        return doc, parent.pop(_list_index(parent, token, allow_end=False))
+    raise JsonPatchError(f"Cannot remove from a scalar at {token!r}")
+
+
+def apply_patch(doc: Any, patch: list) -> Any:
+    """按顺序应用补丁并返回新文档；任一操作失败时抛出 JsonPatchError（入参不被修改）"""
+    if not isinstance(patch, list):
+        raise JsonPatchError("A JSON patch must be a list of operations")
+    doc = copy.deepcopy(doc)
+    for operation in patch:
+        if not isinstance(operation, dict) or not isinstance(operation.get("path"), str):
+            raise JsonPatchError(f"Invalid patch operation: {operation!r}")
+        op = operation.get("op")
+        tokens = parse_pointer(operation["path"])
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JsonPatchError(f"'{op}' requires a value")
+        if op == "add":
+            doc = _add(doc, tokens, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            doc, _ = _remove(doc, tokens)
+        elif op == "replace":
+            if tokens:
+                doc, _ = _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            if not isinstance(operation.get("from"), str):
+                raise JsonPatchError(f"'{op}' requires a from pointer")
+            source = parse_pointer(operation["from"])
+            if op == "move":
+                if tokens[:len(source)] == source and tokens != source:
+                    raise JsonPatchError("Cannot move a value into one of its children")
+                doc, value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, tokens, value)
+        elif op == "test":
+            if not json_equal(_resolve(doc, tokens), operation["value"]):
+                raise JsonPatchError(f"Test failed at {operation['path']!r}")
+        else:
+            raise JsonPatchError(f"Unknown patch operation: {op!r}")
+    return doc
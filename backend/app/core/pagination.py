@@ -0,0 +1,157 @@
+"""
+键集（keyset）分页与计数缓存
+
+OFFSET 分页越往后越慢，且每一页都要 ``count()`` 扫描整个过滤结果。这里提供：
+
+- :func:`paginate_keyset`：按排序键做 ``WHERE (k1, k2) > (v1, v2)`` 式的定位，每页耗时与页码无关；
+  游标是排序键值的 base64 编码（对客户端不透明）；解码失败或键值与排序列的类型不符时返回 400。
+- :func:`cached_count`：按查询语句缓存总数若干秒，翻页时不再重复计数；写操作可调用
+  :func:`invalidate_count_cache` 让对应命名空间的缓存立即失效。
+"""
+import base64
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from .config import get_settings
+from .exceptions import ValidationError
+
+# 排序键：(列, 是否降序)
+KeyColumn = tuple[Any, bool]
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _matches_column(value, column) -> bool:
+    """游标中的键值是否与排序列的类型一致（可空列允许 None）"""
+    if value is None:
+        return bool(getattr(column, "nullable", True))
+    python_type = column.type.python_type
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor: str, keys: Sequence[KeyColumn]) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_decode_value(v) for v in json.loads(raw)]
+    except (ValueError, TypeError):
+        raise ValidationError("无效的分页游标")
+    if len(values) != len(keys) or not all(_matches_column(v, column) for v, (column, _) in zip(values, keys)):
+        raise ValidationError("无效的分页游标")
+    return values
+
+
+def _after(keys: Sequence[KeyColumn], values: list):
+    """构造“排在游标之后”的条件：k1 > v1 OR (k1 = v1 AND k2 > v2) ...（降序列用 <）"""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def paginate_keyset(query: Query, keys: Sequence[KeyColumn], limit: int, cursor: Optional[str] = None) -> Page:
+    """按 keys 排序取一页；keys 的最后一列必须唯一（通常是主键）以保证顺序稳定"""
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in keys])
+    return Page(items=rows, next_cursor=next_cursor)
+
+
+def wants_page(args) -> bool:
+    """带 cursor 或 limit 参数时返回分页结构，否则保持原有的完整列表响应"""
+    return "cursor" in args or "limit" in args
+
+
+def parse_page_args(args, default_limit: int = 50) -> tuple[Optional[str], int]:
+    """从查询参数解析 (cursor, limit)，limit 被限制在 [1, pagination_max_limit]"""
+    try:
+        limit = int(args.get("limit", default_limit))
+    except (TypeError, ValueError):
+        raise ValidationError("limit 必须是整数")
+    limit = max(1, min(limit, get_settings().pagination_max_limit))
+    return args.get("cursor") or None, limit
+
+
+_count_cache: dict[tuple[str, str], tuple[float, int]] = {}
+_count_lock = threading.Lock()
+_COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def cached_count(query: Query, namespace: str) -> int:
+    """返回 query 的行数，同一语句与参数在 pagination_count_cache_seconds 秒内复用结果"""
+    ttl = get_settings().pagination_count_cache_seconds
+    statement = query.order_by(None).statement
+    compiled = statement.compile()
+    key = (namespace, f"{compiled}|{sorted(compiled.params.items(), key=lambda item: item[0])!r}")
+
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    total = query.order_by(None).count()
+    if ttl > 0:
+        with _count_lock:
+            if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+                _count_cache.clear()
+            _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def invalidate_count_cache(namespace: str) -> None:
+    """写操作后调用，清除某个命名空间下的全部计数缓存"""
+    with _count_lock:
+        for key in [k for k in _count_cache if k[0] == namespace]:
+            del _count_cache[key]
+
+
+def page_response(page: Page, limit: int, serialize) -> dict:
+    """游标分页的统一响应结构"""
+    return {
+        "items": [serialize(item) for item in page.items],
+        "next_cursor": page.next_cursor,
+        "limit": limit,
+        "total": page.total,
+    }
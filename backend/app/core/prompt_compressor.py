@@ -0,0 +1,175 @@
+"""
+Prompt 预处理（压缩）
+
+教案 Markdown 在转换为课程 JSON 前会被原样塞进 Prompt，其中常见大量对模型毫无意义的 token：
+内联 base64 图片、表格对齐用的空格、重复的空行/空格、在多个分块里重复出现的模板段落等。
+
+本模块在调用大模型前对 Markdown 做一次无损（对语义而言）的压缩：
+
+- ``media``：将 ``data:`` URI 替换为 ``media://N`` 占位符，生成结果后再用 :func:`restore_media` 还原；
+- ``tables``：去掉表格单元格两侧的填充空格，分隔行缩短为 ``|-|``；
+- ``whitespace``：去掉行尾空白、合并连续空格与多余空行（代码块内保持原样）；
+- ``boilerplate``：重复出现的较长段落只保留第一次。
+
+每个步骤都会记录压缩前后的 token 估算值，汇总为 :class:`CompressionReport`。
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .token_utils import estimate_tokens
+
+MEDIA_SCHEME = "media://"
+
+_DATA_URI_RE = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+_TABLE_SEPARATOR_CELL_RE = re.compile(r"^\s*(:?)-{3,}(:?)\s*$")
+_MEDIA_PLACEHOLDER_RE = re.compile(r"media://(\d+)")
+
+# 参与去重的段落最短长度，避免误删「是」「否」之类的短行
+_MIN_BOILERPLATE_CHARS = 20
+
+
+@dataclass
+class CompressionReport:
+    """各压缩步骤的 token 节省统计"""
+    actions: List[Dict[str, int | str]] = field(default_factory=list)
+
+    def record(self, action: str, before: str | int, after: str | int) -> None:
+        tokens_before = before if isinstance(before, int) else estimate_tokens(before)
+        tokens_after = after if isinstance(after, int) else estimate_tokens(after)
+        self.actions.append({
+            "action": action,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "saved": tokens_before - tokens_after,
+        })
+
+    @property
+    def total_saved(self) -> int:
+        return sum(int(item["saved"]) for item in self.actions)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"actions": self.actions, "total_saved": self.total_saved}
+
+    def summary(self) -> str:
+        parts = [f"{item['action']} -{item['saved']}" for item in self.actions if item["saved"]]
+        return f"Prompt 压缩节省约 {self.total_saved} tokens（{', '.join(parts) or '无'}）"
+
+
+@dataclass
+class CompressedMarkdown:
+    text: str
+    media: Dict[str, str]
+    report: CompressionReport
+
+
+def _map_outside_code(markdown: str, func) -> str:
+    """仅对代码块（```）之外的行应用 func(line)，func 返回 None 表示删除该行"""
+    out: List[str] = []
+    in_code = False
+    for line in markdown.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+            out.append(line)
+            continue
+        if in_code:
+            out.append(line)
+            continue
+        mapped = func(line)
+        if mapped is not None:
+            out.append(mapped)
+    return "\n".join(out)
+
+
+def _strip_media(markdown: str, media: Dict[str, str]) -> str:
+    seen: Dict[str, str] = {}
+
+    def replace(match: re.Match) -> str:
+        uri = match.group(0)
+        if uri not in seen:
+            key = str(len(seen) + 1)
+            seen[uri] = key
+            media[key] = uri
+        return f"{MEDIA_SCHEME}{seen[uri]}"
+
+    return _DATA_URI_RE.sub(replace, markdown)
+
+
+def _compact_table_line(line: str) -> str:
+    stripped = line.strip()
+    if not (stripped.startswith("|") and stripped.endswith("|") and len(stripped) > 1):
+        return line
+    cells = stripped[1:-1].split("|")
+    compact = []
+    for cell in cells:
+        sep = _TABLE_SEPARATOR_CELL_RE.match(cell)
+        compact.append(f"{sep.group(1)}-{sep.group(2)}" if sep else cell.strip())
+    return "|" + "|".join(compact) + "|"
+
+
+def _collapse_whitespace_line(line: str) -> str:
+    line = line.rstrip()
+    indent = len(line) - len(line.lstrip(" \t"))
+    return line[:indent] + re.sub(r"[ \t]{2,}", " ", line[indent:])
+
+
+def _dedupe_paragraphs(markdown: str) -> str:
+    seen: set[str] = set()
+    out: List[str] = []
+    in_code = False
+    for para in re.split(r"\n{2,}", markdown):
+        fences = para.count("```")
+        key = re.sub(r"\s+", " ", para).strip()
+        is_heading = key.startswith("#")
+        if (
+            not in_code
+            and fences == 0
+            and not is_heading
+            and len(key) >= _MIN_BOILERPLATE_CHARS
+        ):
+            if key in seen:
+                continue
+            seen.add(key)
+        if fences % 2 == 1:
+            in_code = not in_code
+        out.append(para)
+    return "\n\n".join(out)
+
+
+def compress_markdown(markdown: str) -> CompressedMarkdown:
+    """压缩教案 Markdown，返回压缩后的文本、被剥离的媒体与节省报告"""
+    report = CompressionReport()
+    media: Dict[str, str] = {}
+    text = markdown.replace("\r\n", "\n")
+
+    after = _strip_media(text, media)
+    report.record("media", text, after)
+    text = after
+
+    after = _map_outside_code(text, _compact_table_line)
+    report.record("tables", text, after)
+    text = after
+
+    after = _map_outside_code(text, _collapse_whitespace_line)
+    after = re.sub(r"\n{3,}", "\n\n", after).strip() + "\n"
+    report.record("whitespace", text, after)
+    text = after
+
+    after = _dedupe_paragraphs(text)
+    report.record("boilerplate", text, after)
+    text = after
+
+    return CompressedMarkdown(text=text, media=media, report=report)
+
+
+def restore_media(value: Any, media: Dict[str, str]) -> Any:
+    """将结果（任意嵌套的 dict/list/str）中的 ``media://N`` 占位符还原为原始内容"""
+    if not media:
+        return value
+    if isinstance(value, str):
+        return _MEDIA_PLACEHOLDER_RE.sub(lambda m: media.get(m.group(1), m.group(0)), value)
+    if isinstance(value, list):
+        return [restore_media(item, media) for item in value]
+    if isinstance(value, dict):
+        return {key: restore_media(item, media) for key, item in value.items()}
+    return value
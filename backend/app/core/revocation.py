@@ -0,0 +1,167 @@
+"""
+令牌吊销集合
+
+访问令牌只有十几分钟有效期，但登出、停用账号、检测到刷新令牌重放时需要立即生效。吊销记录写入
+``revoked_tokens`` 表，每个进程在内存中保存一份未过期的副本：
+
+- 访问令牌携带 ``fam``（登录会话）与 ``ver``（用户令牌版本），校验时检查 ``fam:<family>`` 与
+  ``user:<id>:<ver>`` 两个 key；
+- 绝大多数请求不在吊销集合中，先查 Bloom 过滤器即可确定“未吊销”，命中时再查精确集合排除误判；
+- 每 ``revocation_sync_seconds`` 秒增量读取一次其他进程写入的记录（按自增 id），请求本身不访问数据库。
+  本进程写入的吊销立即生效，其他进程最迟在一个同步周期后生效；
+- 增量同步看不到已有记录的 ``expires_at`` 被延长，也可能错过提交顺序晚于更大 id 的记录，
+  因此每 ``revocation_full_sync_seconds`` 秒改为全量读取一次未过期记录。
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.auth_token import RevokedToken
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """固定容量的 Bloom 过滤器（双重哈希生成 k 个位置）"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: float, full_sync_seconds: float = 60.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.full_sync_seconds = full_sync_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._expires: dict[str, datetime] = {}
+            self._last_id = 0
+            self._synced_at: Optional[float] = None
+            self._full_synced_at: Optional[float] = None
+
+    def _add(self, key: str, expires_at: datetime) -> None:
+        # 调用方持有锁；同一 key 取较晚的过期时间
+        current = self._expires.get(key)
+        self._expires[key] = expires_at if current is None else max(current, expires_at)
+        self._bloom.add(key)
+
+    def add(self, key: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._add(key, expires_at)
+
+    def is_revoked(self, *keys: str) -> bool:
+        now = None
+        for key in keys:
+            if key not in self._bloom:
+                continue
+            now = now or datetime.utcnow()
+            expires_at = self._expires.get(key)
+            if expires_at is not None and expires_at > now:
+                return True
+        return False
+
+    def _prune(self) -> None:
+        """丢弃过期条目；有条目过期或超出容量时重建 Bloom 过滤器（调用方持有锁）"""
+        now = datetime.utcnow()
+        expired = [key for key, expires_at in self._expires.items() if expires_at <= now]
+        for key in expired:
+            del self._expires[key]
+        if expired or len(self._expires) > self.capacity:
+            self.capacity = max(self.capacity, len(self._expires) * 2)
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            for key in self._expires:
+                self._bloom.add(key)
+
+    def sync(self, db: Session, full: bool = False) -> None:
+        """读取数据库中的吊销记录：默认只读 id 更大的新记录，full=True 时读取全部未过期记录"""
+        query = db.query(RevokedToken.id, RevokedToken.key, RevokedToken.expires_at).filter(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        if not full:
+            query = query.filter(RevokedToken.id > self._last_id)
+        rows = query.order_by(RevokedToken.id).all()
+        with self._lock:
+            for row in rows:
+                self._add(row.key, row.expires_at)
+                self._last_id = max(self._last_id, row.id)
+            self._prune()
+            self._synced_at = time.monotonic()
+            if full:
+                self._full_synced_at = self._synced_at
+
+    def maybe_sync(self, db: Session) -> None:
+        """距上次同步超过 sync_seconds 时同步一次（到期时全量）；失败（如表尚未迁移）只记录日志"""
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+            return
+        full = self._full_synced_at is None or now - self._full_synced_at >= self.full_sync_seconds
+        try:
+            self.sync(db, full=full)
+        except Exception as e:
+            self._synced_at = time.monotonic()
+            logger.warning(f"Token revocation sync failed: {e}")
+
+    def revoke(self, db: Session, key: str, expires_at: datetime) -> None:
+        """写入吊销记录（由调用方提交）并立即在本进程生效"""
+        self.add(key, expires_at)
+        existing = db.query(RevokedToken).filter(RevokedToken.key == key).first()
+        if existing:
+            existing.expires_at = max(existing.expires_at, expires_at)
+        else:
+            db.add(RevokedToken(key=key, expires_at=expires_at))
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+
+
+def family_key(family_id: str) -> str:
+    return f"fam:{family_id}"
+
+
+def user_version_key(user_id: int, version: int) -> str:
+    return f"user:{user_id}:{version}"
+
+
+_revocations: Optional[RevocationList] = None
+_revocations_lock = threading.Lock()
+
+
+def get_revocation_list() -> RevocationList:
+    global _revocations
+    with _revocations_lock:
+        if _revocations is None:
+            settings = get_settings()
+            _revocations = RevocationList(
+                capacity=settings.revocation_bloom_capacity,
+                error_rate=settings.revocation_bloom_error_rate,
+                sync_seconds=settings.revocation_sync_seconds,
+                full_sync_seconds=settings.revocation_full_sync_seconds,
+            )
+        return _revocations
@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Optional
@@ -8,26 +9,74 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from ..core.config import get_settings
+from ..db.routing import primary
 from ..db.session import get_db
 from ..models.user import User
+from .revocation import family_key, get_revocation_list, user_version_key
+from .user_cache import CachedUser, get_user_cache
 
 
-# Use Argon2 instead of bcrypt to avoid 72-byte limit and improve security
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 settings = get_settings()
+# Use Argon2 instead of bcrypt to avoid 72-byte limit and improve security.
+# Hashes created with other parameters are reported by verify_and_update() and rehashed on login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost_kib,
+    argon2__parallelism=settings.argon2_parallelism,
+)
+
+
+def create_access_token(
+    subject: str,
+    expires_delta: Optional[timedelta] = None,
+    version: int = 0,
+    family_id: Optional[str] = None,
+) -> str:
+    """Create a short-lived access token.
+
+    ``ver`` is the user's token_version at issue time and ``fam`` the login session
+    it belongs to; both are checked against the in-memory revocation list.
+    """
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
+    to_encode = {"sub": subject, "exp": expire, "typ": "access", "ver": version, "jti": uuid.uuid4().hex}
+    if family_id:
+        to_encode["fam"] = family_id
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode = {"sub": subject, "exp": expire}
+def create_refresh_token(subject: str, jti: str, family_id: str, version: int, expires_at: datetime) -> str:
+    """Create a refresh token; its rotation state lives in the refresh_tokens table."""
+    to_encode = {"sub": subject, "exp": expires_at, "typ": "refresh", "ver": version, "jti": jti, "fam": family_id}
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
+def decode_token(token: str, token_type: str = "access") -> Optional[dict]:
+    """Decode and verify a token; returns None when invalid, expired or of another type.
+
+    Access tokens issued before refresh tokens existed carry no ``typ`` claim and are
+    treated as access tokens of version 0.
+    """
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    if payload.get("sub") is None or payload.get("typ", "access") != token_type:
+        return None
+    return payload
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash when the stored one uses outdated parameters."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password using Argon2."""
     return pwd_context.hash(password)
@@ -41,26 +90,54 @@ def get_token_from_header() -> Optional[str]:
     return None
 
 
-def get_current_user() -> User:
-    """Get current authenticated user from token."""
+def _load_current_user(user_id: int) -> Optional[CachedUser]:
+    cache = get_user_cache()
+    user = cache.get(user_id) if cache is not None else None
+    if user is None:
+        db: Session = get_db()
+        row = db.query(User.id, User.role, User.is_active, User.token_version).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = CachedUser(id=row.id, role=row.role, is_active=row.is_active, token_version=row.token_version)
+        if cache is not None:
+            cache.set(user)
+    return user
+
+
+def get_current_user() -> CachedUser:
+    """Get current authenticated user from token.
+
+    Returns the cached (id, role, is_active, token_version) projection; load the full
+    User row from the session when other columns are needed. In the common case
+    neither the user lookup nor the revocation check touches the database.
+    """
     from flask import abort
 
     token = get_token_from_header()
     if not token:
         abort(401, description="Could not validate credentials")
 
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: str | None = payload.get("sub")
-        if user_id is None:
-            abort(401, description="Could not validate credentials")
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None:
         abort(401, description="Could not validate credentials")
 
-    db: Session = get_db()
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user or not user.is_active:
+    user_id = int(payload["sub"])
+    version = int(payload.get("ver", 0))
+    revocations = get_revocation_list()
+    db = get_db()
+    # Revocations and the active flag must not come from a lagging read replica
+    with primary(db):
+        revocations.maybe_sync(db)
+        keys = [user_version_key(user_id, version)]
+        if payload.get("fam"):
+            keys.append(family_key(payload["fam"]))
+        if revocations.is_revoked(*keys):
+            abort(401, description="Could not validate credentials")
+
+        user = _load_current_user(user_id)
+    if not user or not user.is_active or user.token_version != version:
         abort(401, description="Could not validate credentials")
+    g.token_payload = payload
     return user
 
 
@@ -0,0 +1,20 @@
+"""
+Token 估算工具
+
+大模型按 token 计费，但项目中没有引入具体模型的分词器。这里使用一个足够稳定的近似：
+中日韩字符按 1 字 1 token 计，其余连续的 ASCII 文本按约 4 个字符 1 个 token 计。
+仅用于预算控制与节省量统计，不追求与服务端计费完全一致。
+"""
+import math
+import re
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str | None) -> int:
+    """估算一段文本的 token 数"""
+    if not text:
+        return 0
+    cjk_count = len(_CJK_RE.findall(text))
+    other = len(text) - cjk_count
+    return cjk_count + math.ceil(other / 4)
@@ -0,0 +1,137 @@
+"""
+已认证用户缓存
+
+``get_current_user`` 在每个需要登录的请求上都会按 id 查询一次 users，这是整个系统执行次数最多的语句。
+路由实际只用到 ``id`` 与 ``role``（以及用于拒绝已停用账号和旧令牌的 ``is_active``、``token_version``），
+这里按用户 id 缓存这几个字段：
+
+- ``local``（默认）：进程内 TTL + LRU 缓存。``UserService`` 修改角色/启用状态时会立即清除本进程中的条目，
+  其他 worker 进程最迟在 ``user_cache_ttl_seconds`` 秒后读到新值。
+- ``redis``：多个 worker 共享同一份缓存（需安装 redis 并配置 ``redis_url``），清除对所有进程立即生效；
+  Redis 不可用时退回直接查库。
+- ``off``：不缓存。
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """当前用户的精简投影（路由通过 g.current_user 使用）"""
+    id: int
+    role: str
+    is_active: bool
+    token_version: int = 0
+
+
+class _LocalUserCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple[float, CachedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user: CachedUser) -> None:
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class _RedisUserCache:
+    _PREFIX = "auth:user:"
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # 可选依赖，只有 user_cache_backend=redis 时才需要
+
+        self.ttl = max(1, int(ttl))
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        try:
+            raw = self._client.get(f"{self._PREFIX}{user_id}")
+        except Exception as e:
+            logger.warning(f"User cache read failed: {e}")
+            return None
+        return CachedUser(**json.loads(raw)) if raw else None
+
+    def set(self, user: CachedUser) -> None:
+        try:
+            self._client.setex(f"{self._PREFIX}{user.id}", self.ttl, json.dumps(asdict(user)))
+        except Exception as e:
+            logger.warning(f"User cache write failed: {e}")
+
+    def delete(self, user_id: int) -> None:
+        try:
+            self._client.delete(f"{self._PREFIX}{user_id}")
+        except Exception as e:
+            logger.warning(f"User cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            keys = list(self._client.scan_iter(f"{self._PREFIX}*"))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"User cache clear failed: {e}")
+
+
+_cache = None
+_cache_initialized = False
+_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """返回配置的缓存后端；user_cache_backend=off 时返回 None"""
+    global _cache, _cache_initialized
+    with _cache_lock:
+        if not _cache_initialized:
+            settings = get_settings()
+            backend = settings.user_cache_backend
+            if backend == "redis" and settings.redis_url:
+                try:
+                    _cache = _RedisUserCache(settings.redis_url, settings.user_cache_ttl_seconds)
+                except ImportError:
+                    logger.warning("redis is not installed, falling back to the in-process user cache")
+                    backend = "local"
+            if backend in ("local", "redis") and _cache is None and settings.user_cache_ttl_seconds > 0:
+                _cache = _LocalUserCache(settings.user_cache_ttl_seconds, settings.user_cache_max_entries)
+            _cache_initialized = True
+        return _cache
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """用户角色、启用状态或密码变更后调用"""
+    cache = get_user_cache()
+    if cache is not None:
+        cache.delete(user_id)
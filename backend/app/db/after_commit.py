@@ -0,0 +1,35 @@
+"""
+提交后回调
+
+服务层只 flush，事务由请求结束时的 commit_db（或脚本、路由中的显式 commit）统一提交。
+更新进程内索引等无法回滚的副作用不能在 flush 时执行：请求随后失败回滚时，索引里就留下了
+数据库中并不存在的内容。这类操作通过 ``run_after_commit`` 登记在会话上，事务真正提交后
+才执行；事务回滚时直接丢弃。
+"""
+import logging
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def run_after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """登记一个在当前事务提交成功后执行的回调"""
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            # 数据已经提交，回调失败不能再让请求报错
+            logger.error(f"After-commit callback failed: {e}", exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_callbacks(session):
+    session.info.pop("after_commit", None)
@@ -0,0 +1,22 @@
+"""
+批量写入工具
+"""
+from typing import Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+def insert_returning_ids(db: Session, model, rows: Sequence[dict]) -> list:
+    """
+    批量插入并返回与 rows 一一对应的新主键（INSERT ... RETURNING，按 insertmanyvalues 分批）
+
+    ``sort_by_parameter_order`` 在 SQLite 上会退化为逐行插入；而 SQLite 在一条多行 INSERT 中按 VALUES
+    顺序依次分配递增的 rowid（写入期间持有库级写锁，分批也按顺序执行），因此直接按升序排列返回的 id 即可。
+    其他数据库使用 SQLAlchemy 的 sentinel 机制保证顺序。
+    """
+    if not rows:
+        return []
+    if db.get_bind().dialect.name == "sqlite":
+        return sorted(db.scalars(insert(model).returning(model.id), rows).all())
+    return list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all())
@@ -0,0 +1,140 @@
+"""
+索引顾问
+
+在测试或压测期间捕获执行过的 SELECT 语句，逐条执行 EXPLAIN，报告需要关注的访问路径：
+
+- SQLite：``EXPLAIN QUERY PLAN`` 中的 ``SCAN <table>``（全表/全索引扫描）与
+  ``USE TEMP B-TREE FOR ORDER BY / GROUP BY / DISTINCT``（临时排序）；
+- PostgreSQL：``EXPLAIN (FORMAT JSON)`` 中的 ``Seq Scan`` 与 ``Sort`` 节点。
+
+用法::
+
+    with QueryCapture() as capture:
+        ...  # 运行测试或业务流程
+    findings = analyze(engine, capture.statements)
+    print(format_report(findings))
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+_SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)")
+_TEMP_BTREE_RE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class CapturedStatement:
+    sql: str
+    parameters: Any
+    count: int = 1
+
+
+@dataclass
+class Finding:
+    """一条需要关注的访问路径"""
+    kind: str  # full_scan / temp_sort
+    table: Optional[str]
+    detail: str
+    sql: str
+    count: int
+
+
+@dataclass
+class QueryCapture:
+    """捕获所有引擎执行的 SELECT 语句（按 SQL 文本去重并计数）"""
+    statements: Dict[str, CapturedStatement] = field(default_factory=dict)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        sql = statement.strip()
+        if executemany or not sql.upper().startswith("SELECT"):
+            return
+        captured = self.statements.get(sql)
+        if captured:
+            captured.count += 1
+        else:
+            self.statements[sql] = CapturedStatement(sql=sql, parameters=parameters)
+
+    def __enter__(self) -> "QueryCapture":
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+
+
+def _explain_sqlite(conn, stmt: CapturedStatement) -> List[Finding]:
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + stmt.sql, stmt.parameters or ())
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    findings = []
+    for row in rows:
+        detail = row[-1]
+        scan = _SCAN_RE.match(detail)
+        if scan:
+            findings.append(Finding("full_scan", scan.group(1), detail, stmt.sql, stmt.count))
+            continue
+        temp = _TEMP_BTREE_RE.search(detail)
+        if temp:
+            findings.append(Finding("temp_sort", None, detail, stmt.sql, stmt.count))
+    return findings
+
+
+def _walk_pg_plan(node: Dict[str, Any], stmt: CapturedStatement, findings: List[Finding]) -> None:
+    node_type = node.get("Node Type")
+    if node_type == "Seq Scan":
+        findings.append(Finding("full_scan", node.get("Relation Name"), f"Seq Scan on {node.get('Relation Name')}", stmt.sql, stmt.count))
+    elif node_type in ("Sort", "Incremental Sort"):
+        keys = ", ".join(node.get("Sort Key", []))
+        findings.append(Finding("temp_sort", None, f"{node_type} ({keys})", stmt.sql, stmt.count))
+    for child in node.get("Plans", []):
+        _walk_pg_plan(child, stmt, findings)
+
+
+def _explain_postgresql(conn, stmt: CapturedStatement) -> List[Finding]:
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + stmt.sql, stmt.parameters or None)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    findings: List[Finding] = []
+    _walk_pg_plan(plan[0]["Plan"], stmt, findings)
+    return findings
+
+
+def analyze(engine: Engine, statements: Dict[str, CapturedStatement]) -> List[Finding]:
+    """对捕获的语句逐条执行 EXPLAIN，返回发现的问题（按执行次数降序）"""
+    explain = {"sqlite": _explain_sqlite, "postgresql": _explain_postgresql}.get(engine.dialect.name)
+    if explain is None:
+        raise ValueError(f"不支持的数据库方言：{engine.dialect.name}")
+    findings: List[Finding] = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))  # 确保 DBAPI 连接已建立
+        for stmt in statements.values():
+            try:
+                findings.extend(explain(conn, stmt))
+            except Exception as e:
+                findings.append(Finding("error", None, str(e), stmt.sql, stmt.count))
+    return sorted(findings, key=lambda f: f.count, reverse=True)
+
+
+def format_report(findings: List[Finding], total_statements: Optional[int] = None) -> str:
+    """生成文本报告"""
+    lines = []
+    if total_statements is not None:
+        lines.append(f"分析语句 {total_statements} 条，发现问题 {len(findings)} 处")
+    if not findings:
+        lines.append("未发现全表扫描或临时排序。")
+        return "\n".join(lines)
+    for finding in findings:
+        sql = _WHITESPACE_RE.sub(" ", finding.sql)
+        lines.append(f"[{finding.kind}] x{finding.count} {finding.detail}")
+        lines.append(f"    {sql[:300]}{'...' if len(sql) > 300 else ''}")
+    return "\n".join(lines)
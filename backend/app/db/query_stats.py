@@ -0,0 +1,114 @@
+"""
+按请求统计 SQL 查询
+
+通过 SQLAlchemy 的 cursor 事件记录每个请求内执行的语句数、数据库耗时以及重复出现的语句形状：
+
+- 响应头 ``Server-Timing: db;dur=<毫秒>;desc="<N> queries"``，可直接在浏览器开发者工具中查看；
+- 同一语句形状（去掉参数与 IN 列表长度后的 SQL）在一个请求内重复超过阈值时，记录疑似 N+1 的 warning；
+- 路由可用 :func:`query_budget` 声明查询预算；``ENFORCE_QUERY_BUDGET`` 开启时（测试环境）
+  超出预算会抛出 :class:`QueryBudgetExceeded`，否则只记录 warning。
+
+只统计在请求上下文中执行的语句，SSE 后台线程等不在统计范围内。
+"""
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Optional
+
+from flask import Flask, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """请求执行的查询数超过了路由声明的预算"""
+
+
+def statement_shape(statement: str) -> str:
+    """归一化 SQL：去掉字面量、把 IN 列表折叠为一个占位符"""
+    shape = _LITERAL_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0  # 秒
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def current_stats() -> Optional[QueryStats]:
+    if not has_app_context():
+        return None
+    return g.get("query_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def query_budget(max_queries: int):
+    """声明路由在一次请求内最多执行的查询数（放在 route 装饰器之下）"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.query_budget = max_queries
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def install(app: Flask, n_plus_one_threshold: int = 5) -> None:
+    """注册 cursor 事件与请求钩子"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+
+        response.headers.add("Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"')
+
+        endpoint = request.endpoint or request.path
+        for shape, n in stats.repeated(n_plus_one_threshold):
+            logger.warning(f"Possible N+1 in {request.method} {endpoint}: {n}x {shape[:200]}")
+
+        budget = g.get("query_budget")
+        if budget is not None and stats.count > budget:
+            message = f"{request.method} {endpoint} executed {stats.count} queries, budget is {budget}"
+            if current_app.config.get("ENFORCE_QUERY_BUDGET"):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,114 @@
+"""
+读写分离：按请求把查询路由到主库或只读副本
+
+- ``RoutingSession`` 在 ``session.info["read_only"]`` 为真时把查询发往健康的副本（轮询），
+  其余情况以及所有写操作（flush、INSERT/UPDATE/DELETE）都发往主库；
+- 会话一旦写过数据，本次请求剩余的查询都固定走主库（read-your-writes）；同一客户端随后几秒内的
+  请求也走主库（见 ``session.pin_reads_after_write``），不会读到副本上尚未同步的旧数据；
+  ``info["pending_writes"]`` 标记当前事务中是否有未提交的写入，供请求结束时的统一提交使用；
+- 鉴权、吊销检查等不能容忍副本延迟的读取用 ``primary()`` 显式固定到主库；
+- 副本在被选中时按间隔惰性执行 ``SELECT 1`` 做健康检查，失败的副本在下次检查前不再参与路由；
+- 未配置副本时行为与普通 ``Session`` 完全一致。
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_healthy(self, interval: float) -> bool:
+        now = time.monotonic()
+        # 同一时刻只有一个线程做检查，其他线程沿用上次结果
+        if now - self.checked_at >= interval and self._lock.acquire(blocking=False):
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                if not self.healthy:
+                    logger.info(f"Replica {self.engine.url.render_as_string(hide_password=True)} is healthy again")
+                self.healthy = True
+            except Exception as e:
+                if self.healthy:
+                    logger.warning(f"Replica {self.engine.url.render_as_string(hide_password=True)} failed health check: {e}")
+                self.healthy = False
+            finally:
+                self.checked_at = time.monotonic()
+                self._lock.release()
+        return self.healthy
+
+
+class ReplicaPool:
+    """一组只读副本，按轮询顺序返回健康的副本"""
+
+    def __init__(self, engines: List[Engine], check_interval: float = 30.0):
+        self._replicas = [_Replica(engine) for engine in engines]
+        self._counter = itertools.count()
+        self.check_interval = check_interval
+
+    def __bool__(self) -> bool:
+        return bool(self._replicas)
+
+    def choose(self) -> Optional[Engine]:
+        if not self._replicas:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self._replicas)):
+            replica = self._replicas[(start + offset) % len(self._replicas)]
+            if replica.is_healthy(self.check_interval):
+                return replica.engine
+        return None
+
+
+class RoutingSession(Session):
+    """按读写类型选择主库或副本的 Session"""
+
+    def __init__(self, *args, replicas: Optional[ReplicaPool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if isinstance(clause, UpdateBase) or self._flushing:
+            self.info["wrote"] = True
+            self.info["pending_writes"] = True
+        elif self.replicas and self.info.get("read_only") and not self.info.get("wrote"):
+            # 同一会话固定使用一个副本，避免一次请求内的读取分散在多个副本上
+            replica = self.info.get("replica") or self.replicas.choose()
+            if replica is not None:
+                self.info["replica"] = replica
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@contextmanager
+def _routed(session: Session, read_only: bool) -> Iterator[Session]:
+    previous = session.info.get("read_only")
+    session.info["read_only"] = read_only
+    try:
+        yield session
+    finally:
+        session.info["read_only"] = previous
+
+
+def read_only(session: Session):
+    """在非 GET 请求或后台任务中，把一段只读查询显式路由到副本"""
+    return _routed(session, True)
+
+
+def primary(session: Session):
+    """把一段查询固定发往主库（GET 请求中也是），用于不能读到延迟数据的检查"""
+    return _routed(session, False)
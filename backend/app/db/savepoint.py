@@ -0,0 +1,23 @@
+"""
+保存点
+
+``savepoint(db)`` 包装 ``Session.begin_nested``：块内的写入失败时只回滚这部分，当前事务中
+调用方的其他修改不受影响，也不会被提前提交；成功时随事务（请求结束时的 commit_db）一并提交。
+
+pysqlite 只在 DML 之前隐式开启事务：事务中还没有写入时，SAVEPOINT 会成为最外层事务，
+RELEASE 时直接提交。因此进入保存点前先在主库连接上显式 BEGIN。
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+
+@contextmanager
+def savepoint(db: Session) -> Iterator[Session]:
+    connection = db.connection(bind_arguments={"bind": db.bind})
+    dbapi_connection = connection.connection.dbapi_connection
+    if connection.dialect.name == "sqlite" and not dbapi_connection.in_transaction:
+        dbapi_connection.execute("BEGIN")
+    with db.begin_nested():
+        yield db
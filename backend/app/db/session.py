@@ -1,13 +1,23 @@
+import logging
+import math
+import time
 from pathlib import Path
 
-from sqlalchemy import create_engine
-from sqlalchemy.engine import make_url
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from ..core.config import get_settings
 from .base import Base
+from .routing import ReplicaPool, RoutingSession
 
 BASE_BACKEND_DIR = Path(__file__).resolve().parents[2]
+logger = logging.getLogger(__name__)
+
+# 客户端最近一次提交写入后，读请求固定走主库的截止时间（Unix 时间戳）
+PRIMARY_READS_COOKIE = "db_primary_until"
 
 
 def _prepare_database(database_url: str) -> tuple[str, dict]:
@@ -17,6 +27,9 @@ def _prepare_database(database_url: str) -> tuple[str, dict]:
     if url.drivername != "sqlite":
         return database_url, connect_args
 
+    if url.database == ":memory:":
+        return database_url, {"check_same_thread": False}
+
     db_path = Path(url.database or "data/app.db")
     if not db_path.is_absolute():
         db_path = (BASE_BACKEND_DIR / db_path).resolve()
@@ -27,25 +40,152 @@ def _prepare_database(database_url: str) -> tuple[str, dict]:
     return str(updated_url), connect_args
 
 
+def apply_sqlite_profile(engine: Engine, settings) -> None:
+    """在每个新建的 SQLite 连接上设置 PRAGMA
+
+    - WAL：读写互不阻塞，多个请求可在写入的同时读取；
+    - synchronous=NORMAL：WAL 模式下仍保证崩溃一致性，只在 checkpoint 时 fsync；
+    - cache_size / mmap_size：加大页缓存并使用内存映射读取；
+    - busy_timeout：遇到写锁时等待而不是立即报 "database is locked"；
+    - foreign_keys：按 sqlite_foreign_keys 显式设置，连接状态不依赖 SQLite 的编译默认值。
+    """
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+            cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}")
+            cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size_bytes)}")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            cursor.execute(f"PRAGMA foreign_keys = {'ON' if settings.sqlite_foreign_keys else 'OFF'}")
+        finally:
+            cursor.close()
+
+
+def create_app_engine(database_url: str, connect_args: dict, settings) -> Engine:
+    """创建引擎；SQLite 使用调优后的连接配置与连接池"""
+    url = make_url(database_url)
+    if url.drivername != "sqlite" or not settings.sqlite_tuned:
+        return create_engine(database_url, connect_args=connect_args)
+
+    if url.database == ":memory:":
+        # 内存库只存在于单个连接中，所有线程共享同一连接
+        engine = create_engine(database_url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            database_url,
+            connect_args={**connect_args, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+            poolclass=QueuePool,
+            pool_size=settings.sqlite_pool_size,
+            max_overflow=settings.sqlite_max_overflow,
+            pool_timeout=settings.sqlite_busy_timeout_ms / 1000,
+        )
+    apply_sqlite_profile(engine, settings)
+    return engine
+
+
 settings = get_settings()
 database_url, connect_args = _prepare_database(settings.database_url)
-engine = create_engine(database_url, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_app_engine(database_url, connect_args, settings)
+replica_engines = [
+    create_app_engine(*_prepare_database(url.strip()), settings)
+    for url in settings.database_replica_urls.split(",")
+    if url.strip()
+]
+replicas = ReplicaPool(replica_engines, check_interval=settings.database_replica_health_interval_seconds)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replicas,
+)
 
 
 def init_db() -> None:
-    """Create database tables."""
+    """Create database tables and the user search index."""
+    from .user_search import ensure_user_search_index
+
     Base.metadata.create_all(bind=engine)
+    ensure_user_search_index(engine)
 
 
 def get_db() -> Session:
-    """Get database session. Use Flask's g object for request-scoped sessions."""
-    from flask import g
+    """Get database session. Use Flask's g object for request-scoped sessions.
+
+    GET/HEAD requests read from a replica (when configured) until the session writes,
+    unless the same client committed writes moments ago (see pin_reads_after_write).
+    """
+    from flask import g, has_request_context, request
     if 'db' not in g:
         g.db = SessionLocal()
+        if has_request_context():
+            g.db.info["read_only"] = request.method in ("GET", "HEAD") and not _recently_wrote(request)
     return g.db
 
 
+def _recently_wrote(request) -> bool:
+    try:
+        return time.time() < float(request.cookies.get(PRIMARY_READS_COOKIE, 0))
+    except ValueError:
+        return False
+
+
+def pin_reads_after_write(response):
+    """Read-your-writes across requests: after a request commits writes, the client's
+    reads go to the primary for database_replica_sticky_seconds (replication lag).
+
+    Registered before commit_db so that it runs after it and sees the final status.
+    """
+    from flask import g
+    db = g.get("db")
+    if db is None or not getattr(db, "replicas", None) or not db.info.get("wrote") or response.status_code >= 400:
+        return response
+    seconds = settings.database_replica_sticky_seconds
+    response.set_cookie(
+        PRIMARY_READS_COOKIE, f"{time.time() + seconds:.3f}", max_age=math.ceil(seconds), httponly=True, samesite="Lax"
+    )
+    return response
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _clear_pending_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("pending_writes", None)
+
+
+def commit_db(response):
+    """Unit of work: commit the request-scoped session once, at the request boundary.
+
+    Services only flush (INSERT ... RETURNING hands back generated keys), so the
+    response is serialized from in-memory state and no row is re-read after commit.
+    Successful responses (< 400) with pending writes are committed; anything else
+    is rolled back. A failed commit turns the response into an error.
+    """
+    from flask import g, jsonify
+    db = g.get("db")
+    if db is None or not (db.info.get("pending_writes") or db.new or db.dirty or db.deleted):
+        return response
+    if response.status_code >= 400:
+        db.rollback()
+        return response
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning(f"Commit failed with integrity error: {e.orig}")
+        response = jsonify({"detail": "数据冲突，保存失败，请刷新后重试"})
+        response.status_code = 409
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Commit failed: {e}", exc_info=True)
+        response = jsonify({"detail": "保存失败，请稍后重试"})
+        response.status_code = 500
+    return response
+
+
 def close_db(e=None):
     """Close database session at end of request."""
     from flask import g
@@ -0,0 +1,139 @@
+"""
+用户全文检索（管理端用户搜索）
+
+``LIKE '%term%'`` 跨四列 OR 无法使用任何索引，每次搜索都会扫全表。这里按方言建立 n-gram 索引：
+
+- SQLite：外部内容 FTS5 表 ``users_fts``（trigram 分词，可匹配中文昵称与学号/手机号片段），
+  由 ``users`` 上的 INSERT/UPDATE/DELETE 触发器保持同步；UPDATE 触发器只监听被检索的四列，
+  登录时的 token_version、密码重新哈希与启停用等更新不会重写索引；
+  排序使用 bm25，并让以搜索词开头的学号/手机号/昵称/邮箱排在前面。
+- PostgreSQL：在四列拼接的表达式上建 pg_trgm GIN 索引，ILIKE 可直接走索引，按 similarity 排序。
+
+trigram 至少需要 3 个字符，更短的搜索词（如两个字的中文名）退回 LIKE。
+"""
+import logging
+import weakref
+from typing import Optional
+
+from sqlalchemy import Float, Integer, case, func, literal, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+MIN_TRIGRAM_LENGTH = 3
+_SEARCH_COLUMNS = ("email", "phone", "student_id", "nickname")
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        {", ".join(_SEARCH_COLUMNS)}, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, {", ".join(_SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in _SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {", ".join(_SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in _SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF {", ".join(_SEARCH_COLUMNS)} ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {", ".join(_SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in _SEARCH_COLUMNS)});
+        INSERT INTO users_fts(rowid, {", ".join(_SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in _SEARCH_COLUMNS)});
+    END""",
+]
+
+_POSTGRES_INDEX = "ix_users_search_trgm"
+
+
+def _search_document():
+    """PostgreSQL 上被索引的拼接表达式（|| 与 coalesce 都是 IMMUTABLE，可以建表达式索引）"""
+    parts = [func.coalesce(getattr(User, c), "") for c in _SEARCH_COLUMNS]
+    document = parts[0]
+    for part in parts[1:]:
+        document = document.op("||")(" ").op("||")(part)
+    return document
+
+
+def ensure_user_search_index(engine: Engine) -> None:
+    """创建检索索引（幂等）；SQLite 首次创建 FTS 表时从 users 重建索引内容"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+                ).first()
+                update_trigger = conn.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'users_fts_au'")
+                ).scalar()
+                if update_trigger and " UPDATE OF " not in update_trigger:
+                    # 旧版本的触发器监听所有列的更新，替换为只监听检索列
+                    conn.execute(text("DROP TRIGGER users_fts_au"))
+                for ddl in _SQLITE_DDL:
+                    conn.execute(text(ddl))
+                if not exists:
+                    conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                _fts_available[engine] = True
+            elif dialect == "postgresql":
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                document = str(_search_document().compile(engine, compile_kwargs={"literal_binds": True}))
+                conn.execute(
+                    text(f"CREATE INDEX IF NOT EXISTS {_POSTGRES_INDEX} ON users USING gin (({document}) gin_trgm_ops)")
+                )
+    except Exception as e:
+        # 例如 SQLite 编译时未启用 FTS5：搜索会退回 LIKE
+        logger.warning(f"User search index not available: {e}")
+
+
+_fts_available: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+
+def _has_sqlite_fts(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind not in _fts_available:
+        row = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")).first()
+        _fts_available[bind] = row is not None
+    return _fts_available[bind]
+
+
+def _like_filter(term: str):
+    pattern = f"%{term}%"
+    return or_(*(getattr(User, c).like(pattern) for c in _SEARCH_COLUMNS))
+
+
+def _prefix_rank(term: str):
+    """以搜索词开头的任一字段排在前面（0），其余为 1"""
+    pattern = f"{term}%"
+    return case((or_(*(getattr(User, c).like(pattern) for c in _SEARCH_COLUMNS)), 0), else_=1)
+
+
+def apply_user_search(db: Session, query: Query, term: str) -> tuple[Query, Optional[list]]:
+    """
+    给用户查询加上搜索条件，返回 (query, 排序表达式列表)
+
+    排序表达式在需要按相关度排序时使用；LIKE 回退时只按前缀命中排序。
+    """
+    term = term.strip()
+    dialect = db.get_bind().dialect.name
+
+    if len(term) >= MIN_TRIGRAM_LENGTH and dialect == "sqlite" and _has_sqlite_fts(db):
+        match = '"' + term.replace('"', '""') + '"'
+        hits = (
+            text("SELECT rowid AS user_id, bm25(users_fts) AS score FROM users_fts WHERE users_fts MATCH :match")
+            .bindparams(match=match)
+            .columns(user_id=Integer, score=Float)
+            .subquery("user_search_hits")
+        )
+        query = query.join(hits, hits.c.user_id == User.id)
+        return query, [_prefix_rank(term), hits.c.score]
+
+    if len(term) >= MIN_TRIGRAM_LENGTH and dialect == "postgresql":
+        document = _search_document()
+        query = query.filter(document.ilike(f"%{term}%"))
+        return query, [_prefix_rank(term), func.similarity(document, literal(term)).desc()]
+
+    return query.filter(_like_filter(term)), [_prefix_rank(term)]
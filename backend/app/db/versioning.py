@@ -0,0 +1,39 @@
+"""
+乐观锁（版本号）工具
+
+Level / LevelMap / Question 以 ``version`` 列作为 SQLAlchemy 的 ``version_id_col``：ORM 生成的
+UPDATE/DELETE 自带 ``WHERE version = <读取时的版本>`` 并同时把版本号加一，一条语句完成“比较并写入”，
+不需要 SELECT ... FOR UPDATE。匹配行数为 0（读取之后被其他请求改过）时 flush 抛出 StaleDataError。
+"""
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from ..core.exceptions import VersionConflictError
+
+
+def check_version(entity, expected_version: Optional[int], message: str = "数据已被修改，请刷新后重试") -> None:
+    """客户端提交的版本号与读取到的版本不一致时抛出 VersionConflictError（expected_version 为 None 时不检查）"""
+    if expected_version is not None and expected_version != entity.version:
+        raise VersionConflictError(message, current_version=entity.version)
+
+
+@contextmanager
+def versioned_write(db: Session, entity, expected_version: Optional[int] = None, message: str = "数据已被修改，请刷新后重试"):
+    """
+    对 entity 的条件写入：先比较客户端版本号，块结束时 flush
+
+    块内（含块内调用的 flush）发生的 StaleDataError 转为携带当前版本号的 VersionConflictError；
+    失败的 flush 之后会话只能回滚，因此这里先回滚再读取当前版本。
+    """
+    check_version(entity, expected_version, message)
+    model, entity_id = type(entity), entity.id
+    try:
+        yield entity
+        db.flush()
+    except StaleDataError:
+        db.rollback()
+        current = db.query(model.version).filter(model.id == entity_id).scalar()
+        raise VersionConflictError(message, current_version=current)
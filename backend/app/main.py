@@ -15,7 +15,10 @@ from .api.routes.task_steps import task_steps_bp
 from .api.routes.task_phase_question_rel import task_phase_question_rel_bp
 from .api.routes.questions import questions_bp
 from .core.config import get_settings
-from .db.session import close_db, init_db
+from .db import query_stats
+from .db.session import SessionLocal, close_db, commit_db, init_db, pin_reads_after_write
+from .services.generated_file_service import start_gc_thread
+from .services.roster_import import get_hash_pool
 
 settings = get_settings()
 
@@ -29,13 +32,21 @@ def create_app() -> Flask:
     app = Flask(__name__)
     app.config["SECRET_KEY"] = settings.secret_key
     app.config["JSON_AS_ASCII"] = False  # Support Chinese characters in JSON
+    app.config["ENFORCE_QUERY_BUDGET"] = settings.enforce_query_budget
 
     # Enable CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    # ETag 需要暴露给前端：课程数据的版本号通过它在 PATCH 时回传（If-Match）
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["ETag"])
 
-    # Register database teardown
+    # Register database teardown; successful requests commit once at the boundary
+    # after_request handlers run in reverse order: pin_reads_after_write sees commit_db's result
+    app.after_request(pin_reads_after_write)
+    app.after_request(commit_db)
     app.teardown_appcontext(close_db)
 
+    # Per-request SQL count/timing (Server-Timing header, N+1 warnings, query budgets)
+    query_stats.install(app, n_plus_one_threshold=settings.query_n_plus_one_threshold)
+
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
@@ -55,6 +66,12 @@ def create_app() -> Flask:
         init_db()
         logger.info("Database initialized")
 
+    # 后台清理 data/generated 中不再被引用的数据文件
+    start_gc_thread(SessionLocal)
+
+    # 名册导入的哈希进程池在启动时创建，而不是在处理请求的线程中按需创建
+    get_hash_pool()
+
     @app.route("/health")
     def health_check():
         return jsonify({"status": "ok"})
@@ -1,4 +1,6 @@
 from .chapter import Chapter
+from .content_blob import ContentBlob
+from .course_data_version import CourseDataVersion
 from .level import Level
 from .level_map import LevelMap
 from .task import Task
@@ -17,10 +19,14 @@ from .treasure_chest import TreasureChest
 from .student_profile import StudentProfile
 from .student_skill import StudentSkill
 from .ai_assistant_log import AIAssistantLog
+from .ai_usage import AIUsageRecord, AIUsageRollup
+from .auth_token import RefreshToken, RevokedToken
 from .user import User
 
 __all__ = [
     "Chapter",
+    "ContentBlob",
+    "CourseDataVersion",
     "Level",
     "LevelMap",
     "Task",
@@ -40,6 +46,10 @@ __all__ = [
     "StudentProfile",
     "StudentSkill",
     "AIAssistantLog",
+    "AIUsageRecord",
+    "AIUsageRollup",
+    "RefreshToken",
+    "RevokedToken",
     "User",
 ]
 
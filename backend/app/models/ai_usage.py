@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, UniqueConstraint, Index
+
+from ..db.base import Base
+
+
+class AIUsageRecord(Base):
+    """AI token 用量流水（每次大模型调用一条，按动作归集）"""
+    __tablename__ = "ai_usage_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True, index=True)  # 发起调用的用户ID（后台任务可为空）
+    action = Column(String(64), nullable=False)  # 操作类型，与 ai_assistant_logs.action 一致
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    estimated = Column(Boolean, default=False, nullable=False)  # 服务端未返回 usage 时为估算值
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class AIUsageRollup(Base):
+    """AI token 用量汇总（按用户 + 动作 + 日/月增量累加，供配额校验与报表直接读取）"""
+    __tablename__ = "ai_usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period_type", "period_key", "action", name="uq_ai_usage_rollups_bucket"),
+        Index("ix_ai_usage_rollups_period", "period_type", "period_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)  # 用户ID（后台任务记为 0）
+    period_type = Column(String(8), nullable=False)  # day / month
+    period_key = Column(String(10), nullable=False)  # 2024-01-31 / 2024-01
+    action = Column(String(64), nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    request_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from ..db.base import Base
+
+
+class RefreshToken(Base):
+    """刷新令牌（每次刷新轮换；同一次登录产生的令牌属于同一 family）"""
+    __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(36), unique=True, nullable=False)  # JWT ID
+    family_id = Column(String(36), nullable=False)  # 登录会话 ID
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # 已被轮换（再次使用即视为泄露）
+    revoked_at = Column(DateTime, nullable=True)  # 登出或检测到重放时整族吊销
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RevokedToken(Base):
+    """吊销记录（各进程定期同步到内存中的吊销集合，过期后可清理）"""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(96), unique=True, nullable=False)  # fam:<family_id> / user:<user_id>:<token_version>
+    expires_at = Column(DateTime, nullable=False, index=True)  # 之后不再有携带该 key 的有效访问令牌
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
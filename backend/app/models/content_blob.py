@@ -0,0 +1,183 @@
+"""
+内容寻址的大文本存储
+
+教案与课程数据不再内联在业务表中，而是存入 ``content_blobs``（SHA-256 → 压缩字节 + 引用计数），
+业务行只保存 64 字节的哈希：
+
+- 相同内容（例如复制到多个班级的同一份教案）只存一份；
+- 扫描业务表时不再读取大字段，内容只在访问属性时才加载并解压；
+- 引用计数在 flush 时用条件 UPDATE 原子增减：写入新内容前先登记引用（``before_flush``），
+  旧内容在业务行更新之后才释放（``after_flush``），计数归零的内容块随即删除。
+
+用法：在映射类上声明哈希列与指向 ``ContentBlob`` 的只读关系，再用 :class:`BlobText` 暴露文本属性::
+
+    guide_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True)
+    guide_blob = relationship(ContentBlob, foreign_keys=[guide_hash], viewonly=True)
+    guide = BlobText("guide_hash", "guide_blob")
+
+批量 ``query.delete()`` / ``update()`` 不经过 ORM 事件，不会维护引用计数；
+可运行 ``scripts/migrate_content_blobs.py`` 重新统计并清理无引用的内容块。
+"""
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, delete, event, inspect, insert, update
+from sqlalchemy.orm import Session, object_session
+
+from ..core.compression import compress, decompress
+from ..db.base import Base
+
+
+class ContentBlob(Base):
+    """内容寻址的大文本块（教案、课程数据）：按 SHA-256 去重，压缩存储，引用计数归零时删除"""
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)  # 原文 UTF-8 字节的 SHA-256（十六进制）
+    codec = Column(String(8), nullable=False)  # zstd / zlib / raw
+    size = Column(Integer, nullable=False)  # 原文字节数
+    data = Column(LargeBinary, nullable=False)  # 压缩后的字节
+    ref_count = Column(Integer, default=0, nullable=False)  # 引用该内容的字段数
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def text(self) -> str:
+        """解压后的原文（首次访问时解压；内容不可变，结果缓存在实例上）"""
+        text = self.__dict__.get("_text")
+        if text is None:
+            text = decompress(self.codec, self.data).decode("utf-8")
+            self.__dict__["_text"] = text
+        return text
+
+
+# 映射类 -> 该类上的 BlobText 属性
+_BLOB_FIELDS: dict[type, list["BlobText"]] = {}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobText:
+    """映射类上的文本属性：读取时按哈希加载并解压内容块，赋值时只计算哈希，内容在 flush 时写入"""
+
+    def __init__(self, hash_attr: str, blob_attr: str):
+        self.hash_attr = hash_attr
+        self.blob_attr = blob_attr
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        _BLOB_FIELDS.setdefault(owner, []).append(self)
+
+    def _cache(self, obj) -> dict:
+        # 按字段缓存 (哈希, 原文)；哈希与当前列值不一致（如被刷新）时失效
+        return obj.__dict__.setdefault("_blob_texts", {})
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        digest = getattr(obj, self.hash_attr)
+        if digest is None:
+            return None
+        cached = self._cache(obj).get(self.name)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        blob = getattr(obj, self.blob_attr)
+        if blob is None or blob.hash != digest:
+            session = object_session(obj)
+            blob = session.get(ContentBlob, digest) if session is not None else None
+            if blob is None:
+                return None
+        text = blob.text
+        self._cache(obj)[self.name] = (digest, text)
+        return text
+
+    def __set__(self, obj, value: Optional[str]):
+        # 先读出旧哈希，保证属性历史中记录被替换的值（flush 时据此释放引用）
+        getattr(obj, self.hash_attr)
+        digest = content_hash(value) if value is not None else None
+        self._cache(obj)[self.name] = (digest, value)
+        setattr(obj, self.hash_attr, digest)
+
+    def pending_text(self, obj, digest: str) -> Optional[str]:
+        cached = obj.__dict__.get("_blob_texts", {}).get(self.name)
+        return cached[1] if cached is not None and cached[0] == digest else None
+
+
+def _acquire(session: Session, digest: str, text: str, count: int) -> None:
+    """引用计数 +count；内容块不存在时压缩并插入（并发插入同一内容时退化为计数累加）"""
+    result = session.execute(
+        update(ContentBlob).where(ContentBlob.hash == digest).values(ref_count=ContentBlob.ref_count + count)
+    )
+    if result.rowcount:
+        return
+    raw = text.encode("utf-8")
+    codec, data = compress(raw)
+    values = dict(hash=digest, codec=codec, size=len(raw), data=data, ref_count=count)
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(ContentBlob).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ContentBlob.hash], set_={"ref_count": ContentBlob.ref_count + count}
+        )
+        session.execute(stmt)
+    else:
+        session.execute(insert(ContentBlob).values(**values))
+
+
+def _release(session: Session, counts: Counter) -> None:
+    for digest, count in counts.items():
+        session.execute(
+            update(ContentBlob).where(ContentBlob.hash == digest).values(ref_count=ContentBlob.ref_count - count)
+        )
+    session.execute(delete(ContentBlob).where(ContentBlob.hash.in_(list(counts)), ContentBlob.ref_count <= 0))
+
+
+@event.listens_for(Session, "before_flush")
+def _acquire_blob_refs(session, flush_context, instances):
+    acquired: Counter = Counter()
+    texts: dict[str, str] = {}
+    released: Counter = Counter()
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        fields = _BLOB_FIELDS.get(type(obj))
+        if not fields:
+            continue
+        state = inspect(obj)
+        for field in fields:
+            if obj in session.deleted:
+                digest = getattr(obj, field.hash_attr)
+                if digest is not None and state.persistent:
+                    released[digest] += 1
+                continue
+            history = state.attrs[field.hash_attr].history
+            for digest in history.added:
+                if digest is not None:
+                    text = field.pending_text(obj, digest)
+                    if text is None:
+                        raise ValueError(f"{type(obj).__name__}.{field.hash_attr} must be set through {field.name}")
+                    acquired[digest] += 1
+                    texts[digest] = text
+            for digest in history.deleted:
+                if digest is not None:
+                    released[digest] += 1
+    for digest, count in acquired.items():
+        _acquire(session, digest, texts[digest], count)
+    if released:
+        session.info.setdefault("blob_releases", Counter()).update(released)
+
+
+@event.listens_for(Session, "after_flush")
+def _release_blob_refs(session, flush_context):
+    released = session.info.pop("blob_releases", None)
+    if released:
+        _release(session, released)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_blob_releases(session):
+    session.info.pop("blob_releases", None)
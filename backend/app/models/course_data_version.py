@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from ..db.base import Base
+from .content_blob import BlobText, ContentBlob
+
+
+class CourseDataVersion(Base):
+    """
+    课程数据版本历史
+
+    每个版本要么是完整快照（存放在去重、压缩的 content_blobs 中），要么是相对上一版本的 JSON Patch。
+    快照按固定间隔（或补丁体积接近全文时）生成，任意版本都由最近的快照加不超过一个间隔的补丁重放得到。
+    """
+    __tablename__ = "course_data_versions"
+    __table_args__ = (
+        UniqueConstraint("level_id", "version", name="uq_course_data_versions_level_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    level_id = Column(Integer, ForeignKey("levels.id"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)  # 关卡内从 1 递增
+    kind = Column(String(10), nullable=False)  # snapshot / delta
+    snapshot_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True)
+    patch_json = Column(Text, nullable=True)  # delta：相对 version - 1 的 JSON Patch
+    size = Column(Integer, nullable=False, default=0)  # 本条记录新增存储的字节数（快照为原文大小）
+    source = Column(String(20), nullable=False, default="edit")  # initial / edit / ai / patch / restore
+    restored_from = Column(Integer, nullable=True)  # source=restore 时恢复的版本号
+    created_by = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    snapshot_blob = relationship(ContentBlob, foreign_keys=[snapshot_hash], viewonly=True)
+    snapshot_json = BlobText("snapshot_hash", "snapshot_blob")
@@ -1,13 +1,18 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, Text, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, Text, ForeignKey, Index, event, inspect
+from sqlalchemy.orm import relationship
 
 from ..db.base import Base
+from .content_blob import BlobText, ContentBlob
 
 
 class Level(Base):
     """关卡模型（简化版：基于MD教案）"""
     __tablename__ = "levels"
+    __table_args__ = (
+        Index("ix_levels_chapter_id_order", "chapter_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     chapter_id = Column(Integer, ForeignKey("chapters.id"), nullable=False, index=True)  # 所属篇章ID
@@ -15,10 +20,12 @@ class Level(Base):
     description = Column(Text, nullable=True)  # 关卡描述（简短）
     order = Column(Integer, default=0, nullable=False)  # 关卡顺序
     allow_skip = Column(Boolean, default=False, nullable=False)  # 是否允许跳过
-    # 教案内容（MD格式）：包含完整的实验指导书内容
-    teaching_guide_md = Column(Text, nullable=True)  # 教案/实验指导书（Markdown格式）
-    # 课程数据（JSON格式）：从MD生成的交互式课程数据，可编辑
-    course_data_json = Column(Text, nullable=True)  # 课程数据JSON（可编辑）
+    # 教案与课程数据单个可达数百 KB，存放在去重、压缩的 content_blobs 中，行内只保存内容哈希；
+    # 列表等查询不会读取内容，访问属性时才加载并解压（需要时用 joinedload 随主查询一并加载）
+    teaching_guide_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True, index=True)
+    course_data_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True, index=True)
+    course_data_version = Column(Integer, default=0, server_default="0", nullable=False)  # 课程数据当前版本号（0 表示尚无历史）
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # 行版本号（乐观锁，关卡信息更新时加一）
     last_md_sync = Column(DateTime, nullable=True)  # 最后一次从MD同步的时间
     last_json_edit = Column(DateTime, nullable=True)  # 最后一次JSON编辑的时间
     edit_mode = Column(String(10), nullable=True)  # 当前编辑模式：'md' 或 'json'
@@ -28,3 +35,35 @@ class Level(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # ORM 的 UPDATE/DELETE 带 WHERE version = ?，被并发修改时抛出 StaleDataError（见 db/versioning.py）；
+    # 版本号由下面的 before_update 钩子递增：课程数据有自己的 course_data_version，保存课程数据不改变关卡版本
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+    teaching_guide_blob = relationship(ContentBlob, foreign_keys=[teaching_guide_hash], viewonly=True)
+    course_data_blob = relationship(ContentBlob, foreign_keys=[course_data_hash], viewonly=True)
+    # 教案内容（MD格式）：包含完整的实验指导书内容
+    teaching_guide_md = BlobText("teaching_guide_hash", "teaching_guide_blob")  # 教案/实验指导书（Markdown格式）
+    # 课程数据（JSON格式）：从MD生成的交互式课程数据，可编辑
+    course_data_json = BlobText("course_data_hash", "course_data_blob")  # 课程数据JSON（可编辑）
+
+    # 只读关系：用于 selectinload 一次性加载关卡树，增删仍由各 service 负责
+    tasks = relationship("Task", viewonly=True, order_by="Task.id")
+    questions = relationship("Question", viewonly=True, order_by="Question.id")
+    treasure_chests = relationship("TreasureChest", viewonly=True, order_by="TreasureChest.id")
+
+
+# 只随课程数据变化的列：修改它们不递增关卡版本，避免可视化编辑器自动保存让其他页面的关卡编辑冲突
+_COURSE_DATA_COLUMNS = frozenset({
+    "course_data_hash", "course_data_version", "last_json_edit", "last_md_sync", "edit_mode", "updated_at", "version",
+})
+
+
+@event.listens_for(Level, "before_update")
+def _bump_level_version(mapper, connection, level: Level) -> None:
+    state = inspect(level)
+    if any(
+        state.attrs[column.key].history.has_changes()
+        for column in mapper.column_attrs
+        if column.key not in _COURSE_DATA_COLUMNS
+    ):
+        level.version = (level.version or 0) + 1
@@ -12,6 +12,9 @@ class LevelMap(Base):
     id = Column(Integer, primary_key=True, index=True)
     chapter_id = Column(Integer, ForeignKey("chapters.id"), unique=True, nullable=False, index=True)  # 所属篇章ID（一对一）
     map_config_json = Column(Text, nullable=True)  # 思维导图配置JSON（关卡树结构）
+    version = Column(Integer, server_default="1", nullable=False)  # 行版本号（乐观锁，每次更新加一）
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # ORM 的 UPDATE/DELETE 带 WHERE version = ?，被并发修改时抛出 StaleDataError（见 db/versioning.py）
+    __mapper_args__ = {"version_id_col": version}
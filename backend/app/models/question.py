@@ -21,6 +21,9 @@ class Question(Base):
     score = Column(Float, default=10.0, nullable=False)  # 分值
     knowledge_point = Column(String(255), nullable=True)  # 知识点
     tags = Column(JSON, nullable=True)  # 标签（JSON数组）
+    version = Column(Integer, server_default="1", nullable=False)  # 行版本号（乐观锁，每次更新加一）
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # ORM 的 UPDATE/DELETE 带 WHERE version = ?，被并发修改时抛出 StaleDataError（见 db/versioning.py）
+    __mapper_args__ = {"version_id_col": version}
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, Index
 
 from ..db.base import Base
 
@@ -8,6 +8,9 @@ from ..db.base import Base
 class SkillCard(Base):
     """技能卡片模型"""
     __tablename__ = "skill_cards"
+    __table_args__ = (
+        Index("ix_skill_cards_task_id_order", "task_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)  # 所属任务ID
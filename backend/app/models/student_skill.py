@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, ForeignKey, Float
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, Float, Index
 
 from ..db.base import Base
 
@@ -8,6 +8,9 @@ from ..db.base import Base
 class StudentSkill(Base):
     """学生技能模型"""
     __tablename__ = "student_skills"
+    __table_args__ = (
+        Index("uq_student_skills_user_id_skill_node_id", "user_id", "skill_node_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)  # 用户ID
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey
+from sqlalchemy.orm import relationship
 
 from ..db.base import Base
 
@@ -17,3 +18,9 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # 只读关系：用于 selectinload 一次性加载关卡树
+    phases = relationship("TaskPhase", viewonly=True, order_by="(TaskPhase.order, TaskPhase.id)")
+    knowledge_cards = relationship("KnowledgeCard", viewonly=True, order_by="(KnowledgeCard.order, KnowledgeCard.id)")
+    skill_cards = relationship("SkillCard", viewonly=True, order_by="(SkillCard.order, SkillCard.id)")
+    question_rels = relationship("TaskQuestionRel", viewonly=True, order_by="(TaskQuestionRel.order, TaskQuestionRel.id)")
+
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, Index
+from sqlalchemy.orm import relationship
 
 from ..db.base import Base
 
@@ -8,6 +9,9 @@ from ..db.base import Base
 class TaskPhase(Base):
     """任务环节模型"""
     __tablename__ = "task_phases"
+    __table_args__ = (
+        Index("ix_task_phases_task_id_order", "task_id", "order", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)  # 所属任务ID
@@ -17,3 +21,6 @@ class TaskPhase(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # 只读关系：用于 selectinload 一次性加载关卡树
+    steps = relationship("TaskStep", viewonly=True, order_by="(TaskStep.order, TaskStep.id)")
+
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, Index
 
 from ..db.base import Base
 
@@ -13,6 +13,9 @@ class TaskQuestionRel(Base):
     """
 
     __tablename__ = "task_question_rels"
+    __table_args__ = (
+        Index("ix_task_question_rels_task_id_order", "task_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)  # 所属任务ID
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, JSON
+from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, JSON, Index
 
 from ..db.base import Base
 
@@ -8,6 +8,9 @@ from ..db.base import Base
 class TaskStep(Base):
     """任务步骤模型"""
     __tablename__ = "task_steps"
+    __table_args__ = (
+        Index("ix_task_steps_phase_id_order", "phase_id", "order", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     phase_id = Column(Integer, ForeignKey("task_phases.id"), nullable=False, index=True)  # 所属环节ID
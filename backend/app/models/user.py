@@ -1,12 +1,24 @@
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, text
 
 from ..db.base import Base
 
 
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """邮箱统一按小写存储与比较"""
+    return email.strip().lower() if email else email
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at", "created_at"),
+        Index("ix_users_role_created_at", "role", "created_at"),
+        # 邮箱不区分大小写：登录按 lower(email) 匹配，唯一性也按小写判断
+        Index("ix_users_email_lower", text("lower(email)"), unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, nullable=True, index=True)
@@ -16,6 +28,8 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role = Column(String(32), default="student", nullable=False, index=True)  # student, teacher, admin
     is_active = Column(Boolean, default=True, nullable=False)
+    # 令牌版本：登出全部设备或停用账号时加 1，携带旧版本号的令牌全部失效
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     class_name = Column(String(128), nullable=True)  # 班级
     notes = Column(String(512), nullable=True)  # 备注
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
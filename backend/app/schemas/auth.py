@@ -3,6 +3,8 @@ from typing import Optional
 
 from pydantic import BaseModel, EmailStr, field_validator
 
+from ..models.user import normalize_email
+
 
 class UserBase(BaseModel):
     email: Optional[EmailStr] = None
@@ -10,6 +12,11 @@ class UserBase(BaseModel):
     student_id: Optional[str] = None
     nickname: str
 
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, value: Optional[str]) -> Optional[str]:
+        return normalize_email(value)
+
     @field_validator("phone")
     @classmethod
     def validate_phone(cls, value: Optional[str]) -> Optional[str]:
@@ -55,6 +62,11 @@ class TeacherCreate(BaseModel):
     nickname: str
     password: str
 
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, value: Optional[str]) -> Optional[str]:
+        return normalize_email(value)
+
     @field_validator("phone")
     @classmethod
     def validate_phone(cls, value: Optional[str]) -> Optional[str]:
@@ -69,4 +81,10 @@ class TeacherCreate(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # 访问令牌有效秒数
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
@@ -26,20 +26,28 @@ class LevelUpdate(BaseModel):
     teaching_guide_md: Optional[str] = Field(None, description="教案/实验指导书（Markdown格式）")
     allow_skip: Optional[bool] = Field(None, description="是否允许跳过关卡")
     course_data_json: Optional[str] = Field(None, description="课程数据JSON")
+    version: Optional[int] = Field(None, description="读取时的关卡版本号（也可通过 If-Match 提供）")
+    course_data_base_version: Optional[int] = Field(
+        None, description="修改课程数据时必填：读取时的课程数据版本号（也可通过 If-Match: \"level-<版本>.<课程数据版本>\" 提供）"
+    )
 
 
-class LevelRead(LevelBase):
-    """关卡读取模型"""
+# 关卡的大字段：列表接口默认不返回，可通过 fields 参数显式请求
+LEVEL_CONTENT_FIELDS = ("teaching_guide_md", "course_data_json")
+
+
+class LevelSummary(LevelBase):
+    """关卡列表模型（不含教案与课程数据）"""
     id: int
     chapter_id: int
     is_visible: bool
     is_published: bool
     published_at: Optional[datetime]
-    teaching_guide_md: Optional[str] = Field(None, description="教案/实验指导书（Markdown格式）")
-    course_data_json: Optional[str] = Field(None, description="课程数据JSON（可编辑）")
     last_md_sync: Optional[datetime] = Field(None, description="最后一次从MD同步的时间")
     last_json_edit: Optional[datetime] = Field(None, description="最后一次JSON编辑的时间")
     edit_mode: Optional[str] = Field(None, description="当前编辑模式：'md' 或 'json'")
+    course_data_version: int = Field(0, description="课程数据当前版本号")
+    version: int = Field(1, description="关卡版本号（更新时回传，用于并发冲突检测）")
     created_at: datetime
     updated_at: datetime
 
@@ -47,12 +55,39 @@ class LevelRead(LevelBase):
         from_attributes = True
 
 
+class LevelRead(LevelSummary):
+    """关卡读取模型"""
+    teaching_guide_md: Optional[str] = Field(None, description="教案/实验指导书（Markdown格式）")
+    course_data_json: Optional[str] = Field(None, description="课程数据JSON（可编辑）")
+
+
 class CourseDataUpdate(BaseModel):
     """课程数据更新模型"""
     course_data: dict = Field(..., description="课程数据JSON对象")
+    base_version: Optional[int] = Field(None, description="修改基于的课程数据版本号（也可通过 If-Match 提供）")
+
+
+class CourseDataPatch(BaseModel):
+    """课程数据增量更新（RFC 6902 JSON Patch）"""
+    base_version: Optional[int] = Field(None, description="补丁基于的版本号（也可通过 If-Match 提供）")
+    patch: list[dict] = Field(..., description="JSON Patch 操作列表")
 
 
 class CourseDataResponse(BaseModel):
     """课程数据响应模型"""
     course_data: dict = Field(..., description="课程数据JSON对象")
 
+
+
+class CourseDataVersionRead(BaseModel):
+    """课程数据版本（列表项，不含内容）"""
+    version: int
+    kind: str = Field(..., description="snapshot（完整快照）/ delta（相对上一版本的 JSON Patch）")
+    size: int = Field(..., description="本版本占用的存储字节数")
+    source: str = Field(..., description="initial / edit / ai / patch / restore")
+    restored_from: Optional[int] = Field(None, description="恢复自哪个版本")
+    created_by: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -15,13 +15,14 @@ class LevelMapCreate(LevelMapBase):
 
 class LevelMapUpdate(LevelMapBase):
     """更新地图模型"""
-    pass
+    version: Optional[int] = Field(None, description="读取时的地图版本号，地图尚不存在时为 0（也可通过 If-Match 提供）")
 
 
 class LevelMapRead(LevelMapBase):
     """地图读取模型"""
     id: int
     chapter_id: int
+    version: int = Field(1, description="地图版本号（更新时回传，用于并发冲突检测）")
 
     class Config:
         from_attributes = True
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class StepBulkItem(BaseModel):
+    """批量保存中的步骤（带 id 为更新，不带 id 为新建）"""
+    id: Optional[int] = Field(None, description="已有步骤ID")
+    step_name: str = Field(..., min_length=1, max_length=255, description="步骤名称")
+    content: Optional[str] = Field(None, description="步骤内容")
+    requirements: Optional[str] = Field(None, description="操作要求")
+    submission_type: str = Field("text", min_length=1, max_length=64, description="提交项类型")
+    validation_rules: Optional[dict] = Field(None, description="提交项校验规则")
+    order: Optional[int] = Field(None, description="步骤顺序，缺省时按列表位置")
+
+
+class PhaseBulkItem(BaseModel):
+    """批量保存中的环节及其完整步骤列表"""
+    id: Optional[int] = Field(None, description="已有环节ID")
+    phase_name: str = Field(..., min_length=1, max_length=255, description="环节名称")
+    order: Optional[int] = Field(None, description="环节顺序，缺省时按列表位置")
+    is_required: bool = Field(True, description="是否必做")
+    steps: list[StepBulkItem] = Field(default_factory=list, description="环节下的全部步骤")
+
+
+class PhasesReplace(BaseModel):
+    """用完整列表替换任务的环节与步骤（未出现的已有环节/步骤会被删除）"""
+    phases: list[PhaseBulkItem]
+
+
+class QuestionBulkItem(BaseModel):
+    """批量保存中的题目（带 id 为更新，不带 id 为新建）"""
+    id: Optional[int] = Field(None, description="已有题目ID")
+    version: Optional[int] = Field(None, description="已有题目读取时的版本号（带 id 时必填）")
+    question_type: str = Field(..., min_length=1, max_length=64, description="题型")
+    title: str = Field(..., min_length=1, description="题目标题")
+    content: Optional[str] = None
+    options: Optional[list] = None
+    correct_answer: Optional[str] = None
+    answer_analysis: Optional[str] = None
+    difficulty: str = Field("medium", max_length=32)
+    score: float = 10.0
+    knowledge_point: Optional[str] = Field(None, max_length=255)
+    tags: Optional[list] = None
+
+
+class QuestionsReplace(BaseModel):
+    """用完整列表替换任务关联的题目（顺序即任务内顺序）"""
+    questions: list[QuestionBulkItem]
@@ -4,6 +4,8 @@ from typing import Optional
 
 from pydantic import BaseModel, EmailStr, field_validator
 
+from ..models.user import normalize_email
+
 
 class UserCreateAdmin(BaseModel):
     """Schema for admin creating a user."""
@@ -16,6 +18,11 @@ class UserCreateAdmin(BaseModel):
     class_name: Optional[str] = None  # 班级
     notes: Optional[str] = None  # 备注
 
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, value: Optional[str]) -> Optional[str]:
+        return normalize_email(value)
+
     @field_validator("phone")
     @classmethod
     def validate_phone(cls, value: Optional[str]) -> Optional[str]:
@@ -55,6 +62,11 @@ class UserUpdateAdmin(BaseModel):
     class_name: Optional[str] = None  # 班级
     notes: Optional[str] = None  # 备注
 
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, value: Optional[str]) -> Optional[str]:
+        return normalize_email(value)
+
     @field_validator("phone")
     @classmethod
     def validate_phone(cls, value: Optional[str]) -> Optional[str]:
@@ -4,13 +4,32 @@
 
 - 用更贴近业务的函数对 `AIClient` 进行二次封装；
 - 负责**记录 AI 交互日志**（写入 `AIAssistantLog`），方便后续审计与分析；
+- 负责**记录 token 用量**（写入 `AIUsageRecord` 并累加日/月汇总），供配额校验与用量报表使用；
 - 不直接关心 HTTP 细节，也不负责权限控制，这些逻辑由 `api/routes/ai_assistant.py` 处理。
 """
+import json
+import logging
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 
-from ..core.ai_client import AIClient
+from ..core.ai_client import COURSE_JSON_EXAMPLE, AIClient
+from ..core.config import get_settings
+from ..core.pagination import Page, cached_count, paginate_keyset
 from ..models.ai_assistant_log import AIAssistantLog
+from ..core.prompt_compressor import CompressionReport, compress_markdown, restore_media
+from ..core.token_utils import estimate_tokens
+from ..db.savepoint import savepoint
+from .ai_usage_service import AIUsageService
+from .guide_retriever import format_passages, guide_retriever
+
+logger = logging.getLogger(__name__)
+
+
+def _record_schema_savings(report: CompressionReport, chunks: int) -> None:
+    """统计示例 JSON 由缩进格式改为紧凑格式后，在所有分块 Prompt 中节省的 token"""
+    pretty = estimate_tokens(json.dumps(COURSE_JSON_EXAMPLE, indent=2, ensure_ascii=False))
+    minified = estimate_tokens(json.dumps(COURSE_JSON_EXAMPLE, separators=(",", ":"), ensure_ascii=False))
+    report.record("schema", pretty * chunks, minified * chunks)
 
 
 class AIService:
@@ -19,8 +38,9 @@ class AIService:
     每个 public 方法都对应一个具体业务能力（思维导图 / 任务 / 卡片 / 题目 / 学习助手等）。
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, user_id: Optional[int] = None):
         self.db = db
+        self.user_id = user_id
         self.client = AIClient()
     
     def generate_mindmap(self, chapter_name: str, description: Optional[str] = None, knowledge_points: Optional[list] = None) -> Optional[Dict[str, Any]]:
@@ -317,23 +337,50 @@ class AIService:
         
         return result
     
-    def learning_help(self, question: str, context: Optional[str] = None) -> Optional[str]:
-        """AI 学习助手（面向学生端的问答助手）"""
-        result = self.client.learning_help(question, context)
+    def learning_help(self, question: str, context: Optional[str] = None, level_id: Optional[int] = None) -> Optional[str]:
+        """AI 学习助手（面向学生端的问答助手）
+
+        传入 ``level_id`` 时，从该关卡教案的检索索引中挑选与问题最相关的段落作为参考资料，
+        不再需要前端把整份教案作为 context 传上来；检索不到内容时回退到前端传入的 context。
+        """
+        passages = []
+        if level_id is not None:
+            settings = get_settings()
+            guide_retriever.ensure_level_indexed(self.db, level_id)
+            passages = guide_retriever.search(
+                level_id,
+                question,
+                top_k=settings.learning_help_top_k,
+                token_budget=settings.learning_help_context_tokens,
+            )
+
+        if passages:
+            result = self.client.learning_help_with_passages(question, format_passages(passages))
+        else:
+            result = self.client.learning_help(question, context)
         
         self._log_interaction("learning_help", {
             "question": question,
-            "context": context
+            "context": context,
+            "level_id": level_id,
+            "passages": [p.title for p in passages],
         }, {"response": result})
         
         return result
 
     def teaching_guide_to_course_json(self, markdown: str) -> Optional[Dict[str, Any]]:
-        """将Markdown实验指导书转换为课程JSON（courseData）"""
-        result = self.client.teaching_guide_to_course_json(markdown)
+        """将Markdown实验指导书转换为课程JSON（courseData）
+
+        调用前先压缩 Markdown（剥离内联图片等），生成后再把占位符还原。
+        """
+        compressed = compress_markdown(markdown)
+        _record_schema_savings(compressed.report, chunks=1)
+        result = self.client.teaching_guide_to_course_json(compressed.text)
+        result = restore_media(result, compressed.media)
+        logger.info(f"teaching_guide_to_course_json: {compressed.report.summary()}")
         self._log_interaction(
             "teaching_guide_to_course_json",
-            {"markdown_preview": markdown[:200]},
+            {"markdown_preview": markdown[:200], "compression": compressed.report.as_dict()},
             result,
         )
         return result
@@ -368,8 +415,13 @@ class AIService:
                 chunks.append("".join(current))
             return chunks
 
-        chunks = _split_markdown(markdown)
+        compressed = compress_markdown(markdown)
+        chunks = _split_markdown(compressed.text)
         total_chunks = len(chunks)
+        _record_schema_savings(compressed.report, chunks=total_chunks)
+        logger.info(f"teaching_guide_to_course_json_stream: {compressed.report.summary()}")
+        if stream_callback:
+            stream_callback(f"[预处理] {compressed.report.summary()}\n")
 
         merged: Dict[str, Any] = {"steps": []}
 
@@ -400,11 +452,15 @@ class AIService:
             if stream_callback:
                 stream_callback(f"[分块 {part_no}/{total_chunks}] 已成功解析 {len(partial['steps'])} 个步骤。\n")
 
-        result: Optional[Dict[str, Any]] = merged if merged["steps"] else None
+        result: Optional[Dict[str, Any]] = restore_media(merged, compressed.media) if merged["steps"] else None
 
         self._log_interaction(
             "teaching_guide_to_course_json_stream",
-            {"markdown_preview": markdown[:200], "chunks": total_chunks},
+            {
+                "markdown_preview": markdown[:200],
+                "chunks": total_chunks,
+                "compression": compressed.report.as_dict(),
+            },
             result,
         )
         return result
@@ -461,21 +517,66 @@ class AIService:
 
         return result
     
+    def generate_data_schema(
+        self,
+        task_name: str,
+        data_requirements: str,
+        stream_callback=None,
+    ) -> Optional[Dict[str, Any]]:
+        """根据教案中的数据要求生成数据列定义（schema），数据行由本地生成器产生"""
+        result = self.client.generate_data_schema(
+            task_name=task_name,
+            data_requirements=data_requirements,
+            stream_callback=stream_callback,
+        )
+
+        self._log_interaction(
+            "generate_data_schema",
+            {
+                "task_name": task_name,
+                "data_requirements_preview": data_requirements[:200],
+            },
+            result,
+        )
+
+        return result
+
     def _log_interaction(self, action: str, input_data: dict, output_data: Any):
-        """记录 AI 交互日志
+        """记录 AI 交互日志与本次动作产生的 token 用量
 
-        日志写入失败时**不会中断主流程**，仅打印 warning。
+        只 flush，随请求结束时的 commit_db 一并提交；写入放在保存点中，失败时只回滚这几行，
+        **不会中断主流程**也不影响调用方未提交的修改，仅打印 warning。
         """
         try:
-            log = AIAssistantLog(
-                action=action,
-                input_data=input_data,
-                output_data=output_data
-            )
-            self.db.add(log)
-            self.db.commit()
+            # 用量与日志各用一个保存点：日志写入失败时用量仍然计入配额
+            with savepoint(self.db):
+                for event in self.client.pop_usage_events():
+                    AIUsageService.record_usage(
+                        self.db,
+                        user_id=self.user_id,
+                        action=action,
+                        prompt_tokens=event["prompt_tokens"],
+                        completion_tokens=event["completion_tokens"],
+                        estimated=event["estimated"],
+                    )
+            with savepoint(self.db):
+                self.db.add(AIAssistantLog(
+                    action=action,
+                    input_data=input_data,
+                    output_data=output_data
+                ))
         except Exception as e:
             # 日志记录失败不影响主流程
             import logging
             logging.getLogger(__name__).warning(f"Failed to log AI interaction: {e}")
 
+    @staticmethod
+    def get_logs_page(db: Session, action: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None) -> Page:
+        """按时间倒序分页读取 AI 交互日志（键集分页，总数走计数缓存）"""
+        query = db.query(AIAssistantLog)
+        if action:
+            query = query.filter(AIAssistantLog.action == action)
+        page = paginate_keyset(query, [(AIAssistantLog.created_at, True), (AIAssistantLog.id, True)], limit, cursor)
+        page.total = cached_count(query, "ai_logs")
+        return page
+
@@ -0,0 +1,178 @@
+"""
+AI 用量与配额服务
+
+- 每次大模型调用都会写入一条 ``AIUsageRecord`` 流水；
+- 同时对 ``AIUsageRollup`` 中当天、当月两个桶做增量累加（INSERT ... ON CONFLICT DO UPDATE），
+  配额校验与管理端报表只读取汇总表，不扫描流水或 ``ai_assistant_logs``。
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..models.ai_usage import AIUsageRecord, AIUsageRollup
+from ..models.user import User
+
+
+def _period_keys(now: datetime) -> Dict[str, str]:
+    return {"day": now.strftime("%Y-%m-%d"), "month": now.strftime("%Y-%m")}
+
+
+@dataclass
+class QuotaStatus:
+    """配额检查结果"""
+    daily_tokens: int = 0
+    monthly_tokens: int = 0
+    exceeded: bool = False  # 已达到硬配额，应拒绝
+    warnings: List[str] = field(default_factory=list)  # 已达到的软配额：daily / monthly
+    message: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        settings = get_settings()
+        return {
+            "daily_tokens": self.daily_tokens,
+            "monthly_tokens": self.monthly_tokens,
+            "daily_soft_quota": settings.ai_daily_soft_quota_tokens,
+            "daily_hard_quota": settings.ai_daily_hard_quota_tokens,
+            "monthly_soft_quota": settings.ai_monthly_soft_quota_tokens,
+            "monthly_hard_quota": settings.ai_monthly_hard_quota_tokens,
+            "exceeded": self.exceeded,
+            "warnings": self.warnings,
+        }
+
+
+class AIUsageService:
+    """AI 用量服务类"""
+
+    @staticmethod
+    def record_usage(
+        db: Session,
+        user_id: Optional[int],
+        action: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool = False,
+        now: Optional[datetime] = None,
+    ) -> None:
+        """记录一次调用的用量并累加到日/月汇总（不提交事务）"""
+        now = now or datetime.utcnow()
+        db.add(AIUsageRecord(
+            user_id=user_id,
+            action=action,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            estimated=estimated,
+            created_at=now,
+        ))
+
+        dialect = db.get_bind().dialect.name
+        insert_fn = pg_insert if dialect == "postgresql" else sqlite_insert
+        for period_type, period_key in _period_keys(now).items():
+            stmt = insert_fn(AIUsageRollup).values(
+                user_id=user_id or 0,
+                period_type=period_type,
+                period_key=period_key,
+                action=action,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                request_count=1,
+                updated_at=now,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "period_type", "period_key", "action"],
+                set_={
+                    "prompt_tokens": AIUsageRollup.prompt_tokens + stmt.excluded.prompt_tokens,
+                    "completion_tokens": AIUsageRollup.completion_tokens + stmt.excluded.completion_tokens,
+                    "request_count": AIUsageRollup.request_count + 1,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt)
+
+    @staticmethod
+    def get_user_totals(db: Session, user_id: int, now: Optional[datetime] = None) -> Dict[str, int]:
+        """获取用户当天、当月的 token 总量（只读汇总表）"""
+        keys = _period_keys(now or datetime.utcnow())
+        rows = (
+            db.query(
+                AIUsageRollup.period_type,
+                func.sum(AIUsageRollup.prompt_tokens + AIUsageRollup.completion_tokens),
+            )
+            .filter(
+                AIUsageRollup.user_id == user_id,
+                ((AIUsageRollup.period_type == "day") & (AIUsageRollup.period_key == keys["day"]))
+                | ((AIUsageRollup.period_type == "month") & (AIUsageRollup.period_key == keys["month"])),
+            )
+            .group_by(AIUsageRollup.period_type)
+            .all()
+        )
+        totals = {"day": 0, "month": 0}
+        for period_type, total in rows:
+            totals[period_type] = int(total or 0)
+        return totals
+
+    @staticmethod
+    def check_quota(db: Session, user) -> QuotaStatus:
+        """生成开始前检查配额；管理员不受限制"""
+        settings = get_settings()
+        if user.role == "admin":
+            return QuotaStatus()
+
+        totals = AIUsageService.get_user_totals(db, user.id)
+        status = QuotaStatus(daily_tokens=totals["day"], monthly_tokens=totals["month"])
+
+        def reached(used: int, quota: int) -> bool:
+            return quota > 0 and used >= quota
+
+        if reached(status.daily_tokens, settings.ai_daily_hard_quota_tokens):
+            status.exceeded = True
+            status.message = "今日 AI 使用额度已用完，请明天再试或联系管理员"
+        elif reached(status.monthly_tokens, settings.ai_monthly_hard_quota_tokens):
+            status.exceeded = True
+            status.message = "本月 AI 使用额度已用完，请联系管理员"
+
+        if reached(status.daily_tokens, settings.ai_daily_soft_quota_tokens):
+            status.warnings.append("daily")
+        if reached(status.monthly_tokens, settings.ai_monthly_soft_quota_tokens):
+            status.warnings.append("monthly")
+        return status
+
+    @staticmethod
+    def get_report(db: Session, period_type: str, period_key: str, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """管理端报表：按用户汇总指定日/月的用量，附带按动作的明细"""
+        query = (
+            db.query(AIUsageRollup, User.nickname, User.email, User.role)
+            .outerjoin(User, User.id == AIUsageRollup.user_id)
+            .filter(AIUsageRollup.period_type == period_type, AIUsageRollup.period_key == period_key)
+        )
+        if user_id is not None:
+            query = query.filter(AIUsageRollup.user_id == user_id)
+
+        users: Dict[int, Dict[str, Any]] = {}
+        for rollup, nickname, email, role in query.all():
+            entry = users.setdefault(rollup.user_id, {
+                "user_id": rollup.user_id,
+                "nickname": nickname,
+                "email": email,
+                "role": role,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "request_count": 0,
+                "actions": {},
+            })
+            entry["prompt_tokens"] += rollup.prompt_tokens
+            entry["completion_tokens"] += rollup.completion_tokens
+            entry["total_tokens"] += rollup.prompt_tokens + rollup.completion_tokens
+            entry["request_count"] += rollup.request_count
+            entry["actions"][rollup.action] = {
+                "prompt_tokens": rollup.prompt_tokens,
+                "completion_tokens": rollup.completion_tokens,
+                "request_count": rollup.request_count,
+            }
+        return sorted(users.values(), key=lambda item: item["total_tokens"], reverse=True)
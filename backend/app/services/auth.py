@@ -1,8 +1,22 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from ..core.security import get_password_hash, verify_password
-from ..models.user import User
+from ..core.config import get_settings
+from ..core.hash_executor import get_hash_executor
+from ..core.revocation import family_key, get_revocation_list, user_version_key
+from ..core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_password_hash,
+    verify_and_update_password,
+)
+from ..core.user_cache import invalidate_cached_user
+from ..db.after_commit import run_after_commit
+from ..models.auth_token import RefreshToken
+from ..models.user import User, normalize_email
 from ..schemas.auth import UserCreate
 
 class AuthError(Exception):
@@ -17,24 +31,30 @@ class AuthService:
         self.db = db
 
     def _get_user_by_identifier(self, identifier: str) -> Optional[User]:
-        """Get user by email, phone, or student_id."""
-        return (
-            self.db.query(User)
-            .filter(
-                or_(
-                    User.email == identifier,
-                    User.phone == identifier,
-                    User.student_id == identifier
-                )
-            )
-            .first()
-        )
+        """Get user by email, phone, or student_id.
+
+        Emails are matched case-insensitively through the lower(email) index;
+        anything else is looked up on the phone and student_id indexes.
+        """
+        identifier = identifier.strip()
+        if "@" in identifier:
+            condition = func.lower(User.email) == identifier.lower()
+        else:
+            condition = or_(User.phone == identifier, User.student_id == identifier)
+        return self.db.query(User).filter(condition).order_by(User.id).first()
+
+    def email_taken(self, email: str, exclude_user_id: Optional[int] = None) -> bool:
+        """Case-insensitive uniqueness check, matching the unique lower(email) index."""
+        query = self.db.query(User.id).filter(func.lower(User.email) == normalize_email(email))
+        if exclude_user_id is not None:
+            query = query.filter(User.id != exclude_user_id)
+        return query.first() is not None
 
     def register_user(self, payload: UserCreate) -> User:
         """Register a new student user (students can only register as students)."""
         if not payload.email and not payload.phone and not payload.student_id:
             raise AuthError("Email, phone, or student_id is required", 400)
-        if payload.email and self.db.query(User).filter(User.email == payload.email).first():
+        if payload.email and self.email_taken(payload.email):
             raise AuthError("Email already registered", 400)
         if payload.phone and self.db.query(User).filter(User.phone == payload.phone).first():
             raise AuthError("Phone already registered", 400)
@@ -42,7 +62,7 @@ class AuthService:
             raise AuthError("Student ID already registered", 400)
 
         user = User(
-            email=payload.email,
+            email=normalize_email(payload.email),
             phone=payload.phone,
             student_id=payload.student_id,
             nickname=payload.nickname,
@@ -51,20 +71,19 @@ class AuthService:
         )
         self.db.add(user)
         self.db.flush()
-        self.db.refresh(user)
         return user
 
     def create_teacher(self, payload) -> User:
         """Create a teacher account (admin only)."""
         if not payload.email and not payload.phone:
             raise AuthError("Email or phone is required", 400)
-        if payload.email and self.db.query(User).filter(User.email == payload.email).first():
+        if payload.email and self.email_taken(payload.email):
             raise AuthError("Email already registered", 400)
         if payload.phone and self.db.query(User).filter(User.phone == payload.phone).first():
             raise AuthError("Phone already registered", 400)
 
         user = User(
-            email=payload.email,
+            email=normalize_email(payload.email),
             phone=payload.phone,
             nickname=payload.nickname,
             hashed_password=get_password_hash(payload.password),
@@ -72,13 +91,91 @@ class AuthService:
         )
         self.db.add(user)
         self.db.flush()
-        self.db.refresh(user)
         return user
 
     def authenticate(self, identifier: str, password: str) -> User:
+        """Check credentials; verification runs on the bounded hash executor.
+
+        Raises HashingBusyError when the executor is saturated. If the stored hash
+        uses outdated Argon2 parameters it is replaced (the caller commits).
+        """
         user = self._get_user_by_identifier(identifier)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
+            raise AuthError("Incorrect email/phone/student_id or password", 401)
+        verified, new_hash = get_hash_executor().run(verify_and_update_password, password, user.hashed_password)
+        if not verified:
             raise AuthError("Incorrect email/phone/student_id or password", 401)
         if not user.is_active:
             raise AuthError("User is inactive", 400)
+        if new_hash:
+            user.hashed_password = new_hash
         return user
+
+    def issue_tokens(self, user: User, family_id: Optional[str] = None) -> dict:
+        """Issue an access token and a refresh token (a new session unless family_id is given)."""
+        settings = get_settings()
+        family_id = family_id or uuid.uuid4().hex
+        jti = uuid.uuid4().hex
+        expires_at = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+        self.db.add(RefreshToken(jti=jti, family_id=family_id, user_id=user.id, expires_at=expires_at))
+        return {
+            "access_token": create_access_token(str(user.id), version=user.token_version, family_id=family_id),
+            "refresh_token": create_refresh_token(str(user.id), jti, family_id, user.token_version, expires_at),
+            "token_type": "bearer",
+            "expires_in": settings.access_token_expire_minutes * 60,
+        }
+
+    def refresh(self, refresh_token: str) -> tuple[User, dict]:
+        """Rotate a refresh token.
+
+        Each refresh token can be used once. Presenting one that was already used means
+        it leaked: the whole session (family) is revoked, including its access tokens.
+        """
+        payload = decode_token(refresh_token, token_type="refresh")
+        if payload is None:
+            raise AuthError("Invalid refresh token", 401)
+        now = datetime.utcnow()
+        claimed = (
+            self.db.query(RefreshToken)
+            .filter(
+                RefreshToken.jti == payload["jti"],
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+            )
+            .update({RefreshToken.used_at: now}, synchronize_session=False)
+        )
+        if not claimed:
+            if self.db.query(RefreshToken.id).filter(RefreshToken.jti == payload["jti"]).first():
+                self.revoke_session(payload["fam"])
+                # Deliberately outside the request's unit of work: the 401 that follows makes
+                # commit_db roll back, and the revocation must persist precisely because the
+                # request failed (a replayed refresh token means the session leaked).
+                self.db.commit()
+            raise AuthError("Invalid refresh token", 401)
+
+        user = self.db.get(User, int(payload["sub"]))
+        if not user or not user.is_active or user.token_version != payload.get("ver"):
+            raise AuthError("Invalid refresh token", 401)
+        return user, self.issue_tokens(user, family_id=payload["fam"])
+
+    def revoke_session(self, family_id: str) -> None:
+        """Log out one session: its refresh tokens and every access token issued for it."""
+        now = datetime.utcnow()
+        self.db.query(RefreshToken).filter(
+            RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        expires_at = now + timedelta(minutes=get_settings().access_token_expire_minutes)
+        get_revocation_list().revoke(self.db, family_key(family_id), expires_at)
+
+    def revoke_all_sessions(self, user: User) -> None:
+        """Invalidate every token of the user (logout everywhere, account disabled)."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=get_settings().access_token_expire_minutes)
+        get_revocation_list().revoke(self.db, user_version_key(user.id, user.token_version), expires_at)
+        user.token_version = (user.token_version or 0) + 1
+        self.db.query(RefreshToken).filter(
+            RefreshToken.user_id == user.id, RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        user_id = user.id
+        # Evict once committed, otherwise a concurrent request could cache the old row again
+        run_after_commit(self.db, lambda: invalidate_cached_user(user_id))
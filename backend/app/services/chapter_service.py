@@ -36,8 +36,7 @@ class ChapterService:
             teacher_id=teacher_id
         )
         db.add(chapter)
-        db.commit()
-        db.refresh(chapter)
+        db.flush()
         return chapter
 
     @staticmethod
@@ -52,8 +51,7 @@ class ChapterService:
         if description is not None:
             chapter.description = description
         
-        db.commit()
-        db.refresh(chapter)
+        db.flush()
         return chapter
 
     @staticmethod
@@ -64,6 +62,6 @@ class ChapterService:
             raise NotFoundError("篇章不存在")
         
         db.delete(chapter)
-        db.commit()
+        db.flush()
         return True
 
@@ -0,0 +1,220 @@
+"""
+课程数据版本服务
+
+关卡上的 ``course_data_json`` 始终是最新版本（读取无需重放）；每次保存同时追加一条版本记录：
+
+- 每隔 ``course_data_snapshot_interval`` 个版本保存一次完整快照（存入去重、压缩的内容块，
+  与关卡当前内容相同时共用同一个内容块）；
+- 其余版本只保存相对上一版本的 JSON Patch，存储量与改动量成正比；补丁超过全文一半时改存快照；
+- 重建任意版本：取不晚于它的最近快照，再依次应用其后的补丁，最多重放一个快照间隔。
+
+课程数据的所有写入都应经过 :meth:`CourseDataVersionService.record`，否则版本链会与当前内容脱节。
+"""
+import json
+from typing import Any, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, defer, joinedload
+
+from ..core.config import get_settings
+from ..core.exceptions import NotFoundError, ValidationError, VersionConflictError
+from ..core.json_patch import JsonPatchError, apply_patch, json_equal, make_patch
+from ..core.pagination import Page, paginate_keyset
+from ..models import CourseDataVersion, Level
+
+# 补丁超过全文的这个比例时直接保存快照
+_SNAPSHOT_PATCH_RATIO = 0.5
+
+# 关卡还没有课程数据时客户端看到的文档
+EMPTY_COURSE_DATA = {"steps": [], "meta": {}}
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _current_data(level: Level) -> Optional[Any]:
+    if not level.course_data_json:
+        return None
+    try:
+        return json.loads(level.course_data_json)
+    except json.JSONDecodeError:
+        return None
+
+
+class CourseDataVersionService:
+    """课程数据版本服务类"""
+
+    @staticmethod
+    def _add_version(
+        db: Session,
+        level: Level,
+        text: str,
+        patch: Optional[str],
+        source: str,
+        user_id: Optional[int],
+        restored_from: Optional[int] = None,
+    ) -> CourseDataVersion:
+        version = (level.course_data_version or 0) + 1
+        entry = CourseDataVersion(
+            level_id=level.id,
+            version=version,
+            kind="delta" if patch is not None else "snapshot",
+            patch_json=patch,
+            size=len((patch if patch is not None else text).encode("utf-8")),
+            source=source,
+            restored_from=restored_from,
+            created_by=user_id,
+        )
+        if patch is None:
+            entry.snapshot_json = text
+        db.add(entry)
+        level.course_data_version = version
+        return entry
+
+    @staticmethod
+    def record(
+        db: Session,
+        level: Level,
+        course_data: Any,
+        user_id: Optional[int] = None,
+        source: str = "edit",
+        restored_from: Optional[int] = None,
+        patch: Optional[list] = None,
+    ) -> Optional[CourseDataVersion]:
+        """
+        把 course_data 保存为关卡的当前课程数据并追加一个版本；内容与当前版本相同时不追加，返回 None
+
+        patch 为调用方已知的、从当前内容到 course_data 的 JSON Patch（如客户端提交的补丁），提供时不再重新比较全文。
+        """
+        current = _current_data(level)
+        if level.course_data_version and json_equal(current, course_data):
+            return None
+        if not level.course_data_version and current is not None and not json_equal(current, course_data):
+            # 启用版本历史之前已有的内容作为版本 1 保留下来
+            CourseDataVersionService._add_version(db, level, level.course_data_json, None, "initial", None)
+
+        text = _dumps(course_data)
+        stored_patch = None
+        if level.course_data_version and current is not None:
+            last_snapshot = db.query(func.max(CourseDataVersion.version)).filter(
+                CourseDataVersion.level_id == level.id,
+                CourseDataVersion.kind == "snapshot",
+            ).scalar() or 0
+            if level.course_data_version + 1 - last_snapshot < get_settings().course_data_snapshot_interval:
+                patch_text = _dumps(patch if patch is not None else make_patch(current, course_data))
+                if len(patch_text) < len(text) * _SNAPSHOT_PATCH_RATIO:
+                    stored_patch = patch_text
+
+        entry = CourseDataVersionService._add_version(db, level, text, stored_patch, source, user_id, restored_from)
+        level.course_data_json = text
+        db.flush()
+        return entry
+
+    @staticmethod
+    def check_base_version(level: Level, base_version: int) -> None:
+        """客户端修改所基于的版本不是当前版本时抛出 VersionConflictError（携带当前版本号）"""
+        current_version = level.course_data_version or 0
+        if base_version != current_version:
+            raise VersionConflictError("课程数据已被修改，请刷新后重试", current_version=current_version)
+
+    @staticmethod
+    def patch(
+        db: Session,
+        level: Level,
+        patch: list,
+        base_version: int,
+        user_id: Optional[int] = None,
+    ) -> Optional[CourseDataVersion]:
+        """
+        在服务端把 JSON Patch 应用到当前课程数据并保存为新版本
+
+        base_version 必须是当前版本，否则抛出 VersionConflictError（客户端需重新获取后再修改）；
+        补丁无法应用或结果不是 JSON 对象时抛出 JsonPatchError。
+        """
+        CourseDataVersionService.check_base_version(level, base_version)
+        current = _current_data(level)
+        course_data = apply_patch(current if current is not None else EMPTY_COURSE_DATA, patch)
+        if not isinstance(course_data, dict):
+            raise JsonPatchError("course_data must be a JSON object")
+        return CourseDataVersionService.record(
+            db, level, course_data, user_id, source="patch", patch=patch if current is not None else None
+        )
+
+    @staticmethod
+    def get_versions_page(db: Session, level_id: int, limit: int, cursor: Optional[str] = None) -> Page:
+        """按版本号倒序分页列出版本（不加载补丁内容）"""
+        query = db.query(CourseDataVersion).options(defer(CourseDataVersion.patch_json)).filter(
+            CourseDataVersion.level_id == level_id
+        )
+        return paginate_keyset(query, [(CourseDataVersion.version, True)], limit, cursor)
+
+    @staticmethod
+    def get_versions(db: Session, level_id: int) -> List[CourseDataVersion]:
+        """按版本号倒序列出全部版本（不加载补丁内容）"""
+        return (
+            db.query(CourseDataVersion)
+            .options(defer(CourseDataVersion.patch_json))
+            .filter(CourseDataVersion.level_id == level_id)
+            .order_by(CourseDataVersion.version.desc())
+            .all()
+        )
+
+    @staticmethod
+    def get_version_data(db: Session, level_id: int, version: int) -> Any:
+        """重建指定版本的课程数据：一条查询取最近快照及其后的补丁，按顺序重放"""
+        snapshot_version = (
+            select(func.max(CourseDataVersion.version))
+            .where(
+                CourseDataVersion.level_id == level_id,
+                CourseDataVersion.kind == "snapshot",
+                CourseDataVersion.version <= version,
+            )
+            .scalar_subquery()
+        )
+        rows = (
+            db.query(CourseDataVersion)
+            .options(joinedload(CourseDataVersion.snapshot_blob))
+            .filter(
+                CourseDataVersion.level_id == level_id,
+                CourseDataVersion.version >= snapshot_version,
+                CourseDataVersion.version <= version,
+            )
+            .order_by(CourseDataVersion.version)
+            .all()
+        )
+        if not rows or rows[-1].version != version:
+            raise NotFoundError("课程数据版本不存在")
+        data = json.loads(rows[0].snapshot_json)
+        try:
+            for row in rows[1:]:
+                data = apply_patch(data, json.loads(row.patch_json))
+        except JsonPatchError as e:
+            raise ValidationError(f"课程数据版本 {version} 无法重建: {e}")
+        return data
+
+    @staticmethod
+    def diff(db: Session, level_id: int, from_version: int, to_version: int) -> list:
+        """两个版本之间的 JSON Patch（把 from_version 变为 to_version）"""
+        old = CourseDataVersionService.get_version_data(db, level_id, from_version)
+        new = CourseDataVersionService.get_version_data(db, level_id, to_version)
+        return make_patch(old, new)
+
+    @staticmethod
+    def restore(db: Session, level: Level, version: int, user_id: Optional[int] = None) -> Optional[CourseDataVersion]:
+        """把指定版本的内容保存为新的当前版本（历史不被改写）；与当前内容相同时返回 None"""
+        data = CourseDataVersionService.get_version_data(db, level.id, version)
+        return CourseDataVersionService.record(db, level, data, user_id, source="restore", restored_from=version)
+
+    @staticmethod
+    def delete_versions(db: Session, level_id: int) -> None:
+        """删除关卡的全部版本；快照逐条删除以释放内容块引用"""
+        db.query(CourseDataVersion).filter(
+            CourseDataVersion.level_id == level_id,
+            CourseDataVersion.snapshot_hash.is_(None),
+        ).delete(synchronize_session=False)
+        for snapshot in db.query(CourseDataVersion).filter(
+            CourseDataVersion.level_id == level_id,
+            CourseDataVersion.snapshot_hash.isnot(None),
+        ):
+            db.delete(snapshot)
@@ -0,0 +1,332 @@
+"""
+本地合成数据生成器
+
+「数据文件」生成分两步：大模型只返回一份紧凑的列定义（schema），本模块再按 schema
+在本地批量生成任意行数的数据并流式写入文件，避免让大模型逐行输出整份数据
+（慢、贵，且受 max_tokens 限制只能生成几百行）。
+
+schema 示例::
+
+    {
+      "columns": [
+        {"name": "员工编号", "type": "sequence", "start": 1001, "prefix": "E"},
+        {"name": "姓名", "type": "name"},
+        {"name": "部门", "type": "choice", "values": ["销售", "技术", "财务"], "weights": [5, 3, 2]},
+        {"name": "年龄", "type": "int", "min": 22, "max": 60},
+        {"name": "月薪", "type": "float", "distribution": "normal", "mean": 8000, "std": 2000,
+         "min": 3000, "max": 30000, "decimals": 2},
+        {"name": "入职日期", "type": "date", "start": "2015-01-01", "end": "2024-12-31"},
+        {"name": "是否在职", "type": "bool", "p": 0.9},
+        {"name": "电话", "type": "phone", "null_rate": 0.05}
+      ]
+    }
+
+生成按列、按批进行：每列有独立的随机数发生器（由 seed 与列序号派生），同一 seed 与
+schema 的输出与批大小无关，可完全复现。
+"""
+import csv
+import io
+import json
+import math
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+COLUMN_TYPES = ("sequence", "int", "float", "choice", "date", "datetime", "bool", "name", "phone", "email", "text")
+FILE_FORMATS = ("csv", "json", "txt")
+
+BATCH_SIZE = 10_000
+PREVIEW_ROWS = 10
+
+_SURNAMES = list("王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤")
+_GIVEN_CHARS = list("伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉萍红建文辉力永宁欣雪琳晨浩宇轩子涵梓睿思佳怡嘉俊博一鑫昊然")
+_PHONE_PREFIXES = ["130", "131", "132", "135", "136", "137", "138", "139", "150", "151", "152", "158", "159", "177", "180", "186", "187", "188", "189", "199"]
+_EMAIL_DOMAINS = ["example.com", "mail.example.com", "school.example.edu"]
+
+
+class SchemaError(ValueError):
+    """schema 不合法"""
+
+
+def _parse_date(value: Any, field: str) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    raise SchemaError(f"列 {field} 的日期格式无法识别：{value}")
+
+
+def _number(value: Any, column: str, field: str, cast: Callable[[Any], Any] = float) -> Any:
+    """把大模型给出的数值字段转换为数字，无法转换时抛出 SchemaError"""
+    if isinstance(value, bool):
+        raise SchemaError(f"列 {column} 的 {field} 必须是数字：{value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise SchemaError(f"列 {column} 的 {field} 必须是数字：{value!r}") from None
+    if not math.isfinite(number):
+        raise SchemaError(f"列 {column} 的 {field} 必须是有限数字：{value!r}")
+    return cast(number)
+
+
+def normalize_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """校验并补全 schema，返回可直接用于生成的副本"""
+    if not isinstance(schema, dict) or not isinstance(schema.get("columns"), list) or not schema["columns"]:
+        raise SchemaError("schema 必须包含非空的 columns 列表")
+
+    columns: List[Dict[str, Any]] = []
+    seen: set[str] = set()
+    for raw in schema["columns"]:
+        if not isinstance(raw, dict):
+            raise SchemaError("columns 中的每一项都必须是对象")
+        col = dict(raw)
+        name = str(col.get("name") or "").strip()
+        if not name:
+            raise SchemaError("列名不能为空")
+        if name in seen:
+            raise SchemaError(f"列名重复：{name}")
+        seen.add(name)
+        col["name"] = name
+
+        col_type = str(col.get("type") or "text").lower()
+        if col_type not in COLUMN_TYPES:
+            raise SchemaError(f"列 {name} 的类型 {col_type} 不受支持")
+        col["type"] = col_type
+
+        null_rate = _number(col.get("null_rate") or 0, name, "null_rate")
+        if not 0 <= null_rate < 1:
+            raise SchemaError(f"列 {name} 的 null_rate 必须在 [0, 1) 之间")
+        col["null_rate"] = null_rate
+
+        if col_type in ("int", "float"):
+            cast = int if col_type == "int" else float
+            col["min"] = _number(col.get("min", 0), name, "min", cast)
+            col["max"] = _number(col.get("max", 100), name, "max", cast)
+            if col["min"] > col["max"]:
+                raise SchemaError(f"列 {name} 的 min 大于 max")
+            col["distribution"] = col.get("distribution") or "uniform"
+            if col["distribution"] not in ("uniform", "normal"):
+                raise SchemaError(f"列 {name} 的分布 {col['distribution']} 不受支持")
+            col["mean"] = _number(col.get("mean", (col["min"] + col["max"]) / 2), name, "mean")
+            col["std"] = _number(col.get("std", max((col["max"] - col["min"]) / 6, 1e-9)), name, "std")
+            if col["std"] < 0:
+                raise SchemaError(f"列 {name} 的 std 不能为负数")
+            col["decimals"] = _number(col.get("decimals", 2), name, "decimals", int)
+        elif col_type in ("choice", "text"):
+            values = col.get("values") or []
+            if col_type == "choice" and not values:
+                raise SchemaError(f"列 {name} 缺少 values")
+            col["values"] = [str(v) for v in values] or [name]
+            weights = col.get("weights")
+            if weights is not None:
+                if not isinstance(weights, list) or len(weights) != len(col["values"]):
+                    raise SchemaError(f"列 {name} 的 weights 与 values 长度不一致")
+                col["weights"] = [_number(w, name, "weights") for w in weights]
+                if any(w < 0 for w in col["weights"]) or not sum(col["weights"]) > 0:
+                    raise SchemaError(f"列 {name} 的 weights 必须为非负数且不能全为 0")
+        elif col_type in ("date", "datetime"):
+            start = _parse_date(col.get("start", "2020-01-01"), name)
+            end = _parse_date(col.get("end", "2024-12-31"), name)
+            if start > end:
+                raise SchemaError(f"列 {name} 的 start 晚于 end")
+            col["start"], col["end"] = start, end
+            col.setdefault("format", "%Y-%m-%d" if col_type == "date" else "%Y-%m-%d %H:%M:%S")
+        elif col_type == "sequence":
+            col["start"] = _number(col.get("start", 1), name, "start", int)
+            col["step"] = _number(col.get("step", 1), name, "step", int) or 1
+            col.setdefault("prefix", "")
+            col["width"] = _number(col.get("width", 0), name, "width", int)
+        elif col_type == "bool":
+            col["p"] = _number(col.get("p", 0.5), name, "p")
+            if not 0 <= col["p"] <= 1:
+                raise SchemaError(f"列 {name} 的 p 必须在 [0, 1] 之间")
+            col["true_label"] = col.get("true_label", "是")
+            col["false_label"] = col.get("false_label", "否")
+        columns.append(col)
+
+    return {"columns": columns}
+
+
+class _ColumnGenerator:
+    """单列生成器：每次返回一批值"""
+
+    def __init__(self, column: Dict[str, Any], seed: int, index: int):
+        self.column = column
+        # 字符串种子在不同进程间稳定，每列的随机序列互不影响
+        self.rng = random.Random(f"{seed}:{index}:{column['name']}")
+        # 缺失值使用单独的随机序列，保证与取值序列交错方式（批大小）无关
+        self.null_rng = random.Random(f"{seed}:{index}:{column['name']}:null")
+        self.offset = 0
+        self._batch = getattr(self, f"_batch_{column['type']}")
+
+    def batch(self, size: int) -> List[Any]:
+        values = self._batch(size)
+        self.offset += size
+        null_rate = self.column["null_rate"]
+        if null_rate:
+            rand = self.null_rng.random
+            values = [None if rand() < null_rate else v for v in values]
+        return values
+
+    def _numbers(self, size: int) -> List[float]:
+        col, rng = self.column, self.rng
+        lo, hi = col["min"], col["max"]
+        if col["distribution"] == "normal":
+            gauss, mean, std = rng.gauss, col["mean"], col["std"]
+            return [min(max(gauss(mean, std), lo), hi) for _ in range(size)]
+        uniform = rng.uniform
+        return [uniform(lo, hi) for _ in range(size)]
+
+    def _batch_int(self, size: int) -> List[int]:
+        col = self.column
+        if col["distribution"] == "uniform":
+            randint, lo, hi = self.rng.randint, int(col["min"]), int(col["max"])
+            return [randint(lo, hi) for _ in range(size)]
+        return [int(round(v)) for v in self._numbers(size)]
+
+    def _batch_float(self, size: int) -> List[float]:
+        decimals = int(self.column["decimals"])
+        return [round(v, decimals) for v in self._numbers(size)]
+
+    def _batch_choice(self, size: int) -> List[str]:
+        col = self.column
+        return self.rng.choices(col["values"], weights=col.get("weights"), k=size)
+
+    _batch_text = _batch_choice
+
+    def _batch_sequence(self, size: int) -> List[str | int]:
+        col = self.column
+        start = col["start"] + self.offset * col["step"]
+        numbers = range(start, start + size * col["step"], col["step"])
+        prefix, width = col["prefix"], col["width"]
+        if not prefix and not width:
+            return list(numbers)
+        return [f"{prefix}{n:0{width}d}" for n in numbers]
+
+    def _batch_date(self, size: int) -> List[str]:
+        col = self.column
+        start, fmt = col["start"], col["format"]
+        span_days = (col["end"] - start).days
+        randint = self.rng.randint
+        return [(start + timedelta(days=randint(0, span_days))).strftime(fmt) for _ in range(size)]
+
+    def _batch_datetime(self, size: int) -> List[str]:
+        col = self.column
+        start, fmt = col["start"], col["format"]
+        span_seconds = int((col["end"] - start).total_seconds())
+        randint = self.rng.randint
+        return [(start + timedelta(seconds=randint(0, span_seconds))).strftime(fmt) for _ in range(size)]
+
+    def _batch_bool(self, size: int) -> List[str]:
+        col = self.column
+        rand, p = self.rng.random, col["p"]
+        true_label, false_label = col["true_label"], col["false_label"]
+        return [true_label if rand() < p else false_label for _ in range(size)]
+
+    def _batch_name(self, size: int) -> List[str]:
+        choice, rand = self.rng.choice, self.rng.random
+        return [
+            choice(_SURNAMES) + choice(_GIVEN_CHARS) + (choice(_GIVEN_CHARS) if rand() < 0.7 else "")
+            for _ in range(size)
+        ]
+
+    def _batch_phone(self, size: int) -> List[str]:
+        choice, randint = self.rng.choice, self.rng.randint
+        return [f"{choice(_PHONE_PREFIXES)}{randint(0, 99_999_999):08d}" for _ in range(size)]
+
+    def _batch_email(self, size: int) -> List[str]:
+        choice, randint = self.rng.choice, self.rng.randint
+        return [f"user{self.offset + i + 1}_{randint(100, 999)}@{choice(_EMAIL_DOMAINS)}" for i in range(size)]
+
+
+def generate_batches(
+    schema: Dict[str, Any],
+    rows: int,
+    seed: int,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[List[tuple]]:
+    """按批生成数据行，每批为若干 tuple（列顺序与 schema 一致）"""
+    generators = [_ColumnGenerator(col, seed, i) for i, col in enumerate(schema["columns"])]
+    remaining = rows
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        yield list(zip(*(gen.batch(size) for gen in generators)))
+        remaining -= size
+
+
+def _to_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def write_dataset(
+    schema: Dict[str, Any],
+    path: Path,
+    file_format: str,
+    rows: int,
+    seed: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """按 schema 生成 rows 行数据并写入 path，返回前几行作为预览
+
+    progress_callback(written, total) 在每批写入后调用。
+    """
+    if file_format not in FILE_FORMATS:
+        raise SchemaError(f"不支持的文件格式：{file_format}")
+    names = [col["name"] for col in schema["columns"]]
+    preview: List[Dict[str, Any]] = []
+    written = 0
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        if file_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(names)
+        elif file_format == "txt":
+            f.write("\t".join(names) + "\n")
+        else:
+            f.write("[")
+
+        for batch in generate_batches(schema, rows, seed):
+            if len(preview) < PREVIEW_ROWS:
+                preview.extend(dict(zip(names, row)) for row in batch[:PREVIEW_ROWS - len(preview)])
+
+            if file_format == "csv":
+                writer.writerows(batch)
+            elif file_format == "txt":
+                f.write("".join("\t".join(_to_text(v) for v in row) + "\n" for row in batch))
+            else:
+                f.write(("," if written else "") + ",".join(
+                    "\n" + json.dumps(dict(zip(names, row)), ensure_ascii=False) for row in batch
+                ))
+
+            written += len(batch)
+            if progress_callback:
+                progress_callback(written, rows)
+
+        if file_format == "json":
+            f.write("\n]\n")
+
+    tmp_path.replace(path)
+    return preview
+
+
+def preview_text(preview: List[Dict[str, Any]], schema: Dict[str, Any], file_format: str) -> str:
+    """把预览行渲染成与目标文件相同格式的文本片段"""
+    names = [col["name"] for col in schema["columns"]]
+    if file_format == "json":
+        return json.dumps(preview, ensure_ascii=False, indent=2)
+    if file_format == "txt":
+        lines = ["\t".join(names)] + ["\t".join(_to_text(row.get(n)) for n in names) for row in preview]
+        return "\n".join(lines)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    writer.writerows([row.get(n) for n in names] for row in preview)
+    return buffer.getvalue()
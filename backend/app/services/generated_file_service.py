@@ -0,0 +1,247 @@
+"""
+生成数据文件的存储与清理
+
+AI 生成的数据文件统一存放在 ``backend/data/generated``：
+
+- 文件按内容哈希命名（``<sha256 前 32 位>.<ext>``），内容不变则名称不变，可以被浏览器和 CDN 永久缓存；
+- ``aliases.json`` 记录「友好文件名 -> 哈希文件名」的映射，友好文件名（如 ``销售数据_sample.csv``）
+  始终指向最近一次生成的版本；多个 worker 进程通过 ``.aliases.lock`` 上的文件锁串行化读改写；
+- 体积较大的文件额外保存一份预压缩的 ``.gz`` 版本；
+- 后台清理线程定期删除既不被别名指向、也未被任何关卡内容引用的哈希文件。
+
+旧版本按任务名直接写入的文件不会被清理，仍可按原文件名访问。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ..core.config import DATA_DIR, get_settings
+from ..models.content_blob import ContentBlob
+
+logger = logging.getLogger(__name__)
+
+GENERATED_DIR = DATA_DIR / "generated"
+ALIASES_FILE = "aliases.json"
+ALIASES_LOCK_FILE = ".aliases.lock"
+URL_PREFIX = "/api/v1/ai-assistant/data-files/"
+
+_HASHED_NAME_RE = re.compile(r"^[0-9a-f]{32}\.[A-Za-z0-9]+$")
+_REFERENCE_RE = re.compile(re.escape(URL_PREFIX) + r"([^\s\"')<>?#]+)")
+
+_lock = threading.Lock()
+_gc_started = False
+
+
+@dataclass
+class StoredFile:
+    """一次存储的结果"""
+    name: str  # 哈希文件名
+    alias: str  # 友好文件名
+    digest: str
+    size: int
+    gzipped: bool
+
+    @property
+    def etag(self) -> str:
+        return self.digest
+
+
+def is_hashed_name(name: str) -> bool:
+    return bool(_HASHED_NAME_RE.match(name))
+
+
+def safe_alias(task_name: str, file_format: str) -> str:
+    """由任务名生成友好文件名"""
+    safe_task_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in task_name)[:50] or "data"
+    return f"{safe_task_name}_sample.{file_format}"
+
+
+def load_aliases(directory: Path = GENERATED_DIR) -> Dict[str, str]:
+    path = directory / ALIASES_FILE
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Failed to read {path}: {e}")
+        return {}
+
+
+def _save_aliases(aliases: Dict[str, str], directory: Path) -> None:
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".aliases.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(aliases, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, directory / ALIASES_FILE)
+
+
+@contextmanager
+def _aliases_lock(directory: Path):
+    """进程内的线程锁加跨进程的文件锁：多个 worker 同时更新 aliases.json 时不会互相覆盖"""
+    with _lock, open(directory / ALIASES_LOCK_FILE, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK 重试约 10 秒后放弃，继续等待
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_digest(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _write_gzip(path: Path) -> bool:
+    """生成预压缩版本，压缩收益不足 10% 时放弃"""
+    gz_path = path.with_name(path.name + ".gz")
+    if gz_path.exists():
+        return True
+    tmp = gz_path.with_name(gz_path.name + ".tmp")
+    with open(path, "rb") as src, gzip.GzipFile(tmp, "wb", compresslevel=9, mtime=0) as dst:
+        shutil.copyfileobj(src, dst)
+    if tmp.stat().st_size > path.stat().st_size * 0.9:
+        tmp.unlink()
+        return False
+    os.replace(tmp, gz_path)
+    return True
+
+
+def store_path(source: Path, alias: str, directory: Path = GENERATED_DIR) -> StoredFile:
+    """将已写好的文件移动为哈希文件名并更新别名，source 需与 directory 位于同一文件系统"""
+    directory.mkdir(parents=True, exist_ok=True)
+    digest = _file_digest(source)
+    ext = alias.rsplit(".", 1)[-1] if "." in alias else "bin"
+    name = f"{digest[:32]}.{ext}"
+    target = directory / name
+
+    if target.exists():
+        source.unlink()
+        os.utime(target)  # 重新计算清理保留期
+    else:
+        os.replace(source, target)
+
+    size = target.stat().st_size
+    gzipped = size >= get_settings().generated_file_gzip_min_bytes and _write_gzip(target)
+
+    with _aliases_lock(directory):
+        aliases = load_aliases(directory)
+        aliases[alias] = name
+        _save_aliases(aliases, directory)
+
+    return StoredFile(name=name, alias=alias, digest=digest, size=size, gzipped=gzipped)
+
+
+def new_temp_path(directory: Path = GENERATED_DIR) -> Path:
+    """在生成目录中分配一个临时文件路径，写完后交给 :func:`store_path`"""
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".upload.", suffix=".tmp")
+    os.close(fd)
+    return Path(tmp)
+
+
+def store_text(content: str, alias: str, directory: Path = GENERATED_DIR) -> StoredFile:
+    """保存文本内容"""
+    tmp = new_temp_path(directory)
+    tmp.write_text(content, encoding="utf-8")
+    return store_path(tmp, alias, directory)
+
+
+def resolve_alias(name: str, directory: Path = GENERATED_DIR) -> Optional[str]:
+    """返回别名当前指向的哈希文件名"""
+    return load_aliases(directory).get(name)
+
+
+def find_referenced_files(db: Session) -> Set[str]:
+    """扫描关卡教案与课程数据中引用的数据文件名（内容块已去重，每份内容只解压一次）"""
+    referenced: Set[str] = set()
+    blobs = db.query(ContentBlob).filter(ContentBlob.ref_count > 0).yield_per(200)
+    for blob in blobs:
+        text = blob.text
+        if URL_PREFIX in text:
+            referenced.update(_REFERENCE_RE.findall(text))
+    return referenced
+
+
+def collect_garbage(
+    referenced: Iterable[str],
+    grace_seconds: int,
+    directory: Path = GENERATED_DIR,
+    now: Optional[float] = None,
+) -> list[str]:
+    """删除未被别名或关卡内容引用、且超过保留期的哈希文件（含 .gz 版本）以及残留的临时文件"""
+    if not directory.exists():
+        return []
+    now = now or time.time()
+    with _aliases_lock(directory):
+        keep = set(load_aliases(directory).values()) | set(referenced)
+        removed: list[str] = []
+        for path in directory.iterdir():
+            if not path.is_file() or now - path.stat().st_mtime < grace_seconds:
+                continue
+            name = path.name
+            base = name[:-3] if name.endswith(".gz") else name
+            stale_tmp = name.startswith(".") and name.endswith(".tmp")
+            if stale_tmp or (is_hashed_name(base) and base not in keep):
+                path.unlink(missing_ok=True)
+                removed.append(name)
+    if removed:
+        logger.info(f"Removed {len(removed)} unreferenced generated files")
+    return removed
+
+
+def start_gc_thread(session_factory) -> None:
+    """启动后台清理线程（每个进程只启动一次；间隔为 0 时不启动）"""
+    global _gc_started
+    settings = get_settings()
+    interval = settings.generated_file_gc_interval_seconds
+    if interval <= 0 or _gc_started:
+        return
+    _gc_started = True
+
+    def run() -> None:
+        while True:
+            time.sleep(interval)
+            db = session_factory()
+            db.info["read_only"] = True  # 只做扫描，可走只读副本
+            try:
+                collect_garbage(find_referenced_files(db), settings.generated_file_gc_grace_seconds)
+            except Exception as e:
+                logger.warning(f"Generated file GC failed: {e}")
+            finally:
+                db.close()
+
+    threading.Thread(target=run, name="generated-file-gc", daemon=True).start()
@@ -0,0 +1,272 @@
+"""
+教案检索索引（BM25）
+
+为「AI 学习助手」提供检索增强：把每个关卡的实验指导书（Markdown）按标题切分为段落，
+把课程 JSON 按步骤切分为段落，建立关卡级别的倒排索引。提问时只挑选与问题最相关的
+若干段落，并控制在 token 预算之内，避免把整份教案塞进 Prompt。
+
+- 索引常驻进程内存，按关卡分片；关卡保存时只重建该关卡的分片（增量更新）；
+- 内容指纹未变化时跳过重建；
+- 进程重启后索引为空，首次提问时按需从数据库加载对应关卡。
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from ..core.token_utils import estimate_tokens
+
+# BM25 参数
+_K1 = 1.5
+_B = 0.75
+
+# 单个段落的最大 token 数，超过后按段落继续切分
+_MAX_PASSAGE_TOKENS = 400
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+_CJK_RUN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_DATA_URI_RE = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+
+
+@dataclass
+class Passage:
+    """可被检索的段落"""
+    source: str  # guide / course
+    title: str
+    text: str
+    tokens: int = 0
+
+
+@dataclass
+class _LevelIndex:
+    fingerprint: str
+    passages: List[Passage] = field(default_factory=list)
+    postings: Dict[str, List[tuple[int, int]]] = field(default_factory=dict)
+    doc_lens: List[int] = field(default_factory=list)
+    avgdl: float = 0.0
+
+
+def tokenize(text: str) -> List[str]:
+    """中英文混合分词：英文按单词，中文按字二元组（单字片段保留单字）"""
+    if not text:
+        return []
+    text = text.lower()
+    terms = _WORD_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _split_long_text(title: str, source: str, text: str) -> List[Passage]:
+    """将过长的段落按空行切分为不超过 _MAX_PASSAGE_TOKENS 的片段"""
+    text = text.strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= _MAX_PASSAGE_TOKENS:
+        return [Passage(source=source, title=title, text=text, tokens=estimate_tokens(text))]
+
+    passages: List[Passage] = []
+    current: List[str] = []
+    current_tokens = 0
+    for para in re.split(r"\n\s*\n", text):
+        para_tokens = estimate_tokens(para)
+        if current and current_tokens + para_tokens > _MAX_PASSAGE_TOKENS:
+            chunk = "\n\n".join(current)
+            passages.append(Passage(source=source, title=title, text=chunk, tokens=estimate_tokens(chunk)))
+            current, current_tokens = [], 0
+        current.append(para)
+        current_tokens += para_tokens
+    if current:
+        chunk = "\n\n".join(current)
+        passages.append(Passage(source=source, title=title, text=chunk, tokens=estimate_tokens(chunk)))
+    return passages
+
+
+def split_teaching_guide(markdown: Optional[str]) -> List[Passage]:
+    """按标题层级切分 Markdown 教案，段落标题带上父级标题路径"""
+    if not markdown:
+        return []
+    markdown = _DATA_URI_RE.sub("", markdown)
+
+    passages: List[Passage] = []
+    heading_path: List[str] = []
+    buffer: List[str] = []
+    in_code = False
+
+    def flush():
+        title = " / ".join(heading_path) or "教案"
+        passages.extend(_split_long_text(title, "guide", "\n".join(buffer)))
+        buffer.clear()
+
+    for line in markdown.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_RE.match(line)
+        if match:
+            flush()
+            depth = len(match.group(1))
+            del heading_path[depth - 1:]
+            heading_path.append(match.group(2))
+        else:
+            buffer.append(line)
+    flush()
+    return passages
+
+
+def _collect_strings(value: Any, out: List[str]) -> None:
+    if isinstance(value, str):
+        text = _HTML_TAG_RE.sub(" ", _DATA_URI_RE.sub("", value)).strip()
+        if text:
+            out.append(text)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            # 坐标、尺寸、样式等字段对检索没有意义
+            if key in ("id", "position", "size", "style", "canvasConfig", "type"):
+                continue
+            _collect_strings(item, out)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_strings(item, out)
+
+
+def split_course_data(course_data_json: Optional[str]) -> List[Passage]:
+    """按步骤切分课程 JSON（courseData），提取每个步骤中组件的文本内容"""
+    if not course_data_json:
+        return []
+    try:
+        course_data = json.loads(course_data_json)
+    except (TypeError, json.JSONDecodeError):
+        return []
+    if not isinstance(course_data, dict):
+        return []
+
+    passages: List[Passage] = []
+    meta = course_data.get("meta")
+    if isinstance(meta, dict):
+        texts: List[str] = []
+        _collect_strings(meta, texts)
+        passages.extend(_split_long_text(str(meta.get("title") or "课程信息"), "course", "\n".join(texts)))
+
+    steps = course_data.get("steps")
+    if isinstance(steps, list):
+        for idx, step in enumerate(steps, start=1):
+            if not isinstance(step, dict):
+                continue
+            texts = []
+            _collect_strings(step.get("components"), texts)
+            title = str(step.get("title") or f"步骤 {idx}")
+            passages.extend(_split_long_text(title, "course", "\n".join(texts)))
+    return passages
+
+
+def _fingerprint(teaching_guide_md: Optional[str], course_data_json: Optional[str]) -> str:
+    digest = hashlib.sha1()
+    digest.update((teaching_guide_md or "").encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update((course_data_json or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class GuideRetriever:
+    """关卡教案的 BM25 检索器（线程安全）"""
+
+    def __init__(self):
+        self._levels: Dict[int, _LevelIndex] = {}
+        self._lock = threading.Lock()
+
+    def is_indexed(self, level_id: int) -> bool:
+        with self._lock:
+            return level_id in self._levels
+
+    def index_level(self, level_id: int, teaching_guide_md: Optional[str], course_data_json: Optional[str]) -> bool:
+        """（重新）索引单个关卡；内容未变化时直接返回 False"""
+        fingerprint = _fingerprint(teaching_guide_md, course_data_json)
+        with self._lock:
+            current = self._levels.get(level_id)
+            if current and current.fingerprint == fingerprint:
+                return False
+
+        passages = split_teaching_guide(teaching_guide_md) + split_course_data(course_data_json)
+        index = _LevelIndex(fingerprint=fingerprint, passages=passages)
+        for doc_idx, passage in enumerate(passages):
+            terms = tokenize(f"{passage.title}\n{passage.text}")
+            index.doc_lens.append(len(terms))
+            for term, tf in Counter(terms).items():
+                index.postings.setdefault(term, []).append((doc_idx, tf))
+        index.avgdl = (sum(index.doc_lens) / len(index.doc_lens)) if index.doc_lens else 0.0
+
+        with self._lock:
+            self._levels[level_id] = index
+        return True
+
+    def remove_level(self, level_id: int) -> None:
+        with self._lock:
+            self._levels.pop(level_id, None)
+
+    def search(self, level_id: int, question: str, top_k: int = 4, token_budget: int = 1200) -> List[Passage]:
+        """检索与问题最相关的段落：按 BM25 得分降序，累计不超过 token 预算"""
+        with self._lock:
+            index = self._levels.get(level_id)
+        if not index or not index.passages:
+            return []
+
+        query_terms = set(tokenize(question))
+        n_docs = len(index.passages)
+        scores: Dict[int, float] = {}
+        for term in query_terms:
+            postings = index.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                norm = _K1 * (1 - _B + _B * index.doc_lens[doc_idx] / (index.avgdl or 1))
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (_K1 + 1) / (tf + norm)
+
+        selected: List[Passage] = []
+        used_tokens = 0
+        for doc_idx, _score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            passage = index.passages[doc_idx]
+            if used_tokens + passage.tokens > token_budget:
+                continue
+            selected.append(passage)
+            used_tokens += passage.tokens
+            if len(selected) >= top_k:
+                break
+        return selected
+
+    def ensure_level_indexed(self, db: Session, level_id: int) -> bool:
+        """索引中没有该关卡时从数据库加载；关卡不存在返回 False"""
+        if self.is_indexed(level_id):
+            return True
+        from ..models.level import Level
+
+        level = (
+            db.query(Level)
+            .options(joinedload(Level.teaching_guide_blob), joinedload(Level.course_data_blob))
+            .filter(Level.id == level_id)
+            .first()
+        )
+        if not level:
+            return False
+        self.index_level(level.id, level.teaching_guide_md, level.course_data_json)
+        return True
+
+
+def format_passages(passages: List[Passage]) -> str:
+    """将检索结果拼接为 Prompt 中的参考资料文本"""
+    return "\n\n".join(f"【{p.title}】\n{p.text}" for p in passages)
+
+
+# 进程级单例
+guide_retriever = GuideRetriever()
@@ -2,41 +2,55 @@
 地图服务
 """
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 
 from ..models.level_map import LevelMap
-from ..core.exceptions import NotFoundError
+from ..core.exceptions import NotFoundError, VersionConflictError
+from ..db.versioning import versioned_write
 
 
 class LevelMapService:
     """地图服务类"""
 
     @staticmethod
-    def get_map_by_chapter(db: Session, chapter_id: int) -> Optional[LevelMap]:
-        """获取篇章的地图配置"""
-        return db.query(LevelMap).filter(LevelMap.chapter_id == chapter_id).first()
+    def get_map_by_chapter(db: Session, chapter_id: int, with_config: bool = True) -> Optional[LevelMap]:
+        """获取篇章的地图配置；with_config=False 时不加载配置 JSON（首次访问该属性时再单独读取）"""
+        query = db.query(LevelMap)
+        if not with_config:
+            query = query.options(defer(LevelMap.map_config_json))
+        return query.filter(LevelMap.chapter_id == chapter_id).first()
 
     @staticmethod
-    def create_or_update_map(db: Session, chapter_id: int, map_config_json: Optional[str] = None) -> LevelMap:
-        """创建或更新地图配置"""
+    def create_or_update_map(
+        db: Session,
+        chapter_id: int,
+        map_config_json: Optional[str] = None,
+        expected_version: Optional[int] = None,
+    ) -> LevelMap:
+        """
+        创建或更新地图配置
+
+        expected_version 为客户端读取时的版本号（地图尚不存在时为 0）：与当前版本不一致，
+        或读取之后被并发修改时抛出 VersionConflictError。
+        """
         level_map = LevelMapService.get_map_by_chapter(db, chapter_id)
         
         if level_map:
             # 更新
-            if map_config_json is not None:
-                level_map.map_config_json = map_config_json
-            db.commit()
-            db.refresh(level_map)
+            with versioned_write(db, level_map, expected_version, "地图已被修改，请刷新后重试"):
+                if map_config_json is not None:
+                    level_map.map_config_json = map_config_json
             return level_map
         else:
+            if expected_version:
+                raise VersionConflictError("地图已被删除，请刷新后重试", current_version=0)
             # 创建
             level_map = LevelMap(
                 chapter_id=chapter_id,
                 map_config_json=map_config_json
             )
             db.add(level_map)
-            db.commit()
-            db.refresh(level_map)
+            db.flush()
             return level_map
 
     @staticmethod
@@ -47,6 +61,6 @@ class LevelMapService:
             raise NotFoundError("地图配置不存在")
         
         db.delete(level_map)
-        db.commit()
+        db.flush()
         return True
 
@@ -1,25 +1,122 @@
 """
 关卡服务
 """
-from typing import Optional, List
-from sqlalchemy.orm import Session
+import hashlib
+import json
+from typing import Iterable, Optional, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from ..models.level import Level
+from ..models import KnowledgeCard, Level, Question, SkillCard, Task, TaskPhase, TaskQuestionRel, TaskStep, TreasureChest
 from ..core.exceptions import NotFoundError, ValidationError
+from ..core.pagination import Page, paginate_keyset
+from ..db.after_commit import run_after_commit
+from ..db.versioning import versioned_write
+from .course_data_version_service import CourseDataVersionService
+from .guide_retriever import guide_retriever
+
+# 关卡大字段 -> 保存其内容的内容块关系
+_CONTENT_BLOBS = {
+    "teaching_guide_md": Level.teaching_guide_blob,
+    "course_data_json": Level.course_data_blob,
+}
+
+
+def _content_options(fields: Iterable[str]) -> list:
+    """随主查询 JOIN 加载指定大字段的内容块"""
+    return [joinedload(_CONTENT_BLOBS[field]) for field in fields]
 
 
 class LevelService:
     """关卡服务类"""
 
     @staticmethod
-    def get_level(db: Session, level_id: int) -> Optional[Level]:
-        """获取关卡"""
-        return db.query(Level).filter(Level.id == level_id).first()
+    def get_level(db: Session, level_id: int, with_content: bool = False) -> Optional[Level]:
+        """获取关卡；with_content=True 时随同一条查询加载教案与课程数据"""
+        query = db.query(Level)
+        if with_content:
+            query = query.options(*_content_options(_CONTENT_BLOBS))
+        return query.filter(Level.id == level_id).first()
+
+    @staticmethod
+    def load_content(db: Session, level: Level, fields: Iterable[str] = tuple(_CONTENT_BLOBS)) -> Level:
+        """为已加载（未带内容）的关卡用一条查询补齐指定大字段的内容块"""
+        return db.query(Level).options(*_content_options(fields)).filter(Level.id == level.id).one()
+
+    @staticmethod
+    def get_level_tree(db: Session, level_id: int) -> Optional[Level]:
+        """
+        加载关卡及其完整子树（任务/环节/步骤/卡片/题目/宝箱）
+
+        每层一条 selectinload 查询，查询数与树的大小无关；教案与课程数据两个大字段不加载。
+        """
+        task_loader = selectinload(Level.tasks)
+        return (
+            db.query(Level)
+            .options(
+                task_loader.selectinload(Task.phases).selectinload(TaskPhase.steps),
+                task_loader.selectinload(Task.knowledge_cards),
+                task_loader.selectinload(Task.skill_cards),
+                task_loader.selectinload(Task.question_rels),
+                selectinload(Level.questions),
+                selectinload(Level.treasure_chests),
+            )
+            .filter(Level.id == level_id)
+            .first()
+        )
+
+    @staticmethod
+    def get_level_tree_version(db: Session, level_id: int) -> Optional[str]:
+        """
+        关卡树的版本标识：一条聚合查询取各层的 max(updated_at) 与行数
+
+        行数用于感知删除（删除不会改变剩余行的 updated_at）。关卡不存在时返回 None。
+        """
+        task_ids = select(Task.id).where(Task.level_id == level_id)
+        phase_ids = select(TaskPhase.id).where(TaskPhase.task_id.in_(task_ids))
+        parts = [
+            (Task, Task.level_id == level_id),
+            (TaskPhase, TaskPhase.task_id.in_(task_ids)),
+            (TaskStep, TaskStep.phase_id.in_(phase_ids)),
+            (KnowledgeCard, KnowledgeCard.task_id.in_(task_ids)),
+            (SkillCard, SkillCard.task_id.in_(task_ids)),
+            (TaskQuestionRel, TaskQuestionRel.task_id.in_(task_ids)),
+            (Question, Question.level_id == level_id),
+            (TreasureChest, TreasureChest.level_id == level_id),
+        ]
+        columns = [Level.updated_at]
+        for model, condition in parts:
+            columns.append(select(func.count(model.id)).where(condition).scalar_subquery())
+            columns.append(select(func.max(model.updated_at)).where(condition).scalar_subquery())
+        row = db.query(*columns).filter(Level.id == level_id).first()
+        if row is None:
+            return None
+        return hashlib.sha1(repr(tuple(row)).encode("utf-8")).hexdigest()[:20]
+
+    @staticmethod
+    def _levels_query(db: Session, chapter_id: int, content_fields: Iterable[str] = ()):
+        """篇章下关卡的查询；大字段默认不加载，content_fields 中列出的随主查询加载"""
+        query = db.query(Level).filter(Level.chapter_id == chapter_id)
+        options = _content_options(content_fields)
+        return query.options(*options) if options else query
+
+    @staticmethod
+    def get_levels_by_chapter(db: Session, chapter_id: int, content_fields: Iterable[str] = ()) -> List[Level]:
+        """获取篇章下的全部关卡"""
+        query = LevelService._levels_query(db, chapter_id, content_fields)
+        return query.order_by(Level.order, Level.id).all()
 
     @staticmethod
-    def get_levels_by_chapter(db: Session, chapter_id: int, skip: int = 0, limit: int = 100) -> List[Level]:
-        """获取篇章下的关卡列表"""
-        return db.query(Level).filter(Level.chapter_id == chapter_id).order_by(Level.order).offset(skip).limit(limit).all()
+    def get_levels_page(
+        db: Session,
+        chapter_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        content_fields: Iterable[str] = (),
+    ) -> Page:
+        """按 (order, id) 键集分页获取篇章下的关卡"""
+        query = LevelService._levels_query(db, chapter_id, content_fields)
+        return paginate_keyset(query, [(Level.order, False), (Level.id, False)], limit, cursor)
 
     @staticmethod
     def create_level(
@@ -42,8 +139,7 @@ class LevelService:
             allow_skip=allow_skip,
         )
         db.add(level)
-        db.commit()
-        db.refresh(level)
+        db.flush()
         return level
 
     @staticmethod
@@ -57,29 +153,47 @@ class LevelService:
         teaching_guide_md: Optional[str] = None,
         allow_skip: Optional[bool] = None,
         course_data_json: Optional[str] = None,
+        user_id: Optional[int] = None,
+        expected_version: Optional[int] = None,
+        course_data_base_version: Optional[int] = None,
     ) -> Level:
-        """更新关卡"""
-        level = LevelService.get_level(db, level_id)
+        """
+        更新关卡（课程数据的修改会追加一个版本）
+
+        expected_version 为客户端读取时的行版本号：与当前版本不一致，或读取之后被并发修改时
+        抛出 VersionConflictError。保存课程数据不改变行版本号，修改所基于的课程数据版本由
+        course_data_base_version 单独核对。
+        """
+        level = LevelService.get_level(db, level_id, with_content=True)
         if not level:
             raise NotFoundError("关卡不存在")
         
-        if name is not None:
-            level.name = name
-        if description is not None:
-            level.description = description
-        if order is not None:
-            level.order = order
-        if is_visible is not None:
-            level.is_visible = is_visible
-        if teaching_guide_md is not None:
-            level.teaching_guide_md = teaching_guide_md
-        if allow_skip is not None:
-            level.allow_skip = allow_skip
-        if course_data_json is not None:
-            level.course_data_json = course_data_json
+        with versioned_write(db, level, expected_version, "关卡已被修改，请刷新后重试"):
+            if name is not None:
+                level.name = name
+            if description is not None:
+                level.description = description
+            if order is not None:
+                level.order = order
+            if is_visible is not None:
+                level.is_visible = is_visible
+            if teaching_guide_md is not None:
+                level.teaching_guide_md = teaching_guide_md
+            if allow_skip is not None:
+                level.allow_skip = allow_skip
+            if course_data_json is not None:
+                try:
+                    course_data = json.loads(course_data_json)
+                except json.JSONDecodeError:
+                    raise ValidationError("课程数据必须是合法的JSON")
+                if course_data_base_version is not None:
+                    CourseDataVersionService.check_base_version(level, course_data_base_version)
+                CourseDataVersionService.record(db, level, course_data, user_id)
         
-        db.commit()
-        db.refresh(level)
+        if teaching_guide_md is not None or course_data_json is not None:
+            # 检索索引在进程内存中无法回滚，等事务提交后再更新
+            level_id, guide, course = level.id, level.teaching_guide_md, level.course_data_json
+            run_after_commit(db, lambda: guide_retriever.index_level(level_id, guide, course))
         return level
 
     @staticmethod
@@ -89,8 +203,10 @@ class LevelService:
         if not level:
             raise NotFoundError("关卡不存在")
         
+        CourseDataVersionService.delete_versions(db, level_id)
         db.delete(level)
-        db.commit()
+        db.flush()
+        run_after_commit(db, lambda: guide_retriever.remove_level(level_id))
         return True
 
     @staticmethod
@@ -105,8 +221,7 @@ class LevelService:
         level.is_visible = True
         level.published_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(level)
+        db.flush()
         return level
 
     @staticmethod
@@ -119,7 +234,6 @@ class LevelService:
         level.is_published = False
         level.is_visible = False
         
-        db.commit()
-        db.refresh(level)
+        db.flush()
         return level
 
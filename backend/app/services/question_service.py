@@ -1,13 +1,20 @@
 """
 题目服务
 """
+from datetime import datetime
 from typing import Optional, List
 
+from sqlalchemy import bindparam, delete, exists, insert, update
 from sqlalchemy.orm import Session
 
 from ..models.question import Question
 from ..models.task_question_rel import TaskQuestionRel
-from ..core.exceptions import NotFoundError, ValidationError
+from ..core.config import get_settings
+from ..core.exceptions import NotFoundError, PreconditionRequiredError, ValidationError, VersionConflictError
+from ..core.pagination import Page, paginate_keyset
+from ..db.bulk import insert_returning_ids
+from ..db.versioning import versioned_write
+from ..schemas.task_bulk import QuestionBulkItem
 
 
 class QuestionService:
@@ -26,6 +33,12 @@ class QuestionService:
             .all()
         )
 
+    @staticmethod
+    def get_questions_page(db: Session, level_id: int, limit: int, cursor: Optional[str] = None) -> Page:
+        """按 id 键集分页获取关卡下的题目"""
+        query = db.query(Question).filter(Question.level_id == level_id)
+        return paginate_keyset(query, [(Question.id, False)], limit, cursor)
+
     @staticmethod
     def create_question(
         db: Session,
@@ -69,17 +82,17 @@ class QuestionService:
             rel = TaskQuestionRel(task_id=task_id, question_id=question.id, order=order)
             db.add(rel)
 
-        db.commit()
-        db.refresh(question)
+        db.flush()
         return question
 
     @staticmethod
     def update_question(
         db: Session,
         question_id: int,
+        expected_version: Optional[int] = None,
         **kwargs,
     ) -> Question:
-        """更新题目信息（仅题库字段）"""
+        """更新题目信息（仅题库字段）；expected_version 不是当前版本时抛出 VersionConflictError"""
         question = QuestionService.get_question(db, question_id)
         if not question:
             raise NotFoundError("题目不存在")
@@ -96,12 +109,10 @@ class QuestionService:
             "knowledge_point",
             "tags",
         }
-        for field, value in kwargs.items():
-            if field in updatable_fields and value is not None:
-                setattr(question, field, value)
-
-        db.commit()
-        db.refresh(question)
+        with versioned_write(db, question, expected_version, "题目已被修改，请刷新后重试"):
+            for field, value in kwargs.items():
+                if field in updatable_fields and value is not None:
+                    setattr(question, field, value)
         return question
 
     @staticmethod
@@ -113,22 +124,98 @@ class QuestionService:
 
         db.query(TaskQuestionRel).filter(TaskQuestionRel.question_id == question_id).delete()
         db.delete(question)
-        db.commit()
+        db.flush()
         return True
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    @staticmethod
+    def replace_task_questions(db: Session, task_id: int, level_id: int, items: List[QuestionBulkItem]) -> List[Question]:
+        """
+        用完整列表替换任务关联的题目，列表顺序即任务内顺序
+
+        带 id 的题目必须已关联到该任务并带上读取时的 version；已有题目用一条条件 UPDATE（WHERE version = ?）
+        批量更新，任一题目已被修改时抛出 VersionConflictError。从列表中移除的题目解除关联，若不再被其他任务
+        引用则一并删除。新题目用一条批量 INSERT（RETURNING 取回 id）写入，关联关系整体重建。
+        只 flush，由请求边界统一提交（出错时请求整体回滚）。
+        """
+        if len(items) > get_settings().bulk_save_max_items:
+            raise ValidationError(f"单次最多保存 {get_settings().bulk_save_max_items} 道题目")
+
+        linked = dict(
+            db.query(TaskQuestionRel.question_id, Question.version)
+            .join(Question, Question.id == TaskQuestionRel.question_id)
+            .filter(TaskQuestionRel.task_id == task_id)
+        )
+        kept = [item.id for item in items if item.id is not None]
+        if len(set(kept)) != len(kept):
+            raise ValidationError("题目 id 重复")
+        foreign = [qid for qid in kept if qid not in linked]
+        if foreign:
+            raise ValidationError(f"题目 {foreign[0]} 未关联到该任务")
+        unversioned = [item.id for item in items if item.id is not None and item.version is None]
+        if unversioned:
+            raise PreconditionRequiredError(f"题目 {unversioned[0]} 缺少 version")
+        stale = next((item for item in items if item.id is not None and item.version != linked[item.id]), None)
+        if stale:
+            raise VersionConflictError(f"题目 {stale.id} 已被修改，请刷新后重试", current_version=linked[stale.id])
+
+        now = datetime.utcnow()
+        fields = ("question_type", "title", "content", "options", "correct_answer", "answer_analysis",
+                  "difficulty", "score", "knowledge_point", "tags")
+        updates = [
+            {"_id": item.id, "_version": item.version, "updated_at": now, **{f: getattr(item, f) for f in fields}}
+            for item in items if item.id is not None
+        ]
+        if updates:
+            table = Question.__table__
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("_id"), table.c.version == bindparam("_version"))
+                .values(version=table.c.version + 1)
+            )
+            if db.get_bind().dialect.supports_sane_multi_rowcount:
+                matched = db.execute(stmt, updates).rowcount
+            else:
+                # 驱动无法报告 executemany 的总匹配行数时逐行执行，否则检测不到版本冲突
+                matched = sum(db.execute(stmt, row).rowcount for row in updates)
+            if matched != len(updates):
+                # 读取版本之后被并发修改
+                raise VersionConflictError("题目已被修改，请刷新后重试")
+        new_positions = [i for i, item in enumerate(items) if item.id is None]
+        question_ids = [item.id for item in items]
+        new_ids = insert_returning_ids(
+            db,
+            Question,
+            [
+                {"level_id": level_id, "created_at": now, "updated_at": now, **{f: getattr(items[i], f) for f in fields}}
+                for i in new_positions
+            ],
+        )
+        for position, question_id in zip(new_positions, new_ids):
+            question_ids[position] = question_id
+
+        db.execute(delete(TaskQuestionRel).where(TaskQuestionRel.task_id == task_id))
+        if question_ids:
+            db.execute(
+                insert(TaskQuestionRel),
+                [
+                    {"task_id": task_id, "question_id": qid, "order": order, "created_at": now, "updated_at": now}
+                    for order, qid in enumerate(question_ids)
+                ],
+            )
+        dropped = set(linked) - set(kept)
+        if dropped:
+            db.execute(
+                delete(Question)
+                .where(Question.id.in_(dropped))
+                .where(~exists().where(TaskQuestionRel.question_id == Question.id))
+                .execution_options(synchronize_session=False)
+            )
+
+        # Core 语句绕过了会话：已加载的题目对象（包括被删除的）过期，避免后续读到旧的 version 与内容
+        touched = {row["_id"] for row in updates} | dropped
+        for (cls, pk, _), obj in list(db.identity_map.items()):
+            if cls is Question and pk[0] in touched:
+                db.expire(obj)
+
+        questions = {q.id: q for q in db.query(Question).filter(Question.id.in_(question_ids)).populate_existing()}
+        return [questions[qid] for qid in question_ids]
@@ -0,0 +1,277 @@
+"""
+批量导入学生名册（CSV / XLSX）
+
+逐个调用 ``UserService.create_user`` 时，每个用户要做三次唯一性查询、一次同步的 Argon2 哈希和一次 flush，
+导入一个年级要几分钟。这里改为：
+
+1. 解析整个文件并用 ``UserCreateAdmin`` 逐行校验，文件内的重复在内存中用集合检测；
+2. 对已有用户的 email / phone / student_id 做集合查询（``IN`` 分批），每列只查询一次；
+3. 在进程池中并行计算密码哈希（Argon2 是刻意设计的慢哈希，线程受 GIL 限制）；
+4. 按块批量插入并逐块提交，每块完成后产出一条进度事件。
+
+:meth:`RosterImportService.run` 是一个生成器，路由把事件作为 SSE 推送给前端。
+"""
+import atexit
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, Iterator, Optional
+
+from pydantic import ValidationError as PydanticValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..core.exceptions import ValidationError
+from ..core.pagination import invalidate_count_cache
+from ..core.security import get_password_hash
+from ..models.user import User
+from ..schemas.user import UserCreateAdmin
+
+logger = logging.getLogger(__name__)
+
+# 表头别名（中英文均可）
+HEADER_ALIASES = {
+    "email": "email", "邮箱": "email",
+    "phone": "phone", "手机": "phone", "手机号": "phone",
+    "student_id": "student_id", "学号": "student_id",
+    "nickname": "nickname", "name": "nickname", "姓名": "nickname", "昵称": "nickname",
+    "password": "password", "密码": "password",
+    "role": "role", "角色": "role",
+    "class_name": "class_name", "class": "class_name", "班级": "class_name",
+    "notes": "notes", "备注": "notes",
+}
+UNIQUE_FIELDS = ("email", "phone", "student_id")
+_IN_BATCH = 500
+
+
+@dataclass
+class RosterRow:
+    line: int  # 文件中的行号（表头为第 1 行）
+    data: dict
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    def fail(self, line: int, message: str) -> None:
+        self.errors.append({"line": line, "error": message})
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """名册导入用的哈希进程池（应用启动时创建，进程退出时关闭）
+
+    子进程用 spawn 启动：Web 进程中已有请求线程、连接池与后台线程，fork 会把其他线程持有的锁
+    原样复制进子进程，子进程可能永远等不到释放。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = get_settings().roster_import_hash_workers or os.cpu_count() or 1
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(shutdown_hash_pool)
+        return _executor
+
+
+def shutdown_hash_pool() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _normalize_header(name) -> Optional[str]:
+    if name is None:
+        return None
+    return HEADER_ALIASES.get(str(name).strip().lower())
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _rows_from_table(header: list, records: Iterator[tuple]) -> Iterator[RosterRow]:
+    columns = [_normalize_header(h) for h in header]
+    if "nickname" not in columns:
+        raise ValidationError("名册缺少姓名（nickname）列")
+    if not any(c in columns for c in UNIQUE_FIELDS):
+        raise ValidationError("名册至少需要邮箱、手机号或学号中的一列")
+    for offset, record in enumerate(records, start=2):
+        data = {col: _clean(value) for col, value in zip(columns, record) if col}
+        if any(data.values()):
+            yield RosterRow(line=offset, data=data)
+
+
+class RosterImportService:
+    """名册导入服务"""
+
+    @staticmethod
+    def parse(filename: str, stream: IO[bytes]) -> list[RosterRow]:
+        """解析 CSV（UTF-8，可带 BOM）或 XLSX（第一个工作表），返回非空行"""
+        max_rows = get_settings().roster_import_max_rows
+        suffix = os.path.splitext(filename or "")[1].lower()
+
+        if suffix == ".xlsx":
+            try:
+                import openpyxl  # 可选依赖，只有导入 xlsx 时才需要
+            except ImportError:
+                raise ValidationError("服务器未安装 openpyxl，暂不支持 xlsx，请另存为 CSV 后导入")
+            workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+            records = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(records, None)
+        elif suffix in (".csv", ""):
+            text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+            records = csv.reader(text)
+            header = next(records, None)
+        else:
+            raise ValidationError("仅支持 .csv 或 .xlsx 文件")
+
+        if not header:
+            raise ValidationError("名册为空")
+        rows = []
+        for row in _rows_from_table(list(header), records):
+            rows.append(row)
+            if len(rows) > max_rows:
+                raise ValidationError(f"单次最多导入 {max_rows} 行")
+        return rows
+
+    @staticmethod
+    def _existing_values(db: Session, field_name: str, values: set) -> set:
+        column = getattr(User, field_name)
+        if field_name == "email":
+            # 与唯一索引 lower(email) 一致，不区分大小写
+            column = func.lower(column)
+        existing = set()
+        values = list(values)
+        for start in range(0, len(values), _IN_BATCH):
+            chunk = values[start:start + _IN_BATCH]
+            existing.update(v for (v,) in db.query(column).filter(column.in_(chunk)))
+        return existing
+
+    @staticmethod
+    def _validate(db: Session, rows: list[RosterRow], default_password: Optional[str], report: ImportReport) -> list:
+        """逐行校验 + 文件内与数据库内的唯一性检查，返回 (line, UserCreateAdmin) 列表"""
+        valid = []
+        seen = {f: set() for f in UNIQUE_FIELDS}
+        for row in rows:
+            data = dict(row.data)
+            if not data.get("password"):
+                data["password"] = default_password
+            if not data.get("password"):
+                report.fail(row.line, "缺少密码")
+                continue
+            data.setdefault("role", "student")
+            if not any(data.get(f) for f in UNIQUE_FIELDS):
+                report.fail(row.line, "邮箱、手机号、学号至少填写一项")
+                continue
+            try:
+                payload = UserCreateAdmin(**{k: v for k, v in data.items() if v is not None})
+            except PydanticValidationError as e:
+                error = e.errors()[0]
+                report.fail(row.line, f"{'.'.join(str(p) for p in error['loc'])}: {error['msg']}")
+                continue
+
+            duplicate = next(
+                (f for f in UNIQUE_FIELDS if getattr(payload, f) and getattr(payload, f) in seen[f]), None
+            )
+            if duplicate:
+                report.fail(row.line, f"{duplicate} 在文件中重复：{getattr(payload, duplicate)}")
+                continue
+            for f in UNIQUE_FIELDS:
+                if getattr(payload, f):
+                    seen[f].add(getattr(payload, f))
+            valid.append((row.line, payload))
+
+        existing = {f: RosterImportService._existing_values(db, f, seen[f]) for f in UNIQUE_FIELDS if seen[f]}
+        result = []
+        for line, payload in valid:
+            taken = next((f for f in existing if getattr(payload, f) in existing[f]), None)
+            if taken:
+                report.fail(line, f"{taken} 已被注册：{getattr(payload, taken)}")
+                continue
+            result.append((line, payload))
+        return result
+
+    @staticmethod
+    def _insert_chunk(db: Session, chunk: list, hashes: list, report: ImportReport) -> None:
+        values = [
+            {
+                "email": payload.email,
+                "phone": payload.phone,
+                "student_id": payload.student_id,
+                "nickname": payload.nickname,
+                "hashed_password": hashed,
+                "role": payload.role,
+                "is_active": True,
+                "class_name": payload.class_name,
+                "notes": payload.notes,
+            }
+            for (_, payload), hashed in zip(chunk, hashes)
+        ]
+        try:
+            # 导入以 SSE 流式返回，生成器在 after_request（commit_db）之后才执行，
+            # 请求级的工作单元覆盖不到这里；按块提交也让已导入的部分在中途断开时得以保留
+            db.execute(insert(User), values)
+            db.commit()
+            report.created += len(values)
+            return
+        except Exception as e:
+            # 校验之后被并发写入占用等情况：整块回滚后逐行插入，定位出错的行
+            db.rollback()
+            logger.warning(f"Roster chunk insert failed, retrying row by row: {e}")
+
+        for (line, _), row_values in zip(chunk, values):
+            try:
+                db.execute(insert(User), [row_values])
+                db.commit()
+                report.created += 1
+            except Exception as e:
+                db.rollback()
+                report.fail(line, f"写入失败：{e.__class__.__name__}")
+
+    @staticmethod
+    def run(
+        db: Session,
+        rows: list[RosterRow],
+        default_password: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> Iterator[dict]:
+        """执行导入，依次产出 progress 事件，最后产出 result 事件"""
+        settings = get_settings()
+        report = ImportReport(total=len(rows))
+        valid = RosterImportService._validate(db, rows, default_password, report)
+        yield {"type": "progress", "stage": "validated", "total": report.total, "valid": len(valid),
+               "failed": len(report.errors)}
+
+        if not dry_run and valid:
+            executor = get_hash_pool()
+            chunk_size = max(1, settings.roster_import_chunk_size)
+            processed = 0
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                hashes = list(executor.map(get_password_hash, [p.password for _, p in chunk], chunksize=8))
+                RosterImportService._insert_chunk(db, chunk, hashes, report)
+                processed += len(chunk)
+                yield {"type": "progress", "stage": "importing", "processed": processed, "valid": len(valid),
+                       "created": report.created, "failed": len(report.errors)}
+            invalidate_count_cache("users")
+
+        report.errors.sort(key=lambda item: item["line"])
+        yield {"type": "result", "dry_run": dry_run, "total": report.total, "valid": len(valid),
+               "created": report.created, "failed": len(report.errors), "errors": report.errors}
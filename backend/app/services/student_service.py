@@ -20,8 +20,7 @@ class StudentService:
         if not profile:
             profile = StudentProfile(user_id=user_id)
             db.add(profile)
-            db.commit()
-            db.refresh(profile)
+            db.flush()
         return profile
 
     @staticmethod
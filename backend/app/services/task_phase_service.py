@@ -1,12 +1,18 @@
 """
 任务环节服务
 """
+from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session, selectinload
 
 from ..models.task_phase import TaskPhase
+from ..models.task_step import TaskStep
+from ..core.config import get_settings
 from ..core.exceptions import NotFoundError, ValidationError
+from ..db.bulk import insert_returning_ids
+from ..schemas.task_bulk import PhaseBulkItem
 
 
 class TaskPhaseService:
@@ -43,8 +49,7 @@ class TaskPhaseService:
             is_required=is_required,
         )
         db.add(phase)
-        db.commit()
-        db.refresh(phase)
+        db.flush()
         return phase
 
     @staticmethod
@@ -66,8 +71,7 @@ class TaskPhaseService:
         if is_required is not None:
             phase.is_required = is_required
 
-        db.commit()
-        db.refresh(phase)
+        db.flush()
         return phase
 
     @staticmethod
@@ -77,22 +81,90 @@ class TaskPhaseService:
             raise NotFoundError("任务环节不存在")
 
         db.delete(phase)
-        db.commit()
+        db.flush()
         return True
 
+    @staticmethod
+    def replace_phases(db: Session, task_id: int, items: List[PhaseBulkItem]) -> List[TaskPhase]:
+        """
+        用完整列表替换任务下的环节与步骤（一次保存 AI 生成的整套环节）
+
+        先整体校验（带 id 的环节/步骤必须属于该任务/该环节，id 不可重复），然后按
+        删除 → 批量更新 → 批量插入（RETURNING 取回新 id）执行，语句数与条目数无关。
+        只 flush，由请求边界统一提交。
+        """
+        if sum(1 + len(item.steps) for item in items) > get_settings().bulk_save_max_items:
+            raise ValidationError(f"单次最多保存 {get_settings().bulk_save_max_items} 个环节和步骤")
+
+        existing_phases = {pid for (pid,) in db.query(TaskPhase.id).filter(TaskPhase.task_id == task_id)}
+        existing_steps = dict(
+            db.query(TaskStep.id, TaskStep.phase_id).filter(TaskStep.phase_id.in_(existing_phases))
+        ) if existing_phases else {}
+
+        phase_ids = [item.id for item in items if item.id is not None]
+        step_ids = [step.id for item in items for step in item.steps if step.id is not None]
+        if len(set(phase_ids)) != len(phase_ids) or len(set(step_ids)) != len(step_ids):
+            raise ValidationError("环节或步骤 id 重复")
+        for item in items:
+            if item.id is not None and item.id not in existing_phases:
+                raise ValidationError(f"环节 {item.id} 不属于该任务")
+            for step in item.steps:
+                if step.id is not None and (step.id not in existing_steps or existing_steps[step.id] != item.id):
+                    raise ValidationError(f"步骤 {step.id} 不属于所在环节")
+
+        now = datetime.utcnow()
+        removed_phases = existing_phases - set(phase_ids)
+        removed_steps = set(existing_steps) - set(step_ids)
+        if removed_steps:
+            db.execute(delete(TaskStep).where(TaskStep.id.in_(removed_steps)))
+        if removed_phases:
+            db.execute(delete(TaskPhase).where(TaskPhase.id.in_(removed_phases)))
+
+        def phase_values(position: int, item: PhaseBulkItem) -> dict:
+            return {
+                "phase_name": item.phase_name,
+                "order": item.order if item.order is not None else position,
+                "is_required": item.is_required,
+                "updated_at": now,
+            }
+
+        updates = [{"id": item.id, **phase_values(i, item)} for i, item in enumerate(items) if item.id is not None]
+        if updates:
+            db.execute(update(TaskPhase), updates)
+        new_items = [(i, item) for i, item in enumerate(items) if item.id is None]
+        new_ids = insert_returning_ids(
+            db, TaskPhase, [{"task_id": task_id, "created_at": now, **phase_values(i, item)} for i, item in new_items]
+        )
+        resolved = dict(zip((i for i, _ in new_items), new_ids))
+
+        step_updates, step_inserts = [], []
+        for i, item in enumerate(items):
+            phase_id = item.id if item.id is not None else resolved[i]
+            for position, step in enumerate(item.steps):
+                values = {
+                    "phase_id": phase_id,
+                    "step_name": step.step_name,
+                    "content": step.content,
+                    "requirements": step.requirements,
+                    "submission_type": step.submission_type,
+                    "validation_rules": step.validation_rules,
+                    "order": step.order if step.order is not None else position,
+                    "updated_at": now,
+                }
+                if step.id is not None:
+                    step_updates.append({"id": step.id, **values})
+                else:
+                    step_inserts.append({"created_at": now, **values})
+        if step_updates:
+            db.execute(update(TaskStep), step_updates)
+        if step_inserts:
+            db.execute(insert(TaskStep), step_inserts)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        return (
+            db.query(TaskPhase)
+            .options(selectinload(TaskPhase.steps))
+            .filter(TaskPhase.task_id == task_id)
+            .order_by(TaskPhase.order.asc(), TaskPhase.id.asc())
+            .populate_existing()
+            .all()
+        )
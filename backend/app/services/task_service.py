@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from ..models.task import Task
 from ..core.exceptions import NotFoundError, ValidationError
+from ..core.pagination import Page, paginate_keyset
 
 
 class TaskService:
@@ -17,9 +18,15 @@ class TaskService:
         return db.query(Task).filter(Task.id == task_id).first()
 
     @staticmethod
-    def get_tasks_by_level(db: Session, level_id: int, skip: int = 0, limit: int = 100) -> List[Task]:
-        """获取关卡下的任务列表"""
-        return db.query(Task).filter(Task.level_id == level_id).offset(skip).limit(limit).all()
+    def get_tasks_by_level(db: Session, level_id: int) -> List[Task]:
+        """获取关卡下的全部任务"""
+        return db.query(Task).filter(Task.level_id == level_id).order_by(Task.id).all()
+
+    @staticmethod
+    def get_tasks_page(db: Session, level_id: int, limit: int, cursor: Optional[str] = None) -> Page:
+        """按 id 键集分页获取关卡下的任务"""
+        query = db.query(Task).filter(Task.level_id == level_id)
+        return paginate_keyset(query, [(Task.id, False)], limit, cursor)
 
     @staticmethod
     def create_task(
@@ -40,8 +47,7 @@ class TaskService:
             objective=objective
         )
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        db.flush()
         return task
 
     @staticmethod
@@ -64,8 +70,7 @@ class TaskService:
         if objective is not None:
             task.objective = objective
         
-        db.commit()
-        db.refresh(task)
+        db.flush()
         return task
 
     @staticmethod
@@ -76,6 +81,6 @@ class TaskService:
             raise NotFoundError("任务不存在")
         
         db.delete(task)
-        db.commit()
+        db.flush()
         return True
 
@@ -49,8 +49,7 @@ class TaskStepService:
             order=order,
         )
         db.add(step)
-        db.commit()
-        db.refresh(step)
+        db.flush()
         return step
 
     @staticmethod
@@ -81,8 +80,7 @@ class TaskStepService:
         if order is not None:
             step.order = order
 
-        db.commit()
-        db.refresh(step)
+        db.flush()
         return step
 
     @staticmethod
@@ -92,7 +90,7 @@ class TaskStepService:
             raise NotFoundError("任务步骤不存在")
 
         db.delete(step)
-        db.commit()
+        db.flush()
         return True
 
 
@@ -42,8 +42,7 @@ class TreasureChestService:
             reward_config=reward_config
         )
         db.add(chest)
-        db.commit()
-        db.refresh(chest)
+        db.flush()
         return chest
 
     @staticmethod
@@ -69,8 +68,7 @@ class TreasureChestService:
         if reward_config is not None:
             chest.reward_config = reward_config
         
-        db.commit()
-        db.refresh(chest)
+        db.flush()
         return chest
 
     @staticmethod
@@ -81,6 +79,6 @@ class TreasureChestService:
             raise NotFoundError("宝箱不存在")
         
         db.delete(chest)
-        db.commit()
+        db.flush()
         return True
 
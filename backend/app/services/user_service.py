@@ -1,51 +1,67 @@
 """User management service."""
 from typing import List, Optional
 
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from ..core.pagination import Page, cached_count, invalidate_count_cache, paginate_keyset
 from ..core.security import get_password_hash
-from ..models.user import User
+from ..core.user_cache import invalidate_cached_user
+from ..db.after_commit import run_after_commit
+from ..db.user_search import apply_user_search
+from ..models.user import User, normalize_email
+from .auth import AuthService
 
 
 class UserService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_users(
-        self,
-        role: Optional[str] = None,
-        search: Optional[str] = None,
-        skip: int = 0,
-        limit: int = 100,
-    ) -> tuple[List[User], int]:
-        """Get users with optional filtering."""
+    def _filtered_query(self, role: Optional[str] = None, search: Optional[str] = None):
+        """Build the filtered user query; returns (query, relevance ordering or None)."""
         query = self.db.query(User)
 
         # Filter by role
         if role:
             query = query.filter(User.role == role)
 
-        # Search by email, phone, student_id, or nickname
-        if search:
-            search_pattern = f"%{search}%"
-            query = query.filter(
-                or_(
-                    User.email.like(search_pattern),
-                    User.phone.like(search_pattern),
-                    User.student_id.like(search_pattern),
-                    User.nickname.like(search_pattern),
-                )
-            )
-
-        # Get total count
-        total = query.count()
-
-        # Apply pagination
-        users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
+        # Search by email, phone, student_id, or nickname (n-gram index, see app/db/user_search.py)
+        relevance = None
+        if search and search.strip():
+            query, relevance = apply_user_search(self.db, query, search)
+        return query, relevance
 
+    def get_users(
+        self,
+        role: Optional[str] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> tuple[List[User], int]:
+        """Get users with optional filtering (offset pagination, total is cached briefly).
+
+        Search results are ordered by relevance, everything else newest first.
+        """
+        query, relevance = self._filtered_query(role, search)
+        total = cached_count(query, "users")
+        order = [*(relevance or []), User.created_at.desc(), User.id.desc()]
+        users = query.order_by(*order).offset(skip).limit(limit).all()
         return users, total
 
+    def get_users_page(
+        self,
+        role: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+    ) -> Page:
+        """Get one page of users ordered newest first, positioned by an opaque cursor."""
+        query, _ = self._filtered_query(role, search)
+        page = paginate_keyset(query, [(User.created_at, True), (User.id, True)], limit, cursor)
+        if with_total:
+            page.total = cached_count(query, "users")
+        return page
+
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID."""
         return self.db.query(User).filter(User.id == user_id).first()
@@ -65,8 +81,10 @@ class UserService:
         if not email and not phone and not student_id:
             raise ValueError("Email, phone, or student_id is required")
 
+        email = normalize_email(email)
+
         # Check for existing user
-        if email and self.db.query(User).filter(User.email == email).first():
+        if email and AuthService(self.db).email_taken(email):
             raise ValueError("Email already registered")
 
         if phone and self.db.query(User).filter(User.phone == phone).first():
@@ -92,7 +110,7 @@ class UserService:
         )
         self.db.add(user)
         self.db.flush()
-        self.db.refresh(user)
+        invalidate_count_cache("users")
         return user
 
     def update_user(
@@ -115,8 +133,8 @@ class UserService:
 
         if email is not None:
             # Check if email is already taken by another user
-            existing = self.db.query(User).filter(User.email == email, User.id != user_id).first()
-            if existing:
+            email = normalize_email(email)
+            if AuthService(self.db).email_taken(email, exclude_user_id=user_id):
                 raise ValueError("Email already registered")
             user.email = email
 
@@ -137,8 +155,10 @@ class UserService:
         if nickname is not None:
             user.nickname = nickname
 
+        revoke_sessions = False
         if password is not None:
             user.hashed_password = get_password_hash(password)
+            revoke_sessions = True
 
         if role is not None:
             if role not in ["student", "teacher", "admin"]:
@@ -146,10 +166,16 @@ class UserService:
             user.role = role
 
         if is_active is not None:
+            revoke_sessions = revoke_sessions or (user.is_active and not is_active)
             user.is_active = is_active
 
+        if revoke_sessions:
+            # Password reset or account disabled: existing tokens stop working immediately
+            AuthService(self.db).revoke_all_sessions(user)
+
         self.db.flush()
-        self.db.refresh(user)
+        invalidate_count_cache("users")
+        self._invalidate_cached_user_after_commit(user.id)
         return user
 
     def delete_user(self, user_id: int) -> bool:
@@ -160,6 +186,12 @@ class UserService:
 
         # Soft delete
         user.is_active = False
+        AuthService(self.db).revoke_all_sessions(user)
         self.db.flush()
+        self._invalidate_cached_user_after_commit(user.id)
         return True
 
+    def _invalidate_cached_user_after_commit(self, user_id: int) -> None:
+        # Evicting before the commit lets a concurrent request cache the old row again
+        run_after_commit(self.db, lambda: invalidate_cached_user(user_id))
+
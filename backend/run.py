@@ -1,7 +1,9 @@
 """Application entry point."""
 from app.main import create_app
 
-app = create_app()
+# 名册导入的哈希子进程以 spawn 启动，会以 __mp_main__ 的身份重新导入本文件，子进程中不创建应用
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True)
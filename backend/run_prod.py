@@ -1,6 +1,8 @@
 from app.main import create_app
 
-app = create_app()
+# 名册导入的哈希子进程以 spawn 启动，会以 __mp_main__ 的身份重新导入本文件，子进程中不创建应用
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     # 禁用 debug 模式以避免子进程重启问题
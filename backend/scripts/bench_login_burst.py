@@ -0,0 +1,118 @@
+"""
+登录突发负载基准测试
+
+模拟上课开始时大量学生同时登录：在临时 SQLite 数据库中创建若干学生，用多个线程同时调用登录接口，
+同时另一个线程持续请求 /auth/me，统计登录与探测请求的延迟分位数以及 503（哈希执行器满载）的次数。
+
+用法：
+    python scripts/bench_login_burst.py --logins 300 --concurrency 64
+    PASSWORD_HASH_WORKERS=64 python scripts/bench_login_burst.py   # 近似“不限流”的对照组
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 必须在导入 app 之前指定数据库
+_tmp_dir = Path(tempfile.mkdtemp())
+os.environ["DATABASE_URL"] = f"sqlite:///{(_tmp_dir / 'bench.db').as_posix()}"
+
+# 添加项目根目录到路径
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.security import get_password_hash  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+def seed(users: int) -> None:
+    hashed = get_password_hash(PASSWORD)  # 所有用户共用一个哈希，避免准备阶段耗时
+    db = SessionLocal()
+    db.add_all(
+        User(student_id=f"S{i:06d}", nickname=f"学生{i}", hashed_password=hashed, role="student")
+        for i in range(users)
+    )
+    db.commit()
+    db.close()
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(name: str, latencies: list) -> str:
+    return (
+        f"{name}: n={len(latencies)} p50={percentile(latencies, 50) * 1000:.0f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.0f}ms p99={percentile(latencies, 99) * 1000:.0f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    print(
+        f"argon2 t={settings.argon2_time_cost} m={settings.argon2_memory_cost_kib}KiB p={settings.argon2_parallelism}; "
+        f"hash workers={settings.password_hash_workers or os.cpu_count()} "
+        f"max_pending={settings.password_hash_max_pending} wait={settings.password_hash_wait_seconds}s"
+    )
+
+    app = create_app()
+    seed(args.logins)
+    client = app.test_client()
+    token = client.post(
+        "/api/v1/auth/login", json={"identifier": "S000000", "password": PASSWORD}
+    ).get_json()["access_token"]
+
+    login_latencies, statuses = [], {}
+    probe_latencies = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def login(i: int) -> None:
+        started = time.perf_counter()
+        response = client.post("/api/v1/auth/login", json={"identifier": f"S{i:06d}", "password": PASSWORD})
+        elapsed = time.perf_counter() - started
+        with lock:
+            login_latencies.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def probe() -> None:
+        headers = {"Authorization": f"Bearer {token}"}
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/api/v1/auth/me", headers=headers)
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.02)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(login, range(args.logins)))
+    wall = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+
+    print(f"{args.logins} logins with {args.concurrency} client threads in {wall:.1f}s; statuses={statuses}")
+    print(summarize("login", login_latencies))
+    print(summarize("probe /auth/me", probe_latencies))
+
+
+if __name__ == "__main__":
+    main()
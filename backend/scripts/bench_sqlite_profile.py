@@ -0,0 +1,119 @@
+"""
+SQLite 连接配置基准测试
+
+在临时数据库上分别用默认配置与调优配置（WAL + PRAGMA + 连接池）运行同样的并发读写负载，
+对比吞吐量与 "database is locked" 错误数。
+
+用法：
+    python scripts/bench_sqlite_profile.py --threads 16 --seconds 10 --write-ratio 0.3
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import create_app_engine  # noqa: E402
+from app.models import AIAssistantLog, Level  # noqa: E402
+
+
+def build_engine(path: Path, tuned: bool):
+    url = f"sqlite:///{path.as_posix()}"
+    if not tuned:
+        return create_engine(url, connect_args={"check_same_thread": False})
+    settings = get_settings().model_copy(update={"sqlite_tuned": True})
+    return create_app_engine(url, {"check_same_thread": False}, settings)
+
+
+def seed(Session, levels: int) -> None:
+    db = Session()
+    db.add_all(Level(chapter_id=1, name=f"关卡{i}", order=i, teaching_guide_md="# 实验\n" * 50) for i in range(levels))
+    db.commit()
+    db.close()
+
+
+def run(tuned: bool, threads: int, seconds: float, write_ratio: float, levels: int = 200) -> dict:
+    tmp_dir = Path(tempfile.mkdtemp())
+    engine = build_engine(tmp_dir / "bench.db", tuned)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session, levels)
+
+    counters = {"reads": 0, "writes": 0, "locked": 0, "pool_timeouts": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(worker_id: int) -> None:
+        rng = random.Random(worker_id)
+        local = {key: 0 for key in counters}
+        while time.perf_counter() < deadline:
+            db = Session()
+            try:
+                level_id = rng.randint(1, levels)
+                if rng.random() < write_ratio:
+                    # 与线上写路径相似：写 AI 日志 + 保存关卡
+                    db.add(AIAssistantLog(action="bench", input_data={"w": worker_id}, output_data=None))
+                    db.query(Level).filter(Level.id == level_id).update({"description": f"w{worker_id}"})
+                    db.commit()
+                    local["writes"] += 1
+                else:
+                    db.query(Level).filter(Level.id == level_id).one()
+                    db.query(Level.id, Level.name).filter(Level.chapter_id == 1).order_by(Level.order).limit(20).all()
+                    local["reads"] += 1
+            except OperationalError as e:
+                db.rollback()
+                local["locked" if "locked" in str(e) else "errors"] += 1
+            except PoolTimeoutError:
+                local["pool_timeouts"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counters[key] += value
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        **counters,
+        "ops_per_sec": round((counters["reads"] + counters["writes"]) / elapsed, 1),
+        "writes_per_sec": round(counters["writes"] / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} seconds={args.seconds} write_ratio={args.write_ratio}")
+    for label, tuned in (("default", False), ("tuned", True)):
+        result = run(tuned, args.threads, args.seconds, args.write_ratio)
+        print(
+            f"{label:8s} ops/s={result['ops_per_sec']:>8} writes/s={result['writes_per_sec']:>8} "
+            f"reads={result['reads']} writes={result['writes']} locked={result['locked']} pool_timeouts={result['pool_timeouts']} other_errors={result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+索引顾问脚本
+
+在临时 SQLite 数据库上构造一份篇章/关卡/任务/环节/步骤/题目数据，通过测试客户端
+调用主要的读接口，捕获执行过的 SQL 并用 EXPLAIN QUERY PLAN 报告全表扫描与临时排序。
+
+用法：
+    python scripts/index_advisor.py              # 内置的接口负载
+    python scripts/index_advisor.py --pytest     # 捕获 pytest 运行期间的 SQL
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+TMP_DIR = Path(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{(TMP_DIR / 'advisor.db').as_posix()}")
+os.environ.setdefault("GENERATED_FILE_GC_INTERVAL_SECONDS", "0")
+
+from app.db.index_advisor import QueryCapture, analyze, format_report  # noqa: E402
+
+
+def seed(db) -> dict:
+    """构造有一定规模的层级数据，避免优化器因表太小直接选择全表扫描"""
+    from app.core.security import get_password_hash
+    from app.models import Chapter, Level, Question, Task, TaskPhase, TaskStep, User
+
+    password = get_password_hash("secret123")
+    teacher = User(email="teacher@example.com", nickname="教师", hashed_password=password, role="teacher")
+    admin = User(email="admin@example.com", nickname="管理员", hashed_password=password, role="admin")
+    db.add_all([teacher, admin])
+    db.add_all(
+        User(email=f"s{i}@example.com", student_id=f"S{i:05d}", nickname=f"学生{i}", hashed_password=password)
+        for i in range(500)
+    )
+    db.flush()
+
+    ids = {}
+    for c in range(10):
+        chapter = Chapter(name=f"篇章{c}", teacher_id=teacher.id)
+        db.add(chapter)
+        db.flush()
+        for l in range(10):
+            level = Level(chapter_id=chapter.id, name=f"关卡{c}-{l}", order=9 - l, is_published=True)
+            db.add(level)
+            db.flush()
+            db.add_all(Question(level_id=level.id, question_type="single_choice", title=f"题目{q}") for q in range(5))
+            task = Task(level_id=level.id, name=f"任务{c}-{l}")
+            db.add(task)
+            db.flush()
+            for p in range(4):
+                phase = TaskPhase(task_id=task.id, phase_name=f"环节{p}", order=3 - p)
+                db.add(phase)
+                db.flush()
+                db.add_all(TaskStep(phase_id=phase.id, step_name=f"步骤{s}", order=3 - s) for s in range(4))
+            ids.update(chapter_id=chapter.id, level_id=level.id, task_id=task.id, phase_id=phase.id)
+    db.commit()
+    return ids
+
+
+def run_workload() -> None:
+    from app.db.session import SessionLocal
+    from app.main import create_app
+
+    app = create_app()
+    db = SessionLocal()
+    ids = seed(db)
+    db.close()
+    client = app.test_client()
+
+    def token(identifier: str) -> dict:
+        response = client.post("/api/v1/auth/login", json={"identifier": identifier, "password": "secret123"})
+        return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+    teacher, admin = token("teacher@example.com"), token("admin@example.com")
+    for path in (
+        "/api/v1/chapters",
+        f"/api/v1/chapters/{ids['chapter_id']}/levels",
+        f"/api/v1/levels/{ids['level_id']}",
+        f"/api/v1/levels/{ids['level_id']}/tasks",
+        f"/api/v1/levels/{ids['level_id']}/questions",
+        f"/api/v1/tasks/{ids['task_id']}/phases",
+        f"/api/v1/tasks/{ids['task_id']}/phases/{ids['phase_id']}/steps",
+        f"/api/v1/tasks/{ids['task_id']}/phase-question-relation",
+    ):
+        client.get(path, headers=teacher)
+    for path in ("/api/v1/admin/users", "/api/v1/admin/users?role=student", "/api/v1/admin/ai-usage"):
+        client.get(path, headers=admin)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pytest", nargs="*", metavar="ARG", help="在捕获期间运行 pytest（可附带参数）")
+    args = parser.parse_args()
+
+    with QueryCapture() as capture:
+        if args.pytest is not None:
+            import pytest
+            pytest.main(["-q", "-p", "no:cacheprovider", *(args.pytest or [str(backend_dir / "tests")])])
+        else:
+            run_workload()
+
+    from app.db.session import engine
+
+    findings = analyze(engine, capture.statements)
+    print(format_report(findings, total_statements=len(capture.statements)))
+
+
+if __name__ == "__main__":
+    main()
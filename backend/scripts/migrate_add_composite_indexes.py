@@ -0,0 +1,82 @@
+"""Add composite indexes for the chapter/level/task/phase/step hierarchy and the users list.
+
+Indexes already present are skipped. The unique index on student_skills(user_id, skill_node_id)
+is only created when the table has no duplicate pairs; duplicates are listed so they can be
+merged by hand first.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, inspect  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import (  # noqa: E402
+    KnowledgeCard,
+    Level,
+    SkillCard,
+    StudentSkill,
+    TaskPhase,
+    TaskQuestionRel,
+    TaskStep,
+    User,
+)
+
+MODELS = [Level, TaskPhase, TaskStep, TaskQuestionRel, KnowledgeCard, SkillCard, StudentSkill, User]
+INDEX_NAMES = {
+    "ix_levels_chapter_id_order",
+    "ix_task_phases_task_id_order",
+    "ix_task_steps_phase_id_order",
+    "ix_task_question_rels_task_id_order",
+    "ix_knowledge_cards_task_id_order",
+    "ix_skill_cards_task_id_order",
+    "uq_student_skills_user_id_skill_node_id",
+    "ix_users_created_at",
+    "ix_users_role_created_at",
+}
+
+
+def find_student_skill_duplicates(db: Session) -> list:
+    return (
+        db.query(StudentSkill.user_id, StudentSkill.skill_node_id, func.count(StudentSkill.id))
+        .group_by(StudentSkill.user_id, StudentSkill.skill_node_id)
+        .having(func.count(StudentSkill.id) > 1)
+        .all()
+    )
+
+
+def migrate():
+    """Create the indexes listed in INDEX_NAMES (declared in the models' __table_args__)."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+
+    with Session(engine) as db:
+        duplicates = find_student_skill_duplicates(db) if StudentSkill.__tablename__ in tables else []
+
+    created = []
+    for model in MODELS:
+        table = model.__table__
+        if table.name not in tables:
+            print(f"Table {table.name} not found, skipping (it will be created by init_db)")
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in INDEX_NAMES or index.name in existing:
+                continue
+            if index.unique and table.name == StudentSkill.__tablename__ and duplicates:
+                print(f"Skipping {index.name}: {len(duplicates)} duplicate (user_id, skill_node_id) pairs found:")
+                for user_id, skill_node_id, count in duplicates[:20]:
+                    print(f"    user_id={user_id} skill_node_id={skill_node_id} rows={count}")
+                continue
+            print(f"Creating index {index.name} on {table.name}({', '.join(c.name for c in index.columns)})...")
+            index.create(bind=engine)
+            created.append(index.name)
+
+    print(f"Migration completed successfully! Created {len(created)} index(es).")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,44 @@
+"""Add levels.course_data_version and the course_data_versions table.
+
+Existing levels start at version 0. Their current course data is kept as version 1 (a full
+snapshot) the first time it is edited, so nothing needs to be copied here.
+Run migrate_content_blobs.py first: snapshots are stored in content_blobs.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import inspect, text  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import ContentBlob, CourseDataVersion, Level  # noqa: E402
+
+
+def migrate():
+    """Add the course_data_version column and create the versions table if missing."""
+    inspector = inspect(engine)
+    if Level.__tablename__ not in inspector.get_table_names():
+        print(f"Table {Level.__tablename__} not found, skipping (it will be created by init_db)")
+        return
+    if ContentBlob.__tablename__ not in inspector.get_table_names():
+        print("Table content_blobs not found, run scripts/migrate_content_blobs.py first")
+        return
+
+    columns = {column["name"] for column in inspector.get_columns(Level.__tablename__)}
+    if "course_data_version" in columns:
+        print("course_data_version column already exists")
+    else:
+        print("Adding course_data_version column to levels table...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE levels ADD COLUMN course_data_version INTEGER DEFAULT 0 NOT NULL"))
+
+    print(f"Creating table {CourseDataVersion.__tablename__} (if missing)...")
+    CourseDataVersion.__table__.create(bind=engine, checkfirst=True)
+
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,38 @@
+"""Add the lower(email) expression index used by case-insensitive login lookups.
+
+Skipped when the index already exists. The index is unique; on a database that
+still has emails differing only in case, run migrate_normalize_emails.py instead.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import inspect  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import User  # noqa: E402
+
+INDEX_NAME = "ix_users_email_lower"
+
+
+def migrate():
+    """Create ix_users_email_lower (declared in User.__table_args__)."""
+    inspector = inspect(engine)
+    if User.__tablename__ not in inspector.get_table_names():
+        print(f"Table {User.__tablename__} not found, skipping (it will be created by init_db)")
+        return
+    existing = {index["name"] for index in inspector.get_indexes(User.__tablename__)}
+    if INDEX_NAME in existing:
+        print(f"Index {INDEX_NAME} already exists, nothing to do.")
+        return
+
+    index = next(index for index in User.__table__.indexes if index.name == INDEX_NAME)
+    print(f"Creating index {INDEX_NAME} on {User.__tablename__}(lower(email))...")
+    index.create(bind=engine)
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
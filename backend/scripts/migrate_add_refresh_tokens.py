@@ -0,0 +1,41 @@
+"""Add users.token_version and the refresh_tokens / revoked_tokens tables.
+
+Existing access tokens have no session claim and are treated as version 0, so they keep
+working until they expire.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import inspect, text  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import RefreshToken, RevokedToken, User  # noqa: E402
+
+
+def migrate():
+    """Add the token_version column and create the token tables if missing."""
+    inspector = inspect(engine)
+    if User.__tablename__ not in inspector.get_table_names():
+        print(f"Table {User.__tablename__} not found, skipping (it will be created by init_db)")
+        return
+
+    columns = {column["name"] for column in inspector.get_columns(User.__tablename__)}
+    if "token_version" in columns:
+        print("token_version column already exists")
+    else:
+        print("Adding token_version column to users table...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER DEFAULT 0 NOT NULL"))
+
+    for model in (RefreshToken, RevokedToken):
+        print(f"Creating table {model.__tablename__} (if missing)...")
+        model.__table__.create(bind=engine, checkfirst=True)
+
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,39 @@
+"""Add the optimistic-locking version column to levels, level_maps and questions.
+
+Existing rows start at version 1. Editors must send the version they read back on every
+write (request body or If-Match), so deploy the matching frontend together with this change.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import inspect, text  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import Level, LevelMap, Question  # noqa: E402
+
+
+def migrate():
+    """Add a version column (default 1) to every versioned table that lacks one."""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    for model in (Level, LevelMap, Question):
+        table = model.__tablename__
+        if table not in tables:
+            print(f"Table {table} not found, skipping (it will be created by init_db)")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "version" in columns:
+            print(f"{table}.version column already exists")
+            continue
+        print(f"Adding version column to {table} table...")
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER DEFAULT 1 NOT NULL"))
+
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,168 @@
+"""Move levels.teaching_guide_md / course_data_json into the content_blobs table.
+
+Each distinct text is stored once (keyed by its SHA-256) and compressed; the levels row keeps
+only the hash. The script is idempotent and also serves as a repair tool: it always finishes by
+recounting references from every column with a foreign key to content_blobs.hash (levels and
+course data history snapshots) and deleting blobs nobody points to (bulk deletes bypass the ORM
+hooks that keep the counts up to date).
+
+Prints the database size and the time of a full scan of the levels table before and after.
+"""
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, inspect, select, text  # noqa: E402
+
+from app.core.compression import compress  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.models import ContentBlob, Level  # noqa: E402
+from app.models.content_blob import content_hash  # noqa: E402
+
+LEGACY_COLUMNS = {"teaching_guide_md": "teaching_guide_hash", "course_data_json": "course_data_hash"}
+BATCH_SIZE = 200
+
+
+def _database_size(conn) -> int:
+    if engine.dialect.name != "sqlite":
+        return 0
+    return conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+
+
+def _scan_seconds(conn) -> float:
+    started = time.perf_counter()
+    for _ in conn.execute(text("SELECT * FROM levels")):
+        pass
+    return time.perf_counter() - started
+
+
+def _report(label: str) -> tuple[int, float]:
+    with engine.connect() as conn:
+        size, seconds = _database_size(conn), _scan_seconds(conn)
+    print(f"{label}: database {size / 1024:.0f} KiB, full scan of levels {seconds * 1000:.1f} ms")
+    return size, seconds
+
+
+def _move_content(legacy: list[str]) -> None:
+    """Copy inline content into blobs, batch by batch, and point the rows at the hashes."""
+    blobs = ContentBlob.__table__
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(blobs.c.hash)).scalars())
+        last_id = 0
+        moved = 0
+        while True:
+            rows = conn.execute(
+                text(f"SELECT id, {', '.join(legacy)} FROM levels WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).mappings().all()
+            if not rows:
+                break
+            for row in rows:
+                values = {}
+                for column in legacy:
+                    content = row[column]
+                    if content is None:
+                        continue
+                    digest = content_hash(content)
+                    if digest not in existing:
+                        raw = content.encode("utf-8")
+                        codec, data = compress(raw)
+                        conn.execute(blobs.insert().values(hash=digest, codec=codec, size=len(raw), data=data, ref_count=0))
+                        existing.add(digest)
+                    values[LEGACY_COLUMNS[column]] = digest
+                if values:
+                    assignments = ", ".join(f"{column} = :{column}" for column in values)
+                    conn.execute(text(f"UPDATE levels SET {assignments} WHERE id = :id"), {**values, "id": row["id"]})
+                    moved += 1
+            last_id = rows[-1]["id"]
+        print(f"Moved content of {moved} levels into {len(existing)} blobs")
+
+
+def _blob_references(bind) -> list:
+    """Every existing column with a foreign key to content_blobs.hash (levels, course data history, ...)."""
+    blobs = ContentBlob.__table__
+    tables = set(inspect(bind).get_table_names())
+    return [
+        fk.parent
+        for table in Base.metadata.sorted_tables
+        if table.name in tables
+        for fk in table.foreign_keys
+        if fk.column is blobs.c.hash
+    ]
+
+
+def _recount_references(bind=engine) -> None:
+    """Recompute ref_count from every column referencing a blob and delete unreferenced blobs."""
+    blobs = ContentBlob.__table__
+    columns = _blob_references(bind)
+    with bind.begin() as conn:
+        counts: Counter = Counter()
+        for column in columns:
+            for digest, count in conn.execute(select(column, func.count()).where(column.isnot(None)).group_by(column)):
+                counts[digest] += count
+        stored = conn.execute(select(blobs.c.hash, blobs.c.ref_count)).all()
+        for digest, ref_count in stored:
+            if counts[digest] != ref_count:
+                conn.execute(blobs.update().where(blobs.c.hash == digest).values(ref_count=counts[digest]))
+        removed = conn.execute(blobs.delete().where(blobs.c.ref_count <= 0)).rowcount
+        missing = set(counts) - {digest for digest, _ in stored}
+    referencing = ", ".join(f"{column.table.name}.{column.name}" for column in columns)
+    print(f"Reference counts verified for {len(stored)} blobs ({referencing}), removed {removed} unreferenced")
+    if missing:
+        print(f"WARNING: {len(missing)} referenced hashes have no blob")
+
+
+def migrate():
+    """Create content_blobs, add the hash columns, move inline content and drop the old columns."""
+    inspector = inspect(engine)
+    if Level.__tablename__ not in inspector.get_table_names():
+        print(f"Table {Level.__tablename__} not found, skipping (it will be created by init_db)")
+        return
+
+    before = _report("Before")
+
+    print(f"Creating table {ContentBlob.__tablename__} (if missing)...")
+    ContentBlob.__table__.create(bind=engine, checkfirst=True)
+
+    columns = {column["name"] for column in inspector.get_columns(Level.__tablename__)}
+    for hash_column in LEGACY_COLUMNS.values():
+        if hash_column in columns:
+            print(f"{hash_column} column already exists")
+            continue
+        print(f"Adding {hash_column} column to levels table...")
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE levels ADD COLUMN {hash_column} VARCHAR(64) REFERENCES content_blobs (hash)"))
+    for index in Level.__table__.indexes:
+        if {column.name for column in index.columns} & set(LEGACY_COLUMNS.values()):
+            index.create(bind=engine, checkfirst=True)
+
+    legacy = [column for column in LEGACY_COLUMNS if column in columns]
+    if legacy:
+        _move_content(legacy)
+        for column in legacy:
+            print(f"Dropping legacy column levels.{column}...")
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE levels DROP COLUMN {column}"))
+    else:
+        print("No inline content columns left to move")
+
+    _recount_references()
+
+    if engine.dialect.name == "sqlite" and legacy:
+        print("Reclaiming free pages (VACUUM)...")
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    after = _report("After")
+    if before[0] and before[1]:
+        print(f"Database size {after[0] / before[0]:.1%} of before, levels scan {before[1] / max(after[1], 1e-9):.1f}x faster")
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
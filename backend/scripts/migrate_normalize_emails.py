@@ -0,0 +1,73 @@
+"""Store every email in lower case and make the lower(email) index unique.
+
+Login matches emails case-insensitively, so two accounts whose emails differ only
+in case cannot both log in. The migration first lists such duplicates and stops
+without changing anything when there are any; resolve them (merge or rename the
+accounts) and run it again. Otherwise it lower-cases stored emails and recreates
+ix_users_email_lower as a unique index.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, inspect, select, text, update  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models import User  # noqa: E402
+
+INDEX_NAME = "ix_users_email_lower"
+
+
+def find_duplicate_emails(conn) -> dict[str, list[tuple[int, str]]]:
+    """Return {lower(email): [(user id, stored email), ...]} for emails used by more than one account."""
+    lowered = func.lower(func.trim(User.email))
+    duplicated = (
+        select(lowered)
+        .where(User.email.is_not(None))
+        .group_by(lowered)
+        .having(func.count() > 1)
+    )
+    rows = conn.execute(
+        select(lowered, User.id, User.email).where(lowered.in_(duplicated)).order_by(lowered, User.id)
+    )
+    groups: dict[str, list[tuple[int, str]]] = {}
+    for key, user_id, email in rows:
+        groups.setdefault(key, []).append((user_id, email))
+    return groups
+
+
+def migrate() -> int:
+    inspector = inspect(engine)
+    if User.__tablename__ not in inspector.get_table_names():
+        print(f"Table {User.__tablename__} not found, skipping (it will be created by init_db)")
+        return 0
+
+    with engine.begin() as conn:
+        duplicates = find_duplicate_emails(conn)
+        if duplicates:
+            print(f"Found {len(duplicates)} email(s) shared by several accounts (case-insensitive):")
+            for key, users in duplicates.items():
+                listed = ", ".join(f"#{user_id} {email}" for user_id, email in users)
+                print(f"  {key}: {listed}")
+            print("Resolve these accounts first; nothing was changed.")
+            return 1
+
+        lowered = func.lower(func.trim(User.email))
+        result = conn.execute(
+            update(User).where(User.email.is_not(None), User.email != lowered).values(email=lowered)
+        )
+        print(f"Lower-cased {result.rowcount} email(s).")
+
+        # expression indexes are not reflected on SQLite, so rebuild unconditionally
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        index = next(index for index in User.__table__.indexes if index.name == INDEX_NAME)
+        print(f"Creating unique index {INDEX_NAME} on {User.__tablename__}(lower(email))...")
+        index.create(bind=conn)
+    print("Migration completed successfully!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(migrate())
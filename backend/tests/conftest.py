@@ -0,0 +1,73 @@
+"""
+测试公用夹具
+
+- ``engine``：内存 SQLite 库，已建好全部表；StaticPool 让所有会话、所有线程共用同一个连接，
+  多个会话可以模拟并发请求；
+- ``Session`` / ``db``：绑定到该库的会话工厂与一个会话；
+- ``make_chapter`` / ``make_level``：新建篇章（及其下一个关卡）并提交。
+
+应用在导入 ``app.db.session`` 时按 DATABASE_URL 创建引擎，这里在任何测试模块导入应用之前
+把它指向临时目录中的库：create_app 的测试不会写入 data/app.db，WAL 的 -wal/-shm 文件
+也不会留在 tests/ 中，测试结束后整个目录被删除。
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+_TEST_DB_DIR = Path(tempfile.mkdtemp(prefix="backend-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DB_DIR / 'test.db'}"
+
+from app.db.base import Base  # noqa: E402
+from app.models import Chapter, Level  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(Session):
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_chapter(db):
+    """make_chapter(teacher_id=1)：新建篇章并提交，返回篇章"""
+    def make(teacher_id: int = 1) -> Chapter:
+        chapter = Chapter(name="c", teacher_id=teacher_id)
+        db.add(chapter)
+        db.commit()
+        return chapter
+    return make
+
+
+@pytest.fixture
+def make_level(db, make_chapter):
+    """make_level(teacher_id=1, **关卡字段)：新建篇章及其下一个关卡并提交，返回关卡"""
+    def make(teacher_id: int = 1, **fields) -> Level:
+        level = Level(chapter_id=make_chapter(teacher_id).id, **{"name": "l", **fields})
+        db.add(level)
+        db.commit()
+        return level
+    return make
@@ -0,0 +1,68 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.models import AIAssistantLog, AIUsageRecord, AIUsageRollup, Chapter
+from app.services.ai_service import AIService
+from app.services.ai_usage_service import AIUsageService
+
+
+def test_record_usage_upserts_day_and_month_rollups(db):
+    now = datetime(2024, 3, 5, 10, 0, 0)
+    AIUsageService.record_usage(db, 7, "learning_help", 100, 50, now=now)
+    AIUsageService.record_usage(db, 7, "learning_help", 20, 10, estimated=True, now=now)
+    db.commit()
+
+    assert db.query(AIUsageRecord).count() == 2  # 日志写入失败时用量仍然记录
+    day = db.query(AIUsageRollup).filter_by(period_type="day", period_key="2024-03-05").one()
+    assert (day.prompt_tokens, day.completion_tokens, day.request_count) == (120, 60, 2)
+    assert AIUsageService.get_user_totals(db, 7, now=now) == {"day": 180, "month": 180}
+
+    report = AIUsageService.get_report(db, "month", "2024-03")
+    assert report[0]["user_id"] == 7
+    assert report[0]["actions"]["learning_help"]["request_count"] == 2
+
+
+def test_check_quota_soft_and_hard_limits(monkeypatch, db):
+    settings = SimpleNamespace(
+        ai_daily_soft_quota_tokens=100,
+        ai_daily_hard_quota_tokens=200,
+        ai_monthly_soft_quota_tokens=0,
+        ai_monthly_hard_quota_tokens=0,
+    )
+    monkeypatch.setattr("app.services.ai_usage_service.get_settings", lambda: settings)
+    student = SimpleNamespace(id=1, role="student")
+    admin = SimpleNamespace(id=2, role="admin")
+
+    AIUsageService.record_usage(db, 1, "learning_help", 100, 20)
+    status = AIUsageService.check_quota(db, student)
+    assert not status.exceeded and status.warnings == ["daily"]
+
+    AIUsageService.record_usage(db, 1, "learning_help", 100, 0)
+    AIUsageService.record_usage(db, 2, "generate_task", 1000, 1000)
+    assert AIUsageService.check_quota(db, student).exceeded
+    assert not AIUsageService.check_quota(db, admin).exceeded
+
+
+class _FakeClient:
+    def pop_usage_events(self):
+        return [{"prompt_tokens": 10, "completion_tokens": 5, "estimated": False}]
+
+
+def test_interaction_log_is_flushed_with_the_request_and_failures_are_isolated(monkeypatch, db, make_chapter):
+    monkeypatch.setattr("app.services.ai_service.AIClient", _FakeClient)
+    chapter = make_chapter()
+    service = AIService(db, user_id=7)
+
+    service._log_interaction("generate_task", {"level": 1}, {"ok": True})
+    assert db.query(AIAssistantLog).count() == 1
+    db.rollback()  # 请求失败：日志随请求一起回滚，没有在中途提交
+    assert db.query(AIAssistantLog).count() == 0
+
+    chapter.name = "caller"
+    service._log_interaction("generate_task", {"level": 1}, {"bad": object()})  # 无法序列化，写入失败
+    service._log_interaction("generate_task", {"level": 2}, {"ok": True})
+    db.commit()
+    assert [log.input_data for log in db.query(AIAssistantLog)] == [{"level": 2}]
+    assert db.query(AIUsageRecord).count() == 2  # 日志写入失败时用量仍然记录
+    db.expire_all()
+    assert db.get(Chapter, chapter.id).name == "caller"
@@ -1,13 +1,4 @@
-import os
-from pathlib import Path
-
-TEST_DB = Path(__file__).parent / "test.db"
-if TEST_DB.exists():
-    TEST_DB.unlink()
-
-os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
-
-from app.main import create_app  # noqa: E402
+from app.main import create_app
 
 app = create_app()
 client = app.test_client()
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.authorization import AuthorizationResolver
+from app.db.index_advisor import QueryCapture
+from app.models import Task, TaskPhase, TaskStep
+
+
+@pytest.fixture
+def seed(db, make_level):
+    task = Task(level_id=make_level(teacher_id=7).id, name="t")
+    db.add(task)
+    db.flush()
+    phases = [TaskPhase(task_id=task.id, phase_name=f"p{i}", order=i) for i in range(3)]
+    db.add_all(phases)
+    db.flush()
+    step = TaskStep(phase_id=phases[0].id, step_name="s")
+    db.add(step)
+    db.commit()
+    return task, phases, step
+
+
+def test_resolve_step_in_one_query_and_memoize(db, seed):
+    task, phases, step = seed
+    task_id, phase_ids, step_id = task.id, [p.id for p in phases], step.id
+    db.expunge_all()
+    resolver = AuthorizationResolver(db)
+    owner = SimpleNamespace(id=7, role="teacher")
+    other = SimpleNamespace(id=8, role="teacher")
+    admin = SimpleNamespace(id=1, role="admin")
+
+    with QueryCapture() as capture:
+        node, err = resolver.check(owner, "step", step_id, task=task_id, phase=phase_ids[0])
+        assert err is None and node.entity.id == step_id and node.teacher_id == 7
+        assert resolver.check(other, "step", step_id)[1] == ("无权操作此任务", 403)
+        assert resolver.check(admin, "step", step_id)[1] is None
+    assert sum(s.count for s in capture.statements.values()) == 1
+
+    assert resolver.check(owner, "step", step_id, phase=phase_ids[1])[1] == ("步骤不存在", 404)
+    assert resolver.check(owner, "task", 999)[1] == ("任务不存在", 404)
+
+
+def test_preload_children_skips_queries(db, seed):
+    task, phases, _ = seed
+    resolver = AuthorizationResolver(db)
+    task_node = resolver.resolve("task", task.id)
+    resolver.preload("phase", phases, task_node)
+
+    with QueryCapture() as capture:
+        for phase in phases:
+            node, err = resolver.check(SimpleNamespace(id=7, role="teacher"), "phase", phase.id, task=task.id)
+            assert err is None and node.ancestor_id("chapter") == task_node.ancestor_id("chapter")
+    assert capture.statements == {}
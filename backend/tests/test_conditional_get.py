@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import event
+
+from app.api.routes.level_maps import level_maps_bp
+from app.api.routes.levels import levels_bp
+from app.core import security
+from app.models import CourseDataVersion, Level
+from app.services.course_data_version_service import CourseDataVersionService
+from app.services.level_map_service import LevelMapService
+
+
+@pytest.fixture
+def client(monkeypatch, engine, Session, db, make_level):
+    level = make_level(teaching_guide_md="# guide " * 5000)
+    CourseDataVersionService.record(db, level, {"steps": [{"title": "s"}], "meta": {}})
+    LevelMapService.create_or_update_map(db, level.chapter_id, '{"nodes": []}')
+    db.commit()
+    ids = SimpleNamespace(chapter=level.chapter_id, level=level.id)
+    db.close()
+
+    monkeypatch.setattr(security, "get_current_user", lambda: SimpleNamespace(id=1, role="teacher"))
+    app = Flask(__name__)
+    app.register_blueprint(levels_bp)
+    app.register_blueprint(level_maps_bp)
+    app.before_request(lambda: setattr(g, "db", Session()))
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return app.test_client(), ids, statements, Session
+
+
+@pytest.mark.parametrize("path", ["/api/v1/levels/{level}", "/api/v1/levels/{level}/course-data", "/api/v1/chapters/{chapter}/map"])
+def test_matching_validators_get_304_without_loading_content(client, path):
+    client, ids, statements, _ = client
+    url = path.format(level=ids.level, chapter=ids.chapter)
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"] and first.headers["Last-Modified"]
+
+    statements.clear()
+    by_etag = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert by_etag.status_code == 304 and by_etag.data == b""
+    assert by_etag.headers["ETag"] == first.headers["ETag"]
+    assert not any("content_blobs" in s or "map_config_json" in s for s in statements)
+
+    by_date = client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert by_date.status_code == 304
+
+
+@pytest.mark.parametrize("path", ["/api/v1/levels/{level}", "/api/v1/levels/{level}/course-data"])
+def test_changed_course_data_is_sent_again(client, path):
+    client, ids, _, Session = client
+    url = path.format(level=ids.level)
+    etag = client.get(url).headers["ETag"]
+
+    db = Session()
+    CourseDataVersionService.record(db, db.get(Level, ids.level), {"steps": [], "meta": {"title": "new"}})
+    db.commit()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "new" in response.get_data(as_text=True)
+    assert response.headers["ETag"] != etag
+
+
+def test_level_update_checks_the_course_data_version(client):
+    client, ids, _, Session = client
+    url = f"/api/v1/levels/{ids.level}"
+    etag = client.get(url).headers["ETag"]
+
+    db = Session()
+    CourseDataVersionService.record(db, db.get(Level, ids.level), {"steps": [], "meta": {"title": "newer"}})
+    db.commit()
+
+    body = {"course_data_json": '{"steps": []}'}
+    assert client.put(url, json={**body, "version": 1}).status_code == 428
+    stale = client.put(url, json=body, headers={"If-Match": etag})
+    assert stale.status_code == 409 and stale.get_json()["current_version"] == 2
+    assert client.put(url, json={**body, "version": 1, "course_data_base_version": 2}).status_code == 200
+    assert client.put(url, json={"name": "renamed"}, headers={"If-Match": etag}).status_code == 200
+
+
+def test_restore_racing_with_a_save_is_a_conflict(client):
+    client, ids, _, Session = client
+    db = Session()
+    CourseDataVersionService.record(db, db.get(Level, ids.level), {"steps": [], "meta": {}})
+    # 另一个请求已写入版本 3，但本请求读到的关卡仍停留在版本 2
+    db.add(CourseDataVersion(level_id=ids.level, version=3, kind="delta", patch_json="[]"))
+    db.commit()
+
+    response = client.post(f"/api/v1/levels/{ids.level}/course-data/versions/1/restore")
+    assert response.status_code == 409 and "Integrity" not in response.get_data(as_text=True)
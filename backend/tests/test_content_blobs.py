@@ -0,0 +1,87 @@
+import pytest
+
+from app.core.compression import decompress
+from app.models import ContentBlob, Level
+from app.models.content_blob import content_hash
+from app.services.course_data_version_service import CourseDataVersionService
+from scripts.migrate_content_blobs import _recount_references
+
+GUIDE = "# 实验指导书\n\n" + "按步骤完成实验并提交报告。\n" * 2000
+
+
+@pytest.fixture
+def chapter_id(make_chapter):
+    return make_chapter().id
+
+
+def _blobs(db) -> dict:
+    return {blob.hash: blob.ref_count for blob in db.query(ContentBlob).populate_existing()}
+
+
+def test_identical_content_is_stored_once_and_compressed(Session, db, chapter_id):
+    db.add_all([Level(chapter_id=chapter_id, name=f"l{i}", teaching_guide_md=GUIDE) for i in range(3)])
+    db.commit()
+
+    digest = content_hash(GUIDE)
+    assert _blobs(db) == {digest: 3}
+    blob = db.get(ContentBlob, digest)
+    assert blob.size == len(GUIDE.encode("utf-8")) and len(blob.data) < blob.size // 10
+    assert decompress(blob.codec, blob.data).decode("utf-8") == GUIDE
+
+    # 新会话中读取：列表查询不加载内容，访问属性时才加载并解压
+    other = Session()
+    levels = other.query(Level).order_by(Level.id).all()
+    assert "teaching_guide_blob" not in levels[0].__dict__
+    assert all(level.teaching_guide_md == GUIDE for level in levels)
+    assert levels[0].course_data_json is None
+
+
+def test_reference_counts_follow_updates_and_deletes(Session, db, chapter_id):
+    first = Level(chapter_id=chapter_id, name="a", teaching_guide_md=GUIDE, course_data_json='{"steps": []}')
+    second = Level(chapter_id=chapter_id, name="b", teaching_guide_md=GUIDE)
+    db.add_all([first, second])
+    db.commit()
+
+    # 赋相同内容不改变计数
+    second.teaching_guide_md = GUIDE
+    db.commit()
+    assert _blobs(db)[content_hash(GUIDE)] == 2
+
+    first.teaching_guide_md = "new guide"
+    db.commit()
+    assert _blobs(db) == {content_hash(GUIDE): 1, content_hash("new guide"): 1, content_hash('{"steps": []}'): 1}
+
+    db.delete(second)
+    first.course_data_json = None
+    db.commit()
+    assert _blobs(db) == {content_hash("new guide"): 1}
+    assert Session().get(Level, first.id).teaching_guide_md == "new guide"
+
+
+def test_rolled_back_flush_leaves_counts_unchanged(db, chapter_id):
+    level = Level(chapter_id=chapter_id, name="a", teaching_guide_md=GUIDE)
+    db.add(level)
+    db.commit()
+
+    level.teaching_guide_md = "draft"
+    db.flush()
+    db.rollback()
+    assert _blobs(db) == {content_hash(GUIDE): 1}
+    assert level.teaching_guide_md == GUIDE
+
+
+def test_recount_keeps_blobs_referenced_only_by_history(engine, db, make_level):
+    level = make_level(teaching_guide_md=GUIDE)
+    CourseDataVersionService.record(db, level, {"steps": [], "meta": {"title": "v1"}})
+    db.commit()
+    CourseDataVersionService.record(db, level, {"steps": [], "meta": {"title": "v2"}})
+    level.teaching_guide_md = None
+    db.commit()
+    counts = _blobs(db)
+    assert len(counts) == 2  # 当前课程数据 + 只被历史快照引用的版本 1
+
+    db.query(ContentBlob).update({ContentBlob.ref_count: 0})
+    db.commit()
+    _recount_references(engine)
+    assert _blobs(db) == counts
+    assert CourseDataVersionService.get_version_data(db, level.id, 1) == {"steps": [], "meta": {"title": "v1"}}
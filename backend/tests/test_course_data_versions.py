@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.core.config import get_settings
+from app.core.exceptions import ConflictError
+from app.core.json_patch import JsonPatchError
+from app.models import ContentBlob, CourseDataVersion
+from app.services.course_data_version_service import CourseDataVersionService
+from app.services.level_service import LevelService
+
+
+@pytest.fixture
+def level(make_level):
+    return make_level()
+
+
+def _document(n_steps: int) -> dict:
+    return {"meta": {"title": "lab"}, "steps": [{"title": f"step {i}", "content": "说明" * 300} for i in range(n_steps)]}
+
+
+def test_any_version_is_rebuilt_from_snapshot_plus_bounded_replay(engine, db, level):
+    interval = get_settings().course_data_snapshot_interval
+    history = []
+    doc = _document(40)
+    for i in range(interval * 2 + 5):
+        doc = json.loads(json.dumps(doc))
+        doc["steps"][i % 40]["title"] = f"edited {i}"
+        CourseDataVersionService.record(db, level, doc, user_id=1)
+        history.append(doc)
+    db.commit()
+    assert level.course_data_version == len(history)
+
+    entries = db.query(CourseDataVersion).order_by(CourseDataVersion.version).all()
+    snapshots = [e.version for e in entries if e.kind == "snapshot"]
+    assert snapshots == [1, interval + 1, interval * 2 + 1]
+    # 补丁只记录改动，远小于全文
+    full_size = len(json.dumps(doc, ensure_ascii=False).encode("utf-8"))
+    assert max(e.size for e in entries if e.kind == "delta") < full_size / 50
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    for version in (1, interval, interval + 3, len(history)):
+        statements.clear()
+        assert CourseDataVersionService.get_version_data(db, level.id, version) == history[version - 1]
+        assert len(statements) == 1
+
+
+def test_unchanged_content_does_not_add_a_version_and_restore_appends(db, level):
+    first, second = _document(3), _document(4)
+    CourseDataVersionService.record(db, level, first)
+    assert CourseDataVersionService.record(db, level, first) is None
+    CourseDataVersionService.record(db, level, second)
+
+    assert CourseDataVersionService.diff(db, level.id, 1, 2) == [
+        {"op": "add", "path": "/steps/3", "value": second["steps"][3]}
+    ]
+    entry = CourseDataVersionService.restore(db, level, 1, user_id=9)
+    db.commit()
+    assert (entry.version, entry.source, entry.restored_from) == (3, "restore", 1)
+    assert json.loads(level.course_data_json) == first
+    assert [v.version for v in CourseDataVersionService.get_versions(db, level.id)] == [3, 2, 1]
+
+
+def test_existing_content_becomes_version_one_and_delete_releases_snapshots(db, level):
+    original = _document(5)
+    level.course_data_json = json.dumps(original)
+    db.commit()
+
+    edited = json.loads(json.dumps(original))
+    edited["meta"]["title"] = "renamed"
+    LevelService.update_level(db, level.id, course_data_json=json.dumps(edited))
+    db.commit()
+    entries = db.query(CourseDataVersion).order_by(CourseDataVersion.version).all()
+    assert [(e.version, e.kind, e.source) for e in entries] == [(1, "snapshot", "initial"), (2, "delta", "edit")]
+    assert CourseDataVersionService.get_version_data(db, level.id, 1) == original
+
+    LevelService.delete_level(db, level.id)
+    db.commit()
+    assert db.query(CourseDataVersion).count() == 0
+    assert db.query(ContentBlob).count() == 0
+
+
+def test_client_patch_requires_the_current_base_version(db, level):
+    CourseDataVersionService.record(db, level, _document(30))
+    ops = [{"op": "replace", "path": "/steps/2/title", "value": "moved"}]
+
+    entry = CourseDataVersionService.patch(db, level, ops, base_version=1)
+    assert (entry.version, entry.kind, json.loads(entry.patch_json)) == (2, "delta", ops)
+    assert json.loads(level.course_data_json)["steps"][2]["title"] == "moved"
+
+    with pytest.raises(ConflictError):
+        CourseDataVersionService.patch(db, level, ops, base_version=1)
+    with pytest.raises(JsonPatchError):
+        CourseDataVersionService.patch(db, level, [{"op": "remove", "path": "/missing"}], base_version=2)
+    assert level.course_data_version == 2
+
+
+def test_switching_a_value_type_is_saved_as_a_new_version(db, level):
+    CourseDataVersionService.record(db, level, {"steps": [1]})
+    assert CourseDataVersionService.record(db, level, {"steps": [True]}) is not None
+    assert CourseDataVersionService.record(db, level, {"steps": [1.0]}) is not None
+    assert json.loads(level.course_data_json) == {"steps": [1.0]} and level.course_data_version == 3
+    assert CourseDataVersionService.get_version_data(db, level.id, 2) == {"steps": [True]}
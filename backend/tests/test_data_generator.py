@@ -0,0 +1,79 @@
+import csv
+import json
+
+import pytest
+
+from app.services.data_generator import SchemaError, generate_batches, normalize_schema, write_dataset
+
+SCHEMA = {
+    "columns": [
+        {"name": "员工编号", "type": "sequence", "start": 1, "prefix": "E", "width": 4},
+        {"name": "姓名", "type": "name"},
+        {"name": "部门", "type": "choice", "values": ["销售", "技术"], "weights": [3, 1]},
+        {"name": "月薪", "type": "float", "distribution": "normal", "mean": 8000, "std": 2000, "min": 3000, "max": 20000},
+        {"name": "入职日期", "type": "date", "start": "2020-01-01", "end": "2020-12-31"},
+        {"name": "电话", "type": "phone", "null_rate": 0.2},
+    ]
+}
+
+
+def test_generation_is_reproducible_and_independent_of_batch_size():
+    schema = normalize_schema(SCHEMA)
+    small = [row for batch in generate_batches(schema, 250, seed=42, batch_size=7) for row in batch]
+    large = [row for batch in generate_batches(schema, 250, seed=42) for row in batch]
+    assert small == large
+    assert small[0][0] == "E0001" and small[-1][0] == "E0250"
+    assert all(3000 <= row[3] <= 20000 for row in small)
+    assert any(row[5] is None for row in small)
+
+    other = [row for batch in generate_batches(schema, 250, seed=43) for row in batch]
+    assert other != small
+
+
+@pytest.mark.parametrize("file_format", ["csv", "json", "txt"])
+def test_write_dataset_streams_requested_rows(tmp_path, file_format):
+    path = tmp_path / f"data.{file_format}"
+    progress = []
+    preview = write_dataset(
+        normalize_schema(SCHEMA), path, file_format, 25_000, seed=1,
+        progress_callback=lambda written, total: progress.append(written),
+    )
+    assert len(preview) == 10
+    assert progress[-1] == 25_000
+
+    if file_format == "json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        assert len(rows) == 25_000 and rows[0] == preview[0]
+    elif file_format == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            assert sum(1 for _ in csv.reader(f)) == 25_001
+    else:
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 25_001
+
+
+def test_normalize_schema_rejects_invalid_columns():
+    with pytest.raises(SchemaError):
+        normalize_schema({"columns": []})
+    with pytest.raises(SchemaError):
+        normalize_schema({"columns": [{"name": "a", "type": "choice"}]})
+    with pytest.raises(SchemaError):
+        normalize_schema({"columns": [{"name": "a", "type": "int", "min": 5, "max": 1}]})
+
+
+@pytest.mark.parametrize("column", [
+    {"name": "年龄", "type": "int", "min": "about 20", "max": 60},
+    {"name": "月薪", "type": "float", "mean": None},
+    {"name": "月薪", "type": "float", "std": "nan"},
+    {"name": "电话", "type": "phone", "null_rate": "5%"},
+    {"name": "在职", "type": "bool", "p": "often"},
+    {"name": "部门", "type": "choice", "values": ["a", "b"], "weights": [1, "x"]},
+    {"name": "编号", "type": "sequence", "start": [1]},
+])
+def test_normalize_schema_rejects_malformed_numbers(column):
+    with pytest.raises(SchemaError, match=column["name"]):
+        normalize_schema({"columns": [column]})
+
+
+def test_normalize_schema_coerces_numeric_strings():
+    col = normalize_schema({"columns": [{"name": "年龄", "type": "int", "min": "22", "max": 60.0}]})["columns"][0]
+    assert (col["min"], col["max"]) == (22, 60)
@@ -0,0 +1,119 @@
+import pytest
+from flask import Flask, g, jsonify, request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from werkzeug.exceptions import Unauthorized
+
+from app.core.revocation import get_revocation_list
+from app.core.security import create_access_token, get_current_user
+from app.core.user_cache import get_user_cache
+from app.db import routing, session as db_session
+from app.db.base import Base
+from app.db.routing import ReplicaPool, RoutingSession, read_only
+from app.models import Chapter, User
+
+
+def _engine(path, name):
+    engine = create_engine(f"sqlite:///{path / name}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _seed(engine, name):
+    db = sessionmaker(bind=engine)()
+    db.add(Chapter(name=name, teacher_id=1))
+    db.commit()
+    db.close()
+
+
+def test_reads_go_to_replica_until_session_writes(tmp_path):
+    primary, replica = _engine(tmp_path, "primary.db"), _engine(tmp_path, "replica.db")
+    _seed(primary, "primary")
+    _seed(replica, "replica")
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=ReplicaPool([replica]))
+
+    db = Session()
+    db.info["read_only"] = True
+    assert db.query(Chapter.name).scalar() == "replica"
+
+    db.add(Chapter(name="new", teacher_id=1))
+    db.flush()
+    # 写入后本会话的读取固定走主库
+    assert {name for (name,) in db.query(Chapter.name)} == {"primary", "new"}
+    db.commit()
+    db.close()
+
+    writer = Session()
+    assert writer.query(Chapter.name).order_by(Chapter.id).first() == ("primary",)
+    with read_only(writer):
+        assert writer.query(Chapter.name).scalar() == "replica"
+        with routing.primary(writer):
+            assert writer.query(Chapter.name).order_by(Chapter.id).first() == ("primary",)
+        assert writer.query(Chapter.name).scalar() == "replica"
+    writer.close()
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path):
+    primary = _engine(tmp_path, "primary.db")
+    _seed(primary, "primary")
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=ReplicaPool([broken]))
+
+    db = Session()
+    db.info["read_only"] = True
+    assert db.query(Chapter.name).scalar() == "primary"
+    db.close()
+
+
+def test_client_reads_from_primary_shortly_after_writing(tmp_path, monkeypatch):
+    primary_engine, replica = _engine(tmp_path, "primary.db"), _engine(tmp_path, "replica.db")
+    _seed(replica, "replica")
+    Session = sessionmaker(class_=RoutingSession, bind=primary_engine, replicas=ReplicaPool([replica]))
+    monkeypatch.setattr(db_session, "SessionLocal", Session)
+
+    app = Flask(__name__)
+    app.after_request(db_session.pin_reads_after_write)
+    app.after_request(db_session.commit_db)
+    app.teardown_appcontext(db_session.close_db)
+
+    @app.route("/chapters", methods=["GET", "POST"])
+    def chapters():
+        db = db_session.get_db()
+        if request.method == "POST":
+            db.add(Chapter(name="new", teacher_id=1))
+            return jsonify({}), 201
+        return jsonify(sorted(name for (name,) in db.query(Chapter.name)))
+
+    client = app.test_client()
+    assert client.get("/chapters").get_json() == ["replica"]
+    assert not client.get_cookie(db_session.PRIMARY_READS_COOKIE)
+
+    # 副本尚未同步刚提交的写入：随后的读请求走主库
+    assert client.post("/chapters").status_code == 201
+    assert client.get_cookie(db_session.PRIMARY_READS_COOKIE)
+    assert client.get("/chapters").get_json() == ["new"]
+    with app.test_request_context(headers={"Cookie": f"{db_session.PRIMARY_READS_COOKIE}=0"}):
+        assert db_session.get_db().info["read_only"]
+
+
+def test_authentication_reads_the_primary(tmp_path):
+    primary_engine, replica = _engine(tmp_path, "primary.db"), _engine(tmp_path, "replica.db")
+    for engine, active in ((primary_engine, False), (replica, True)):
+        db = sessionmaker(bind=engine)()
+        db.add(User(id=1, nickname="u", hashed_password="x", is_active=active))
+        db.commit()
+        db.close()
+    Session = sessionmaker(class_=RoutingSession, bind=primary_engine, replicas=ReplicaPool([replica]))
+    get_revocation_list().reset()
+    get_user_cache().clear()
+
+    # 副本上尚未同步停用：GET 请求的鉴权仍以主库为准
+    app = Flask(__name__)
+    with app.test_request_context(headers={"Authorization": f"Bearer {create_access_token('1')}"}):
+        g.db = Session()
+        g.db.info["read_only"] = True
+        with pytest.raises(Unauthorized):
+            get_current_user()
+        assert g.db.query(User.is_active).scalar() is True
+        g.db.close()
+    get_user_cache().clear()
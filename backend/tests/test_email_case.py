@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models import User
+from app.schemas.auth import UserCreate
+from app.services.auth import AuthError, AuthService
+from app.services.user_service import UserService
+
+
+def test_emails_are_stored_lower_case_and_unique_ignoring_case(db):
+    user = AuthService(db).register_user(UserCreate(email="Zhang.San@Example.com", nickname="z", password="secret1"))
+    assert user.email == "zhang.san@example.com"
+
+    with pytest.raises(AuthError):
+        AuthService(db).register_user(UserCreate(email="ZHANG.SAN@example.com", nickname="z", password="secret1"))
+    with pytest.raises(ValueError):
+        UserService(db).create_user("zhang.san@EXAMPLE.com", None, None, "z", "secret1")
+
+    other = UserService(db).create_user("li.si@example.com", None, None, "l", "secret1")
+    with pytest.raises(ValueError):
+        UserService(db).update_user(other.id, email="Zhang.San@example.com")
+
+
+def test_database_rejects_emails_differing_only_in_case(db):
+    db.add(User(email="a@example.com", nickname="a", hashed_password="x"))
+    db.commit()
+    db.add(User(email="A@example.com", nickname="b", hashed_password="x"))
+    with pytest.raises(IntegrityError):
+        db.commit()
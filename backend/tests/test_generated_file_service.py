@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+
+from app.services import generated_file_service as files
+
+
+def test_store_text_uses_content_hash_and_updates_alias(tmp_path):
+    first = files.store_text("a,b\n1,2\n", "销售_sample.csv", directory=tmp_path)
+    assert files.is_hashed_name(first.name)
+    assert files.resolve_alias("销售_sample.csv", directory=tmp_path) == first.name
+
+    again = files.store_text("a,b\n1,2\n", "其他_sample.csv", directory=tmp_path)
+    assert again.name == first.name
+
+    second = files.store_text("a,b\n3,4\n", "销售_sample.csv", directory=tmp_path)
+    assert second.name != first.name
+    assert files.resolve_alias("销售_sample.csv", directory=tmp_path) == second.name
+    assert not list(tmp_path.glob(".upload.*"))
+
+
+def test_large_files_get_gzip_variant(tmp_path):
+    stored = files.store_text("id,name\n" + "1,张三\n" * 2000, "big_sample.csv", directory=tmp_path)
+    assert stored.gzipped
+    assert (tmp_path / f"{stored.name}.gz").exists()
+
+
+def test_collect_garbage_keeps_aliased_and_referenced_files(tmp_path):
+    old = files.store_text("x\n1\n", "a_sample.csv", directory=tmp_path)
+    referenced = files.store_text("x\n2\n", "a_sample.csv", directory=tmp_path)
+    orphan = files.store_text("x\n3\n", "a_sample.csv", directory=tmp_path)
+    current = files.store_text("x\n4\n", "a_sample.csv", directory=tmp_path)
+    legacy = tmp_path / "旧文件_sample.csv"
+    legacy.write_text("x\n", encoding="utf-8")
+
+    past = time.time() - 10
+    for path in tmp_path.iterdir():
+        os.utime(path, (past, past))
+
+    # 保留期内不删除
+    assert files.collect_garbage([referenced.name], grace_seconds=3600, directory=tmp_path) == []
+
+    removed = files.collect_garbage([referenced.name], grace_seconds=1, directory=tmp_path)
+    assert set(removed) == {old.name, orphan.name}
+    remaining = {p.name for p in tmp_path.iterdir()}
+    assert {referenced.name, current.name, legacy.name} <= remaining
+
+
+def _store_aliases(directory, worker):
+    for i in range(20):
+        files.store_text(f"{worker},{i}\n", f"w{worker}_{i}_sample.csv", directory=directory)
+
+
+def test_concurrent_workers_do_not_lose_aliases(tmp_path):
+    # 模拟多个 gunicorn worker：各自的线程锁互不可见，只能靠文件锁串行化
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_store_aliases, args=(tmp_path, w)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(files.load_aliases(tmp_path)) == 80
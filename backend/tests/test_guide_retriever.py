@@ -0,0 +1,51 @@
+import json
+
+from app.services.guide_retriever import GuideRetriever, split_teaching_guide
+
+GUIDE = """# VLOOKUP 函数实验
+
+## 学习目标
+掌握 VLOOKUP 函数的语法与精确匹配。
+
+## 操作步骤
+1. 打开员工信息表。
+2. 在 C2 单元格输入 =VLOOKUP(A2, Sheet2!A:B, 2, FALSE)。
+
+## 课堂问答
+为什么第四个参数要写 FALSE？
+"""
+
+COURSE = json.dumps({
+    "meta": {"title": "数据透视表"},
+    "steps": [
+        {
+            "id": "step-1",
+            "title": "创建数据透视表",
+            "components": [{"type": "text", "config": {"content": "<p>选择插入菜单中的数据透视表</p>"}}],
+        }
+    ],
+}, ensure_ascii=False)
+
+
+def test_split_teaching_guide_keeps_heading_path():
+    passages = split_teaching_guide(GUIDE)
+    titles = [p.title for p in passages]
+    assert "VLOOKUP 函数实验 / 操作步骤" in titles
+
+
+def test_search_ranks_relevant_sections_within_budget():
+    retriever = GuideRetriever()
+    assert retriever.index_level(1, GUIDE, COURSE) is True
+    # 内容未变化时不重复建索引
+    assert retriever.index_level(1, GUIDE, COURSE) is False
+
+    results = retriever.search(1, "精确匹配为什么写 FALSE", top_k=2, token_budget=200)
+    assert results
+    assert results[0].title.endswith("课堂问答") or results[0].title.endswith("学习目标")
+    assert sum(p.tokens for p in results) <= 200
+
+    results = retriever.search(1, "如何插入数据透视表")
+    assert results[0].source == "course"
+
+    retriever.remove_level(1)
+    assert retriever.search(1, "VLOOKUP") == []
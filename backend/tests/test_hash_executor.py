@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core.hash_executor import BoundedHashExecutor, HashingBusyError
+from app.core.security import pwd_context
+from app.models import User
+from app.services.auth import AuthError, AuthService
+
+
+def test_executor_rejects_when_full_and_recovers():
+    executor = BoundedHashExecutor(max_workers=1, max_pending=0, wait_seconds=5)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    worker = threading.Thread(target=lambda: executor.run(block))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(HashingBusyError) as exc:
+        executor.run(lambda: None)
+    assert exc.value.retry_after >= 1
+    release.set()
+    worker.join()
+    assert executor.run(lambda: 42) == 42
+
+
+def test_executor_times_out_waiting():
+    executor = BoundedHashExecutor(max_workers=1, max_pending=1, wait_seconds=0.05)
+    release = threading.Event()
+    with pytest.raises(HashingBusyError):
+        executor.run(release.wait, 5)
+    release.set()
+
+
+def test_login_matches_email_case_insensitively_and_rehashes_old_parameters(db):
+    old_context = CryptContext(schemes=["argon2"], argon2__time_cost=1, argon2__memory_cost=8192, argon2__parallelism=1)
+    old_hash = old_context.hash("secret123")
+    db.add(User(email="Mixed@Example.com", nickname="m", hashed_password=old_hash, role="student"))
+    db.commit()
+
+    service = AuthService(db)
+    with pytest.raises(AuthError):
+        service.authenticate("mixed@example.com", "wrong")
+    user = service.authenticate("  MIXED@example.COM ", "secret123")
+    assert user.hashed_password != old_hash
+    assert not pwd_context.needs_update(user.hashed_password)
+    assert pwd_context.verify("secret123", user.hashed_password)
@@ -0,0 +1,14 @@
+from app.db.index_advisor import QueryCapture, analyze
+from app.models import AIAssistantLog, TaskPhase
+
+
+def test_advisor_reports_scans_and_temp_sorts_only_where_indexes_are_missing(engine, db):
+    with QueryCapture() as capture:
+        db.query(TaskPhase).filter(TaskPhase.task_id == 1).order_by(TaskPhase.order, TaskPhase.id).all()
+        db.query(AIAssistantLog).filter(AIAssistantLog.output_data.is_(None)).order_by(AIAssistantLog.input_data).all()
+
+    findings = analyze(engine, capture.statements)
+    assert len(capture.statements) == 2
+    assert not [f for f in findings if "task_phases" in f.sql]
+    kinds = {f.kind for f in findings if "ai_assistant_logs" in f.sql}
+    assert kinds == {"full_scan", "temp_sort"}
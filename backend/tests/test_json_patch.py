@@ -0,0 +1,86 @@
+import copy
+import random
+
+import pytest
+
+from app.core.json_patch import JsonPatchError, apply_patch, make_patch
+
+
+def _mutate(doc, rng):
+    """随机修改嵌套文档中的一处：增删数组元素、改写或删除对象键"""
+    node = doc
+    while True:
+        children = list(node.values()) if isinstance(node, dict) else node
+        containers = [child for child in children if isinstance(child, (dict, list))]
+        if not containers or rng.random() < 0.3:
+            break
+        node = rng.choice(containers)
+    if isinstance(node, list):
+        choice = rng.random()
+        if node and choice < 0.3:
+            node.pop(rng.randrange(len(node)))
+        elif node and choice < 0.6:
+            node[rng.randrange(len(node))] = {"title": f"t{rng.random()}"}
+        else:
+            node.insert(rng.randint(0, len(node)), rng.choice([1, "x", None, {"a": [1]}]))
+    else:
+        key = rng.choice(["title", "a/b", "~k", "new", *node.keys()])
+        if key in node and rng.random() < 0.3:
+            del node[key]
+        else:
+            node[key] = rng.choice([2, True, "y", [1, 2], {"z": 1}])
+
+
+def test_patch_round_trip_on_random_edits():
+    rng = random.Random(7)
+    old = {"meta": {"title": "lab"}, "steps": [{"title": f"s{i}", "items": list(range(i))} for i in range(6)]}
+    for _ in range(300):
+        new = copy.deepcopy(old)
+        for _ in range(rng.randint(1, 3)):
+            _mutate(new, rng)
+        patch = make_patch(old, new)
+        assert apply_patch(old, patch) == new
+        old = new
+
+
+def test_patch_size_follows_the_edit():
+    steps = [{"title": f"step {i}", "content": "x" * 200} for i in range(100)]
+    edited = steps[:50] + [{"title": "inserted"}] + steps[50:]
+    patch = make_patch({"steps": steps}, {"steps": edited})
+    assert patch == [{"op": "add", "path": "/steps/50", "value": {"title": "inserted"}}]
+    assert make_patch(steps, steps) == []
+
+
+def test_rfc6902_operations_and_errors():
+    doc = {"a": {"b": [1, 2]}, "c": "d"}
+    patched = apply_patch(doc, [
+        {"op": "test", "path": "/c", "value": "d"},
+        {"op": "add", "path": "/a/b/-", "value": 3},
+        {"op": "move", "from": "/c", "path": "/e"},
+        {"op": "copy", "from": "/a/b", "path": "/f"},
+        {"op": "replace", "path": "/a/b/0", "value": 0},
+        {"op": "remove", "path": "/f/1"},
+    ])
+    assert patched == {"a": {"b": [0, 2, 3]}, "e": "d", "f": [1, 3]}
+    assert doc == {"a": {"b": [1, 2]}, "c": "d"}
+
+    for bad in (
+        [{"op": "test", "path": "/c", "value": "x"}],
+        [{"op": "test", "path": "/a/b/0", "value": True}],
+        [{"op": "test", "path": "/a/b", "value": [1.0, 2]}],
+        [{"op": "remove", "path": "/missing"}],
+        [{"op": "add", "path": "/a/b/5", "value": 1}],
+        [{"op": "move", "from": "/a", "path": "/a/x"}],
+        [{"op": "unknown", "path": "/c"}],
+        {"op": "add"},
+    ):
+        with pytest.raises(JsonPatchError):
+            apply_patch(doc, bad)
+
+
+def test_type_only_changes_are_not_lost():
+    for old, new in [(1, True), (1, 1.0), (0, False), ({"a": [1]}, {"a": [True]})]:
+        patch = make_patch({"v": old}, {"v": new})
+        assert patch, (old, new)
+        result = apply_patch({"v": old}, patch)
+        assert type(result["v"]) is type(new) and result["v"] == new
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event
+
+from app.models import Level
+from app.schemas.level import LevelRead, LevelSummary
+from app.services.level_service import LevelService
+
+
+@pytest.fixture
+def seed(db, make_chapter):
+    def seed(n_levels: int) -> int:
+        chapter_id = make_chapter().id
+        db.add_all([
+            Level(chapter_id=chapter_id, name=f"l{i}", order=i, teaching_guide_md="#" * 50000, course_data_json="{}")
+            for i in range(n_levels)
+        ])
+        db.commit()
+        db.expunge_all()
+        return chapter_id
+    return seed
+
+
+def test_level_list_does_not_load_content_columns(engine, db, seed):
+    chapter_id = seed(5)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    levels = LevelService.get_levels_by_chapter(db, chapter_id)
+    summaries = [LevelSummary.model_validate(level).model_dump() for level in levels]
+    assert [s["name"] for s in summaries] == [f"l{i}" for i in range(5)]
+    assert "teaching_guide_md" not in summaries[0]
+    assert len(statements) == 1
+    assert "teaching_guide_md" not in statements[0] and "course_data_json" not in statements[0]
+
+
+def test_content_loads_with_the_main_query_when_requested(engine, db, seed):
+    chapter_id = seed(3)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    levels = LevelService.get_levels_by_chapter(db, chapter_id, content_fields=("teaching_guide_md",))
+    assert all(len(level.teaching_guide_md) == 50000 for level in levels)
+    assert len(statements) == 1 and "course_data_json" not in statements[0]
+
+    db.expunge_all()
+    statements.clear()
+    level = LevelService.get_level(db, levels[0].id, with_content=True)
+    data = LevelRead.model_validate(level).model_dump()
+    assert data["course_data_json"] == "{}"
+    assert len(statements) == 1
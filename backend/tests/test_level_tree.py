@@ -0,0 +1,56 @@
+import pytest
+
+from app.db.index_advisor import QueryCapture
+from app.models import KnowledgeCard, Task, TaskPhase, TaskStep
+from app.services.level_service import LevelService
+
+
+@pytest.fixture
+def seed(db, make_level):
+    def seed(n_tasks: int) -> int:
+        level = make_level(teaching_guide_md="# guide")
+        for i in range(n_tasks):
+            task = Task(level_id=level.id, name=f"t{i}")
+            db.add(task)
+            db.flush()
+            db.add(KnowledgeCard(task_id=task.id, title="k"))
+            for j in range(2):
+                phase = TaskPhase(task_id=task.id, phase_name=f"p{j}", order=j)
+                db.add(phase)
+                db.flush()
+                db.add_all([TaskStep(phase_id=phase.id, step_name=f"s{k}", order=k) for k in range(3)])
+        db.commit()
+        return level.id
+    return seed
+
+
+def _executed(capture: QueryCapture) -> int:
+    return sum(s.count for s in capture.statements.values())
+
+
+def test_tree_loads_with_fixed_number_of_queries(db, seed):
+    counts = []
+    for n_tasks in (1, 6):
+        level_id = seed(n_tasks)
+        db.expunge_all()
+        with QueryCapture() as capture:
+            level = LevelService.get_level_tree(db, level_id)
+            steps = [s for t in level.tasks for p in t.phases for s in p.steps]
+            cards = [c for t in level.tasks for c in t.knowledge_cards]
+        assert len(steps) == n_tasks * 6 and len(cards) == n_tasks
+        assert "teaching_guide_md" not in level.__dict__
+        counts.append(_executed(capture))
+    assert counts[0] == counts[1]
+
+
+def test_tree_version_changes_on_update_and_delete(db, seed):
+    level_id = seed(2)
+
+    version = LevelService.get_level_tree_version(db, level_id)
+    assert version == LevelService.get_level_tree_version(db, level_id)
+
+    step = db.query(TaskStep).first()
+    db.delete(step)
+    db.commit()
+    assert LevelService.get_level_tree_version(db, level_id) != version
+    assert LevelService.get_level_tree_version(db, 999) is None
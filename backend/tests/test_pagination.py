@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.exceptions import ValidationError
+from app.core.pagination import cached_count, encode_cursor, invalidate_count_cache, paginate_keyset
+from app.models import User
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def db(db):
+    base = datetime(2024, 1, 1)
+    # 每两个用户共用一个 created_at，验证 id 作为第二排序键
+    db.add_all(
+        [
+            User(nickname=f"u{i}", hashed_password="x", role="student" if i % 3 else "teacher",
+                 created_at=base + timedelta(minutes=i // 2))
+            for i in range(25)
+        ]
+    )
+    db.commit()
+    return db
+
+
+def test_cursor_walks_all_users_in_order_without_duplicates(db):
+    service = UserService(db)
+    seen, cursor = [], None
+    while True:
+        page = service.get_users_page(limit=7, cursor=cursor, with_total=False)
+        seen.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 25 and len({u.id for u in seen}) == 25
+    keys = [(u.created_at, u.id) for u in seen]
+    assert keys == sorted(keys, reverse=True)
+
+    expected = [u.id for u in db.query(User).filter(User.role == "teacher").order_by(User.created_at.desc(), User.id.desc())]
+    first = service.get_users_page(role="teacher", limit=5)
+    rest = service.get_users_page(role="teacher", limit=5, cursor=first.next_cursor)
+    assert [u.id for u in first.items + rest.items] == expected
+    assert first.total == len(expected)
+
+
+@pytest.mark.parametrize("values", [[[1]], [{"a": 1}], ["1"], [True], [None], ["2024-01-01T00:00:00", 1]])
+def test_cursor_values_must_match_the_key_types(db, values):
+    keys = [(User.created_at, True), (User.id, True)]
+    cursor = encode_cursor(values if len(values) == 2 else [datetime(2024, 1, 1), *values])
+    with pytest.raises(ValidationError):
+        paginate_keyset(db.query(User), keys, 5, cursor=cursor)
+
+
+def test_invalid_cursor_is_a_validation_error(db):
+    with pytest.raises(ValidationError):
+        paginate_keyset(db.query(User), [(User.id, False)], 5, cursor="not-a-cursor")
+
+
+def test_count_is_cached_until_invalidated(db):
+    query = db.query(User).filter(User.role == "student")
+    total = cached_count(query, "users-test")
+    db.add(User(nickname="new", hashed_password="x", role="student"))
+    db.commit()
+    assert cached_count(query, "users-test") == total
+    invalidate_count_cache("users-test")
+    assert cached_count(query, "users-test") == total + 1
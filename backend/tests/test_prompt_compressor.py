@@ -0,0 +1,50 @@
+from app.core.prompt_compressor import compress_markdown, restore_media
+
+IMAGE = "data:image/png;base64," + "iVBORw0KGgo" * 200
+
+MARKDOWN = f"""# 实验一
+
+![流程图]({IMAGE})
+
+| 姓名      |   部门     |
+| --------- | :--------: |
+| 张三      |   销售     |
+
+
+
+本实验所有数据均为虚构，仅用于课堂教学演示。
+
+```python
+def f():
+    return  1
+```
+
+## 实验二
+
+本实验所有数据均为虚构，仅用于课堂教学演示。
+"""
+
+
+def test_compress_markdown_strips_media_and_reports_savings():
+    compressed = compress_markdown(MARKDOWN)
+
+    assert "base64" not in compressed.text
+    assert "![流程图](media://1)" in compressed.text
+    assert "|姓名|部门|" in compressed.text
+    assert "|-|:-:|" in compressed.text
+    # 代码块内的空格保持原样
+    assert "    return  1" in compressed.text
+    # 重复的说明段落只保留一次
+    assert compressed.text.count("本实验所有数据均为虚构") == 1
+
+    actions = {item["action"]: item for item in compressed.report.actions}
+    assert actions["media"]["saved"] > 0
+    assert actions["boilerplate"]["saved"] > 0
+    assert compressed.report.total_saved > 0
+
+
+def test_restore_media_reinserts_placeholders():
+    compressed = compress_markdown(MARKDOWN)
+    result = {"steps": [{"components": [{"config": {"content": '<img src="media://1">'}}]}]}
+    restored = restore_media(result, compressed.media)
+    assert restored["steps"][0]["components"][0]["config"]["content"] == f'<img src="{IMAGE}">'
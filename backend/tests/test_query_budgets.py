@@ -0,0 +1,82 @@
+"""在开启 ENFORCE_QUERY_BUDGET 的应用上调用声明了 query_budget 的路由，超出预算即测试失败"""
+import uuid
+
+import pytest
+
+from app.core.security import create_access_token
+from app.db.session import SessionLocal
+from app.main import create_app
+from app.models import Chapter, Level, Task, User
+from app.services.course_data_version_service import CourseDataVersionService
+
+
+@pytest.fixture(scope="module")
+def api():
+    app = create_app()
+    app.config.update(TESTING=True, ENFORCE_QUERY_BUDGET=True)
+
+    db = SessionLocal()
+    teacher = User(nickname="budget", student_id=f"t-{uuid.uuid4().hex[:12]}", hashed_password="x", role="teacher")
+    db.add(teacher)
+    db.flush()
+    chapter = Chapter(name="c", teacher_id=teacher.id)
+    db.add(chapter)
+    db.flush()
+    level = Level(chapter_id=chapter.id, name="l", teaching_guide_md="# guide")
+    db.add(level)
+    db.flush()
+    CourseDataVersionService.record(db, level, {"steps": [{"title": "s"}]})
+    task = Task(level_id=level.id, name="t")
+    db.add(task)
+    db.commit()
+    ids = {"level": level.id, "task": task.id}
+    headers = {"Authorization": f"Bearer {create_access_token(str(teacher.id), version=teacher.token_version or 0)}"}
+    db.close()
+
+    client = app.test_client()
+    # 预热：首个请求还要加载用户缓存、同步吊销集合，之后才是稳定状态下的查询数
+    app.config["ENFORCE_QUERY_BUDGET"] = False
+    assert client.get(f"/api/v1/levels/{ids['level']}", headers=headers).status_code == 200
+    app.config["ENFORCE_QUERY_BUDGET"] = True
+    return client, headers, ids
+
+
+def test_get_level_stays_within_budget(api):
+    client, headers, ids = api
+    response = client.get(f"/api/v1/levels/{ids['level']}", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["teaching_guide_md"] == "# guide"
+
+
+def test_replace_phases_stays_within_budget(api):
+    client, headers, ids = api
+    url = f"/api/v1/tasks/{ids['task']}/phases"
+    body = {"phases": [{"phase_name": f"p{i}", "steps": [{"step_name": f"s{j}"} for j in range(5)]} for i in range(20)]}
+    response = client.put(url, json=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+    phases = response.get_json()
+    body = {"phases": [
+        {"id": phases[0]["id"], "phase_name": "renamed", "steps": [{"id": phases[0]["steps"][0]["id"], "step_name": "kept"}]},
+        {"phase_name": "new", "steps": [{"step_name": "n"}]},
+    ]}
+    response = client.put(url, json=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert [p["phase_name"] for p in response.get_json()] == ["renamed", "new"]
+
+
+def test_replace_task_questions_stays_within_budget(api):
+    client, headers, ids = api
+    url = f"/api/v1/tasks/{ids['task']}/questions"
+    body = {"questions": [{"question_type": "single_choice", "title": f"q{i}"} for i in range(30)]}
+    response = client.put(url, json=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+    questions = response.get_json()
+    body = {"questions": [
+        {"id": q["id"], "version": q["version"], "question_type": q["question_type"], "title": f"{q['title']}!"}
+        for q in questions[:20]
+    ] + [{"question_type": "single_choice", "title": "new"}]}
+    response = client.put(url, json=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert len(response.get_json()) == 21
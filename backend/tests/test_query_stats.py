@@ -0,0 +1,39 @@
+import pytest
+
+from app.db.query_stats import QueryBudgetExceeded, query_budget, statement_shape
+from app.db.session import get_db
+from app.main import create_app
+from app.models import Chapter
+
+
+def _app():
+    app = create_app()
+    app.config.update(TESTING=True, ENFORCE_QUERY_BUDGET=True)
+
+    @app.route("/_test/queries/<int:n>")
+    @query_budget(2)
+    def run_queries(n: int):
+        db = get_db()
+        for chapter_id in range(n):
+            db.query(Chapter).filter(Chapter.id == chapter_id).first()
+        return {"ok": True}
+
+    return app
+
+
+def test_statement_shape_ignores_literals_and_in_list_length():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'") == statement_shape(
+        "SELECT * FROM t WHERE id IN (?) AND name = 'y'"
+    )
+
+
+def test_server_timing_header_and_budget_enforcement(caplog):
+    client = _app().test_client()
+
+    response = client.get("/_test/queries/2")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+
+    with caplog.at_level("WARNING"), pytest.raises(QueryBudgetExceeded):
+        client.get("/_test/queries/6")
+    assert any("Possible N+1" in record.message for record in caplog.records)
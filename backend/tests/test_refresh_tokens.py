@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask, g
+from werkzeug.exceptions import Unauthorized
+
+from app.core.revocation import BloomFilter, RevocationList, get_revocation_list
+from app.core.security import get_current_user
+from app.core.user_cache import get_user_cache
+from app.models import RevokedToken, User
+from app.services.auth import AuthError, AuthService
+from app.services.user_service import UserService
+
+app = Flask(__name__)
+
+
+@pytest.fixture
+def db(db):
+    get_revocation_list().reset()
+    get_user_cache().clear()
+    yield db
+    get_revocation_list().reset()
+    get_user_cache().clear()
+
+
+def _user(db, role="student"):
+    user = User(nickname="u", hashed_password="x", role=role)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _current(db, access_token):
+    with app.test_request_context(headers={"Authorization": f"Bearer {access_token}"}):
+        g.db = db
+        return get_current_user()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"fam:{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_refresh_rotates_and_reuse_revokes_the_session(db):
+    user = _user(db)
+    service = AuthService(db)
+    first = service.issue_tokens(user)
+    db.commit()
+    assert _current(db, first["access_token"]).id == user.id
+
+    _, second = service.refresh(first["refresh_token"])
+    db.commit()
+    assert second["refresh_token"] != first["refresh_token"]
+    assert _current(db, second["access_token"]).id == user.id
+
+    with pytest.raises(AuthError):
+        service.refresh(first["refresh_token"])  # replayed: whole family is revoked
+    with pytest.raises(Unauthorized):
+        _current(db, second["access_token"])
+    with pytest.raises(AuthError):
+        service.refresh(second["refresh_token"])
+
+    # another process learns about the revocation from the table
+    assert db.query(RevokedToken).count() == 1
+    get_revocation_list().reset()
+    with pytest.raises(Unauthorized):
+        _current(db, second["access_token"])
+
+
+def test_logout_only_ends_that_session(db):
+    user = _user(db)
+    service = AuthService(db)
+    phone, laptop = service.issue_tokens(user), service.issue_tokens(user)
+    db.commit()
+    with app.test_request_context(headers={"Authorization": f"Bearer {phone['access_token']}"}):
+        g.db = db
+        get_current_user()
+        payload = g.token_payload
+    service.revoke_session(payload["fam"])
+    db.commit()
+    with pytest.raises(Unauthorized):
+        _current(db, phone["access_token"])
+    assert _current(db, laptop["access_token"]).id == user.id
+
+
+def test_disabling_a_user_revokes_every_token(db):
+    user = _user(db)
+    tokens = AuthService(db).issue_tokens(user)
+    db.commit()
+    assert _current(db, tokens["access_token"]).id == user.id
+
+    UserService(db).update_user(user.id, is_active=False)
+    db.commit()
+    UserService(db).update_user(user.id, is_active=True)
+    db.commit()
+    with pytest.raises(Unauthorized):
+        _current(db, tokens["access_token"])
+    with pytest.raises(AuthError):
+        AuthService(db).refresh(tokens["refresh_token"])
+
+    fresh = AuthService(db).issue_tokens(db.get(User, user.id))
+    db.commit()
+    assert _current(db, fresh["access_token"]).id == user.id
+
+
+def test_extended_revocation_reaches_other_processes(db):
+    soon, later = datetime.utcnow() + timedelta(minutes=1), datetime.utcnow() + timedelta(hours=1)
+    get_revocation_list().revoke(db, "fam:x", soon)
+    db.commit()
+    other = RevocationList(capacity=100, error_rate=0.01, sync_seconds=0, full_sync_seconds=3600)
+    other.maybe_sync(db)
+
+    # the row keeps its id, so the incremental sync cannot see the new expiry
+    get_revocation_list().revoke(db, "fam:x", later)
+    db.commit()
+    other.maybe_sync(db)
+    assert other._expires["fam:x"] == soon
+
+    other.full_sync_seconds = 0
+    other.maybe_sync(db)
+    assert other._expires["fam:x"] == later
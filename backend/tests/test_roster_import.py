@@ -0,0 +1,60 @@
+import io
+
+import pytest
+
+from app.core.exceptions import ValidationError
+from app.core.security import verify_password
+from app.models import User
+from app.services.roster_import import RosterImportService, get_hash_pool, shutdown_hash_pool
+
+ROSTER = """学号,姓名,手机号,密码,班级
+20240001,张三,13800000001,pass1234,一班
+20240002,李四,,,一班
+20240003,王五,13800000003,pass1234,二班
+20240001,重复,,pass1234,二班
+x,太短,,pass1234,二班
+,,,,
+19990001,已存在,,pass1234,三班
+"""
+
+
+@pytest.fixture
+def db(db):
+    db.add(User(nickname="老用户", student_id="19990001", hashed_password="x"))
+    db.commit()
+    return db
+
+
+def test_import_reports_row_errors_and_inserts_valid_rows(db):
+    rows = RosterImportService.parse("roster.csv", io.BytesIO(("﻿" + ROSTER).encode("utf-8")))
+    assert len(rows) == 6
+
+    events = list(RosterImportService.run(db, rows))
+    result = events[-1]
+    assert [e["type"] for e in events] == ["progress", "progress", "result"]
+    assert result["created"] == 2
+    assert [e["line"] for e in result["errors"]] == [3, 5, 6, 8]
+
+    user = db.query(User).filter(User.student_id == "20240003").one()
+    assert user.class_name == "二班" and user.role == "student"
+    assert verify_password("pass1234", user.hashed_password)
+
+
+def test_default_password_and_dry_run(db):
+    rows = RosterImportService.parse("roster.csv", io.BytesIO(ROSTER.encode("utf-8")))
+    result = list(RosterImportService.run(db, rows, default_password="init5678", dry_run=True))[-1]
+    assert result["valid"] == 3 and result["created"] == 0
+    assert db.query(User).count() == 1
+
+
+def test_rejects_roster_without_identity_columns():
+    with pytest.raises(ValidationError):
+        RosterImportService.parse("roster.csv", io.BytesIO("姓名,班级\n张三,一班\n".encode("utf-8")))
+
+
+def test_hash_pool_spawns_workers_and_can_be_shut_down():
+    pool = get_hash_pool()
+    assert pool._mp_context.get_start_method() == "spawn"
+    assert get_hash_pool() is pool
+    shutdown_hash_pool()
+    assert get_hash_pool() is not pool
@@ -0,0 +1,91 @@
+import pytest
+from werkzeug.datastructures import ETags
+
+from app.core.conditional import required_version
+from app.core.exceptions import PreconditionRequiredError, VersionConflictError
+from app.models import Level, Question
+from app.services.course_data_version_service import CourseDataVersionService
+from app.services.level_map_service import LevelMapService
+from app.services.level_service import LevelService
+from app.services.question_service import QuestionService
+
+
+@pytest.fixture
+def ids(make_level):
+    level = make_level()
+    return level.chapter_id, level.id
+
+
+def test_update_checks_the_client_version_and_bumps_it(Session, ids):
+    _, level_id = ids
+    db = Session()
+    level = LevelService.update_level(db, level_id, name="first", expected_version=1)
+    db.commit()
+    assert level.version == 2
+
+    with pytest.raises(VersionConflictError) as conflict:
+        LevelService.update_level(db, level_id, name="stale", expected_version=1)
+    assert conflict.value.current_version == 2
+    db.rollback()
+    assert db.get(Level, level_id).name == "first"
+
+
+def test_write_after_a_concurrent_update_is_a_conflict(Session, ids):
+    # 两个会话共用同一个内存库，模拟两个并发请求
+    _, level_id = ids
+    first, second = Session(), Session()
+    first.get(Level, level_id)
+    second.get(Level, level_id)
+
+    LevelService.update_level(second, level_id, name="second", expected_version=1)
+    second.commit()
+
+    # first 读到的仍是版本 1：客户端版本检查通过，条件 UPDATE 匹配 0 行
+    with pytest.raises(VersionConflictError) as conflict:
+        LevelService.update_level(first, level_id, name="first", expected_version=1)
+    assert conflict.value.current_version == 2
+    assert Session().get(Level, level_id).name == "second"
+
+
+def test_map_and_question_writes_are_conditional(Session, ids):
+    chapter_id, level_id = ids
+    db = Session()
+    level_map = LevelMapService.create_or_update_map(db, chapter_id, "{}", expected_version=0)
+    db.commit()
+    assert level_map.version == 1
+    with pytest.raises(VersionConflictError):
+        LevelMapService.create_or_update_map(db, chapter_id, '{"a": 1}', expected_version=0)
+    db.rollback()
+    assert LevelMapService.create_or_update_map(db, chapter_id, '{"a": 1}', expected_version=1).version == 2
+
+    question = Question(level_id=level_id, question_type="single_choice", title="q")
+    db.add(question)
+    db.commit()
+    assert QuestionService.update_question(db, question.id, expected_version=1, title="q2").version == 2
+    with pytest.raises(VersionConflictError):
+        QuestionService.update_question(db, question.id, expected_version=1, title="q3")
+
+
+def test_version_comes_from_body_or_if_match():
+    assert required_version(ETags(), "level", 3) == 3
+    assert required_version(ETags(["map-2", "level-7"]), "level") == 7
+    assert required_version(ETags(["level-7.12"]), "level") == 7
+    assert required_version(ETags(["level-7.12"]), "level", revision=True) == 12
+    with pytest.raises(PreconditionRequiredError):
+        required_version(ETags(["level-7"]), "level", revision=True)
+    with pytest.raises(PreconditionRequiredError):
+        required_version(ETags(["course-data-7"]), "level")
+
+
+def test_course_data_saves_do_not_bump_the_level_version(Session, ids):
+    _, level_id = ids
+    db = Session()
+    level = db.get(Level, level_id)
+    CourseDataVersionService.record(db, level, {"steps": []})
+    db.commit()
+    assert (level.version, level.course_data_version) == (1, 1)
+
+    # 关卡编辑页持有的版本 1 仍然有效
+    LevelService.update_level(db, level_id, name="renamed", expected_version=1)
+    db.commit()
+    assert level.version == 2
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.db.session import create_app_engine
+from app.models import Chapter
+
+
+def _engine(tmp_path, **overrides):
+    settings = get_settings().model_copy(update={"sqlite_tuned": True, **overrides})
+    url = f"sqlite:///{(tmp_path / 'profile.db').as_posix()}"
+    engine = create_app_engine(url, {"check_same_thread": False}, settings)
+    Base.metadata.create_all(bind=engine)
+    return engine, settings
+
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+@pytest.mark.parametrize("foreign_keys", [False, True])
+def test_every_pooled_connection_gets_the_profile(tmp_path, foreign_keys):
+    engine, settings = _engine(tmp_path, sqlite_foreign_keys=foreign_keys)
+    # 同时借出两个连接，确认每个新建的连接都执行了 PRAGMA
+    with engine.connect() as first, engine.connect() as second:
+        for conn in (first, second):
+            assert _pragma(conn, "journal_mode") == "wal"
+            assert _pragma(conn, "busy_timeout") == settings.sqlite_busy_timeout_ms
+            assert _pragma(conn, "synchronous") == 1  # NORMAL
+            assert _pragma(conn, "foreign_keys") == int(foreign_keys)
+    engine.dispose()
+
+
+def test_concurrent_writers_wait_instead_of_failing(tmp_path):
+    engine, _ = _engine(tmp_path)
+    Session = sessionmaker(bind=engine)
+    errors = []
+    start = threading.Barrier(8)
+
+    def write(worker):
+        start.wait()
+        try:
+            for i in range(25):
+                with Session() as db:
+                    db.add(Chapter(name=f"w{worker}-{i}", teacher_id=1))
+                    db.commit()
+        except Exception as e:  # pragma: no cover - 失败时在断言中报告
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with Session() as db:
+        assert db.query(Chapter).count() == 8 * 25
+    engine.dispose()
+
+
+def test_readers_are_not_blocked_by_an_open_write(tmp_path):
+    engine, _ = _engine(tmp_path)
+    with engine.connect() as writer, engine.connect() as reader:
+        writer.exec_driver_sql("BEGIN IMMEDIATE")
+        writer.execute(insert(Chapter).values(name="pending", teacher_id=1))
+        # WAL：写事务未提交时其他连接照常读取已提交的数据
+        assert reader.execute(text("SELECT count(*) FROM chapters")).scalar() == 0
+        writer.exec_driver_sql("COMMIT")
+        assert reader.execute(text("SELECT count(*) FROM chapters")).scalar() == 1
+    engine.dispose()
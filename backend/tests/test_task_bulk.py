@@ -0,0 +1,154 @@
+import pytest
+from sqlalchemy import event
+
+from app.core.exceptions import PreconditionRequiredError, ValidationError, VersionConflictError
+from app.models import Question, Task, TaskPhase, TaskQuestionRel, TaskStep
+from app.schemas.task_bulk import PhaseBulkItem, QuestionBulkItem
+from app.services.question_service import QuestionService
+from app.services.task_phase_service import TaskPhaseService
+
+
+@pytest.fixture
+def task(db, make_level):
+    task = Task(level_id=make_level().id, name="t")
+    db.add(task)
+    db.commit()
+    return task
+
+
+def _phases(n_phases: int, n_steps: int) -> list:
+    return [
+        PhaseBulkItem(phase_name=f"p{i}", steps=[{"step_name": f"s{i}.{j}"} for j in range(n_steps)])
+        for i in range(n_phases)
+    ]
+
+
+def test_replace_phases_uses_a_constant_number_of_statements(engine, db, task):
+    task_id = task.id
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # 3 次读取 + 删除/更新/插入（环节、步骤各一次）+ 2 次重新加载，与条目数无关
+    max_statements = 11
+
+    phases = TaskPhaseService.replace_phases(db, task_id, _phases(8, 4))
+    assert len(statements) <= max_statements
+    assert [p.phase_name for p in phases] == [f"p{i}" for i in range(8)]
+    assert [s.order for s in phases[3].steps] == [0, 1, 2, 3]
+
+    # 保留并修改第一个环节及其一个步骤，其余删除，再新增一个环节
+    first = phases[0]
+    items = [
+        PhaseBulkItem(id=first.id, phase_name="renamed", steps=[{"id": first.steps[1].id, "step_name": "kept"}]),
+        PhaseBulkItem(phase_name="new", steps=[{"step_name": "n"}]),
+    ]
+    statements.clear()
+    phases = TaskPhaseService.replace_phases(db, task_id, items)
+    db.commit()
+    assert len(statements) <= max_statements
+    assert [(p.phase_name, [s.step_name for s in p.steps]) for p in phases] == [("renamed", ["kept"]), ("new", ["n"])]
+    assert phases[0].id == first.id
+    assert db.query(TaskStep).count() == 2
+
+    statements.clear()
+    TaskPhaseService.replace_phases(db, task_id, _phases(40, 5))
+    assert len(statements) <= max_statements
+
+
+def test_replace_phases_rejects_ids_from_elsewhere(db, task):
+    other = Task(level_id=task.level_id, name="other")
+    db.add(other)
+    db.flush()
+    foreign = TaskPhase(task_id=other.id, phase_name="x")
+    db.add(foreign)
+    db.commit()
+    with pytest.raises(ValidationError):
+        TaskPhaseService.replace_phases(db, task.id, [PhaseBulkItem(id=foreign.id, phase_name="x")])
+    with pytest.raises(ValidationError):
+        TaskPhaseService.replace_phases(db, task.id, [PhaseBulkItem(phase_name="x", steps=[{"id": 999, "step_name": "s"}])])
+    assert db.query(TaskPhase).filter(TaskPhase.task_id == task.id).count() == 0
+
+
+def test_replace_task_questions_keeps_order_and_drops_unlinked(db, task):
+    items = [QuestionBulkItem(question_type="single_choice", title=f"q{i}") for i in range(5)]
+    questions = QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    db.commit()
+    ids = [q.id for q in questions]
+
+    shared = Task(level_id=task.level_id, name="shared")
+    db.add(shared)
+    db.flush()
+    db.add(TaskQuestionRel(task_id=shared.id, question_id=ids[1]))
+    db.commit()
+
+    items = [
+        QuestionBulkItem(id=ids[3], version=1, question_type="single_choice", title="third"),
+        QuestionBulkItem(question_type="true_false", title="new"),
+        QuestionBulkItem(id=ids[0], version=1, question_type="single_choice", title="first"),
+    ]
+    questions = QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    db.commit()
+    assert [q.title for q in questions] == ["third", "new", "first"]
+    assert [q.version for q in questions] == [2, 1, 2]
+    rels = db.query(TaskQuestionRel).filter(TaskQuestionRel.task_id == task.id).order_by(TaskQuestionRel.order)
+    assert [r.question_id for r in rels] == [q.id for q in questions]
+    remaining = {q.id for q in db.query(Question)}
+    assert ids[1] in remaining  # still used by another task
+    assert ids[2] not in remaining and ids[4] not in remaining
+
+
+def test_replace_task_questions_requires_current_versions(db, task):
+    items = [QuestionBulkItem(question_type="single_choice", title="q")]
+    (question,) = QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    db.commit()
+
+    with pytest.raises(PreconditionRequiredError):
+        QuestionService.replace_task_questions(
+            db, task.id, task.level_id, [QuestionBulkItem(id=question.id, question_type="single_choice", title="x")]
+        )
+    with pytest.raises(VersionConflictError) as conflict:
+        QuestionService.replace_task_questions(
+            db, task.id, task.level_id,
+            [QuestionBulkItem(id=question.id, version=0, question_type="single_choice", title="x")],
+        )
+    assert conflict.value.current_version == 1
+
+
+@pytest.mark.parametrize("sane_multi_rowcount", [True, False])
+def test_concurrent_question_edit_is_a_conflict(monkeypatch, sane_multi_rowcount, engine, db, task):
+    monkeypatch.setattr(engine.dialect, "supports_sane_multi_rowcount", sane_multi_rowcount)
+    items = [QuestionBulkItem(question_type="single_choice", title=f"q{i}") for i in range(3)]
+    ids = [q.id for q in QuestionService.replace_task_questions(db, task.id, task.level_id, items)]
+    db.commit()
+
+    # 版本检查之后、条件 UPDATE 之前，另一个请求改了第二道题
+    edited = []
+
+    def concurrent_edit(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE questions") and not edited:
+            edited.append(1)
+            cursor.connection.execute("UPDATE questions SET version = version + 1 WHERE id = ?", (ids[1],))
+
+    event.listen(engine, "before_cursor_execute", concurrent_edit)
+    items = [QuestionBulkItem(id=qid, version=1, question_type="single_choice", title="edited") for qid in ids]
+    with pytest.raises(VersionConflictError):
+        QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    db.rollback()  # 模拟的并发修改与本事务共用连接，一并回滚
+
+    items = [QuestionBulkItem(id=qid, version=1, question_type="single_choice", title="ok") for qid in ids]
+    questions = QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    assert [(q.title, q.version) for q in questions] == [("ok", 2)] * 3
+
+
+def test_loaded_questions_do_not_go_stale(db, task):
+    items = [QuestionBulkItem(question_type="single_choice", title=f"q{i}") for i in range(2)]
+    kept, dropped = QuestionService.replace_task_questions(db, task.id, task.level_id, items)
+    db.commit()
+    kept_id, dropped_id = kept.id, dropped.id
+    assert (kept.version, dropped.title) == (1, "q1")  # 提交后重新加载到会话中
+
+    QuestionService.replace_task_questions(
+        db, task.id, task.level_id, [QuestionBulkItem(id=kept_id, version=1, question_type="single_choice", title="new")]
+    )
+    assert (kept.title, kept.version) == ("new", 2)
+    assert db.get(Question, dropped_id) is None
@@ -0,0 +1,88 @@
+from flask import Flask, g, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.routing import RoutingSession
+from app.db.session import commit_db
+from app.models import Chapter, Level, User
+from app.services.chapter_service import ChapterService
+from app.services.guide_retriever import guide_retriever
+from app.services.level_service import LevelService
+
+
+def _app(engine):
+    Session = sessionmaker(bind=engine, class_=RoutingSession, autoflush=False)
+    app = Flask(__name__)
+    app.after_request(commit_db)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    @app.before_request
+    def _open():
+        g.db = Session()
+
+    @app.route("/chapters/<name>", methods=["POST"])
+    def create(name):
+        chapter = ChapterService.create_chapter(g.db, name=name, description=None, teacher_id=1)
+        if name == "bad":
+            return jsonify({"detail": "rejected"}), 400
+        return jsonify({"id": chapter.id, "created_at": chapter.created_at.isoformat()}), 201
+
+    @app.route("/users/<email>", methods=["POST"])
+    def create_user(email):
+        g.db.add(User(email=email, nickname="n", hashed_password="x"))
+        return jsonify({}), 201
+
+    @app.route("/levels/<int:level_id>/guide/<outcome>", methods=["PUT"])
+    def update_guide(level_id, outcome):
+        LevelService.update_level(g.db, level_id, teaching_guide_md="# 实验步骤\n连接数据库")
+        if outcome == "bad":
+            return jsonify({"detail": "rejected"}), 400
+        return jsonify({}), 200
+
+    return app, Session, commits
+
+
+def test_successful_request_commits_once_and_failed_request_rolls_back(engine):
+    app, Session, commits = _app(engine)
+    client = app.test_client()
+
+    response = client.post("/chapters/ok")
+    assert response.status_code == 201
+    assert response.get_json()["id"] and response.get_json()["created_at"]
+    assert commits == [1]
+
+    assert client.post("/chapters/bad").status_code == 400
+    assert [c.name for c in Session().query(Chapter)] == ["ok"]
+    assert commits == [1]
+
+
+def test_integrity_error_on_commit_becomes_conflict(engine):
+    app, _, _ = _app(engine)
+    client = app.test_client()
+    assert client.post("/users/a@example.com").status_code == 201
+    response = client.post("/users/a@example.com")
+    assert response.status_code == 409
+
+
+def test_guide_index_is_updated_only_after_commit(engine):
+    app, Session, _ = _app(engine)
+    db = Session()
+    chapter = Chapter(name="c", teacher_id=1)
+    db.add(chapter)
+    db.flush()
+    level = Level(chapter_id=chapter.id, name="l")
+    db.add(level)
+    db.commit()
+    level_id = level.id
+    guide_retriever.remove_level(level_id)
+    client = app.test_client()
+
+    try:
+        assert client.put(f"/levels/{level_id}/guide/bad").status_code == 400
+        assert not guide_retriever.is_indexed(level_id)
+
+        assert client.put(f"/levels/{level_id}/guide/ok").status_code == 200
+        assert guide_retriever.is_indexed(level_id)
+    finally:
+        guide_retriever.remove_level(level_id)
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import event
+from werkzeug.exceptions import Unauthorized
+
+from app.core.security import create_access_token, get_current_user
+from app.core.user_cache import CachedUser, _LocalUserCache, get_user_cache
+from app.models import User
+from app.services.user_service import UserService
+
+
+def test_local_cache_expires_and_evicts_least_recently_used():
+    cache = _LocalUserCache(ttl=0.05, max_entries=2)
+    for user_id in (1, 2):
+        cache.set(CachedUser(id=user_id, role="student", is_active=True))
+    assert cache.get(1) is not None  # 1 becomes most recently used
+    cache.set(CachedUser(id=3, role="student", is_active=True))
+    assert cache.get(2) is None and cache.get(1) is not None and cache.get(3) is not None
+    time.sleep(0.06)
+    assert cache.get(1) is None
+
+
+def test_current_user_is_served_from_cache_and_invalidated_on_update(engine, db):
+    user = User(nickname="t", hashed_password="x", role="teacher")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    get_user_cache().clear()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    app = Flask(__name__)
+    headers = {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+
+    def current():
+        with app.test_request_context(headers=headers):
+            g.db = db
+            return get_current_user()
+
+    assert current().role == "teacher"
+    assert current().role == "teacher"
+    assert len([s for s in statements if "FROM users" in s]) == 1
+
+    # 提交之前并发请求仍读到旧行并重新缓存：提交后才清除，不会留下旧角色
+    UserService(db).update_user(user_id, role="admin")
+    get_user_cache().set(CachedUser(id=user_id, role="teacher", is_active=True))
+    db.commit()
+    assert current().role == "admin"
+
+    UserService(db).update_user(user_id, role="student")
+    db.rollback()
+    statements.clear()
+    assert current().role == "admin" and not statements  # 回滚时缓存保持有效
+
+    UserService(db).delete_user(user_id)
+    db.commit()
+    with pytest.raises(Unauthorized):
+        current()
+    get_user_cache().clear()
@@ -0,0 +1,79 @@
+import pytest
+
+from app.core.pagination import invalidate_count_cache
+from app.db.user_search import ensure_user_search_index
+from app.models import User
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def service(engine, db):
+    # 建索引前已存在的用户需要被 rebuild 收录
+    db.add(User(nickname="早期用户", student_id="19990001", hashed_password="x"))
+    db.commit()
+    ensure_user_search_index(engine)
+    db.add_all(
+        [
+            User(nickname="张三丰", student_id="20240001", hashed_password="x"),
+            User(nickname="李四", phone="13820240077", hashed_password="x"),
+            User(nickname="王五", email="wangwu@example.com", hashed_password="x"),
+        ]
+    )
+    db.commit()
+    return UserService(db)
+
+
+def _nicknames(service, term):
+    # 计数缓存按 SQL 文本共享，各测试使用独立的内存库
+    invalidate_count_cache("users")
+    users, total = service.get_users(search=term)
+    assert total == len(users)
+    return [u.nickname for u in users]
+
+
+def test_trigram_search_matches_substrings_and_ranks_prefix_first(service):
+    assert _nicknames(service, "1999") == ["早期用户"]
+    assert _nicknames(service, "张三丰") == ["张三丰"]
+    assert _nicknames(service, "example") == ["王五"]
+    # 学号以 2024 开头的排在手机号中间包含 2024 的前面
+    assert _nicknames(service, "2024") == ["张三丰", "李四"]
+
+
+def test_short_terms_fall_back_to_like(service):
+    assert _nicknames(service, "三丰") == ["张三丰"]
+    assert _nicknames(service, "李") == ["李四"]
+
+
+def test_index_follows_updates_and_deletes(db, service):
+    user = db.query(User).filter(User.nickname == "王五").one()
+    service.update_user(user.id, nickname="王小五", email="xiaowu@example.com")
+    db.commit()
+    assert _nicknames(service, "wangwu") == []
+    assert _nicknames(service, "xiaowu") == ["王小五"]
+
+    service.delete_user(user.id)
+    db.commit()
+    assert _nicknames(service, "xiaowu") == ["王小五"]
+
+    db.delete(user)
+    db.commit()
+    assert _nicknames(service, "xiaowu") == []
+
+
+def test_index_is_not_rewritten_for_non_search_columns(db, service):
+    user = db.query(User).filter(User.nickname == "李四").one()
+    changes = db.connection().exec_driver_sql("SELECT total_changes()").scalar()
+    user.token_version += 1
+    user.is_active = False
+    db.commit()
+    # 触发器写入 FTS 表的行也计入 total_changes：只更新了 users 一行
+    assert db.connection().exec_driver_sql("SELECT total_changes()").scalar() == changes + 1
+
+
+def test_existing_catch_all_update_trigger_is_replaced(engine, db, service):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TRIGGER users_fts_au")
+        conn.exec_driver_sql("CREATE TRIGGER users_fts_au AFTER UPDATE ON users BEGIN SELECT 1; END")
+    ensure_user_search_index(engine)
+    sql = db.connection().exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'users_fts_au'").scalar()
+    assert "AFTER UPDATE OF email, phone, student_id, nickname ON users" in sql
@@ -20,17 +20,73 @@ apiClient.interceptors.request.use(
   }
 )
 
-// 响应拦截器：处理错误
+// 刷新访问令牌：并发的 401 请求共用同一次刷新
+let refreshing: Promise<string | null> | null = null
+
+export function refreshAccessToken(): Promise<string | null> {
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!refreshToken) return Promise.resolve(null)
+  if (!refreshing) {
+    refreshing = axios
+      .post(`${apiClient.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken })
+      .then(({ data }) => {
+        localStorage.setItem('token', data.access_token)
+        localStorage.setItem('refresh_token', data.refresh_token)
+        apiClient.defaults.headers.common.Authorization = `Bearer ${data.access_token}`
+        return data.access_token as string
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshing = null
+      })
+  }
+  return refreshing
+}
+
+// 响应拦截器：访问令牌过期时用刷新令牌换取新令牌并重试一次，刷新失败再清除登录状态
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const config = error.config
+    const isAuthCall = config?.url?.includes('/auth/login') || config?.url?.includes('/auth/refresh')
+    if (error.response?.status === 401 && config && !config._retried && !isAuthCall) {
+      config._retried = true
+      const token = await refreshAccessToken()
+      if (token) {
+        config.headers.Authorization = `Bearer ${token}`
+        return apiClient(config)
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('token')
+      localStorage.removeItem('refresh_token')
       // 可以在这里添加跳转到登录页的逻辑
     }
     return Promise.reject(error)
   },
 )
 
+/**
+ * 流式接口无法走 axios，用 fetch 发请求时经由此函数：
+ * 自动附带访问令牌，遇到 401 时与拦截器一样刷新一次令牌并重试
+ */
+export async function authFetch(url: string, init: RequestInit = {}): Promise<Response> {
+  const send = (token: string | null) => {
+    const headers = new Headers(init.headers)
+    if (token) headers.set('Authorization', `Bearer ${token}`)
+    return fetch(url, { ...init, headers })
+  }
+  let response = await send(localStorage.getItem('token'))
+  if (response.status === 401) {
+    const token = await refreshAccessToken()
+    if (token) response = await send(token)
+  }
+  if (response.status === 401) {
+    localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
+  }
+  return response
+}
+
 export default apiClient
 
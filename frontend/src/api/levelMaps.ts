@@ -5,6 +5,7 @@ export interface LevelMap {
   id: number
   chapter_id: number
   map_config_json?: string
+  version: number
 }
 
 export interface LevelMapUpdate {
@@ -17,9 +18,9 @@ export const levelMapsApi = {
     return apiClient.get(`/chapters/${chapterId}/map`)
   },
 
-  // 更新地图配置
-  updateMap(chapterId: number, data: LevelMapUpdate): Promise<AxiosResponse<LevelMap>> {
-    return apiClient.put(`/chapters/${chapterId}/map`, data)
+  // 更新地图配置：version 为读取时的版本（地图尚不存在时为 0），已被修改时返回 409
+  updateMap(chapterId: number, data: LevelMapUpdate, version: number): Promise<AxiosResponse<LevelMap>> {
+    return apiClient.put(`/chapters/${chapterId}/map`, { ...data, version })
   },
 }
 
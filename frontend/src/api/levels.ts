@@ -1,5 +1,6 @@
 import apiClient from './http'
 import type { AxiosResponse } from 'axios'
+import type { JsonPatchOperation } from '../utils/jsonPatch'
 
 export interface Level {
   id: number
@@ -11,10 +12,26 @@ export interface Level {
   is_published: boolean
   published_at?: string
   teaching_guide_md?: string
+  course_data_json?: string
+  course_data_version?: number
+  version: number
   created_at: string
   updated_at: string
 }
 
+export interface CourseDataVersion {
+  version: number
+  kind: 'snapshot' | 'delta'
+  size: number
+  source: 'initial' | 'edit' | 'ai' | 'patch' | 'restore'
+  restored_from?: number | null
+  created_by?: number | null
+  created_at: string
+}
+
+// 列表接口默认不返回的大字段，可通过 fields 参数请求
+export type LevelContentField = 'teaching_guide_md' | 'course_data_json'
+
 export interface LevelCreate {
   chapter_id: number
   name: string
@@ -28,6 +45,9 @@ export interface LevelUpdate {
   order?: number
   is_visible?: boolean
   teaching_guide_md?: string
+  course_data_json?: string
+  // 修改课程数据时必填：读取时的课程数据版本，不是当前版本时返回 409
+  course_data_base_version?: number
 }
 
 export interface TreasureChestCreate {
@@ -50,9 +70,11 @@ export interface TreasureChest {
 }
 
 export const levelsApi = {
-  // 获取篇章下的关卡列表
-  getLevels(chapterId: number): Promise<AxiosResponse<Level[]>> {
-    return apiClient.get(`/chapters/${chapterId}/levels`)
+  // 获取篇章下的关卡列表（默认不含教案与课程数据）
+  getLevels(chapterId: number, fields?: LevelContentField[]): Promise<AxiosResponse<Level[]>> {
+    return apiClient.get(`/chapters/${chapterId}/levels`, {
+      params: fields?.length ? { fields: fields.join(',') } : undefined
+    })
   },
 
   // 获取关卡详情
@@ -65,9 +87,9 @@ export const levelsApi = {
     return apiClient.post(`/chapters/${chapterId}/levels`, data)
   },
 
-  // 更新关卡
-  updateLevel(id: number, data: LevelUpdate): Promise<AxiosResponse<Level>> {
-    return apiClient.put(`/levels/${id}`, data)
+  // 更新关卡：version 为读取时的版本，关卡已被修改时返回 409
+  updateLevel(id: number, data: LevelUpdate, version: number): Promise<AxiosResponse<Level>> {
+    return apiClient.put(`/levels/${id}`, { ...data, version })
   },
 
   // 删除关卡
@@ -85,9 +107,43 @@ export const levelsApi = {
     return apiClient.get(`/levels/${levelId}/course-data`)
   },
 
-  // 更新课程数据
-  updateCourseData(levelId: number, courseData: any): Promise<AxiosResponse<any>> {
-    return apiClient.put(`/levels/${levelId}/course-data`, { course_data: courseData })
+  // 整体更新课程数据：baseVersion 为读取时的课程数据版本，不是当前版本时返回 409
+  updateCourseData(levelId: number, courseData: any, baseVersion: number): Promise<AxiosResponse<any>> {
+    return apiClient.put(`/levels/${levelId}/course-data`, { course_data: courseData, base_version: baseVersion })
+  },
+
+  // 以 JSON Patch 增量保存课程数据；baseVersion 不是当前版本时返回 409
+  patchCourseData(
+    levelId: number,
+    patch: JsonPatchOperation[],
+    baseVersion: number
+  ): Promise<AxiosResponse<{ detail: string; version: number }>> {
+    return apiClient.patch(`/levels/${levelId}/course-data`, patch, {
+      headers: {
+        'Content-Type': 'application/json-patch+json',
+        'If-Match': `"course-data-${baseVersion}"`
+      }
+    })
+  },
+
+  // 课程数据版本列表（新版本在前）
+  getCourseDataVersions(levelId: number): Promise<AxiosResponse<CourseDataVersion[]>> {
+    return apiClient.get(`/levels/${levelId}/course-data/versions`)
+  },
+
+  // 获取指定版本的课程数据
+  getCourseDataVersion(levelId: number, version: number): Promise<AxiosResponse<{ version: number; course_data: any }>> {
+    return apiClient.get(`/levels/${levelId}/course-data/versions/${version}`)
+  },
+
+  // 比较两个版本（to 缺省为当前版本），返回 JSON Patch
+  diffCourseData(levelId: number, from: number, to?: number): Promise<AxiosResponse<{ from: number; to: number; patch: any[] }>> {
+    return apiClient.get(`/levels/${levelId}/course-data/diff`, { params: { from, to } })
+  },
+
+  // 恢复到指定版本（作为新版本保存）
+  restoreCourseDataVersion(levelId: number, version: number): Promise<AxiosResponse<any>> {
+    return apiClient.post(`/levels/${levelId}/course-data/versions/${version}/restore`)
   },
 
   // 同步到MD
@@ -14,6 +14,7 @@ export interface Question {
   score: number
   knowledge_point?: string
   tags?: string[] | null
+  version: number
   created_at: string
   updated_at: string
 }
@@ -55,12 +56,21 @@ export const questionsApi = {
     return apiClient.post(`/levels/${levelId}/questions`, data)
   },
 
+  // 一次保存任务的全部题目（顺序即任务内顺序）：带 id 的更新（需带读取时的 version），不带 id 的新建，未列出的解除关联
+  replaceTaskQuestions(
+    taskId: number,
+    questions: (QuestionUpdate & { id?: number; version?: number; question_type: string; title: string })[],
+  ): Promise<AxiosResponse<Question[]>> {
+    return apiClient.put(`/tasks/${taskId}/questions`, { questions })
+  },
+
   getQuestion(id: number): Promise<AxiosResponse<Question>> {
     return apiClient.get(`/questions/${id}`)
   },
 
-  updateQuestion(id: number, data: QuestionUpdate): Promise<AxiosResponse<Question>> {
-    return apiClient.put(`/questions/${id}`, data)
+  // version 为读取时的版本，题目已被修改时返回 409
+  updateQuestion(id: number, data: QuestionUpdate, version: number): Promise<AxiosResponse<Question>> {
+    return apiClient.put(`/questions/${id}`, { ...data, version })
   },
 
   deleteQuestion(id: number): Promise<AxiosResponse<void>> {
@@ -23,6 +23,28 @@ export interface TaskPhaseUpdate {
   is_required?: boolean
 }
 
+export interface TaskPhaseBulkStep {
+  id?: number
+  step_name: string
+  content?: string
+  requirements?: string
+  submission_type?: string
+  validation_rules?: Record<string, any> | null
+  order?: number
+}
+
+export interface TaskPhaseBulkItem {
+  id?: number
+  phase_name: string
+  order?: number
+  is_required?: boolean
+  steps: TaskPhaseBulkStep[]
+}
+
+export interface TaskPhaseWithSteps extends TaskPhase {
+  steps: (TaskPhaseBulkStep & { id: number; phase_id: number; order: number })[]
+}
+
 export const taskPhasesApi = {
   getPhases(taskId: number): Promise<AxiosResponse<TaskPhase[]>> {
     return apiClient.get(`/tasks/${taskId}/phases`)
@@ -39,6 +61,11 @@ export const taskPhasesApi = {
   deletePhase(taskId: number, phaseId: number): Promise<AxiosResponse<void>> {
     return apiClient.delete(`/tasks/${taskId}/phases/${phaseId}`)
   },
+
+  // 一次保存任务的全部环节与步骤：带 id 的更新，不带 id 的新建，未列出的删除
+  replacePhases(taskId: number, phases: TaskPhaseBulkItem[]): Promise<AxiosResponse<TaskPhaseWithSteps[]>> {
+    return apiClient.put(`/tasks/${taskId}/phases`, { phases })
+  },
 }
 
 
@@ -64,8 +64,12 @@ export const useAuthStore = defineStore('auth', () => {
     loading.value = true
     error.value = null
     try {
-      const { data } = await apiClient.post<{ access_token: string; user: User }>('/auth/login', payload)
+      const { data } = await apiClient.post<{ access_token: string; refresh_token: string; user: User }>(
+        '/auth/login',
+        payload,
+      )
       setToken(data.access_token)
+      localStorage.setItem('refresh_token', data.refresh_token)
       // Save user info from login response
       if (data.user) {
         currentUser.value = data.user
@@ -92,7 +96,14 @@ export const useAuthStore = defineStore('auth', () => {
   }
 
   function logout() {
+    if (token.value) {
+      // 通知后端吊销本次会话的令牌；失败不影响本地登出
+      apiClient
+        .post('/auth/logout', null, { headers: { Authorization: `Bearer ${token.value}` } })
+        .catch(() => null)
+    }
     setToken(null)
+    localStorage.removeItem('refresh_token')
     currentUser.value = null
   }
 
@@ -0,0 +1,81 @@
+/**
+ * JSON Patch（RFC 6902）生成工具
+ * 与后端 app/core/json_patch.py 的 make_patch 规则一致：对象按键递归比较，
+ * 数组先去掉相同的前缀与后缀再逐项比较，补丁大小与改动量成正比
+ */
+
+export type JsonPatchOperation =
+  | { op: 'add' | 'replace'; path: string; value: any }
+  | { op: 'remove'; path: string }
+
+const escapeToken = (token: string | number) => String(token).replace(/~/g, '~0').replace(/\//g, '~1')
+
+const join = (path: string, token: string | number) => `${path}/${escapeToken(token)}`
+
+const isObject = (value: any) => value !== null && typeof value === 'object' && !Array.isArray(value)
+
+const clone = <T>(value: T): T => (value === undefined ? value : JSON.parse(JSON.stringify(value)))
+
+function isEqual(a: any, b: any): boolean {
+  if (a === b) return true
+  if (Array.isArray(a) && Array.isArray(b)) {
+    return a.length === b.length && a.every((item, i) => isEqual(item, b[i]))
+  }
+  if (isObject(a) && isObject(b)) {
+    const keys = Object.keys(a).filter((key) => a[key] !== undefined)
+    const otherKeys = Object.keys(b).filter((key) => b[key] !== undefined)
+    return keys.length === otherKeys.length && keys.every((key) => key in b && isEqual(a[key], b[key]))
+  }
+  return false
+}
+
+function diff(oldValue: any, newValue: any, path: string, ops: JsonPatchOperation[]) {
+  if (isObject(oldValue) && isObject(newValue)) {
+    for (const key of Object.keys(oldValue)) {
+      if (oldValue[key] !== undefined && (!(key in newValue) || newValue[key] === undefined)) {
+        ops.push({ op: 'remove', path: join(path, key) })
+      }
+    }
+    for (const key of Object.keys(newValue)) {
+      if (newValue[key] === undefined) continue
+      if (!(key in oldValue) || oldValue[key] === undefined) {
+        ops.push({ op: 'add', path: join(path, key), value: clone(newValue[key]) })
+      } else if (!isEqual(oldValue[key], newValue[key])) {
+        diff(oldValue[key], newValue[key], join(path, key), ops)
+      }
+    }
+    return
+  }
+  if (Array.isArray(oldValue) && Array.isArray(newValue)) {
+    const limit = Math.min(oldValue.length, newValue.length)
+    let prefix = 0
+    while (prefix < limit && isEqual(oldValue[prefix], newValue[prefix])) prefix++
+    let suffix = 0
+    while (
+      suffix < limit - prefix &&
+      isEqual(oldValue[oldValue.length - 1 - suffix], newValue[newValue.length - 1 - suffix])
+    ) suffix++
+    const oldMiddle = oldValue.slice(prefix, oldValue.length - suffix)
+    const newMiddle = newValue.slice(prefix, newValue.length - suffix)
+    const common = Math.min(oldMiddle.length, newMiddle.length)
+    for (let i = 0; i < common; i++) {
+      if (!isEqual(oldMiddle[i], newMiddle[i])) diff(oldMiddle[i], newMiddle[i], join(path, prefix + i), ops)
+    }
+    // 多出的旧元素在同一下标处依次删除；多出的新元素依次插入
+    for (let i = common; i < oldMiddle.length; i++) ops.push({ op: 'remove', path: join(path, prefix + common) })
+    for (let i = common; i < newMiddle.length; i++) {
+      ops.push({ op: 'add', path: join(path, prefix + i), value: clone(newMiddle[i]) })
+    }
+    return
+  }
+  if (!isEqual(oldValue, newValue)) {
+    ops.push({ op: 'replace', path, value: clone(newValue) })
+  }
+}
+
+/** 生成把 oldValue 变为 newValue 的 JSON Patch（相同则为空数组） */
+export function makePatch(oldValue: any, newValue: any): JsonPatchOperation[] {
+  const ops: JsonPatchOperation[] = []
+  diff(oldValue, newValue, '', ops)
+  return ops
+}